@@ -6,6 +6,7 @@ from acapy_agent.core.plugin_registry import PluginRegistry
 
 from acapy_agent.core.protocol_registry import ProtocolRegistry
 
+from ..innkeeper.config import get_config
 from .creddef_storage_service import CredDefStorageService, subscribe
 
 LOGGER = logging.getLogger(__name__)
@@ -26,7 +27,8 @@ async def setup(context: InjectionContext):
     if not bus:
         raise ValueError("EventBus missing in context")
 
-    srv = CredDefStorageService()
+    _config = get_config(context.settings)
+    srv = CredDefStorageService(max_concurrency=_config.storage_sync.max_concurrency)
     context.injector.bind_instance(CredDefStorageService, srv)
 
     subscribe(bus)
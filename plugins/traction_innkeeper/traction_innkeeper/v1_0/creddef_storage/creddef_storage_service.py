@@ -1,11 +1,18 @@
+import asyncio
+import json
 import logging
 import re
-from typing import Optional
+from typing import Awaitable, Callable, Dict, Optional
 
 from acapy_agent.core.event_bus import EventBus, Event
 from acapy_agent.core.profile import Profile
-from acapy_agent.storage.error import StorageNotFoundError
+from acapy_agent.messaging.credential_definitions.util import CRED_DEF_SENT_RECORD_TYPE
+from acapy_agent.revocation.models.issuer_rev_reg_record import IssuerRevRegRecord
+from acapy_agent.storage.base import BaseStorage
+from acapy_agent.storage.error import StorageDuplicateError, StorageNotFoundError
 
+from ..innkeeper.ledger_cache import CRED_DEF, LEDGER_CACHE, ledger_key
+from ..innkeeper.metrics import timed_event_handler
 from .models import CredDefStorageRecord
 
 from acapy_agent.messaging.credential_definitions.util import (
@@ -17,10 +24,16 @@ from acapy_agent.anoncreds.events import (
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_MAX_CONCURRENCY = 8
+
+# async callback receiving one progress entry per cred def during sync_created
+SyncProgress = Callable[[dict], Awaitable[None]]
+
 
 class CredDefStorageService:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
         self._logger = logging.getLogger(__name__)
+        self._max_concurrency = max(max_concurrency, 1)
 
     @property
     def logger(self) -> logging.Logger:
@@ -83,6 +96,10 @@ class CredDefStorageService:
         from acapy_agent.anoncreds.registry import AnonCredsRegistry
         from acapy_agent.anoncreds.base import AnonCredsResolutionError
 
+        cached = LEDGER_CACHE.get(ledger_key(profile), CRED_DEF, cred_def_id)
+        if cached:
+            return cached["tag"]
+
         try:
             anoncreds_registry = profile.inject(AnonCredsRegistry)
             cred_def_result = await anoncreds_registry.get_credential_definition(profile, cred_def_id)
@@ -91,7 +108,6 @@ class CredDefStorageService:
             tag = cred_def.tag or "default"
 
             self.logger.debug(f"Fetched tag from registry: {tag}")
-            return tag
         except AnonCredsResolutionError:
             # Registry doesn't support this identifier
             self.logger.error(f"Registry could not resolve credential definition: {cred_def_id}")
@@ -101,6 +117,11 @@ class CredDefStorageService:
             self.logger.error(f"Error fetching credential definition from registry: {err}")
             return None
 
+        # published cred defs never change, share the tag with every tenant
+        LEDGER_CACHE.put(ledger_key(profile), CRED_DEF, cred_def_id, {"tag": tag})
+        LEDGER_CACHE.schedule_flush()
+        return tag
+
     async def _create_storage_record(self, profile: Profile, data: dict) -> CredDefStorageRecord:
         """Create and save a credential definition storage record."""
         rec: CredDefStorageRecord = CredDefStorageRecord.deserialize(data)
@@ -160,6 +181,145 @@ class CredDefStorageService:
         self.logger.info(f"< remove_item({cred_def_id}): {result}")
         return result
 
+    async def _find_created_anoncreds(self, profile: Profile) -> Dict[str, dict]:
+        """Read every finished cred def this wallet created from the AnonCreds store.
+
+        The stored cred def already carries its tag, so no registry call is needed.
+        """
+        from acapy_agent.anoncreds.constants import CATEGORY_CRED_DEF, STATE_FINISHED
+
+        async with profile.session() as session:
+            entries = await session.handle.fetch_all(CATEGORY_CRED_DEF, {"state": STATE_FINISHED})
+
+        found = {}
+        for entry in entries:
+            support_revocation = entry.tags.get("support_revocation") == "True"
+            try:
+                tag = json.loads(entry.value).get("tag")
+            except (TypeError, ValueError):
+                tag = None
+            found[entry.name] = {
+                "cred_def_id": entry.name,
+                "schema_id": entry.tags.get("schema_id"),
+                "tag": tag,
+                "support_revocation": support_revocation,
+                "rev_reg_size": int(entry.tags["max_cred_num"]) if support_revocation else None,
+            }
+        return found
+
+    async def _find_created_indy(self, profile: Profile) -> Dict[str, dict]:
+        """Read every cred def this wallet sent to the ledger from its cred_def_sent records.
+
+        The tag is the last part of an Indy cred def id and revocation details come
+        from the wallet's own revocation registries, so nothing is fetched from the ledger.
+        """
+        async with profile.session() as session:
+            storage = session.inject(BaseStorage)
+            sent_records = await storage.find_all_records(type_filter=CRED_DEF_SENT_RECORD_TYPE, tag_query={})
+            rev_regs = await IssuerRevRegRecord.query(session)
+
+        rev_reg_sizes = {}
+        for rev_reg in rev_regs:
+            rev_reg_sizes.setdefault(rev_reg.cred_def_id, rev_reg.max_cred_num)
+
+        found = {}
+        for sent in sent_records:
+            cred_def_id = sent.value
+            found[cred_def_id] = {
+                "cred_def_id": cred_def_id,
+                "schema_id": sent.tags.get("schema_id"),
+                "tag": cred_def_id.split(":")[-1],
+                "support_revocation": cred_def_id in rev_reg_sizes,
+                "rev_reg_size": rev_reg_sizes.get(cred_def_id),
+            }
+        return found
+
+    async def sync_created(self, profile: Profile, progress: Optional[SyncProgress] = None):
+        """Store every cred def this wallet created that is not stored yet.
+
+        progress gets "exists" for each cred def already stored and "resolved"
+        as each missing one has its tag, both counted in done. The missing ones
+        are saved in one batch, after which each gets "added" or "error".
+        """
+        self.logger.info("> sync_created()")
+
+        # find all cred defs i created and everything already stored, one query each
+        if self._is_anoncreds_wallet(profile):
+            found = await self._find_created_anoncreds(profile)
+        else:
+            found = await self._find_created_indy(profile)
+        stored = {rec.cred_def_id for rec in await self.list_items(profile)}
+        missing = [data for cred_def_id, data in found.items() if cred_def_id not in stored]
+        self.logger.debug(f"created count = {len(found)}, missing = {len(missing)}")
+
+        total = len(found)
+        done = 0
+        errors = []
+
+        async def report(cred_def_id: str, status: str, error: str = None):
+            nonlocal done
+            if status in ("exists", "resolved"):
+                done += 1
+            if progress:
+                entry = {"cred_def_id": cred_def_id, "status": status, "done": done, "total": total}
+                if error:
+                    entry["error"] = error
+                await progress(entry)
+
+        for cred_def_id in found:
+            if cred_def_id in stored:
+                await report(cred_def_id, "exists")
+
+        # tags the local store could not supply come from the registry, each id
+        # resolved once and at most max_concurrency at a time
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def resolve_tag(data: dict):
+            if not data["tag"]:
+                async with semaphore:
+                    data["tag"] = await self._fetch_tag(profile, data["cred_def_id"])
+            await report(data["cred_def_id"], "resolved")
+
+        await asyncio.gather(*(resolve_tag(data) for data in missing))
+
+        # insert all missing records in one transaction
+        missing = [{key: value for key, value in data.items() if value is not None} for data in missing]
+        try:
+            async with profile.transaction() as txn:
+                for data in missing:
+                    rec: CredDefStorageRecord = CredDefStorageRecord.deserialize(data)
+                    await rec.save(txn, reason="Synced cred def storage record")
+                await txn.commit()
+        except StorageDuplicateError:
+            # the event handler stored one meanwhile, add_item skips existing records
+            self.logger.info("sync_created(): batch insert raced an event, adding one by one")
+            for data in missing:
+                try:
+                    await self.add_item(profile, data)
+                except Exception as err:
+                    self.logger.error(f"Error syncing cred def {data['cred_def_id']}: {err}")
+                    errors.append(err)
+                    await report(data["cred_def_id"], "error", str(err))
+                else:
+                    await report(data["cred_def_id"], "added")
+        except Exception as err:
+            self.logger.error(f"Error syncing cred defs: {err}")
+            errors.append(err)
+            for data in missing:
+                await report(data["cred_def_id"], "error", str(err))
+        else:
+            for data in missing:
+                await report(data["cred_def_id"], "added")
+
+        if errors and not progress:
+            # nothing streamed the failures to the caller, fail like a single add would
+            raise errors[0]
+
+        records = await self.list_items(profile)
+
+        self.logger.info(f"< sync_created(): {len(records)}")
+        return records
+
 
 def subscribe(bus: EventBus):
     # Subscribe to both Indy and AnonCreds credential definition events
@@ -207,6 +367,7 @@ def _normalize_creddef_event_payload(event: Event) -> dict:
         return payload if isinstance(payload, dict) else {}
 
 
+@timed_event_handler
 async def creddef_event_handler(profile: Profile, event: Event):
     LOGGER.info("> creddef_event_handler")
     LOGGER.debug(f"profile = {profile}")
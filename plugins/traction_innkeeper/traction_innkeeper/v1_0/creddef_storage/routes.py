@@ -1,8 +1,9 @@
 import functools
+import json
 import logging
 
 from aiohttp import web
-from aiohttp_apispec import docs, response_schema, match_info_schema, request_schema
+from aiohttp_apispec import docs, response_schema, match_info_schema, request_schema, use_kwargs
 from acapy_agent.admin.request_context import AdminRequestContext
 
 from acapy_agent.messaging.models.base import BaseModelError
@@ -13,6 +14,10 @@ from acapy_agent.admin.decorators.auth import tenant_authentication
 
 from marshmallow import fields
 
+from ..innkeeper.etag import json_response_with_etag, record_etag
+from ..innkeeper.jobs import JOBS, background_requested, item_progress
+from ..innkeeper.models import JobRecord, JobRecordSchema
+
 from .models import CredDefStorageRecordSchema
 from .creddef_storage_service import CredDefStorageService
 
@@ -66,6 +71,22 @@ class CredDefStorageAddSchema(OpenAPISchema):
     )
 
 
+class CredDefStorageSyncQuerySchema(OpenAPISchema):
+    stream = fields.Bool(
+        required=False,
+        metadata={
+            "description": (
+                "Stream per cred def progress as newline delimited JSON, results last: exists or"
+                " resolved as each cred def is checked, then added or error once the batch is saved"
+            )
+        },
+    )
+    background = fields.Bool(
+        required=False,
+        metadata={"description": "Run as a job and return 202 with the job to poll"},
+    )
+
+
 class CredDefStorageOperationResponseSchema(OpenAPISchema):
     """Response schema for simple operations."""
 
@@ -91,9 +112,12 @@ async def creddef_storage_list(request: web.BaseRequest):
     tag_filter = {}
     post_filter = {}
     records = await storage_srv.list_items(profile, tag_filter, post_filter)
-    results = [record.serialize() for record in records]
 
-    return web.json_response({"results": results})
+    return json_response_with_etag(
+        request,
+        record_etag(*records),
+        lambda: {"results": [record.serialize() for record in records]},
+    )
 
 
 @docs(
@@ -129,7 +153,7 @@ async def creddef_storage_get(request: web.BaseRequest):
 
     record = await storage_srv.read_item(profile, cred_def_id)
 
-    return web.json_response(record.serialize())
+    return json_response_with_etag(request, record_etag(record), record.serialize)
 
 
 @docs(
@@ -150,6 +174,51 @@ async def creddef_storage_remove(request: web.BaseRequest):
     return web.json_response({"success": success})
 
 
+@docs(
+    tags=[SWAGGER_CATEGORY],
+)
+@use_kwargs(CredDefStorageSyncQuerySchema(), location="query")
+@response_schema(JobRecordSchema(), 202, description="")
+@response_schema(CredDefStorageListSchema(), 200, description="")
+@error_handler
+@tenant_authentication
+async def creddef_storage_sync_created(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+    profile = context.profile
+    storage_srv = context.inject_or(CredDefStorageService)
+
+    if background_requested(request):
+
+        async def run(job: JobRecord):
+            await storage_srv.sync_created(profile, progress=item_progress(job, "cred_def_id"))
+
+        # safe to interrupt, cancelling rolls back the single batch insert
+        job = await JOBS.start(
+            "cred_def_sync",
+            run,
+            wallet_id=profile.settings.get("wallet.id"),
+            interruptible=True,
+        )
+        return web.json_response(job.serialize(), status=202)
+
+    if request.query.get("stream", "false").lower() not in {"true", "1", "yes"}:
+        records = await storage_srv.sync_created(profile)
+        results = [record.serialize() for record in records]
+
+        return web.json_response({"results": results})
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def write_line(entry: dict):
+        await response.write(json.dumps(entry).encode("utf-8") + b"\n")
+
+    records = await storage_srv.sync_created(profile, progress=write_line)
+    await write_line({"results": [record.serialize() for record in records]})
+    await response.write_eof()
+    return response
+
+
 async def register(app: web.Application):
     """Register routes."""
     LOGGER.info("> registering routes")
@@ -170,6 +239,7 @@ async def register(app: web.Application):
                 "/credential-definition-storage/{cred_def_id}",
                 creddef_storage_remove,
             ),
+            web.post("/credential-definition-storage/sync-created", creddef_storage_sync_created),
         ]
     )
     LOGGER.info("< registering routes")
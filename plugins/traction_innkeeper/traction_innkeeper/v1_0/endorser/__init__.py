@@ -5,7 +5,9 @@ from acapy_agent.core.event_bus import EventBus
 from acapy_agent.core.plugin_registry import PluginRegistry
 from acapy_agent.core.protocol_registry import ProtocolRegistry
 
+from ..innkeeper.metrics import METRICS
 from .endorser_connection_service import (
+    ENDORSER_CONNECTION_CACHE,
     EndorserConnectionService,
     subscribe,
 )
@@ -32,5 +34,6 @@ async def setup(context: InjectionContext):
     context.injector.bind_instance(EndorserConnectionService, srv)
 
     subscribe(bus)
+    METRICS.register_cache("endorser_connection", ENDORSER_CONNECTION_CACHE)
 
     LOGGER.info("< plugin setup.")
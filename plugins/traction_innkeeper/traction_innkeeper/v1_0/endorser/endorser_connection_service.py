@@ -1,5 +1,7 @@
 import logging
 import re
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 from acapy_agent.config.injector import Injector
 from acapy_agent.connections.models.conn_record import ConnRecord
@@ -9,15 +11,104 @@ from acapy_agent.protocols.didexchange.v1_0.manager import DIDXManager
 from acapy_agent.protocols.endorse_transaction.v1_0.manager import (
     TransactionManager,
 )
+from acapy_agent.storage.error import StorageNotFoundError
 
 
 from ..innkeeper.tenant_manager import TenantManager
+from ..innkeeper.metrics import cache_stats, timed_event_handler
 
 
 CONNECTIONS_EVENT_PATTERN = re.compile(f"acapy::record::{ConnRecord.RECORD_TOPIC}::.*")
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_CACHE_MAX_SIZE = 10000
+
+
+class EndorserConnectionCache:
+    """In-process cache of each wallet's endorser connection.
+
+    Maps wallet_id to the endorser alias it was looked up for and the
+    endorser connection_id, or None once a wallet is known to have no
+    connection with that endorser, and remembers which endorser connections
+    already carry endorser metadata. An entry only answers for the alias it
+    was stored with, so a wallet switched to another endorser is looked up
+    again; a ledger switch drops the wallet's entry with `invalidate`.
+    Connection events keep it current; both maps evict their least recently
+    used entry at `max_size`.
+
+    `generation` is bumped on every event; a reader that captured it before
+    going to storage passes it back to `put` so a lookup that raced a new
+    connection never caches "no endorser connection" over it.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        self._connections: "OrderedDict[str, Tuple[str, Optional[str]]]" = OrderedDict()
+        self._with_metadata: "OrderedDict[str, None]" = OrderedDict()
+        self._max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+
+    def lookup(self, wallet_id: str, alias: str) -> Tuple[bool, Optional[str]]:
+        """Return (cached, connection_id) for wallet_id's endorser alias."""
+        entry = self._connections.get(wallet_id) if wallet_id else None
+        if entry is None or entry[0] != alias:
+            self.misses += 1
+            return False, None
+        self._connections.move_to_end(wallet_id)
+        self.hits += 1
+        return True, entry[1]
+
+    def put(self, wallet_id: str, alias: str, connection_id: Optional[str], generation: Optional[int] = None):
+        if not wallet_id:
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._set(self._connections, wallet_id, (alias, connection_id))
+
+    def invalidate(self, wallet_id: str):
+        """Forget wallet_id's endorser connection, after its ledger changed."""
+        self.generation += 1
+        self._connections.pop(wallet_id, None)
+
+    def has_metadata(self, connection_id: str) -> bool:
+        return connection_id in self._with_metadata
+
+    def set_has_metadata(self, connection_id: str):
+        self._set(self._with_metadata, connection_id, None)
+
+    def connection_changed(self, wallet_id: str, record: ConnRecord, deleted: bool = False):
+        """Track a state change of a connection with the endorser alias."""
+        self.generation += 1
+        connection_id = record.connection_id
+        if deleted:
+            self._with_metadata.pop(connection_id, None)
+            if wallet_id and self._connections.get(wallet_id) == (record.alias, connection_id):
+                del self._connections[wallet_id]
+            return
+        if record.state != ConnRecord.State.COMPLETED:
+            self._with_metadata.pop(connection_id, None)
+        self.put(wallet_id, record.alias, connection_id)
+
+    def clear(self):
+        self.generation += 1
+        self._connections.clear()
+        self._with_metadata.clear()
+
+    def _set(self, entries: OrderedDict, key: str, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > max(self._max_size, 0):
+            entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return cache_stats(self.hits, self.misses, size=len(self._connections), max_size=self._max_size)
+
+
+# one cache per process, shared by the endorser routes and connection events
+ENDORSER_CONNECTION_CACHE = EndorserConnectionCache()
+
 
 class EndorserConnectionService:
     def __init__(self):
@@ -61,10 +152,26 @@ class EndorserConnectionService:
         info = self.endorser_info(profile)
         result = None
         if info:
+            wallet_id = profile.settings.get("wallet.id")
+            cached, connection_id = ENDORSER_CONNECTION_CACHE.lookup(wallet_id, info["endorser_name"])
+            if cached and not connection_id:
+                # known to have no endorser connection yet
+                self.logger.info("< endorser_connection(): None")
+                return None
+            generation = ENDORSER_CONNECTION_CACHE.generation
             async with profile.session() as session:
-                conn_recs = await ConnRecord.retrieve_by_alias(session, alias=info["endorser_name"])
-                if len(conn_recs):
-                    result = conn_recs[0]
+                if cached:
+                    try:
+                        result = await ConnRecord.retrieve_by_id(session, connection_id)
+                    except StorageNotFoundError:
+                        cached = False
+                if not cached:
+                    conn_recs = await ConnRecord.retrieve_by_alias(session, alias=info["endorser_name"])
+                    if len(conn_recs):
+                        result = conn_recs[0]
+                    ENDORSER_CONNECTION_CACHE.put(
+                        wallet_id, info["endorser_name"], result and result.connection_id, generation
+                    )
 
         self.logger.info(f"< endorser_connection(): {result}")
         return result
@@ -103,6 +210,7 @@ def subscribe(bus: EventBus):
     bus.subscribe(CONNECTIONS_EVENT_PATTERN, connections_event_handler)
 
 
+@timed_event_handler
 async def connections_event_handler(profile: Profile, event: Event):
     LOGGER.info("> connections_event_handler")
     LOGGER.debug(f"profile = {profile}")
@@ -114,8 +222,12 @@ async def connections_event_handler(profile: Profile, event: Event):
     connection_id = record.connection_id
     if record.alias == endorser_alias:
         LOGGER.info("connection is with endorser...")
+        # deleted records deserialize with their initial state, so check the payload
+        deleted = event.payload.get("state") == ConnRecord.STATE_DELETED
+        ENDORSER_CONNECTION_CACHE.connection_changed(profile.settings.get("wallet.id"), record, deleted)
         # when record is first set to complete/active, we need to add metadata.
-        if record.state == ConnRecord.State.COMPLETED:
+        # once it is known to be there, later events skip storage altogether.
+        if record.state == ConnRecord.State.COMPLETED and not ENDORSER_CONNECTION_CACHE.has_metadata(connection_id):
             async with profile.session() as session:
                 conn_metadata = await record.metadata_get_all(session)
                 LOGGER.debug(f"conn_metadata = {conn_metadata}")
@@ -148,4 +260,6 @@ async def connections_event_handler(profile: Profile, event: Event):
                     endorser_info = await conn_rec.metadata_get(session, "endorser_info")
                     LOGGER.info(f"added endorser metadata = {endorser_info}")
 
+            ENDORSER_CONNECTION_CACHE.set_has_metadata(connection_id)
+
     LOGGER.info("< connections_event_handler")
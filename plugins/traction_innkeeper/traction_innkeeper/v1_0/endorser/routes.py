@@ -17,10 +17,9 @@ from acapy_agent.wallet.error import WalletError
 from acapy_agent.admin.decorators.auth import tenant_authentication
 from marshmallow import fields
 
-from .endorser_connection_service import EndorserConnectionService
+from .endorser_connection_service import ENDORSER_CONNECTION_CACHE, EndorserConnectionService
 from ..tenant.routes import SWAGGER_CATEGORY
-from ..innkeeper.tenant_manager import TenantManager
-from ..innkeeper.models import TenantRecord
+from ..innkeeper.tenant_context import tenant_request_context
 
 LOGGER = logging.getLogger(__name__)
 
@@ -86,12 +85,8 @@ async def endorser_connection_set(request: web.BaseRequest):
 
     """
     context: AdminRequestContext = request["context"]
-    tenant_wallet_id = context.profile.settings.get("wallet.id")
-    tenant_mgr = context.inject(TenantManager)
-    root_profile = tenant_mgr.profile
     profile = context.profile
-    async with root_profile.session() as session:
-        tenant_record = await TenantRecord.query_by_wallet_id(session, tenant_wallet_id)
+    tenant_record = await tenant_request_context(request).tenant()
     # issuer check
     if (
         not tenant_record.connected_to_endorsers
@@ -107,6 +102,8 @@ async def endorser_connection_set(request: web.BaseRequest):
     if not info:
         raise web.HTTPConflict(reason="Endorser is not configured")
 
+    # look the connection up again, the endorser may have changed since it was cached
+    ENDORSER_CONNECTION_CACHE.invalidate(profile.settings.get("wallet.id"))
     request = await endorser_srv.connect_with_endorser(profile, context.injector)
 
     return web.json_response(request.serialize())
@@ -8,9 +8,24 @@ from acapy_agent.core.event_bus import EventBus, Event
 from acapy_agent.core.plugin_registry import PluginRegistry
 from acapy_agent.core.profile import Profile
 from acapy_agent.core.protocol_registry import ProtocolRegistry
-from acapy_agent.core.util import STARTUP_EVENT_PATTERN
+from acapy_agent.core.util import SHUTDOWN_EVENT_PATTERN, STARTUP_EVENT_PATTERN
+from acapy_agent.storage.base import BaseStorage
 
+from . import hashing
 from .config import get_config
+from .jobs import JOBS
+from .ledger_cache import LEDGER_CACHE
+from .loop_monitor import LoopMonitor
+from .metrics import (
+    METRICS,
+    configure_storage_budget,
+    instrument_profile,
+    instrument_storage,
+    instrument_wallet_classes,
+)
+from .reservation_reaper import ReservationReaper
+from .server_config import INNKEEPER_SERVER_CONFIG, TENANT_SERVER_CONFIG
+from .tenant_cache import TENANT_CACHE
 from .tenant_manager import TenantManager
 
 LOGGER = logging.getLogger(__name__)
@@ -34,6 +49,9 @@ async def setup(context: InjectionContext):
         raise ValueError("EventBus missing in context")
 
     bus.subscribe(STARTUP_EVENT_PATTERN, on_startup)
+    bus.subscribe(SHUTDOWN_EVENT_PATTERN, on_shutdown)
+    METRICS.register_cache("tenant", TENANT_CACHE)
+    METRICS.register_cache("ledger", LEDGER_CACHE)
 
     LOGGER.info("< plugin setup.")
 
@@ -44,11 +62,53 @@ async def on_startup(profile: Profile, event: Event):
         # create a tenant manager, this will use the root profile for its sessions
         # this will create reservations and tenants under the same profile (base/root) as wallets
         _config = get_config(profile.settings)
+        TENANT_CACHE.configure(_config.tenant_cache.ttl_seconds, _config.tenant_cache.max_size)
+        LEDGER_CACHE.configure(
+            _config.ledger_cache.max_size,
+            _config.ledger_cache.persist_path,
+            _config.ledger_cache.flush_interval_seconds,
+        )
+        hashing.configure(_config.password_hashing.max_workers, _config.password_hashing.bcrypt_rounds)
+        JOBS.configure(_config.jobs.max_workers, _config.jobs.retention_hours, profile)
+        configure_storage_budget(
+            _config.storage_budget.max_operations,
+            _config.storage_budget.max_sessions,
+            # usage headers only when ACA-Py runs with --debug
+            bool(profile.settings.get("debug.enabled")),
+        )
+        # subwallets can be of another wallet type than the root profile, so
+        # every known profile and storage class is instrumented, plus the
+        # root profile's own in case it is none of those
+        instrument_wallet_classes()
+        async with profile.session() as session:
+            instrument_storage(type(session.inject(BaseStorage)))
+        instrument_profile(type(profile))
         mgr = TenantManager(profile, _config)
         profile.context.injector.bind_instance(TenantManager, mgr)
         await mgr.create_innkeeper()
+        reaper = ReservationReaper(profile, _config.reservation)
+        profile.context.injector.bind_instance(ReservationReaper, reaper)
+        reaper.start()
+        await JOBS.recover()
+        if _config.loop_monitor.enabled:
+            monitor = LoopMonitor(_config.loop_monitor)
+            profile.context.injector.bind_instance(LoopMonitor, monitor)
+            monitor.start()
+        # serialize the server config views now rather than on the first poll
+        INNKEEPER_SERVER_CONFIG.get(profile.context.settings)
+        TENANT_SERVER_CONFIG.get(profile.context.settings)
     else:
         # what type of error should this throw?
         raise ValueError("'multitenant' is not enabled, cannot load 'traction_innkeeper' plugin")
 
     LOGGER.info("< on_startup")
+
+
+async def on_shutdown(profile: Profile, event: Event):
+    reaper = profile.inject_or(ReservationReaper)
+    if reaper:
+        await reaper.stop()
+    monitor = profile.inject_or(LoopMonitor)
+    if monitor:
+        await monitor.stop()
+    await LEDGER_CACHE.close()
@@ -60,26 +60,173 @@ class ReservationConfig(BaseModel):
     expiry_minutes: int
     auto_approve: bool
     auto_issuer: bool = False
+    # expired approved and denied reservations are deleted once they are older
+    # than reaper_retention_days, checked every reaper_interval_minutes (0 = off)
+    reaper_interval_minutes: int = 60
+    reaper_batch_size: int = 100
+    reaper_retention_days: int = 30
 
     @classmethod
     def default(cls):
-        return cls(expiry_minutes=60, auto_approve=False, auto_issuer=False)
+        return cls(
+            expiry_minutes=60,
+            auto_approve=False,
+            auto_issuer=False,
+            reaper_interval_minutes=60,
+            reaper_batch_size=100,
+            reaper_retention_days=30,
+        )
+
+
+class TenantCacheConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    ttl_seconds: int = 30
+    max_size: int = 10000
+
+    @classmethod
+    def default(cls):
+        return cls(ttl_seconds=30, max_size=10000)
+
+
+class PasswordHashingConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    max_workers: int = 4
+    bcrypt_rounds: int = 12
+
+    @classmethod
+    def default(cls):
+        return cls(max_workers=4, bcrypt_rounds=12)
+
+
+class StorageSyncConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    max_concurrency: int = 8
+
+    @classmethod
+    def default(cls):
+        return cls(max_concurrency=8)
+
+
+class LedgerCacheConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    max_size: int = 5000
+    persist_path: Optional[str] = None
+    flush_interval_seconds: int = 5
+
+    @classmethod
+    def default(cls):
+        return cls(max_size=5000, persist_path=None, flush_interval_seconds=5)
+
+
+class RevocationNotificationConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    batch_window_ms: int = 200
+    max_batch_size: int = 100
+    max_pending: int = 1000
+
+    @classmethod
+    def default(cls):
+        return cls(batch_window_ms=200, max_batch_size=100, max_pending=1000)
+
+
+class BulkProvisioningConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    max_concurrency: int = 8
+    max_tenants: int = 1000
+    chunk_size: int = 100
+
+    @classmethod
+    def default(cls):
+        return cls(max_concurrency=8, max_tenants=1000, chunk_size=100)
+
+
+class JobsConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    max_workers: int = 4
+    retention_hours: int = 24
+
+    @classmethod
+    def default(cls):
+        return cls(max_workers=4, retention_hours=24)
+
+
+class StorageBudgetConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    # per request or event handler call, 0 for no limit
+    max_operations: int = 25
+    max_sessions: int = 5
+
+    @classmethod
+    def default(cls):
+        return cls(max_operations=25, max_sessions=5)
+
+
+class LoopMonitorConfig(BaseModel):
+    model_config = ConfigDict(alias_generator=_alias_generator, populate_by_name=True)
+
+    enabled: bool = False
+    interval_ms: int = 100
+    threshold_ms: int = 250
+    max_stalls: int = 50
+    stack_depth: int = 20
+
+    @classmethod
+    def default(cls):
+        return cls(enabled=False, interval_ms=100, threshold_ms=250, max_stalls=50, stack_depth=20)
 
 
 class TractionInnkeeperConfig(BaseModel):
     innkeeper_wallet: Optional[InnkeeperWalletConfig]
     reservation: Optional[ReservationConfig]
+    tenant_cache: Optional[TenantCacheConfig] = TenantCacheConfig.default()
+    password_hashing: Optional[PasswordHashingConfig] = PasswordHashingConfig.default()
+    storage_sync: Optional[StorageSyncConfig] = StorageSyncConfig.default()
+    ledger_cache: Optional[LedgerCacheConfig] = LedgerCacheConfig.default()
+    revocation_notifications: Optional[RevocationNotificationConfig] = RevocationNotificationConfig.default()
+    bulk_provisioning: Optional[BulkProvisioningConfig] = BulkProvisioningConfig.default()
+    jobs: Optional[JobsConfig] = JobsConfig.default()
+    loop_monitor: Optional[LoopMonitorConfig] = LoopMonitorConfig.default()
+    storage_budget: Optional[StorageBudgetConfig] = StorageBudgetConfig.default()
 
     @classmethod
     def default(cls):
         return cls(
             innkeeper_wallet=InnkeeperWalletConfig.default(),
             reservation=ReservationConfig.default(),
+            tenant_cache=TenantCacheConfig.default(),
+            password_hashing=PasswordHashingConfig.default(),
+            storage_sync=StorageSyncConfig.default(),
+            ledger_cache=LedgerCacheConfig.default(),
+            revocation_notifications=RevocationNotificationConfig.default(),
+            bulk_provisioning=BulkProvisioningConfig.default(),
+            jobs=JobsConfig.default(),
+            loop_monitor=LoopMonitorConfig.default(),
+            storage_budget=StorageBudgetConfig.default(),
         )
 
 
 def process_config_dict(config_dict: dict) -> dict:
-    _filter = ["innkeeper_wallet", "reservation"]
+    _filter = [
+        "innkeeper_wallet",
+        "reservation",
+        "tenant_cache",
+        "password_hashing",
+        "storage_sync",
+        "ledger_cache",
+        "revocation_notifications",
+        "bulk_provisioning",
+        "jobs",
+        "loop_monitor",
+        "storage_budget",
+    ]
     for key, value in config_dict.items():
         if key in _filter:
             config_dict[key] = value
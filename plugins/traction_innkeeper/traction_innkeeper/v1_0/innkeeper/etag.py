@@ -0,0 +1,45 @@
+"""ETag helpers for conditional GETs on innkeeper and tenant read endpoints."""
+
+import hashlib
+from typing import Any, Callable
+
+from aiohttp import web
+from acapy_agent.messaging.models.base_record import BaseRecord
+
+
+def make_etag(body: bytes) -> str:
+    """Return a strong ETag for a response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(request: web.BaseRequest, etag: str) -> bool:
+    """Return True if the request's If-None-Match header names etag (or is "*")."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # weak comparison, as If-None-Match calls for
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def not_modified(etag: str) -> web.Response:
+    """Return an empty 304 response for etag."""
+    return web.Response(status=304, headers={"ETag": etag})
+
+
+def record_etag(*records: BaseRecord) -> str:
+    """Return an ETag for a response built from records.
+
+    Every save sets a new updated_at, so the records' ids and updated_at
+    identify the representation without serializing anything.
+    """
+    key = "|".join(f"{record.RECORD_TYPE}:{record._id}:{record.updated_at}" for record in records)
+    return make_etag(key.encode("utf-8"))
+
+
+def json_response_with_etag(request: web.BaseRequest, etag: str, build: Callable[[], Any]) -> web.Response:
+    """Return 304 if the client already has etag, otherwise build() as json."""
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return web.json_response(build(), headers={"ETag": etag})
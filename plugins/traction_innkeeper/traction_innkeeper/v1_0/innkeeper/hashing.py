@@ -0,0 +1,76 @@
+"""Run bcrypt work off the event loop.
+
+bcrypt is deliberately slow (tens of milliseconds per call) and releases the
+GIL while hashing, so it is pushed onto a small, bounded thread pool instead of
+blocking the single ACA-Py event loop for every tenant. Pool size and bcrypt
+cost come from the `traction_innkeeper.password_hashing` plugin config.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+
+from .metrics import BCRYPT_SECONDS
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_ROUNDS = 12
+
+_max_workers = DEFAULT_MAX_WORKERS
+_rounds = DEFAULT_ROUNDS
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure(max_workers: int = DEFAULT_MAX_WORKERS, rounds: int = DEFAULT_ROUNDS):
+    """Set pool size and bcrypt cost; a running pool is replaced on next use."""
+    global _max_workers, _rounds, _executor
+    LOGGER.info("password hashing: max_workers = %d, bcrypt rounds = %d", max_workers, rounds)
+    _max_workers = max_workers
+    _rounds = rounds
+    if _executor is not None:
+        # let in-flight hashes finish on the old pool
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the password hashing executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="traction-bcrypt")
+    return _executor
+
+
+async def _run(func, *args):
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(get_executor(), func, *args)
+    finally:
+        BCRYPT_SECONDS.observe(time.perf_counter() - start, func.__name__)
+
+
+def gensalt() -> bytes:
+    """Generate a salt with the configured bcrypt cost (cheap, no need to offload)."""
+    return bcrypt.gensalt(rounds=_rounds)
+
+
+async def hashpw(password: bytes, salt: bytes) -> bytes:
+    """bcrypt.hashpw on the hashing executor."""
+    return await _run(bcrypt.hashpw, password, salt)
+
+
+async def checkpw(password: bytes, hashed_password: bytes) -> bool:
+    """Constant-time bcrypt check of password against a stored hash."""
+    return await _run(bcrypt.checkpw, password, hashed_password)
+
+
+async def hash_password(password: bytes) -> Tuple[bytes, bytes]:
+    """Return (salt, hash) for password using a fresh salt."""
+    salt = gensalt()
+    return salt, await hashpw(password, salt)
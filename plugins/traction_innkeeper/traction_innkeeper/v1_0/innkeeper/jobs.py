@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from acapy_agent.core.profile import Profile
+from acapy_agent.messaging.util import str_to_datetime
+from acapy_agent.storage.error import StorageNotFoundError
+from aiohttp import web
+
+from .models import JobRecord
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_RETENTION_HOURS = 24
+
+# progress of running jobs is saved at most this often
+CHECKPOINT_SECONDS = 5
+# a running job is saved at least this often, even without progress
+HEARTBEAT_SECONDS = 60
+# an active job not saved for this long was left behind by an agent that went away
+STALE_SECONDS = 5 * HEARTBEAT_SECONDS
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+JobRun = Callable[[JobRecord], Awaitable[None]]
+ItemProgress = Callable[[dict], Awaitable[None]]
+
+
+def background_requested(request: web.BaseRequest) -> bool:
+    """Return True if the caller asked to run the operation as a job (?background=true)."""
+    return request.query.get("background", "false").lower() in {"true", "1", "yes"}
+
+
+def item_progress(job: JobRecord, item_key: str) -> ItemProgress:
+    """Return a sync_created progress callback that counts its entries into job.
+
+    A "resolved" entry counts its item as done before its outcome is known,
+    so a sync that saves its items in one batch at the end still shows its
+    progress; an "error" for the item later moves it from succeeded to failed.
+    """
+    resolved = set()
+
+    async def progress(entry: dict):
+        job.total = entry["total"]
+        item_id = entry[item_key]
+        status = entry["status"]
+        if status == "resolved":
+            resolved.add(item_id)
+            job.item_succeeded()
+            return
+        if item_id in resolved:
+            resolved.discard(item_id)
+            if status != "error":
+                return
+            job.item_succeeded(-1)
+        if status == "error":
+            job.item_failed(item_id, entry.get("error"))
+        else:
+            job.item_succeeded()
+
+    return progress
+
+
+class JobManager:
+    """Runs long innkeeper operations in the background and tracks their progress.
+
+    Each job is a JobRecord in the root profile, so it can be polled from any
+    agent instance and outlives the request that started it. At most
+    max_workers jobs run at once, the rest wait as pending. Progress of
+    running jobs is checkpointed every few seconds, and jobs left pending or
+    running by an agent that went away are marked failed on startup.
+
+    Cancelling a pending job drops it. A running job stops at its next safe
+    point: bulk tenant changes between chunks, interruptible jobs at once.
+    Only the agent instance running a job can cancel it.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        retention_hours: int = DEFAULT_RETENTION_HOURS,
+    ):
+        self._profile: Optional[Profile] = None
+        self._active: Dict[str, JobRecord] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._interruptible: Set[str] = set()
+        self._saved_at: Dict[str, float] = {}
+        self._save_lock = asyncio.Lock()
+        self._checkpoint_task: Optional[asyncio.Task] = None
+        self._purged_at: Optional[float] = None
+        self.configure(max_workers, retention_hours)
+
+    def configure(
+        self,
+        max_workers: int,
+        retention_hours: int,
+        profile: Optional[Profile] = None,
+    ):
+        self._semaphore = asyncio.Semaphore(max(max_workers, 1))
+        self._retention = timedelta(hours=retention_hours)
+        if profile:
+            self._profile = profile
+
+    async def _save(self, job: JobRecord, reason: str):
+        # job records are only ever written from here, one at a time
+        async with self._save_lock:
+            # cleared before the save, so progress made while it is awaited
+            # marks the job dirty again for the next checkpoint
+            job.dirty = False
+            try:
+                async with self._profile.session() as session:
+                    await job.save(session, reason=reason)
+            except Exception:
+                job.dirty = True
+                raise
+        self._saved_at[job.job_id] = time.monotonic()
+
+    async def start(
+        self,
+        job_type: str,
+        run: JobRun,
+        *,
+        total: int = 0,
+        wallet_id: Optional[str] = None,
+        interruptible: bool = False,
+    ) -> JobRecord:
+        """Save a pending job and run `run(job)` in the background; returns the job.
+
+        Interruptible jobs are cancelled mid-run, only use it for operations
+        that are safe to stop at any await.
+        """
+        job = JobRecord(job_type=job_type, wallet_id=wallet_id, total=total)
+        await self._save(job, "Job created")
+        self._active[job.job_id] = job
+        if interruptible:
+            self._interruptible.add(job.job_id)
+        self._tasks[job.job_id] = asyncio.get_running_loop().create_task(self._run(job, run))
+        if self._checkpoint_task is None or self._checkpoint_task.done():
+            self._checkpoint_task = asyncio.get_running_loop().create_task(self._checkpoint())
+        return job
+
+    async def _run(self, job: JobRecord, run: JobRun):
+        try:
+            async with self._semaphore:
+                job.state = JobRecord.STATE_RUNNING
+                await self._save(job, "Job started")
+                LOGGER.info("job %s (%s) started: %d items", job.job_id, job.job_type, job.total)
+                await run(job)
+        except asyncio.CancelledError:
+            job.finish(JobRecord.STATE_CANCELLED)
+        except Exception as err:
+            LOGGER.exception("job %s (%s) failed", job.job_id, job.job_type)
+            job.finish(JobRecord.STATE_FAILED, str(err))
+        else:
+            job.finish(JobRecord.STATE_CANCELLED if job.cancel_requested else JobRecord.STATE_COMPLETED)
+        finally:
+            self._active.pop(job.job_id, None)
+            self._tasks.pop(job.job_id, None)
+            self._interruptible.discard(job.job_id)
+            try:
+                await self._save(job, "Job finished")
+            except Exception:
+                LOGGER.exception("could not save job %s", job.job_id)
+            self._saved_at.pop(job.job_id, None)
+        LOGGER.info(
+            "job %s (%s) %s: %d succeeded, %d failed",
+            job.job_id,
+            job.job_type,
+            job.state,
+            job.succeeded,
+            job.failed,
+        )
+        await self._purge()
+
+    async def _checkpoint(self):
+        while self._active:
+            await asyncio.sleep(CHECKPOINT_SECONDS)
+            now = time.monotonic()
+            for job in list(self._active.values()):
+                if job.dirty or now - self._saved_at.get(job.job_id, now) >= HEARTBEAT_SECONDS:
+                    try:
+                        await self._save(job, "Job progress")
+                    except Exception:
+                        LOGGER.exception("could not save job %s", job.job_id)
+
+    async def get(self, job_id: str, wallet_id: Optional[str] = None) -> JobRecord:
+        """Return the job, raises StorageNotFoundError if missing or not the wallet's."""
+        job = self._active.get(job_id)
+        if not job:
+            async with self._profile.session() as session:
+                job = await JobRecord.retrieve_by_id(session, job_id)
+        if wallet_id and job.wallet_id != wallet_id:
+            raise StorageNotFoundError(f"Job {job_id} not found.")
+        return job
+
+    async def cancel(self, job_id: str, wallet_id: Optional[str] = None) -> JobRecord:
+        """Request the job to stop; finished jobs are returned unchanged."""
+        job = await self.get(job_id, wallet_id)
+        if job_id not in self._active:
+            return job
+        job.cancel_requested = True
+        if job.state == JobRecord.STATE_PENDING or job_id in self._interruptible:
+            self._tasks[job_id].cancel()
+        return job
+
+    async def recover(self):
+        """Fail active jobs not saved lately, their agent went away; purge old jobs."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=STALE_SECONDS)
+        async with self._profile.transaction() as txn:
+            jobs = await JobRecord.query(
+                txn,
+                {"$or": [{"state": state} for state in JobRecord.ACTIVE_STATES]},
+            )
+            stale = [job for job in jobs if job.job_id not in self._active and str_to_datetime(job.updated_at) < cutoff]
+            for job in stale:
+                job.finish(JobRecord.STATE_FAILED, "The agent running the job stopped.")
+                await job.save(txn, reason="Job recovered")
+            await txn.commit()
+        if stale:
+            LOGGER.warning("marked %d interrupted job(s) failed", len(stale))
+        await self._purge()
+
+    async def _purge(self):
+        now = time.monotonic()
+        if self._purged_at is not None and now - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = now
+        cutoff = datetime.now(timezone.utc) - self._retention
+        try:
+            async with self._profile.transaction() as txn:
+                jobs = await JobRecord.query(
+                    txn,
+                    {"$or": [{"state": state} for state in JobRecord.FINISHED_STATES]},
+                )
+                for job in jobs:
+                    if str_to_datetime(job.updated_at) < cutoff:
+                        await job.delete_record(txn)
+                await txn.commit()
+        except Exception:
+            LOGGER.exception("could not purge finished jobs")
+
+
+# one manager per process, configured with the root profile on startup
+JOBS = JobManager()
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from acapy_agent.core.profile import Profile
+
+from .metrics import cache_stats
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 5
+
+# indy ledger and anoncreds registry schemas are stored in different shapes
+SCHEMA = "schema"
+ANONCREDS_SCHEMA = "anoncreds_schema"
+CRED_DEF = "cred_def"
+
+
+class LedgerObjectCache:
+    """In-process LRU cache of resolved schemas and cred defs, shared by all tenants.
+
+    Published ledger objects never change, so entries have no expiry; the least
+    recently used entry is evicted once `max_size` is reached. Entries are keyed
+    by ledger (see `ledger_key`), kind (`SCHEMA`, `ANONCREDS_SCHEMA` or
+    `CRED_DEF`) and id, as the same unqualified id can name different objects
+    on different ledgers. Only json values are kept so every hit hands out a
+    fresh copy.
+
+    When `persist_path` is set the cache is loaded from that json file on
+    `configure` and written back by `flush`, so a restart does not go back to
+    the ledger for objects already seen. Writers call `schedule_flush`, which
+    batches the changes of `flush_interval` seconds into one write.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        persist_path: Optional[str] = None,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._dirty = False
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.configure(max_size, persist_path, flush_interval)
+
+    def configure(
+        self,
+        max_size: int,
+        persist_path: Optional[str] = None,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        self._max_size = max_size
+        self._persist_path = persist_path
+        self._flush_interval = flush_interval
+        if persist_path:
+            self._load()
+        self._trim()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+
+    @staticmethod
+    def _key(ledger_id: str, kind: str, object_id: str) -> str:
+        return f"{ledger_id}::{kind}::{object_id}"
+
+    def get(self, ledger_id: str, kind: str, object_id: str) -> Optional[dict]:
+        """Return the cached value for object_id on ledger_id, or None on a miss."""
+        key = self._key(ledger_id, kind, object_id)
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(value)
+
+    def put(self, ledger_id: str, kind: str, object_id: str, value: dict):
+        if not (object_id and self.enabled):
+            return
+        key = self._key(ledger_id, kind, object_id)
+        self._entries[key] = json.dumps(value)
+        self._entries.move_to_end(key)
+        self._dirty = True
+        self._trim()
+
+    def clear(self):
+        self._entries.clear()
+        self._dirty = True
+
+    def _trim(self):
+        while len(self._entries) > max(self._max_size, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self):
+        try:
+            with open(self._persist_path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as err:
+            LOGGER.warning("could not load ledger cache from '%s': %s", self._persist_path, err)
+            return
+        # oldest first, so the file order is the LRU order; entries of an older
+        # key format, without the ledger, are dropped
+        self._entries = OrderedDict((key, json.dumps(value)) for key, value in entries.items() if key.count("::") == 2)
+        LOGGER.info("loaded %d ledger cache entries from '%s'", len(self._entries), self._persist_path)
+
+    def _write(self, path: str, entries: List[Tuple[str, str]]):
+        # the values are json already, so the file is put together without
+        # parsing them again
+        data = "{" + ", ".join(f"{json.dumps(key)}: {value}" for key, value in entries) + "}"
+        # write to a temp file in the same directory and swap it in, so a crash
+        # never leaves a truncated cache behind
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def schedule_flush(self):
+        """Flush within flush_interval seconds, once for all changes made meanwhile."""
+        if not (self._persist_path and self._dirty) or self._flush_task is not None:
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self._flush_interval)
+        # changes made while this flush runs schedule the next one
+        self._flush_task = None
+        await self.flush()
+
+    async def close(self):
+        """Flush pending changes now, on shutdown."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Persist the cache if it changed since the last flush (no-op without persist_path)."""
+        if not (self._persist_path and self._dirty):
+            return
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            # only the entry list is copied on the loop, the file is serialized
+            # and written in a worker thread
+            entries = list(self._entries.items())
+            self._dirty = False
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, self._write, self._persist_path, entries)
+            except OSError as err:
+                self._dirty = True
+                LOGGER.warning("could not persist ledger cache to '%s': %s", self._persist_path, err)
+
+    def stats(self) -> dict:
+        return cache_stats(
+            self.hits,
+            self.misses,
+            size=len(self._entries),
+            max_size=self._max_size,
+            evictions=self.evictions,
+        )
+
+
+def ledger_key(profile: Profile) -> str:
+    """Return the ledger a profile resolves ledger objects on, to key entries by."""
+    settings = profile.settings
+    return settings.get("ledger.write_ledger") or settings.get("ledger.pool_name") or "default"
+
+
+# one cache per process, shared by schema and cred def storage for every tenant
+LEDGER_CACHE = LedgerObjectCache()
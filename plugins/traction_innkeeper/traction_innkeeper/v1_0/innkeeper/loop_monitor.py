@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from acapy_agent.messaging.util import datetime_to_str
+
+from .config import LoopMonitorConfig
+from .metrics import PLUGIN_MODULE
+
+LOGGER = logging.getLogger(__name__)
+
+# aiohttp middlewares take (request, handler) and only pass the request on
+MIDDLEWARE_ARGS = ("request", "handler")
+
+
+def _is_plugin_frame(frame) -> bool:
+    return frame.f_globals.get("__name__", "").startswith(PLUGIN_MODULE)
+
+
+def thread_stack(thread_id: int) -> list:
+    """Return the frames a thread is running, outermost first."""
+    frame = sys._current_frames().get(thread_id)
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def plugin_handler(frames: list) -> Optional[str]:
+    """Return the outermost plugin function on the stack that is not a wrapper.
+
+    Decorator wrappers are nested functions (`<locals>` in their qualified
+    name) and middlewares take (request, handler), so what is left first is
+    the route or event handler the running task is serving.
+    """
+    for frame in frames:
+        code = frame.f_code
+        if not _is_plugin_frame(frame) or "<locals>" in code.co_qualname:
+            continue
+        if code.co_varnames[: code.co_argcount] == MIDDLEWARE_ARGS:
+            continue
+        return f"{frame.f_globals['__name__']}.{code.co_qualname}"
+    return None
+
+
+def _format_frame(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_lineno} {frame.f_code.co_qualname}"
+
+
+class LoopMonitor:
+    """Watches the event loop for stalls and reports what was blocking it.
+
+    A task on the loop beats every interval. A watchdog thread checks the
+    beat, and when the loop has not come back for the threshold it samples
+    the stack of the loop thread while it is still blocked, naming the plugin
+    handler on it. When the loop resumes the stall is logged with its full
+    lag and kept in a short list of recent stalls.
+    """
+
+    def __init__(self, config: LoopMonitorConfig):
+        self._interval = config.interval_ms / 1000
+        self._threshold = config.threshold_ms / 1000
+        self._stack_depth = config.stack_depth
+        self._stalls = deque(maxlen=max(config.max_stalls, 1))
+        self._beat_at = time.monotonic()
+        self._sample: Optional[dict] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def threshold_ms(self) -> int:
+        return round(self._threshold * 1000)
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat_at = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="traction-loop-monitor", daemon=True)
+        self._watchdog.start()
+        LOGGER.info("event loop monitor started, reporting stalls over %d ms", self.threshold_ms)
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stalls(self) -> List[dict]:
+        """Return the recent stalls, newest first."""
+        return list(reversed(self._stalls))
+
+    async def _beat(self):
+        while True:
+            self._beat_at = time.monotonic()
+            await asyncio.sleep(self._interval)
+            lag = time.monotonic() - self._beat_at - self._interval
+            if lag >= self._threshold:
+                self._stalled(lag)
+            else:
+                self._sample = None
+
+    def _watch(self):
+        while not self._stopping.wait(self._interval):
+            beat_at = self._beat_at
+            if self._sample is not None or time.monotonic() - beat_at < self._interval + self._threshold:
+                continue
+            sample = self._take_sample()
+            # keep it only if the loop is still on the same stall
+            if self._beat_at == beat_at:
+                self._sample = sample
+
+    def _take_sample(self) -> dict:
+        frames = thread_stack(self._loop_thread_id)
+        return {
+            "handler": plugin_handler(frames),
+            "stack": [_format_frame(f) for f in frames[-self._stack_depth :]],
+        }
+
+    def _stalled(self, lag: float):
+        sample, self._sample = self._sample, None
+        # a stall shorter than the watchdog's check interval may not be sampled
+        sample = sample or {"handler": None, "stack": []}
+        stall = {
+            "detected_at": datetime_to_str(datetime.now(timezone.utc)),
+            "lag_ms": round(lag * 1000),
+            **sample,
+        }
+        self._stalls.append(stall)
+        LOGGER.warning(
+            "event loop blocked for %d ms in %s%s",
+            stall["lag_ms"],
+            stall["handler"] or "an unknown task",
+            "".join(f"\n  {line}" for line in stall["stack"]),
+        )
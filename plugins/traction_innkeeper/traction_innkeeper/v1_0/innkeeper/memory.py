@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import sys
+import tracemalloc
+from typing import Dict, Optional, Tuple
+
+from .metrics import PLUGIN_MODULE
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FRAMES = 1
+DEFAULT_LIMIT = 20
+# snapshots hold every traced allocation, keep only a few
+MAX_SNAPSHOTS = 10
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryTracingError(Exception):
+    """Raised when memory tracing is not in the state an operation needs."""
+
+
+class SnapshotNotFoundError(MemoryTracingError):
+    """Raised when a named snapshot does not exist."""
+
+
+def _module_files() -> Dict[str, str]:
+    """Map the source file of every loaded module to its module name."""
+    files = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if filename:
+            files[os.path.abspath(filename)] = name
+    return files
+
+
+class MemoryTracer:
+    """Named tracemalloc snapshots of the agent, compared by module.
+
+    Tracing is off until started, as tracemalloc slows every allocation down
+    while it runs. Snapshots are taken and compared in a worker thread so the
+    event loop keeps serving requests. Differences are summed per module and
+    the plugin's own modules are reported on their own as well, so a leak in
+    the plugin stands out from the agent's.
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[str, tracemalloc.Snapshot] = {}
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": self.tracing,
+            "frames": tracemalloc.get_traceback_limit() if self.tracing else None,
+            "traced_size": current,
+            "traced_peak": peak,
+            "snapshots": list(self._snapshots),
+        }
+
+    def start(self, frames: int = DEFAULT_FRAMES):
+        if self.tracing:
+            raise MemoryTracingError("Memory tracing is already started.")
+        tracemalloc.start(frames)
+        LOGGER.warning("memory tracing started, allocations are slower until it is stopped")
+
+    def stop(self):
+        if not self.tracing:
+            raise MemoryTracingError("Memory tracing is not started.")
+        tracemalloc.stop()
+        self._snapshots.clear()
+        LOGGER.info("memory tracing stopped")
+
+    async def _take_snapshot(self) -> Tuple[tracemalloc.Snapshot, dict]:
+        if not self.tracing:
+            raise MemoryTracingError("Memory tracing is not started.")
+        return await asyncio.get_running_loop().run_in_executor(None, _take_filtered_snapshot)
+
+    async def snapshot(self, name: str) -> dict:
+        """Take a snapshot under name, replacing one of the same name."""
+        snapshot, totals = await self._take_snapshot()
+        self._snapshots.pop(name, None)
+        self._snapshots[name] = snapshot
+        while len(self._snapshots) > MAX_SNAPSHOTS:
+            self._snapshots.pop(next(iter(self._snapshots)))
+        return {"name": name, **totals}
+
+    def _get(self, name: str) -> tracemalloc.Snapshot:
+        snapshot = self._snapshots.get(name)
+        if snapshot is None:
+            raise SnapshotNotFoundError(f"Snapshot {name} not found.")
+        return snapshot
+
+    async def diff(self, name: str, compare_to: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> dict:
+        """Compare a snapshot to another one, or to the memory in use now."""
+        old = self._get(name)
+        new = self._get(compare_to) if compare_to else (await self._take_snapshot())[0]
+        return await asyncio.get_running_loop().run_in_executor(None, _diff_by_module, old, new, limit)
+
+
+def _take_filtered_snapshot() -> Tuple[tracemalloc.Snapshot, dict]:
+    # filtering and summing walk every trace, so they run in the worker
+    # thread along with the snapshot itself
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    traces = snapshot.traces
+    return snapshot, {"size": sum(trace.size for trace in traces), "count": len(traces)}
+
+
+def _diff_by_module(old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, limit: int) -> dict:
+    files = _module_files()
+    modules: Dict[str, dict] = {}
+    for stat in new.compare_to(old, "filename"):
+        filename = stat.traceback[0].filename
+        module = files.get(os.path.abspath(filename), filename)
+        entry = modules.get(module)
+        if entry is None:
+            entry = modules[module] = {
+                "module": module,
+                "size_diff": 0,
+                "size": 0,
+                "count_diff": 0,
+                "count": 0,
+                "plugin": module.startswith(PLUGIN_MODULE),
+            }
+        entry["size_diff"] += stat.size_diff
+        entry["size"] += stat.size
+        entry["count_diff"] += stat.count_diff
+        entry["count"] += stat.count
+
+    ranked = sorted(modules.values(), key=lambda entry: abs(entry["size_diff"]), reverse=True)
+    plugin = [entry for entry in ranked if entry["plugin"]]
+    return {
+        "size_diff": sum(entry["size_diff"] for entry in ranked),
+        "count_diff": sum(entry["count_diff"] for entry in ranked),
+        "plugin_size_diff": sum(entry["size_diff"] for entry in plugin),
+        "results": ranked[:limit],
+        "plugin_results": plugin[:limit],
+    }
+
+
+# tracemalloc is process wide, so is the tracer
+MEMORY = MemoryTracer()
@@ -0,0 +1,437 @@
+"""In-process metrics for the plugin, rendered in the Prometheus text format.
+
+Everything here runs on the event loop thread, so the metrics are plain dicts
+and lists without locks. An observation is a bisect and two additions; cache
+figures are read from the caches' `stats()` only when the metrics are scraped.
+
+Storage operations and session opens are also counted per plugin request and
+per event handler, and a request or handler going over the configured budget
+is logged, to find chatty paths.
+"""
+
+import functools
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from acapy_agent.utils.classloader import ClassLoader, ClassNotFoundError, ModuleLoadError
+from aiohttp import web
+
+LOGGER = logging.getLogger(__name__)
+
+# module prefix of the plugin's code, to tell its handlers and frames apart
+PLUGIN_MODULE = "traction_innkeeper"
+PREFIX = "traction_innkeeper"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# BaseStorage methods counted as storage operations
+STORAGE_OPS = (
+    "add_record",
+    "get_record",
+    "update_record",
+    "delete_record",
+    "find_record",
+    "find_paginated_records",
+    "find_all_records",
+    "delete_all_records",
+)
+
+# Profile methods counted as session opens
+SESSION_METHODS = ("session", "transaction")
+
+# the wallet types ACA-Py opens subwallets with, which need not be the root
+# profile's: an askar root can have askar-anoncreds subwallets, and kanon uses
+# its own storage class
+PROFILE_CLASSES = (
+    "acapy_agent.askar.profile.AskarProfile",
+    "acapy_agent.askar.profile_anon.AskarAnonCredsProfile",
+    "acapy_agent.kanon.profile_anon_kanon.KanonAnonCredsProfile",
+)
+STORAGE_CLASSES = (
+    "acapy_agent.storage.askar.AskarStorage",
+    "acapy_agent.storage.kanon_storage.KanonStorage",
+)
+
+# response headers with the storage usage of a request, sent in debug mode
+STORAGE_OPS_HEADER = "X-Traction-Storage-Operations"
+SESSIONS_HEADER = "X-Traction-Storage-Sessions"
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def cache_stats(hits: int, misses: int, **figures) -> dict:
+    """Return a cache's `stats()`: its own figures plus hits, misses and hit ratio."""
+    lookups = hits + misses
+    return {
+        **figures,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": (hits / lookups) if lookups else 0.0,
+    }
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def clear(self):
+        self._values.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # per label set: [count per bucket (last one is +Inf), sum]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def clear(self):
+        self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, f'le="{le}"')} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The plugin's metrics, plus caches whose stats are read at scrape time."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._caches: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(f"{PREFIX}_{name}", documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(f"{PREFIX}_{name}", documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, cache):
+        """Report a cache with a `stats()` method returning hits, misses and size."""
+        self._caches[name] = cache
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+    def _render_caches(self) -> List[str]:
+        stats = {name: cache.stats() for name, cache in self._caches.items()}
+        lines = []
+        for key, kind, documentation in (
+            ("hits", "counter", "Cache lookups answered from the cache"),
+            ("misses", "counter", "Cache lookups that missed"),
+            ("hit_ratio", "gauge", "Cache hits over lookups since startup"),
+            ("size", "gauge", "Entries in the cache"),
+        ):
+            name = f"{PREFIX}_cache_{key}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{cache="{cache}"}} {values[key]}' for cache, values in stats.items()]
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        lines += self._render_caches()
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+REQUEST_SECONDS = METRICS.histogram(
+    "request_duration_seconds",
+    "Time spent in plugin route handlers",
+    ("method", "route", "status"),
+)
+REQUEST_STORAGE_OPS = METRICS.histogram(
+    "request_storage_operations",
+    "Storage operations per plugin request",
+    ("method", "route"),
+    COUNT_BUCKETS,
+)
+REQUEST_SESSIONS = METRICS.histogram(
+    "request_sessions",
+    "Profile sessions opened per plugin request",
+    ("method", "route"),
+    COUNT_BUCKETS,
+)
+STORAGE_OPS_TOTAL = METRICS.counter(
+    "storage_operations_total",
+    "Storage operations by operation",
+    ("operation",),
+)
+BCRYPT_SECONDS = METRICS.histogram(
+    "bcrypt_duration_seconds",
+    "Time spent hashing and checking passwords and api keys, including pool wait",
+    ("operation",),
+)
+EVENT_HANDLER_SECONDS = METRICS.histogram(
+    "event_handler_duration_seconds",
+    "Time spent in plugin event handlers",
+    ("handler",),
+)
+EVENT_HANDLER_STORAGE_OPS = METRICS.histogram(
+    "event_handler_storage_operations",
+    "Storage operations per plugin event handler call",
+    ("handler",),
+    COUNT_BUCKETS,
+)
+EVENT_HANDLER_SESSIONS = METRICS.histogram(
+    "event_handler_sessions",
+    "Profile sessions opened per plugin event handler call",
+    ("handler",),
+    COUNT_BUCKETS,
+)
+SESSIONS_TOTAL = METRICS.counter(
+    "sessions_total",
+    "Profile sessions opened, by kind",
+    ("kind",),
+)
+
+
+class StorageUsage:
+    """Storage operations and session opens of one request or event handler call."""
+
+    __slots__ = ("operations", "sessions")
+
+    def __init__(self):
+        self.operations = 0
+        self.sessions = 0
+
+
+# storage usage of the request or event handler running, shared by the tasks it spawns
+_storage_usage: ContextVar[Optional[StorageUsage]] = ContextVar("storage_usage", default=None)
+
+# per request or event handler call, 0 for no limit
+_max_operations = 0
+_max_sessions = 0
+_usage_headers = False
+
+
+def configure_storage_budget(max_operations: int, max_sessions: int, usage_headers: bool = False):
+    """Set the storage budget and whether responses carry the usage headers."""
+    global _max_operations, _max_sessions, _usage_headers
+    LOGGER.info(
+        "storage budget: max_operations = %d, max_sessions = %d, usage headers = %s",
+        max_operations,
+        max_sessions,
+        usage_headers,
+    )
+    _max_operations = max_operations
+    _max_sessions = max_sessions
+    _usage_headers = usage_headers
+
+
+def _check_budget(usage: StorageUsage, name: str):
+    if (_max_operations and usage.operations > _max_operations) or (_max_sessions and usage.sessions > _max_sessions):
+        LOGGER.warning(
+            "%s used %d storage operations and %d sessions, over the budget of %d and %d",
+            name,
+            usage.operations,
+            usage.sessions,
+            _max_operations,
+            _max_sessions,
+        )
+
+
+def _counted(operation: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        STORAGE_OPS_TOTAL.inc(operation)
+        usage = _storage_usage.get()
+        if usage is not None:
+            usage.operations += 1
+        return await method(*args, **kwargs)
+
+    wrapper._traction_counted = True
+    return wrapper
+
+
+def _counted_session(kind: str, method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        SESSIONS_TOTAL.inc(kind)
+        usage = _storage_usage.get()
+        if usage is not None:
+            usage.sessions += 1
+        return method(*args, **kwargs)
+
+    wrapper._traction_counted = True
+    return wrapper
+
+
+def instrument_storage(storage_cls: type):
+    """Count the storage operations of storage_cls, once per class."""
+    if storage_cls.__dict__.get("_traction_metrics"):
+        return
+    for operation in STORAGE_OPS:
+        method = getattr(storage_cls, operation, None)
+        # already counted if inherited from an instrumented class
+        if method is not None and not getattr(method, "_traction_counted", False):
+            setattr(storage_cls, operation, _counted(operation, method))
+    storage_cls._traction_metrics = True
+    LOGGER.info("counting storage operations of %s", storage_cls.__name__)
+
+
+def instrument_profile(profile_cls: type):
+    """Count the sessions and transactions opened on profile_cls, once per class."""
+    if profile_cls.__dict__.get("_traction_metrics"):
+        return
+    for kind in SESSION_METHODS:
+        method = getattr(profile_cls, kind, None)
+        if method is not None and not getattr(method, "_traction_counted", False):
+            setattr(profile_cls, kind, _counted_session(kind, method))
+    profile_cls._traction_metrics = True
+    LOGGER.info("counting sessions of %s", profile_cls.__name__)
+
+
+def instrument_wallet_classes():
+    """Count the storage operations and sessions of every known wallet type."""
+    for class_path in STORAGE_CLASSES + PROFILE_CLASSES:
+        try:
+            cls = ClassLoader.load_class(class_path)
+        except (ClassNotFoundError, ModuleLoadError) as err:
+            # wallet type not available in this ACA-Py build
+            LOGGER.warning("not counting storage usage of %s: %s", class_path, err)
+            continue
+        if class_path in STORAGE_CLASSES:
+            instrument_storage(cls)
+        else:
+            instrument_profile(cls)
+
+
+def _plugin_route(request: web.BaseRequest) -> Optional[str]:
+    """Return the route template if a plugin handler serves the request."""
+    match_info = request.match_info
+    handler = getattr(match_info, "handler", None)
+    if not getattr(handler, "__module__", "").startswith(PLUGIN_MODULE):
+        return None
+    route = getattr(match_info, "route", None)
+    resource = route.resource if route else None
+    return resource.canonical if resource else None
+
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler):
+    route = _plugin_route(request)
+    if route is None:
+        return await handler(request)
+
+    usage = StorageUsage()
+    token = _storage_usage.set(usage)
+    status = "500"
+    start = time.perf_counter()
+    try:
+        response = await handler(request)
+        status = str(response.status)
+        _add_usage_headers(response, usage)
+        return response
+    except web.HTTPException as err:
+        status = str(err.status)
+        _add_usage_headers(err, usage)
+        raise
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, route, status)
+        REQUEST_STORAGE_OPS.observe(usage.operations, request.method, route)
+        REQUEST_SESSIONS.observe(usage.sessions, request.method, route)
+        _storage_usage.reset(token)
+        _check_budget(usage, f"{request.method} {route}")
+
+
+def _add_usage_headers(response: web.StreamResponse, usage: StorageUsage):
+    if _usage_headers and not response.prepared:
+        response.headers[STORAGE_OPS_HEADER] = str(usage.operations)
+        response.headers[SESSIONS_HEADER] = str(usage.sessions)
+
+
+def timed_event_handler(func):
+    """Record the duration and storage usage of an event handler under its function name."""
+
+    @functools.wraps(func)
+    async def wrapper(profile, event):
+        usage = StorageUsage()
+        token = _storage_usage.set(usage)
+        start = time.perf_counter()
+        try:
+            return await func(profile, event)
+        finally:
+            EVENT_HANDLER_SECONDS.observe(time.perf_counter() - start, func.__name__)
+            EVENT_HANDLER_STORAGE_OPS.observe(usage.operations, func.__name__)
+            EVENT_HANDLER_SESSIONS.observe(usage.sessions, func.__name__)
+            _storage_usage.reset(token)
+            _check_budget(usage, f"event handler {func.__name__}")
+
+    return wrapper
+
+
+def metrics_response() -> web.Response:
+    return web.Response(
+        body=METRICS.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
@@ -1,15 +1,18 @@
 import json
 import uuid
 from datetime import datetime, timezone
-from typing import Optional, Union, List
+from typing import Optional, Tuple, Union, List
 
 from acapy_agent.core.profile import ProfileSession
 from acapy_agent.messaging.models.base_record import BaseRecord, BaseRecordSchema
 from acapy_agent.messaging.util import datetime_to_str, str_to_datetime
 from acapy_agent.messaging.valid import UUIDFour
+from acapy_agent.storage.base import BaseStorage
 from acapy_agent.storage.error import StorageDuplicateError, StorageNotFoundError
 from marshmallow import fields, EXCLUDE, validate
 
+from .tenant_cache import TENANT_CACHE
+
 ENDORSER_LEDGER_CONFIG_EXAMPLE = {
     "endorser_alias": " ... ",
     "ledger_id": " ... ",
@@ -369,16 +372,45 @@ class TenantRecord(BaseRecord):
             raise StorageNotFoundError("No TenantRecord found for the given wallet_id")
         return result[0]
 
+    @classmethod
+    def from_cache(cls, wallet_id: str) -> Optional["TenantRecord"]:
+        """Return a TenantRecord for wallet_id from the in-process cache, if present."""
+        cached = TENANT_CACHE.get(wallet_id)
+        if not cached:
+            return None
+        tenant_id, vals = cached
+        return cls.from_storage(tenant_id, vals)
+
+    def add_to_cache(self, generation: Optional[int] = None):
+        """Cache this record by wallet_id (see TenantCache.put for generation)."""
+        TENANT_CACHE.put(self.wallet_id, self.tenant_id, self.value, generation)
+
+    async def save(self, session: ProfileSession, *args, **kwargs) -> str:
+        """Persist the record, dropping any cached copy for its wallet."""
+        try:
+            return await super().save(session, *args, **kwargs)
+        finally:
+            TENANT_CACHE.invalidate(self.wallet_id)
+
+    async def delete_record(self, session: ProfileSession):
+        """Remove the record, dropping any cached copy for its wallet."""
+        try:
+            await super().delete_record(session)
+        finally:
+            TENANT_CACHE.invalidate(self.wallet_id)
+
     async def soft_delete(self, session: ProfileSession):
         """
         Soft delete the tenant record by setting its state to 'deleted'.
         Note: This method should be called on an instance of the TenantRecord.
         """
-        # Delete api records
-        recs = await TenantAuthenticationApiRecord.query_by_tenant_id(session, self.tenant_id)
-        for rec in recs:
-            if rec.tenant_id == self.tenant_id:
-                await rec.delete_record(session)
+        # Delete api records, in one storage call rather than one per key
+        if self.tenant_id:
+            storage = session.inject(BaseStorage)
+            await storage.delete_all_records(
+                TenantAuthenticationApiRecord.RECORD_TYPE,
+                {"tenant_id": self.tenant_id},
+            )
 
         if self.state != self.STATE_DELETED:
             self.state = self.STATE_DELETED
@@ -526,11 +558,34 @@ class TenantAuthenticationApiRecord(BaseRecord):
         self.api_key_token_hash = api_key_token_hash
         self.alias = alias
 
+    # issued api keys are "<tenant_authentication_api_id>.<secret>", keys issued
+    # before the prefix was introduced are just the bare secret.
+    API_KEY_SEPARATOR = "."
+
     @property
     def tenant_authentication_api_id(self) -> Optional[str]:
         """Return record id."""
         return uuid.UUID(self._id).hex
 
+    def format_api_key(self, secret: str) -> str:
+        """Return the api key to hand out for secret, prefixed with this record's id."""
+        return f"{self.tenant_authentication_api_id}{self.API_KEY_SEPARATOR}{secret}"
+
+    @classmethod
+    def parse_api_key(cls, api_key: str) -> Tuple[Optional[str], str]:
+        """Split an api key into (record id, secret).
+
+        The record id is None for legacy (unprefixed) keys or if the prefix is
+        not a valid record identifier.
+        """
+        prefix, sep, secret = api_key.partition(cls.API_KEY_SEPARATOR)
+        if not sep:
+            return None, api_key
+        try:
+            return str(uuid.UUID(hex=prefix)), secret
+        except ValueError:
+            return None, secret
+
     @classmethod
     async def retrieve_by_auth_api_id(
         cls,
@@ -610,3 +665,153 @@ class TenantAuthenticationApiRecordSchema(BaseRecordSchema):
             "description": "Alias description for this API key",
         },
     )
+
+
+class JobRecord(BaseRecord):
+    """Innkeeper Job Record, progress of a long running operation over a list of items."""
+
+    class Meta:
+        """JobRecord Meta."""
+
+        schema_class = "JobRecordSchema"
+
+    RECORD_TYPE = "innkeeper_job"
+    RECORD_ID_NAME = "job_id"
+    TAG_NAMES = {
+        "state",
+        "job_type",
+        "wallet_id",
+    }
+
+    STATE_PENDING = "pending"
+    STATE_RUNNING = "running"
+    STATE_COMPLETED = "completed"
+    STATE_FAILED = "failed"
+    STATE_CANCELLED = "cancelled"
+
+    ACTIVE_STATES = (STATE_PENDING, STATE_RUNNING)
+    FINISHED_STATES = (STATE_COMPLETED, STATE_FAILED, STATE_CANCELLED)
+
+    def __init__(
+        self,
+        *,
+        job_id: str = None,
+        state: str = None,
+        job_type: str = None,
+        wallet_id: str = None,
+        total: int = 0,
+        succeeded: int = 0,
+        failed: int = 0,
+        errors: List[dict] = None,
+        error: str = None,
+        **kwargs,
+    ):
+        """Construct record."""
+        super().__init__(job_id, state or self.STATE_PENDING, **kwargs)
+        self.job_type = job_type
+        self.wallet_id = wallet_id
+        self.total = total
+        self.succeeded = succeeded
+        self.failed = failed
+        self.errors = errors or []
+        self.error = error
+        # bookkeeping of the agent instance running the job, never stored
+        self.cancel_requested = False
+        self.dirty = False
+
+    @property
+    def job_id(self) -> Optional[str]:
+        """Return record id."""
+        return self._id
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def finished(self) -> bool:
+        return self.state in self.FINISHED_STATES
+
+    def item_succeeded(self, count: int = 1):
+        self.succeeded += count
+        self.dirty = True
+
+    def item_failed(self, item_id: str, error: str):
+        self.failed += 1
+        self.errors.append({"id": item_id, "error": error})
+        self.dirty = True
+
+    def finish(self, state: str, error: str = None):
+        self.state = state
+        self.error = error
+        self.dirty = True
+
+    @property
+    def record_value(self) -> dict:
+        """Return record value."""
+        return {
+            prop: getattr(self, prop)
+            for prop in (
+                "job_type",
+                "wallet_id",
+                "total",
+                "succeeded",
+                "failed",
+                "errors",
+                "error",
+            )
+        }
+
+
+class JobRecordSchema(BaseRecordSchema):
+    """Innkeeper Job Record Schema."""
+
+    class Meta:
+        """JobRecordSchema Meta."""
+
+        model_class = "JobRecord"
+        unknown = EXCLUDE
+
+    job_id = fields.Str(
+        required=True,
+        metadata={"description": "Job identifier", "example": UUIDFour.EXAMPLE},
+    )
+    job_type = fields.Str(
+        required=True,
+        metadata={"description": "Job type", "example": "tenant_soft_delete"},
+    )
+    wallet_id = fields.Str(
+        required=False,
+        allow_none=True,
+        metadata={
+            "description": "Wallet the job belongs to, if started by a tenant",
+            "example": UUIDFour.EXAMPLE,
+        },
+    )
+    state = fields.Str(
+        required=True,
+        validate=validate.OneOf(
+            [
+                JobRecord.STATE_PENDING,
+                JobRecord.STATE_RUNNING,
+                JobRecord.STATE_COMPLETED,
+                JobRecord.STATE_FAILED,
+                JobRecord.STATE_CANCELLED,
+            ]
+        ),
+        metadata={"description": "Job state", "example": JobRecord.STATE_RUNNING},
+    )
+    total = fields.Int(required=True, metadata={"description": "Number of items"})
+    processed = fields.Int(dump_only=True, metadata={"description": "Number of items processed"})
+    succeeded = fields.Int(required=True, metadata={"description": "Number of items succeeded"})
+    failed = fields.Int(required=True, metadata={"description": "Number of items failed"})
+    errors = fields.List(
+        fields.Dict(),
+        required=False,
+        metadata={"description": "Item failures, with the item id and error"},
+    )
+    error = fields.Str(
+        required=False,
+        allow_none=True,
+        metadata={"description": "Reason the job failed as a whole"},
+    )
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import marshal
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+from .loop_monitor import plugin_handler, thread_stack
+
+LOGGER = logging.getLogger(__name__)
+
+FORMAT_COLLAPSED = "collapsed"
+FORMAT_PSTATS = "pstats"
+FORMATS = (FORMAT_COLLAPSED, FORMAT_PSTATS)
+
+MAX_SECONDS = 60
+DEFAULT_SECONDS = 10
+DEFAULT_INTERVAL_MS = 5
+
+# samples taken while the loop waits on its selector
+IDLE = "(idle)"
+# samples of tasks not serving a plugin handler
+OTHER = "(other)"
+
+# (task label, stack of (module, code) outermost first)
+Sample = Tuple[str, tuple]
+
+
+class ProfileInProgressError(Exception):
+    """Raised when a profile is requested while another one is being taken."""
+
+
+def _label(frames: list) -> str:
+    if frames and frames[-1].f_globals.get("__name__") == "selectors":
+        return IDLE
+    return plugin_handler(frames) or OTHER
+
+
+def _pstats_key(code) -> tuple:
+    return (code.co_filename, code.co_firstlineno, code.co_qualname)
+
+
+class SampledProfile:
+    """Stack samples of the event loop thread, in flamegraph or pstats form.
+
+    Every stack starts with the task's label: the plugin handler it serves,
+    (other) for the rest of the agent, or (idle) while the loop waits for
+    I/O. In pstats the labels are pseudo functions, so their cumulative time
+    is the time spent serving each handler.
+    """
+
+    def __init__(self, samples: Dict[Sample, int], interval: float, duration: float):
+        self.samples = samples
+        self.interval = interval
+        self.duration = duration
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def collapsed(self) -> str:
+        """Return the samples as collapsed stacks, one `a;b;c count` per line."""
+        lines = []
+        for (label, stack), count in sorted(self.samples.items(), key=lambda item: -item[1]):
+            names = [label] if label == IDLE else [label] + [f"{module}.{code.co_qualname}" for module, code in stack]
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats(self) -> bytes:
+        """Return the samples as a marshalled stats dict, loadable by pstats.Stats."""
+        stats = {}
+        for (label, stack), count in self.samples.items():
+            elapsed = count * self.interval
+            funcs = [("~", 0, label)]
+            if label != IDLE:
+                funcs += [_pstats_key(code) for _, code in stack]
+            # recursive functions are counted once per sample
+            for func in set(funcs):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+                entry[0] += count
+                entry[1] += count
+                entry[3] += elapsed
+            stats[funcs[-1]][2] += elapsed
+            for caller, callee in zip(funcs, funcs[1:]):
+                callers = stats[callee][4]
+                nc, cc, tt, ct = callers.get(caller, (0, 0, 0.0, 0.0))
+                callers[caller] = (
+                    nc + count,
+                    cc + count,
+                    tt + (elapsed if callee is funcs[-1] else 0.0),
+                    ct + elapsed,
+                )
+        return marshal.dumps({func: tuple(entry) for func, entry in stats.items()})
+
+
+class SamplingProfiler:
+    """Takes time-boxed profiles of the event loop thread.
+
+    A helper thread samples the loop thread's stack at a fixed interval, so
+    the loop is never instrumented, and the thread only exists while a profile
+    is being taken: there is no overhead between profiles. One profile is
+    taken at a time.
+    """
+
+    def __init__(self):
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(self, seconds: float, interval: float) -> SampledProfile:
+        """Sample the loop for `seconds`, every `interval` seconds."""
+        if self._running:
+            raise ProfileInProgressError("A profile is already being taken.")
+        self._running = True
+        samples: Dict[Sample, int] = Counter()
+        stopping = threading.Event()
+        loop_thread_id = threading.get_ident()
+
+        def sample():
+            while not stopping.wait(interval):
+                frames = thread_stack(loop_thread_id)
+                stack = tuple((f.f_globals.get("__name__", "?"), f.f_code) for f in frames)
+                samples[(_label(frames), stack)] += 1
+
+        sampler = threading.Thread(target=sample, name="traction-profiler", daemon=True)
+        LOGGER.info("profiling the event loop for %s s", seconds)
+        start = time.monotonic()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stopping.set()
+            sampler.join()
+            self._running = False
+        return SampledProfile(dict(samples), interval, time.monotonic() - start)
+
+
+# one profiler per process, the loop thread is shared
+PROFILER = SamplingProfiler()
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from acapy_agent.core.profile import Profile
+from acapy_agent.messaging.util import str_to_datetime
+
+from .config import ReservationConfig
+from .models import ReservationRecord
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ReservationReaper:
+    """Background task deleting reservations that can no longer be checked in.
+
+    Approved reservations whose token expired, and denied reservations, are
+    deleted once they are older than the retention period. Requested and
+    checked in reservations are never touched. Each state is scanned by its
+    tag a page at a time, and every page's deletions share one transaction.
+    """
+
+    REAPED_STATES = (ReservationRecord.STATE_APPROVED, ReservationRecord.STATE_DENIED)
+
+    def __init__(self, profile: Profile, config: ReservationConfig):
+        self._profile = profile
+        self._interval = config.reaper_interval_minutes * 60
+        self._batch_size = max(config.reaper_batch_size, 1)
+        self._retention = timedelta(days=config.reaper_retention_days)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._interval <= 0:
+            LOGGER.info("reservation reaper is disabled")
+            return
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.reap()
+            except Exception:
+                LOGGER.exception("reservation reaper run failed")
+
+    @staticmethod
+    def _reapable(rec: ReservationRecord, cutoff: datetime) -> bool:
+        if rec.state == ReservationRecord.STATE_APPROVED:
+            # approved reservations count from when their token expired
+            expired_at = rec.reservation_token_expiry
+        else:
+            expired_at = rec.updated_at
+        return bool(expired_at) and str_to_datetime(expired_at) < cutoff
+
+    async def reap(self) -> int:
+        """Delete every reservation past retention; returns the number deleted."""
+        cutoff = datetime.now(timezone.utc) - self._retention
+        deleted = 0
+        for state in self.REAPED_STATES:
+            offset = 0
+            while True:
+                async with self._profile.session() as session:
+                    page = await ReservationRecord.query(
+                        session,
+                        {"state": state},
+                        limit=self._batch_size,
+                        offset=offset,
+                        order_by="id",
+                    )
+                reapable = [rec for rec in page if self._reapable(rec, cutoff)]
+                if reapable:
+                    async with self._profile.transaction() as txn:
+                        for rec in reapable:
+                            await rec.delete_record(txn)
+                        await txn.commit()
+                    deleted += len(reapable)
+                if len(page) < self._batch_size:
+                    break
+                # deleted records no longer take up room in the following pages
+                offset += len(page) - len(reapable)
+        if deleted:
+            LOGGER.info("reservation reaper deleted %d reservation(s)", deleted)
+        return deleted
@@ -1,4 +1,5 @@
 import functools
+import json
 import logging
 import uuid
 
@@ -21,16 +22,40 @@ from acapy_agent.multitenant.admin.routes import (
 )
 from acapy_agent.multitenant.base import BaseMultitenantManager
 from acapy_agent.multitenant.error import WalletKeyMissingError
+from acapy_agent.storage.base import MAXIMUM_PAGE_SIZE
 from acapy_agent.storage.error import StorageError, StorageNotFoundError
-from acapy_agent.version import __version__
 from acapy_agent.wallet.error import WalletSettingsError
 from acapy_agent.wallet.models.wallet_record import WalletRecord
 from multitenant_provider.v1_0.routes import plugin_wallet_create_token
 from marshmallow import fields, validate
 
+from ..endorser.endorser_connection_service import ENDORSER_CONNECTION_CACHE
 from . import TenantManager
 from .config import EndorserLedgerConfig, InnkeeperWalletConfig
+from .etag import json_response_with_etag, record_etag
+from .jobs import JOBS, background_requested
+from .loop_monitor import LoopMonitor
+from .memory import (
+    DEFAULT_FRAMES,
+    DEFAULT_LIMIT,
+    MEMORY,
+    MemoryTracingError,
+    SnapshotNotFoundError,
+)
+from .metrics import metrics_middleware, metrics_response
+from .profiler import (
+    DEFAULT_INTERVAL_MS,
+    DEFAULT_SECONDS,
+    FORMAT_COLLAPSED,
+    FORMAT_PSTATS,
+    FORMATS,
+    MAX_SECONDS,
+    PROFILER,
+    ProfileInProgressError,
+)
+from .server_config import INNKEEPER_SERVER_CONFIG
 from .models import (
+    JobRecordSchema,
     ReservationRecord,
     ReservationRecordSchema,
     TenantAuthenticationApiRecord,
@@ -45,6 +70,7 @@ from .utils import (
     TenantConfigSchema,
     approve_reservation,
     create_api_key,
+    query_records_page,
     refresh_registration_token,
 )
 
@@ -109,7 +135,7 @@ class CustomCreateWalletTokenRequestSchema(CreateWalletTokenRequestSchema):
     api_key = fields.Str(
         metadata={
             "description": "API key for this wallet",
-            "example": "3bd14a1e8fb645ddadf9913c0922ff3b",
+            "example": "0c0bbd7bfa6a4b2c9d3e5f6a7b8c9d0e.3bd14a1e8fb645ddadf9913c0922ff3b",
         },
         required=False,
     )
@@ -204,7 +230,52 @@ class CheckinResponseSchema(OpenAPISchema):
     )
 
 
-class ReservationListSchema(OpenAPISchema):
+class PagedListSchema(OpenAPISchema):
+    """Paging details returned with list responses."""
+
+    total = fields.Int(
+        metadata={"description": "Number of records matching the filters", "example": 1},
+    )
+    limit = fields.Int(
+        allow_none=True,
+        metadata={"description": "Page size requested, null when unpaged", "example": 50},
+    )
+    offset = fields.Int(
+        metadata={"description": "Offset of the first result", "example": 0},
+    )
+
+
+class PagedListQuerySchema(OpenAPISchema):
+    """Query parameters for paged lists."""
+
+    limit = fields.Int(
+        required=False,
+        validate=validate.Range(min=1, max=MAXIMUM_PAGE_SIZE),
+        metadata={
+            "description": "Number of results to return, all results when omitted",
+            "example": 50,
+        },
+    )
+    offset = fields.Int(
+        required=False,
+        validate=validate.Range(min=0),
+        metadata={"description": "Offset for pagination", "example": 0},
+    )
+    descending = fields.Bool(
+        required=False,
+        metadata={"description": "Order results in descending order if true"},
+    )
+
+
+def get_paging_params(request: web.BaseRequest):
+    """Read limit, offset and descending from an already validated query."""
+    limit = request.query.get("limit")
+    offset = int(request.query.get("offset", 0))
+    descending = request.query.get("descending", "false").lower() in {"true", "1", "yes"}
+    return (int(limit) if limit else None), offset, descending
+
+
+class ReservationListSchema(PagedListSchema):
     """Response schema for reservations list."""
 
     results = fields.List(
@@ -213,6 +284,33 @@ class ReservationListSchema(OpenAPISchema):
     )
 
 
+class ReservationListQuerySchema(PagedListQuerySchema):
+    """Query parameters schema for reservations list."""
+
+    state = fields.Str(
+        required=False,
+        metadata={
+            "description": "The state of the reservations to filter by.",
+            "example": ReservationRecord.STATE_REQUESTED,
+        },
+        validate=validate.OneOf(
+            [
+                ReservationRecord.STATE_REQUESTED,
+                ReservationRecord.STATE_APPROVED,
+                ReservationRecord.STATE_DENIED,
+                ReservationRecord.STATE_CHECKED_IN,
+            ]
+        ),
+    )
+    tenant_name = fields.Str(
+        required=False,
+        metadata={
+            "description": "Only return reservations whose tenant name starts with this value, ignoring case",
+            "example": "Acme",
+        },
+    )
+
+
 class ReservationIdMatchInfoSchema(OpenAPISchema):
     reservation_id = fields.Str(
         required=True,
@@ -331,6 +429,137 @@ class TenantAdoptRequestSchema(OpenAPISchema):
     )
 
 
+class BulkTenantSpecSchema(OpenAPISchema):
+    """One tenant to provision in a bulk request."""
+
+    tenant_name = fields.Str(
+        required=True,
+        metadata={
+            "description": "Name of Tenant, also the proposed wallet name",
+            "example": "line of business short name",
+        },
+    )
+
+    contact_email = fields.Str(
+        required=True,
+        metadata={
+            "description": "Contact email for this tenant",
+        },
+    )
+
+    connect_to_endorser = fields.List(
+        fields.Nested(EndorserLedgerConfigSchema()),
+        required=False,
+        metadata={
+            "description": "Endorser config",
+        },
+    )
+
+    create_public_did = fields.List(
+        fields.Str(
+            metadata={
+                "description": "Ledger identifier",
+            },
+        ),
+        required=False,
+        metadata={
+            "description": "Public DID config",
+        },
+    )
+
+
+class BulkTenantRequestSchema(OpenAPISchema):
+    """Request schema for bulk tenant provisioning."""
+
+    tenants = fields.List(
+        fields.Nested(BulkTenantSpecSchema()),
+        required=True,
+        validate=validate.Length(min=1),
+        metadata={"description": "Tenants to create"},
+    )
+
+
+class BulkTenantResultSchema(OpenAPISchema):
+    """One line of the bulk tenant provisioning NDJSON response."""
+
+    index = fields.Int(
+        required=True,
+        metadata={"description": "Position of the tenant in the request", "example": 0},
+    )
+    tenant_name = fields.Str(
+        required=True,
+        metadata={"description": "Requested tenant name"},
+    )
+    status = fields.Str(
+        required=True,
+        validate=validate.OneOf(["created", "error"]),
+        metadata={"description": "Outcome for this tenant", "example": "created"},
+    )
+    tenant_id = fields.Str(
+        metadata={"description": "Tenant identifier", "example": UUIDFour.EXAMPLE},
+    )
+    wallet_id = fields.Str(
+        metadata={"description": "Subwallet identifier", "example": UUIDFour.EXAMPLE},
+    )
+    wallet_key = fields.Str(
+        metadata={"description": "Subwallet key", "example": UUIDFour.EXAMPLE},
+    )
+    token = fields.Str(
+        metadata={"description": "Authorization token for the subwallet"},
+    )
+    error = fields.Str(
+        metadata={"description": "Reason the tenant could not be created"},
+    )
+
+
+class BulkTenantOperationRequestSchema(OpenAPISchema):
+    """Tenants to change in bulk, either by id or by tag filter."""
+
+    tenant_ids = fields.List(
+        fields.Str(metadata={"description": "Tenant identifier", "example": UUIDFour.EXAMPLE}),
+        required=False,
+        metadata={"description": "Tenants to change"},
+    )
+    tag_filter = fields.Dict(
+        required=False,
+        metadata={
+            "description": (
+                "Change every tenant matching this tag filter (instead of tenant_ids)."
+                " tenant_name only matches exactly, $like is not supported,"
+                " use tenant_name_prefix instead"
+            ),
+            "example": {"state": "deleted"},
+        },
+    )
+    tenant_name_prefix = fields.Str(
+        required=False,
+        metadata={
+            "description": (
+                "Change every tenant whose name starts with this value, ignoring case"
+                " (instead of tenant_ids, narrowed by tag_filter if given)"
+            ),
+            "example": "test-",
+        },
+    )
+
+
+class JobIdMatchInfoSchema(OpenAPISchema):
+    job_id = fields.Str(
+        required=True,
+        metadata={"description": "Job identifier", "example": UUIDFour.EXAMPLE},
+    )
+
+
+class BackgroundQuerySchema(OpenAPISchema):
+    background = fields.Bool(
+        required=False,
+        metadata={
+            "description": "Run as a job and return 202 with the job to poll",
+            "example": True,
+        },
+    )
+
+
 class TenantAuthenticationsApiRequestSchema(OpenAPISchema):
     """Request schema for api auth record."""
 
@@ -363,12 +592,26 @@ class TenantAuthenticationsApiResponseSchema(OpenAPISchema):
         required=True,
         metadata={
             "description": "The API key",
-            "example": "3bd14a1e8fb645ddadf9913c0922ff3b",
+            "example": "0c0bbd7bfa6a4b2c9d3e5f6a7b8c9d0e.3bd14a1e8fb645ddadf9913c0922ff3b",
         },
     )
 
 
-class TenantListSchema(OpenAPISchema):
+def tenant_name_sort_key(rec: TenantRecord):
+    return (rec.tenant_name or "").lower()
+
+
+def tenant_name_prefix_filter(prefix: str):
+    """Match records whose tenant_name starts with prefix, ignoring case.
+
+    tenant_name is an encrypted tag, Askar only matches it exactly ($like
+    matches nothing), so the prefix is matched in process.
+    """
+    prefix = prefix.lower()
+    return lambda rec: (rec.tenant_name or "").lower().startswith(prefix)
+
+
+class TenantListSchema(PagedListSchema):
     """Response schema for tenants list."""
 
     results = fields.List(
@@ -377,7 +620,7 @@ class TenantListSchema(OpenAPISchema):
     )
 
 
-class TenantListQuerySchema(OpenAPISchema):
+class TenantListQuerySchema(PagedListQuerySchema):
     """Query parameters schema for tenants list."""
 
     state = fields.Str(
@@ -388,9 +631,24 @@ class TenantListQuerySchema(OpenAPISchema):
         },
         validate=validate.OneOf([TenantRecord.STATE_ACTIVE, TenantRecord.STATE_DELETED, "all"]),
     )
+    tenant_name = fields.Str(
+        required=False,
+        metadata={
+            "description": "Only return tenants whose name starts with this value, ignoring case",
+            "example": "Acme",
+        },
+    )
+    order_by = fields.Str(
+        required=False,
+        validate=validate.OneOf(["created_at", "tenant_name"]),
+        metadata={
+            "description": "Field to order results by, defaults to created_at",
+            "example": "created_at",
+        },
+    )
 
 
-class TenantAuthenticationApiListSchema(OpenAPISchema):
+class TenantAuthenticationApiListSchema(PagedListSchema):
     """Response schema for authentications - users list."""
 
     results = fields.List(
@@ -401,6 +659,15 @@ class TenantAuthenticationApiListSchema(OpenAPISchema):
     )
 
 
+class TenantAuthenticationApiListQuerySchema(PagedListQuerySchema):
+    """Query parameters schema for authentications - users list."""
+
+    tenant_id = fields.Str(
+        required=False,
+        metadata={"description": "Only return API keys for this tenant", "example": UUIDFour.EXAMPLE},
+    )
+
+
 class TenantAuthenticationApiIdMatchInfoSchema(OpenAPISchema):
     """Schema for finding a tenant auth user by the record ID."""
 
@@ -424,6 +691,148 @@ class TenantAuthenticationApiOperationResponseSchema(OpenAPISchema):
     )
 
 
+class ProfileQuerySchema(OpenAPISchema):
+    """Query parameters for an event loop profile."""
+
+    seconds = fields.Int(
+        required=False,
+        validate=validate.Range(min=1, max=MAX_SECONDS),
+        metadata={"description": "How long to profile for", "example": DEFAULT_SECONDS},
+    )
+    interval_ms = fields.Int(
+        required=False,
+        validate=validate.Range(min=1, max=1000),
+        metadata={"description": "Time between samples, in milliseconds", "example": DEFAULT_INTERVAL_MS},
+    )
+    format = fields.Str(
+        required=False,
+        validate=validate.OneOf(FORMATS),
+        metadata={
+            "description": "collapsed stacks for flamegraphs (default), or a pstats file",
+            "example": FORMAT_COLLAPSED,
+        },
+    )
+
+
+class MemoryTracingStartSchema(OpenAPISchema):
+    """Request schema for starting memory tracing."""
+
+    frames = fields.Int(
+        required=False,
+        validate=validate.Range(min=1, max=50),
+        metadata={
+            "description": "Frames kept per allocation, 1 is enough to compare by module",
+            "example": DEFAULT_FRAMES,
+        },
+    )
+
+
+class MemoryTracingStatusSchema(OpenAPISchema):
+    """Response schema for memory tracing status."""
+
+    tracing = fields.Bool(metadata={"description": "True if allocations are being traced"})
+    frames = fields.Int(allow_none=True, metadata={"description": "Frames kept per allocation"})
+    traced_size = fields.Int(metadata={"description": "Bytes currently traced"})
+    traced_peak = fields.Int(metadata={"description": "Peak of bytes traced"})
+    snapshots = fields.List(fields.Str(), metadata={"description": "Names of the snapshots taken"})
+
+
+class MemorySnapshotMatchInfoSchema(OpenAPISchema):
+    name = fields.Str(
+        required=True,
+        metadata={"description": "Snapshot name", "example": "before"},
+    )
+
+
+class MemorySnapshotSchema(OpenAPISchema):
+    """Response schema for a memory snapshot."""
+
+    name = fields.Str(metadata={"description": "Snapshot name", "example": "before"})
+    size = fields.Int(metadata={"description": "Bytes traced in the snapshot"})
+    count = fields.Int(metadata={"description": "Allocations traced in the snapshot"})
+
+
+class MemoryDiffQuerySchema(OpenAPISchema):
+    """Query parameters for a memory snapshot diff."""
+
+    snapshot = fields.Str(
+        required=True,
+        metadata={"description": "Snapshot to compare from", "example": "before"},
+    )
+    compare_to = fields.Str(
+        required=False,
+        metadata={"description": "Snapshot to compare to, memory in use now if omitted", "example": "after"},
+    )
+    limit = fields.Int(
+        required=False,
+        validate=validate.Range(min=1, max=1000),
+        metadata={"description": "Number of modules to return", "example": DEFAULT_LIMIT},
+    )
+
+
+class MemoryModuleDiffSchema(OpenAPISchema):
+    module = fields.Str(metadata={"description": "Module (or file) the memory was allocated in"})
+    size_diff = fields.Int(metadata={"description": "Change in bytes"})
+    size = fields.Int(metadata={"description": "Bytes in the later snapshot"})
+    count_diff = fields.Int(metadata={"description": "Change in allocations"})
+    count = fields.Int(metadata={"description": "Allocations in the later snapshot"})
+    plugin = fields.Bool(metadata={"description": "True for traction_innkeeper modules"})
+
+
+class MemoryDiffSchema(OpenAPISchema):
+    """Response schema for a memory snapshot diff."""
+
+    size_diff = fields.Int(metadata={"description": "Change in bytes traced"})
+    count_diff = fields.Int(metadata={"description": "Change in allocations traced"})
+    plugin_size_diff = fields.Int(metadata={"description": "Change in bytes allocated by traction_innkeeper"})
+    results = fields.List(
+        fields.Nested(MemoryModuleDiffSchema()),
+        metadata={"description": "Modules with the largest changes"},
+    )
+    plugin_results = fields.List(
+        fields.Nested(MemoryModuleDiffSchema()),
+        metadata={"description": "traction_innkeeper modules with the largest changes"},
+    )
+
+
+class LoopStallSchema(OpenAPISchema):
+    """An event loop stall reported by the loop monitor."""
+
+    detected_at = fields.Str(
+        metadata={"description": "Time the loop resumed", "example": "2024-01-01T00:00:00.000000Z"},
+    )
+    lag_ms = fields.Int(
+        metadata={"description": "How late the loop came back, in milliseconds", "example": 800},
+    )
+    handler = fields.Str(
+        allow_none=True,
+        metadata={
+            "description": "Plugin handler running while the loop was blocked, null if none or not sampled",
+            "example": "traction_innkeeper.v1_0.innkeeper.routes.innkeeper_tenants_list",
+        },
+    )
+    stack = fields.List(
+        fields.Str(),
+        metadata={"description": "Innermost frames of the blocked stack, outermost first"},
+    )
+
+
+class LoopStallListSchema(OpenAPISchema):
+    """Response schema for event loop stalls."""
+
+    enabled = fields.Bool(
+        metadata={"description": "True if the loop monitor is running"},
+    )
+    threshold_ms = fields.Int(
+        allow_none=True,
+        metadata={"description": "Lag reported as a stall, in milliseconds", "example": 250},
+    )
+    results = fields.List(
+        fields.Nested(LoopStallSchema()),
+        metadata={"description": "Recent stalls, newest first"},
+    )
+
+
 @docs(
     tags=["multitenancy"],
 )
@@ -503,7 +912,7 @@ async def tenant_checkin(request: web.BaseRequest):
             raise web.HTTPUnauthorized(reason="Reservation has expired")
 
         if res_rec.state == ReservationRecord.STATE_APPROVED:
-            reservation_token = mgr.check_reservation_password(reservation_pwd, res_rec)
+            reservation_token = await mgr.check_reservation_password(reservation_pwd, res_rec)
             if not reservation_token:
                 raise web.HTTPUnauthorized(reason="Reservation password incorrect")
 
@@ -577,18 +986,17 @@ async def tenant_create_token(request: web.BaseRequest):
 
     # if an API key is provided verify it is valid
     if api_key:
-        async with profile.session() as session:
-            tenant_keys = await TenantAuthenticationApiRecord.query_by_tenant_id(session, tenant_id)
-            LOGGER.warning(f"tenant_keys = {tenant_keys}")
-            # if no keys found raise an error
-            if not tenant_keys:
-                raise web.HTTPUnauthorized(reason="API Key not found")
-            # check if the provided key matches any of the tenant keys
-            for tenant_key in tenant_keys:
-                if mgr.check_api_key(api_key, tenant_key):
-                    break
-            else:
-                raise web.HTTPUnauthorized(reason="API Key mismatch")
+        tenant_keys = await mgr.find_api_key_records(tenant_id, api_key)
+        LOGGER.debug(f"tenant_keys = {tenant_keys}")
+        # if no keys found raise an error
+        if not tenant_keys:
+            raise web.HTTPUnauthorized(reason="API Key not found")
+        # check if the provided key matches any of the tenant keys
+        for tenant_key in tenant_keys:
+            if await mgr.verify_api_key(api_key, tenant_key):
+                break
+        else:
+            raise web.HTTPUnauthorized(reason="API Key mismatch")
 
     # first look up the tenant...
     async with profile.session() as session:
@@ -694,6 +1102,9 @@ async def tenant_config_update(request: web.BaseRequest):
             tenant_record.curr_ledger_id = curr_ledger_id
         tenant_record.enable_ledger_switch = enable_ledger_switch
         await tenant_record.save(session)
+    if curr_ledger_id:
+        # the endorser connection of the old ledger no longer applies
+        ENDORSER_CONNECTION_CACHE.invalidate(tenant_record.wallet_id)
     return web.json_response(tenant_record.serialize())
 
 
@@ -728,6 +1139,7 @@ async def innkeeper_tenant_res_update(request: web.BaseRequest):
     tags=[SWAGGER_CATEGORY],
 )
 @response_schema(ReservationListSchema(), 200, description="")
+@use_kwargs(ReservationListQuerySchema(), location="query")
 @innkeeper_only
 @error_handler
 async def innkeeper_reservations_list(request: web.BaseRequest):
@@ -738,18 +1150,27 @@ async def innkeeper_reservations_list(request: web.BaseRequest):
     profile = mgr.profile
 
     tag_filter = {}
-    post_filter = {}
+    state = request.query.get("state")
+    if state:
+        tag_filter["state"] = state
+    tenant_name = request.query.get("tenant_name")
+    post_filter = tenant_name_prefix_filter(tenant_name) if tenant_name else None
+
+    limit, offset, descending = get_paging_params(request)
     async with profile.session() as session:
         # innkeeper can access all reservation records
-        records = await ReservationRecord.query(
-            session=session,
-            tag_filter=tag_filter,
-            post_filter_positive=post_filter,
-            alt=True,
+        records, total = await query_records_page(
+            session,
+            ReservationRecord,
+            tag_filter,
+            limit=limit,
+            offset=offset,
+            post_filter=post_filter,
+            descending=descending,
         )
     results = [record.serialize() for record in records]
 
-    return web.json_response({"results": results})
+    return web.json_response({"results": results, "total": total, "limit": limit, "offset": offset})
 
 
 @docs(
@@ -856,19 +1277,30 @@ async def innkeeper_tenants_list(request: web.BaseRequest):
     if state != "all":
         tag_filter["state"] = state
 
-    post_filter = {}
+    tenant_name = request.query.get("tenant_name")
+    post_filter = tenant_name_prefix_filter(tenant_name) if tenant_name else None
+
+    limit, offset, descending = get_paging_params(request)
+    # created_at is storage insertion order, anything else is sorted in process
+    sort_key = None
+    if request.query.get("order_by") == "tenant_name":
+        sort_key = tenant_name_sort_key
 
     async with profile.session() as session:
         # innkeeper can access all tenant records
-        records = await TenantRecord.query(
-            session=session,
-            tag_filter=tag_filter,
-            post_filter_positive=post_filter,
-            alt=True,
+        records, total = await query_records_page(
+            session,
+            TenantRecord,
+            tag_filter,
+            limit=limit,
+            offset=offset,
+            sort_key=sort_key,
+            post_filter=post_filter,
+            descending=descending,
         )
     results = [record.serialize() for record in records]
 
-    return web.json_response({"results": results})
+    return web.json_response({"results": results, "total": total, "limit": limit, "offset": offset})
 
 
 @docs(
@@ -891,7 +1323,7 @@ async def innkeeper_tenant_get(request: web.BaseRequest):
         rec = await TenantRecord.retrieve_by_id(session, tenant_id)
         LOGGER.info(rec)
 
-    return web.json_response(rec.serialize())
+    return json_response_with_etag(request, record_etag(rec), rec.serialize)
 
 
 @docs(
@@ -922,7 +1354,9 @@ async def innkeeper_tenant_delete(request: web.BaseRequest):
     tags=[SWAGGER_CATEGORY],
 )
 @match_info_schema(TenantIdMatchInfoSchema())
+@use_kwargs(BackgroundQuerySchema(), location="query")
 @response_schema(TenantRecordSchema(), 200, description="")
+@response_schema(JobRecordSchema(), 202, description="")
 @innkeeper_only
 @error_handler
 async def innkeeper_tenant_hard_delete(request: web.BaseRequest):
@@ -930,6 +1364,14 @@ async def innkeeper_tenant_hard_delete(request: web.BaseRequest):
     tenant_id = request.match_info["tenant_id"]
 
     mgr = context.inject(TenantManager)
+    if background_requested(request):
+        job = await JOBS.start(
+            "tenant_hard_delete",
+            functools.partial(mgr.hard_delete_tenants, [tenant_id]),
+            total=1,
+        )
+        return web.json_response(job.serialize(), status=202)
+
     profile = mgr.profile
     async with profile.session() as session:
         rec = await TenantRecord.retrieve_by_id(session, tenant_id)
@@ -1014,6 +1456,146 @@ async def innkeeper_tenant_adopt(request: web.BaseRequest):
     return web.json_response(tenant.serialize())
 
 
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Create many tenants and wallets",
+    description="Streams one newline delimited JSON result per tenant as it finishes",
+)
+@request_schema(BulkTenantRequestSchema())
+@response_schema(BulkTenantResultSchema(), 200, description="")
+@innkeeper_only
+@error_handler
+async def innkeeper_tenants_bulk(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+
+    body = await request.json()
+    specs = body.get("tenants") or []
+
+    # records are under base/root profile, use Tenant Manager profile
+    mgr = context.inject(TenantManager)
+    max_tenants = mgr._config.bulk_provisioning.max_tenants
+    if not specs:
+        raise web.HTTPBadRequest(reason="No tenants to create.")
+    if len(specs) > max_tenants:
+        raise web.HTTPBadRequest(reason=f"At most {max_tenants} tenants can be created per request.")
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def write_line(entry: dict):
+        await response.write(json.dumps(entry).encode("utf-8") + b"\n")
+
+    await mgr.provision_tenants(specs, write_line)
+    await response.write_eof()
+    return response
+
+
+async def bulk_tenant_ids(mgr: TenantManager, body: dict) -> list:
+    """Resolve the tenant ids of a bulk request, in request order without duplicates."""
+    tenant_ids = list(dict.fromkeys(body.get("tenant_ids") or []))
+    tag_filter = body.get("tag_filter") or {}
+    name_prefix = body.get("tenant_name_prefix")
+    # an empty tag filter would match every tenant, so one of the two is required
+    if bool(tenant_ids) == bool(tag_filter or name_prefix):
+        raise web.HTTPBadRequest(reason="Provide either tenant_ids or a tag_filter / tenant_name_prefix.")
+    max_tenants = mgr._config.bulk_provisioning.max_tenants
+    if len(tenant_ids) > max_tenants:
+        raise web.HTTPBadRequest(reason=f"At most {max_tenants} tenant ids can be given per request.")
+    if tag_filter or name_prefix:
+        tenant_ids = await mgr.find_tenant_ids(tag_filter, name_prefix=name_prefix)
+    return tenant_ids
+
+
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Soft delete many tenants",
+    description="Runs in the background, poll the returned job for progress",
+)
+@request_schema(BulkTenantOperationRequestSchema())
+@response_schema(JobRecordSchema(), 202, description="")
+@innkeeper_only
+@error_handler
+async def innkeeper_tenants_bulk_delete(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+    mgr = context.inject(TenantManager)
+
+    tenant_ids = await bulk_tenant_ids(mgr, await request.json())
+    job = await JOBS.start(
+        "tenant_soft_delete",
+        functools.partial(mgr.soft_delete_tenants, tenant_ids),
+        total=len(tenant_ids),
+    )
+    return web.json_response(job.serialize(), status=202)
+
+
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Restore many soft deleted tenants",
+    description="Runs in the background, poll the returned job for progress",
+)
+@request_schema(BulkTenantOperationRequestSchema())
+@response_schema(JobRecordSchema(), 202, description="")
+@innkeeper_only
+@error_handler
+async def innkeeper_tenants_bulk_restore(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+    mgr = context.inject(TenantManager)
+
+    tenant_ids = await bulk_tenant_ids(mgr, await request.json())
+    job = await JOBS.start(
+        "tenant_restore",
+        functools.partial(mgr.restore_tenants, tenant_ids),
+        total=len(tenant_ids),
+    )
+    return web.json_response(job.serialize(), status=202)
+
+
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Hard delete many tenants and their wallets",
+    description="Runs in the background, poll the returned job for progress",
+)
+@request_schema(BulkTenantOperationRequestSchema())
+@response_schema(JobRecordSchema(), 202, description="")
+@innkeeper_only
+@error_handler
+async def innkeeper_tenants_bulk_hard_delete(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+    mgr = context.inject(TenantManager)
+
+    tenant_ids = await bulk_tenant_ids(mgr, await request.json())
+    job = await JOBS.start(
+        "tenant_hard_delete",
+        functools.partial(mgr.hard_delete_tenants, tenant_ids),
+        total=len(tenant_ids),
+    )
+    return web.json_response(job.serialize(), status=202)
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Get the progress of a job")
+@match_info_schema(JobIdMatchInfoSchema())
+@response_schema(JobRecordSchema(), 200, description="")
+@innkeeper_only
+@error_handler
+async def innkeeper_job_get(request: web.BaseRequest):
+    job = await JOBS.get(request.match_info["job_id"])
+    return web.json_response(job.serialize())
+
+
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Cancel a job",
+    description="A pending job is dropped, a running job stops at its next safe point",
+)
+@match_info_schema(JobIdMatchInfoSchema())
+@response_schema(JobRecordSchema(), 200, description="")
+@innkeeper_only
+@error_handler
+async def innkeeper_job_cancel(request: web.BaseRequest):
+    job = await JOBS.cancel(request.match_info["job_id"])
+    return web.json_response(job.serialize())
+
+
 @docs(tags=[SWAGGER_CATEGORY], summary="Create API Key Record")
 @request_schema(TenantAuthenticationsApiRequestSchema())
 @response_schema(TenantAuthenticationsApiResponseSchema(), 200, description="")
@@ -1043,6 +1625,7 @@ async def innkeeper_authentications_api(request: web.BaseRequest):
 
 @docs(tags=[SWAGGER_CATEGORY], summary="List all API Key Records")
 @response_schema(TenantAuthenticationApiListSchema(), 200, description="")
+@use_kwargs(TenantAuthenticationApiListQuerySchema(), location="query")
 @innkeeper_only
 @error_handler
 async def innkeeper_authentications_api_list(request: web.BaseRequest):
@@ -1053,18 +1636,24 @@ async def innkeeper_authentications_api_list(request: web.BaseRequest):
     profile = mgr.profile
 
     tag_filter = {}
-    post_filter = {}
+    tenant_id = request.query.get("tenant_id")
+    if tenant_id:
+        tag_filter["tenant_id"] = tenant_id
+
+    limit, offset, descending = get_paging_params(request)
     async with profile.session() as session:
-        # innkeeper can access all reservation records
-        records = await TenantAuthenticationApiRecord.query(
-            session=session,
-            tag_filter=tag_filter,
-            post_filter_positive=post_filter,
-            alt=True,
+        # innkeeper can access all api key records
+        records, total = await query_records_page(
+            session,
+            TenantAuthenticationApiRecord,
+            tag_filter,
+            limit=limit,
+            offset=offset,
+            descending=descending,
         )
     results = [record.serialize() for record in records]
 
-    return web.json_response({"results": results})
+    return web.json_response({"results": results, "total": total, "limit": limit, "offset": offset})
 
 
 @docs(tags=[SWAGGER_CATEGORY], summary="Read API Key Record")
@@ -1127,31 +1716,137 @@ async def innkeeper_config_handler(request: web.BaseRequest):
     mgr = context.inject(TenantManager)
     profile = mgr.profile
 
-    config = {
-        key: (profile.context.settings[key])
-        for key in profile.context.settings
-        if key
-        not in [
-            "admin.admin_api_key",
-            "multitenant.jwt_secret",
-            "wallet.key",
-            "wallet.rekey",
-            "wallet.seed",
-            "wallet.storage_creds",
-        ]
-    }
+    return INNKEEPER_SERVER_CONFIG.response(request, profile.context.settings)
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Plugin metrics in the Prometheus text format")
+@innkeeper_only
+async def innkeeper_metrics(request: web.BaseRequest):
+    return metrics_response()
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Recent event loop stalls and the handlers that caused them")
+@response_schema(LoopStallListSchema(), 200, description="")
+@innkeeper_only
+async def innkeeper_loop_stalls(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+    # the monitor is bound to the base/root profile, use Tenant Manager profile
+    mgr = context.inject(TenantManager)
+    monitor = mgr.profile.inject_or(LoopMonitor)
+    if not monitor:
+        return web.json_response({"enabled": False, "threshold_ms": None, "results": []})
+    return web.json_response(
+        {
+            "enabled": monitor.running,
+            "threshold_ms": monitor.threshold_ms,
+            "results": monitor.stalls(),
+        }
+    )
+
+
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Profile the event loop for a few seconds",
+    description="Samples the agent's event loop and returns collapsed stacks or a pstats file. "
+    "Each stack starts with the plugin handler its task was serving.",
+)
+@use_kwargs(ProfileQuerySchema(), location="query")
+@innkeeper_only
+async def innkeeper_profile(request: web.BaseRequest):
+    seconds = int(request.query.get("seconds", DEFAULT_SECONDS))
+    interval_ms = int(request.query.get("interval_ms", DEFAULT_INTERVAL_MS))
+    output = request.query.get("format", FORMAT_COLLAPSED)
+    try:
+        profile = await PROFILER.profile(seconds, interval_ms / 1000)
+    except ProfileInProgressError as err:
+        raise web.HTTPConflict(reason=str(err))
+
+    LOGGER.info("profiled %d samples in %.1f s", profile.sample_count, profile.duration)
+    if output == FORMAT_PSTATS:
+        return web.Response(
+            body=profile.pstats(),
+            content_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="traction_innkeeper.pstats"'},
+        )
+    return web.Response(text=profile.collapsed(), content_type="text/plain")
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Memory tracing status and snapshots")
+@response_schema(MemoryTracingStatusSchema(), 200, description="")
+@innkeeper_only
+async def innkeeper_memory_status(request: web.BaseRequest):
+    return web.json_response(MEMORY.status())
+
+
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Start tracing memory allocations",
+    description="Every allocation is slower while tracing, stop it when done",
+)
+@request_schema(MemoryTracingStartSchema())
+@response_schema(MemoryTracingStatusSchema(), 200, description="")
+@innkeeper_only
+async def innkeeper_memory_start(request: web.BaseRequest):
+    body = await request.json() if request.body_exists else {}
+    try:
+        MEMORY.start(body.get("frames", DEFAULT_FRAMES))
+    except MemoryTracingError as err:
+        raise web.HTTPConflict(reason=str(err))
+    return web.json_response(MEMORY.status())
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Stop tracing memory allocations and drop the snapshots")
+@response_schema(MemoryTracingStatusSchema(), 200, description="")
+@innkeeper_only
+async def innkeeper_memory_stop(request: web.BaseRequest):
+    try:
+        MEMORY.stop()
+    except MemoryTracingError as err:
+        raise web.HTTPConflict(reason=str(err))
+    return web.json_response(MEMORY.status())
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Take a named memory snapshot")
+@match_info_schema(MemorySnapshotMatchInfoSchema())
+@response_schema(MemorySnapshotSchema(), 200, description="")
+@innkeeper_only
+async def innkeeper_memory_snapshot(request: web.BaseRequest):
     try:
-        del config["plugin_config"]["traction_innkeeper"]["innkeeper_wallet"]["wallet_key"]
-    except KeyError as e:
-        LOGGER.warn(f"The key to be removed: '{e.args[0]}' is missing from the dictionary.")
-    config["version"] = __version__
+        snapshot = await MEMORY.snapshot(request.match_info["name"])
+    except MemoryTracingError as err:
+        raise web.HTTPConflict(reason=str(err))
+    return web.json_response(snapshot)
+
 
-    return web.json_response({"config": config})
+@docs(
+    tags=[SWAGGER_CATEGORY],
+    summary="Compare memory snapshots by module",
+    description="Largest changes first, traction_innkeeper modules are also listed on their own",
+)
+@use_kwargs(MemoryDiffQuerySchema(), location="query")
+@response_schema(MemoryDiffSchema(), 200, description="")
+@innkeeper_only
+async def innkeeper_memory_diff(request: web.BaseRequest):
+    try:
+        diff = await MEMORY.diff(
+            request.query["snapshot"],
+            request.query.get("compare_to"),
+            int(request.query.get("limit", DEFAULT_LIMIT)),
+        )
+    except SnapshotNotFoundError as err:
+        raise web.HTTPNotFound(reason=str(err))
+    except MemoryTracingError as err:
+        raise web.HTTPConflict(reason=str(err))
+    return web.json_response(diff)
 
 
 async def register(app: web.Application):
     """Register routes."""
     LOGGER.info("> registering routes")
+
+    # time plugin handlers, other routes pass straight through
+    app.middlewares.append(metrics_middleware)
+
     # routes that do not require a tenant token can be easily slotted under multitenancy.
     app.add_routes(
         [
@@ -1203,11 +1898,17 @@ async def register(app: web.Application):
             ),
             web.get("/innkeeper/tenants/", innkeeper_tenants_list, allow_head=False),
             web.post("/innkeeper/tenants/adopt", innkeeper_tenant_adopt),
+            web.post("/innkeeper/tenants/bulk", innkeeper_tenants_bulk),
+            web.post("/innkeeper/tenants/bulk/delete", innkeeper_tenants_bulk_delete),
+            web.post("/innkeeper/tenants/bulk/restore", innkeeper_tenants_bulk_restore),
+            web.post("/innkeeper/tenants/bulk/hard-delete", innkeeper_tenants_bulk_hard_delete),
             web.get("/innkeeper/tenants/{tenant_id}", innkeeper_tenant_get, allow_head=False),
             web.put("/innkeeper/tenants/{tenant_id}/config", tenant_config_update),
             web.delete("/innkeeper/tenants/{tenant_id}", innkeeper_tenant_delete),
             web.delete("/innkeeper/tenants/{tenant_id}/hard", innkeeper_tenant_hard_delete),
             web.put("/innkeeper/tenants/{tenant_id}/restore", innkeeper_tenant_restore),
+            web.get("/innkeeper/jobs/{job_id}", innkeeper_job_get, allow_head=False),
+            web.post("/innkeeper/jobs/{job_id}/cancel", innkeeper_job_cancel),
             web.get(
                 "/innkeeper/default-config",
                 tenant_default_config_settings,
@@ -1233,6 +1934,18 @@ async def register(app: web.Application):
                 innkeeper_config_handler,
                 allow_head=False,
             ),
+            web.get(
+                "/innkeeper/server/loop-stalls",
+                innkeeper_loop_stalls,
+                allow_head=False,
+            ),
+            web.post("/innkeeper/server/profile", innkeeper_profile),
+            web.get("/innkeeper/server/memory", innkeeper_memory_status, allow_head=False),
+            web.post("/innkeeper/server/memory/start", innkeeper_memory_start),
+            web.post("/innkeeper/server/memory/stop", innkeeper_memory_stop),
+            web.post("/innkeeper/server/memory/snapshots/{name}", innkeeper_memory_snapshot),
+            web.get("/innkeeper/server/memory/diff", innkeeper_memory_diff, allow_head=False),
+            web.get("/innkeeper/metrics", innkeeper_metrics, allow_head=False),
         ]
     )
     LOGGER.info("< registering routes")
@@ -0,0 +1,118 @@
+import copy
+import json
+import logging
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+from aiohttp import web
+from acapy_agent.version import __version__
+
+from .etag import etag_matches, make_etag, not_modified
+
+LOGGER = logging.getLogger(__name__)
+
+INNKEEPER_EXCLUDED_SETTINGS = [
+    "admin.admin_api_key",
+    "multitenant.jwt_secret",
+    "wallet.key",
+    "wallet.rekey",
+    "wallet.seed",
+    "wallet.storage_creds",
+]
+
+TENANT_EXCLUDED_SETTINGS = [
+    "default_label",
+    "admin.admin_api_key",
+    "admin.admin_insecure_mode",
+    "admin.enabled",
+    "admin.host",
+    "admin.port",
+    "admin.webhook_urls",
+    "admin.admin_client_max_request_size",
+    "multitenant.jwt_secret",
+    "wallet.key",
+    "wallet.name",
+    "multitenant.wallet_name",
+    "wallet.storage_type",
+    "wallet.storage_config",
+    "wallet.rekey",
+    "wallet.seed",
+    "wallet.storage_creds",
+]
+
+
+def _redact(settings: Mapping[str, Any], excluded: List[str]) -> dict:
+    config = {key: settings[key] for key in settings if key not in excluded}
+    # nested values are edited below, never touch the live settings
+    if "plugin_config" in config:
+        config["plugin_config"] = copy.deepcopy(config["plugin_config"])
+    config["version"] = __version__
+    return config
+
+
+def innkeeper_server_config(settings: Mapping[str, Any]) -> dict:
+    """Return the server settings an innkeeper may see."""
+    config = _redact(settings, INNKEEPER_EXCLUDED_SETTINGS)
+    try:
+        del config["plugin_config"]["traction_innkeeper"]["innkeeper_wallet"]["wallet_key"]
+    except KeyError as e:
+        LOGGER.warning(f"The key to be removed: '{e.args[0]}' is missing from the dictionary.")
+    return config
+
+
+def tenant_server_config(settings: Mapping[str, Any]) -> dict:
+    """Return the server settings a tenant may see, without genesis transactions."""
+    config = _redact(settings, TENANT_EXCLUDED_SETTINGS)
+    try:
+        del config["plugin_config"]["traction_innkeeper"]["innkeeper_wallet"]
+    except KeyError as e:
+        LOGGER.warning(f"The key to be removed: '{e.args[0]}' is missing from the dictionary.")
+    if config.get("ledger.ledger_config_list"):
+        config["ledger.ledger_config_list"] = [
+            {k: v for k, v in ledger.items() if k != "genesis_transactions"}
+            for ledger in config["ledger.ledger_config_list"]
+        ]
+    return config
+
+
+class ServerConfigView:
+    """A redacted view of the root settings, serialized once and served by ETag.
+
+    The view is rebuilt only when the settings change: a different settings
+    object, or a top level setting added, removed or replaced. Settings edited
+    in place below the top level are not supported: they go unnoticed, so
+    replace the top level value instead.
+    """
+
+    def __init__(self, build: Callable[[Mapping[str, Any]], dict]):
+        self._build = build
+        self._settings: Optional[Mapping[str, Any]] = None
+        self._values: List[Tuple[str, Any]] = []
+        self._body = b""
+        self._etag = ""
+
+    def _changed(self, settings: Mapping[str, Any]) -> bool:
+        if settings is not self._settings or len(settings) != len(self._values):
+            return True
+        # identity, not equality: comparing genesis blobs would cost what we save
+        return any(key not in settings or settings[key] is not value for key, value in self._values)
+
+    def get(self, settings: Mapping[str, Any]) -> Tuple[bytes, str]:
+        """Return the serialized view and its ETag, rebuilding it if settings changed."""
+        if self._changed(settings):
+            self._body = json.dumps({"config": self._build(settings)}).encode("utf-8")
+            self._etag = make_etag(self._body)
+            self._settings = settings
+            self._values = [(key, settings[key]) for key in settings]
+        return self._body, self._etag
+
+    def response(self, request: web.BaseRequest, settings: Mapping[str, Any]) -> web.Response:
+        """Return the cached view, or 304 if the client already has it."""
+        body, etag = self.get(settings)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+
+# one view per endpoint, both over the root profile settings
+INNKEEPER_SERVER_CONFIG = ServerConfigView(innkeeper_server_config)
+TENANT_SERVER_CONFIG = ServerConfigView(tenant_server_config)
@@ -0,0 +1,98 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .metrics import cache_stats
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 30
+DEFAULT_MAX_SIZE = 10000
+
+
+class TenantCache:
+    """In-process cache of TenantRecord values keyed by wallet_id.
+
+    Entries expire after `ttl_seconds` and the least recently used entry is
+    evicted once `max_size` is reached. Only the stored (json) value is kept,
+    so every hit hands out a fresh record that callers are free to mutate.
+
+    `generation` is bumped on every invalidation; a reader that captured it
+    before going to storage passes it back to `put` so a record read before a
+    concurrent update/suspension is never cached over the invalidation.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_size: int = DEFAULT_MAX_SIZE):
+        self._entries: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self.configure(ttl_seconds, max_size)
+
+    def configure(self, ttl_seconds: float, max_size: int):
+        self._ttl_seconds = ttl_seconds
+        self._max_size = max_size
+        self._trim()
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl_seconds > 0 and self._max_size > 0
+
+    def get(self, wallet_id: str) -> Optional[Tuple[str, dict]]:
+        """Return (tenant_id, record value) for wallet_id, or None on a miss."""
+        entry = self._entries.get(wallet_id) if wallet_id else None
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, tenant_id, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[wallet_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(wallet_id)
+        self.hits += 1
+        return tenant_id, json.loads(value)
+
+    def put(self, wallet_id: str, tenant_id: str, value: dict, generation: Optional[int] = None):
+        if not (wallet_id and self.enabled):
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[wallet_id] = (
+            time.monotonic() + self._ttl_seconds,
+            tenant_id,
+            json.dumps(value),
+        )
+        self._entries.move_to_end(wallet_id)
+        self._trim()
+
+    def invalidate(self, wallet_id: str):
+        self.generation += 1
+        if wallet_id and self._entries.pop(wallet_id, None) is not None:
+            LOGGER.debug("tenant cache invalidated for wallet_id '%s'", wallet_id)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def _trim(self):
+        while len(self._entries) > max(self._max_size, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return cache_stats(
+            self.hits,
+            self.misses,
+            size=len(self._entries),
+            max_size=self._max_size,
+            ttl_seconds=self._ttl_seconds,
+            evictions=self.evictions,
+        )
+
+
+# one cache per process, shared by the middleware and TenantRecord invalidation
+TENANT_CACHE = TenantCache()
@@ -0,0 +1,71 @@
+import logging
+from typing import Optional
+
+from acapy_agent.admin.request_context import AdminRequestContext
+from acapy_agent.core.profile import Profile, ProfileSession
+from aiohttp import web
+
+from .models import TenantRecord
+from .tenant_cache import TENANT_CACHE
+from .tenant_manager import TenantManager
+
+LOGGER = logging.getLogger(__name__)
+
+REQUEST_KEY = "tenant_context"
+
+
+class TenantRequestContext:
+    """The calling tenant of one request.
+
+    The tenant record is looked up at most once per request (or taken from the
+    tenant cache). A cached record may be stale, so it is only for reading:
+    handlers that change and save the record ask for it for_update.
+
+    No root profile session is held between storage calls, so a request does
+    not keep a pooled connection while it waits on other work. Handlers scope
+    a session to their own storage calls with session().
+    """
+
+    def __init__(self, context: AdminRequestContext):
+        self._context = context
+        self.wallet_id: Optional[str] = context.profile.settings.get("wallet.id")
+        self._tenant: Optional[TenantRecord] = None
+
+    @property
+    def root_profile(self) -> Profile:
+        # records are under base/root profile, use Tenant Manager profile
+        return self._context.inject(TenantManager).profile
+
+    def session(self) -> ProfileSession:
+        """Return a new root profile session, to use as an async context manager."""
+        return self.root_profile.session()
+
+    async def tenant(self, session: Optional[ProfileSession] = None, for_update: bool = False) -> TenantRecord:
+        """Return the calling tenant's record, from the cache or storage.
+
+        for_update always reads the record from storage, so a change saved by
+        another instance is not overwritten with a stale cached copy. Storage
+        is read in session when given, else in a session closed right after.
+        """
+        if for_update:
+            return await self._query(session)
+        if self._tenant is None:
+            rec = TenantRecord.from_cache(self.wallet_id)
+            if not rec:
+                generation = TENANT_CACHE.generation
+                rec = await self._query(session)
+                rec.add_to_cache(generation)
+            self._tenant = rec
+        return self._tenant
+
+    async def _query(self, session: Optional[ProfileSession]) -> TenantRecord:
+        # Tenant records must always be fetched by their wallet id.
+        if session is not None:
+            return await TenantRecord.query_by_wallet_id(session, self.wallet_id)
+        async with self.session() as session:
+            return await TenantRecord.query_by_wallet_id(session, self.wallet_id)
+
+
+def tenant_request_context(request: web.BaseRequest) -> TenantRequestContext:
+    """Return the tenant context of the request, set up by setup_tenant_context."""
+    return request[REQUEST_KEY]
@@ -1,22 +1,34 @@
-import bcrypt
+import asyncio
 import logging
-from typing import List, Optional
+import uuid
+from typing import Awaitable, Callable, Iterator, List, Optional, Set
 
+from . import hashing
 from .bcrypt_compat import limit_for_bcrypt
 
 from acapy_agent.core.error import BaseError
-from acapy_agent.core.profile import Profile
+from acapy_agent.core.profile import Profile, ProfileSession
 from acapy_agent.messaging.models.base import BaseModelError
 from acapy_agent.multitenant.base import BaseMultitenantManager
 
 # from acapy_agent.ledger.multiple_ledger.base_manager import (
 #     BaseMultipleLedgerManager,
 # )
+from acapy_agent.storage.base import BaseStorage
 from acapy_agent.storage.error import StorageError, StorageNotFoundError
 from acapy_agent.wallet.models.wallet_record import WalletRecord
 
-from .config import TractionInnkeeperConfig, InnkeeperWalletConfig, ReservationConfig
-from .models import TenantAuthenticationApiRecord, TenantRecord, ReservationRecord
+from .config import EndorserLedgerConfig, TractionInnkeeperConfig, InnkeeperWalletConfig, ReservationConfig
+from .models import JobRecord, TenantAuthenticationApiRecord, TenantRecord, ReservationRecord
+from .tenant_cache import TENANT_CACHE
+
+# async callback receiving one result per tenant during provision_tenants
+ProvisionProgress = Callable[[dict], Awaitable[None]]
+# applies a bulk change to one tenant in a transaction, returns an error or None
+TenantUpdate = Callable[[ProfileSession, TenantRecord], Awaitable[Optional[str]]]
+
+# wallet names checked per query when looking for a free one
+WALLET_NAME_WINDOW = 50
 
 
 class TenantManager:
@@ -32,6 +44,9 @@ class TenantManager:
         self._profile = profile
         self._logger = logging.getLogger(__name__)
         self._config = config
+        # wallet names handed out but not yet stored as a WalletRecord
+        self._wallet_name_lock = asyncio.Lock()
+        self._pending_wallet_names: Set[str] = set()
 
     @property
     def profile(self) -> Profile:
@@ -84,25 +99,31 @@ class TenantManager:
 
             label = wallet_name  # use the name they provided as the label
 
-            unique_wallet_name = await self.get_unique_wallet_name(wallet_name)
-            if unique_wallet_name != wallet_name:
-                # but... we have to change the actual wallet name
+            # allocate and hold the name until its WalletRecord exists, so
+            # concurrent check-ins never pick the same name
+            async with self._wallet_name_lock:
+                unique_wallet_name = await self.get_unique_wallet_name(wallet_name)
+                self._pending_wallet_names.add(unique_wallet_name)
+            try:
+                # but... we may have to change the actual wallet name
                 wallet_name = unique_wallet_name
 
-            settings = {
-                "wallet.type": self._profile.context.settings["wallet.type"],
-                "wallet.name": wallet_name,
-                "wallet.key": wallet_key,
-                "wallet.webhook_urls": wallet_webhook_urls,
-                "wallet.dispatch_type": wallet_dispatch_type,
-            }
-            settings.update(extra_settings)
-            # set the default label (our provided wallet name)
-            settings["default_label"] = label
-
-            multitenant_mgr = self._profile.inject(BaseMultitenantManager)
-
-            wallet_record = await multitenant_mgr.create_wallet(settings, key_management_mode)
+                settings = {
+                    "wallet.type": self._profile.context.settings["wallet.type"],
+                    "wallet.name": wallet_name,
+                    "wallet.key": wallet_key,
+                    "wallet.webhook_urls": wallet_webhook_urls,
+                    "wallet.dispatch_type": wallet_dispatch_type,
+                }
+                settings.update(extra_settings)
+                # set the default label (our provided wallet name)
+                settings["default_label"] = label
+
+                multitenant_mgr = self._profile.inject(BaseMultitenantManager)
+
+                wallet_record = await multitenant_mgr.create_wallet(settings, key_management_mode)
+            finally:
+                self._pending_wallet_names.discard(unique_wallet_name)
             token = await self.get_token(wallet_record, wallet_key)
         except BaseError as err:
             self._logger.error(f"Error creating wallet ('{wallet_name}').", err)
@@ -125,6 +146,191 @@ class TenantManager:
 
         return tenant, wallet_record, token
 
+    async def provision_tenants(self, specs: List[dict], progress: ProvisionProgress):
+        """Create a wallet and tenant for every spec, at most max_concurrency at a time.
+
+        Each spec has tenant_name, contact_email and optionally
+        connect_to_endorser / create_public_did. progress receives one result
+        per spec as soon as it finishes, so results arrive out of order and
+        carry the spec's index. A failed spec is reported and does not stop
+        the others.
+        """
+        semaphore = asyncio.Semaphore(max(self._config.bulk_provisioning.max_concurrency, 1))
+        created = 0
+
+        async def provision_one(index: int, spec: dict):
+            nonlocal created
+            result = {"index": index, "tenant_name": spec["tenant_name"]}
+            async with semaphore:
+                extra_settings = {}
+                if spec.get("connect_to_endorser"):
+                    extra_settings["tenant.endorser_config"] = [
+                        EndorserLedgerConfig(**config) for config in spec["connect_to_endorser"]
+                    ]
+                if spec.get("create_public_did"):
+                    extra_settings["tenant.public_did_config"] = spec["create_public_did"]
+                wallet_key = str(uuid.uuid4())
+                try:
+                    tenant, wallet_record, token = await self.create_wallet(
+                        wallet_name=spec["tenant_name"],
+                        wallet_key=wallet_key,
+                        tenant_email=spec.get("contact_email"),
+                        extra_settings=extra_settings,
+                    )
+                except Exception as err:
+                    self._logger.error(f"Error provisioning tenant ('{spec['tenant_name']}'): {err}")
+                    result.update({"status": "error", "error": str(err)})
+                else:
+                    created += 1
+                    result.update(
+                        {
+                            "status": "created",
+                            "tenant_id": tenant.tenant_id,
+                            "wallet_id": wallet_record.wallet_id,
+                            "wallet_key": wallet_key,
+                            "token": token,
+                        }
+                    )
+            try:
+                await progress(result)
+            except Exception as err:
+                # e.g. the client went away; keep provisioning the rest
+                self._logger.warning(f"could not report tenant ('{spec['tenant_name']}'): {err}")
+
+        await asyncio.gather(*(provision_one(index, spec) for index, spec in enumerate(specs)))
+        self._logger.info(f"provisioned {created} of {len(specs)} tenants")
+        return created
+
+    async def find_tenant_ids(self, tag_filter: dict, name_prefix: Optional[str] = None) -> List[str]:
+        """Return the ids of all tenants matching tag_filter, without loading the records.
+
+        tenant_name is an encrypted tag that Askar only matches exactly, so
+        name_prefix is matched against the returned tags, ignoring case.
+        """
+        async with self._profile.session() as session:
+            storage = session.inject(BaseStorage)
+            records = await storage.find_all_records(TenantRecord.RECORD_TYPE, tag_filter)
+        if name_prefix:
+            name_prefix = name_prefix.lower()
+            records = [r for r in records if (r.tags.get("tenant_name") or "").lower().startswith(name_prefix)]
+        return [record.id for record in records]
+
+    def _bulk_chunks(self, tenant_ids: List[str], job: JobRecord) -> Iterator[List[str]]:
+        # the innkeeper tenant is never part of a bulk change, a broad tag
+        # filter must not take the innkeeper down with the test tenants
+        innkeeper_tenant_id = self._config.innkeeper_wallet.tenant_id
+        if innkeeper_tenant_id in tenant_ids:
+            job.item_failed(innkeeper_tenant_id, "The innkeeper tenant cannot be changed in bulk.")
+            tenant_ids = [tenant_id for tenant_id in tenant_ids if tenant_id != innkeeper_tenant_id]
+        chunk_size = max(self._config.bulk_provisioning.chunk_size, 1)
+        for start in range(0, len(tenant_ids), chunk_size):
+            # a cancelled job stops between chunks, never inside one
+            if job.cancel_requested:
+                return
+            yield tenant_ids[start : start + chunk_size]
+
+    async def _update_tenants(self, tenant_ids: List[str], job: JobRecord, update: TenantUpdate):
+        """Apply update to the tenants, one transaction per chunk.
+
+        A tenant that is missing or refused by update fails on its own; an
+        error from storage rolls back and fails the rest of its chunk.
+        """
+        for chunk in self._bulk_chunks(tenant_ids, job):
+            failures = {}
+            updated = []
+            try:
+                async with self._profile.transaction() as txn:
+                    for tenant_id in chunk:
+                        try:
+                            rec = await TenantRecord.retrieve_by_id(txn, tenant_id, for_update=True)
+                        except StorageNotFoundError:
+                            failures[tenant_id] = f"Tenant {tenant_id} not found."
+                            continue
+                        error = await update(txn, rec)
+                        if error:
+                            failures[tenant_id] = error
+                        else:
+                            updated.append(rec)
+                    await txn.commit()
+            except Exception as err:
+                self._logger.error(f"Error updating tenants in bulk: {err}")
+                failures.update({tenant_id: str(err) for tenant_id in chunk if tenant_id not in failures})
+                updated = []
+            # a reader may have cached the old value while the transaction was open
+            for rec in updated:
+                TENANT_CACHE.invalidate(rec.wallet_id)
+            for tenant_id, error in failures.items():
+                job.item_failed(tenant_id, error)
+            job.item_succeeded(len(updated))
+
+    async def soft_delete_tenants(self, tenant_ids: List[str], job: JobRecord):
+        """Soft delete the tenants and their api keys, chunk_size tenants per transaction."""
+
+        async def soft_delete(txn: ProfileSession, rec: TenantRecord) -> Optional[str]:
+            await rec.soft_delete(txn)
+
+        await self._update_tenants(tenant_ids, job, soft_delete)
+
+    async def restore_tenants(self, tenant_ids: List[str], job: JobRecord):
+        """Restore soft deleted tenants, chunk_size tenants per transaction."""
+
+        async def restore(txn: ProfileSession, rec: TenantRecord) -> Optional[str]:
+            if rec.state != TenantRecord.STATE_DELETED:
+                return f"Tenant {rec.tenant_id} is not deleted."
+            await rec.restore_deleted(txn)
+
+        await self._update_tenants(tenant_ids, job, restore)
+
+    async def hard_delete_tenants(self, tenant_ids: List[str], job: JobRecord):
+        """Remove the tenants' wallets and delete their tenant records.
+
+        Wallets are removed concurrently, at most max_concurrency at a time,
+        then the records of the removed wallets are deleted in one transaction
+        per chunk.
+        """
+        multitenant_mgr = self._profile.inject(BaseMultitenantManager)
+        semaphore = asyncio.Semaphore(max(self._config.bulk_provisioning.max_concurrency, 1))
+
+        async def remove_wallet(rec: TenantRecord) -> Optional[str]:
+            async with semaphore:
+                try:
+                    await multitenant_mgr.remove_wallet(rec.wallet_id)
+                except Exception as err:
+                    self._logger.error(f"Error removing wallet ('{rec.wallet_id}'): {err}")
+                    return str(err)
+            return None
+
+        for chunk in self._bulk_chunks(tenant_ids, job):
+            records = []
+            async with self._profile.session() as session:
+                for tenant_id in chunk:
+                    try:
+                        records.append(await TenantRecord.retrieve_by_id(session, tenant_id))
+                    except StorageNotFoundError:
+                        job.item_failed(tenant_id, f"Tenant {tenant_id} not found.")
+
+            errors = await asyncio.gather(*(remove_wallet(rec) for rec in records))
+            removed = []
+            for rec, error in zip(records, errors):
+                if error:
+                    job.item_failed(rec.tenant_id, error)
+                else:
+                    removed.append(rec)
+            if not removed:
+                continue
+
+            try:
+                async with self._profile.transaction() as txn:
+                    for rec in removed:
+                        await rec.delete_record(txn)
+                    await txn.commit()
+            except Exception as err:
+                self._logger.error(f"Error deleting tenant records in bulk: {err}")
+                for rec in removed:
+                    job.item_failed(rec.tenant_id, str(err))
+            else:
+                job.item_succeeded(len(removed))
+
     async def get_token(self, wallet_record: WalletRecord, wallet_key):
         try:
             multitenant_mgr = self._profile.inject(BaseMultitenantManager)
@@ -226,30 +432,18 @@ class TenantManager:
         if config.print_token:
             print(f"Bearer {token}\n")
 
-    def check_reservation_password(self, reservation_pwd: str, reservation: ReservationRecord):
-        if reservation_pwd is None or reservation is None:
+    async def check_reservation_password(self, reservation_pwd: str, reservation: ReservationRecord):
+        if reservation_pwd is None or reservation is None or not reservation.reservation_token_hash:
             return None
 
-        # make a hash from passed in value with saved salt...
+        # check the passed in value against the saved hash, a single constant-time
+        # check run on the hashing executor so the event loop is not blocked.
         pwd_bytes = limit_for_bcrypt(reservation_pwd.encode("utf-8"))
-        reservation_token = bcrypt.hashpw(
-            pwd_bytes,
-            reservation.reservation_token_salt.encode("utf-8"),
-        )
-        # check the passed in value/hash against the calculated hash.
-        checkpw = bcrypt.checkpw(pwd_bytes, reservation_token)
-        self._logger.debug(f"bcrypt.checkpw(reservation_pwd.encode('utf-8'), reservation_token) = {checkpw}")
-
-        # check the passed in value against the saved hash
-        checkpw2 = bcrypt.checkpw(
-            pwd_bytes,
-            reservation.reservation_token_hash.encode("utf-8"),
-        )
-        self._logger.debug(
-            f"bcrypt.checkpw(reservation_pwd.encode('utf-8'), reservation.reservation_token_hash.encode('utf-8')) = {checkpw2}"
-        )
+        reservation_token = reservation.reservation_token_hash.encode("utf-8")
+        checkpw = await hashing.checkpw(pwd_bytes, reservation_token)
+        self._logger.debug(f"hashing.checkpw(reservation_pwd, reservation.reservation_token_hash) = {checkpw}")
 
-        if checkpw and checkpw2:
+        if checkpw:
             # if password is correct, then return the string equivalent...
             return reservation_token.decode("utf-8")
         else:
@@ -258,25 +452,31 @@ class TenantManager:
 
     async def get_unique_wallet_name(self, wallet_name: str):
         self._logger.info(f"> get_unique_wallet_name('{wallet_name}')")
-        unique_wallet_name = wallet_name
+        unique_wallet_name = None
+        start = 0
         async with self._profile.session() as session:
-            w = await self.check_tables_for_wallet_name(session, unique_wallet_name)
-            idx = 1
-            while w:
-                self._logger.info(f"'{unique_wallet_name}': wallet_exists = {w}")
-                unique_wallet_name = f"{wallet_name}-{idx}"
-                w = await self.check_tables_for_wallet_name(session, unique_wallet_name)
-                idx += 1
+            while unique_wallet_name is None:
+                # the name, then its "-n" suffixed variants, a window at a time
+                candidates = [
+                    f"{wallet_name}-{idx}" if idx else wallet_name for idx in range(start, start + WALLET_NAME_WINDOW)
+                ]
+                taken = await self.get_wallet_names_in_use(session, candidates)
+                # names allocated to wallets still being created count as taken
+                taken |= self._pending_wallet_names
+                unique_wallet_name = next((name for name in candidates if name not in taken), None)
+                start += WALLET_NAME_WINDOW
         # return a unique wallet/tenant name, either the input or calculated...
         self._logger.info(f"< get_unique_wallet_name('{wallet_name}') = '{unique_wallet_name}'")
         return unique_wallet_name
 
-    async def check_tables_for_wallet_name(self, session, wallet_name: str):
-        # we can add more tables here if need (ie reservations, tenants...)
-        wallet_records = await WalletRecord.query(session, {"wallet_name": wallet_name})
-        wallet_exists = len(wallet_records) > 0
-
-        return wallet_exists
+    async def get_wallet_names_in_use(self, session, wallet_names: List[str]) -> Set[str]:
+        # wallet_name is an encrypted tag, it only matches exact values ($like
+        # matches nothing), so ask for every candidate name in one query.
+        wallet_records = await WalletRecord.query(
+            session,
+            {"$or": [{"wallet_name": wallet_name} for wallet_name in wallet_names]},
+        )
+        return {wallet_record.wallet_name for wallet_record in wallet_records}
 
     async def get_wallet_and_tenant(self, wallet_id: str):
         self._logger.info(f"> get_wallet_and_tenant('{wallet_id}')")
@@ -296,32 +496,33 @@ class TenantManager:
             raise StorageNotFoundError(f"Tenant not found with wallet_id '{wallet_id}'")
         return wallet_record, tenant_record
 
-    def check_api_key(self, api_key: str, apiRecord: TenantAuthenticationApiRecord):
-        if api_key is None or apiRecord is None:
-            return None
+    async def find_api_key_records(self, tenant_id: str, api_key: str) -> List[TenantAuthenticationApiRecord]:
+        """Return the api key records of the tenant that api_key could belong to.
 
-        # make a hash from passed in value with saved salt...
-        key_bytes = limit_for_bcrypt(api_key.encode("utf-8"))
-        key_token = bcrypt.hashpw(
-            key_bytes,
-            apiRecord.api_key_token_salt.encode("utf-8"),
-        )
-        # check the passed in value/hash against the calculated hash.
-        checkpw = bcrypt.checkpw(key_bytes, key_token)
-        self._logger.debug(f"bcrypt.checkpw(api_key.encode('utf-8'), key_token) = {checkpw}")
+        Prefixed keys name their record, so only that one is returned; legacy
+        keys have to be checked against all of the tenant's records.
+        """
+        record_id, _ = TenantAuthenticationApiRecord.parse_api_key(api_key)
+        async with self._profile.session() as session:
+            if not record_id:
+                return await TenantAuthenticationApiRecord.query_by_tenant_id(session, tenant_id)
+            try:
+                rec = await TenantAuthenticationApiRecord.retrieve_by_auth_api_id(session, record_id)
+            except StorageNotFoundError:
+                return []
+        return [rec] if rec.tenant_id == tenant_id else []
+
+    async def verify_api_key(self, api_key: str, apiRecord: TenantAuthenticationApiRecord) -> bool:
+        """Check api_key against the record's stored hash.
+
+        This is a single constant-time bcrypt check, done on the hashing thread
+        pool rather than the event loop.
+        """
+        if api_key is None or apiRecord is None or not apiRecord.api_key_token_hash:
+            return False
 
-        # check the passed in value against the saved hash
-        checkpw2 = bcrypt.checkpw(
-            key_bytes,
+        _, secret = TenantAuthenticationApiRecord.parse_api_key(api_key)
+        return await hashing.checkpw(
+            limit_for_bcrypt(secret.encode("utf-8")),
             apiRecord.api_key_token_hash.encode("utf-8"),
         )
-        self._logger.debug(
-            f"bcrypt.checkpw(api_key.encode('utf-8'), reservation.api_key_token_hash.encode('utf-8')) = {checkpw2}"
-        )
-
-        if checkpw and checkpw2:
-            # if password is correct, then return...
-            return key_token.decode("utf-8")
-        else:
-            # else return None
-            return None
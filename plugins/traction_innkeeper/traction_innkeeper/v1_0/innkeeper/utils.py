@@ -1,11 +1,16 @@
-import bcrypt
 import logging
 import uuid
 from datetime import datetime, timedelta, UTC
+from typing import Callable, Optional, Sequence, Tuple, Type
 
+from . import hashing
 from .bcrypt_compat import limit_for_bcrypt
 
+from acapy_agent.core.profile import ProfileSession
+from acapy_agent.messaging.models.base_record import BaseRecord
 from acapy_agent.messaging.models.openapi import OpenAPISchema
+from acapy_agent.storage.askar import AskarStorage
+from acapy_agent.storage.base import BaseStorage
 from marshmallow import fields
 
 from .models import ReservationRecord, TenantAuthenticationApiRecord, TenantRecord
@@ -75,14 +80,12 @@ class TenantConfigSchema(OpenAPISchema):
     )
 
 
-def generate_reservation_token_data(expiry_minutes: int):
+async def generate_reservation_token_data(expiry_minutes: int):
     _pwd = str(uuid.uuid4().hex)
     LOGGER.info(f"_pwd = {_pwd}")
 
-    _salt = bcrypt.gensalt()
+    _salt, _hash = await hashing.hash_password(limit_for_bcrypt(_pwd.encode("utf-8")))
     LOGGER.info(f"_salt = {_salt}")
-
-    _hash = bcrypt.hashpw(limit_for_bcrypt(_pwd.encode("utf-8")), _salt)
     LOGGER.info(f"_hash = {_hash}")
 
     minutes = expiry_minutes
@@ -93,11 +96,13 @@ def generate_reservation_token_data(expiry_minutes: int):
 
 
 async def approve_reservation(reservation_id: str, state_notes: str, manager: TenantManager):
+    # hash before opening the session, no need to hold a connection (and the
+    # reservation lock) meanwhile
+    _pwd, _salt, _hash, _expiry = await generate_reservation_token_data(manager._config.reservation.expiry_minutes)
     async with manager.profile.session() as session:
         # find reservation records.
         rec = await ReservationRecord.retrieve_by_reservation_id(session, reservation_id, for_update=True)
         if rec.state == ReservationRecord.STATE_REQUESTED:
-            _pwd, _salt, _hash, _expiry = generate_reservation_token_data(manager._config.reservation.expiry_minutes)
             rec.reservation_token_salt = _salt.decode("utf-8")
             rec.reservation_token_hash = _hash.decode("utf-8")
             rec.reservation_token_expiry = _expiry
@@ -118,6 +123,14 @@ async def refresh_registration_token(reservation_id: str, manager: TenantManager
     Invalidate the old token, generate a new token, and update the reservation record.
     :return: new_token: the new refreshed token
     """
+    # Generate new token data, before opening the session so the reservation
+    # is not held for update while hashing
+    _pwd = str(uuid.uuid4().hex)  # This generates a new token
+    _salt, _hash = await hashing.hash_password(limit_for_bcrypt(_pwd.encode("utf-8")))
+
+    minutes = manager._config.reservation.expiry_minutes
+    _expiry = datetime.utcnow() + timedelta(minutes=minutes)
+
     async with manager.profile.session() as session:
         try:
             reservation = await ReservationRecord.retrieve_by_reservation_id(session, reservation_id, for_update=True)
@@ -128,14 +141,6 @@ async def refresh_registration_token(reservation_id: str, manager: TenantManager
         if reservation.state != ReservationRecord.STATE_APPROVED:
             raise ReservationException("Only approved reservations can refresh tokens.")
 
-        # Generate new token data
-        _pwd = str(uuid.uuid4().hex)  # This generates a new token
-        _salt = bcrypt.gensalt()
-        _hash = bcrypt.hashpw(limit_for_bcrypt(_pwd.encode("utf-8")), _salt)
-
-        minutes = manager._config.reservation.expiry_minutes
-        _expiry = datetime.utcnow() + timedelta(minutes=minutes)
-
         # Update the reservation record with the new token and related info
         reservation.reservation_token_salt = _salt.decode("utf-8")
         reservation.reservation_token_hash = _hash.decode("utf-8")
@@ -152,14 +157,12 @@ async def refresh_registration_token(reservation_id: str, manager: TenantManager
         return _pwd
 
 
-def generate_api_key_data():
+async def generate_api_key_data():
     _key = str(uuid.uuid4().hex)
     LOGGER.info(f"_key = {_key}")
 
-    _salt = bcrypt.gensalt()
+    _salt, _hash = await hashing.hash_password(limit_for_bcrypt(_key.encode("utf-8")))
     LOGGER.info(f"_salt = {_salt}")
-
-    _hash = bcrypt.hashpw(limit_for_bcrypt(_key.encode("utf-8")), _salt)
     LOGGER.info(f"_hash = {_hash}")
 
     return _key, _salt, _hash
@@ -168,15 +171,71 @@ def generate_api_key_data():
 async def create_api_key(rec: TenantAuthenticationApiRecord, manager: TenantManager):
     if rec.state == TenantRecord.STATE_DELETED:
         raise ValueError("Tenant is disabled")
+    # hash before opening the session, no need to hold a connection meanwhile
+    _key, _salt, _hash = await generate_api_key_data()
     async with manager.profile.session() as session:
-        _key, _salt, _hash = generate_api_key_data()
         rec.api_key_token_salt = _salt.decode("utf-8")
         rec.api_key_token_hash = _hash.decode("utf-8")
         await rec.save(session)
         LOGGER.info(rec)
 
-    # return the generated key and the created record id
-    return _key, rec.tenant_authentication_api_id
+    # return the generated key (prefixed with the record id so verification
+    # only has to check one record) and the created record id
+    return rec.format_api_key(_key), rec.tenant_authentication_api_id
+
+
+async def count_records(session: ProfileSession, record_cls: Type[BaseRecord], tag_filter: dict = None) -> int:
+    """Count the records matching tag_filter without loading their values."""
+    storage = session.inject(BaseStorage)
+    tag_query = record_cls.prefix_tag_filter(tag_filter)
+    if isinstance(storage, AskarStorage):
+        return await storage.session.handle.count(record_cls.RECORD_TYPE, tag_query)
+    # no count on other backends, fall back to fetching the matches
+    return len(await storage.find_all_records(type_filter=record_cls.RECORD_TYPE, tag_query=tag_query))
+
+
+async def query_records_page(
+    session: ProfileSession,
+    record_cls: Type[BaseRecord],
+    tag_filter: dict = None,
+    *,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    sort_key: Optional[Callable[[BaseRecord], object]] = None,
+    post_filter: Optional[Callable[[BaseRecord], bool]] = None,
+    descending: bool = False,
+) -> Tuple[Sequence[BaseRecord], int]:
+    """Return a page of records matching tag_filter and the total number of matches.
+
+    Without a sort_key or post_filter records are returned in storage insertion
+    (created) order and only the requested page is read. Askar cannot order on
+    anything else, nor match encrypted tags other than exactly, so a sort_key or
+    post_filter loads every tag_filter match and sorts or filters them in
+    process before slicing.
+    """
+    if sort_key is not None or post_filter is not None:
+        if sort_key is not None:
+            records = sorted(await record_cls.query(session, tag_filter), key=sort_key, reverse=descending)
+        else:
+            records = await record_cls.query(session, tag_filter, order_by="id", descending=descending)
+        if post_filter is not None:
+            records = [record for record in records if post_filter(record)]
+        end = None if limit is None else offset + limit
+        return records[offset:end], len(records)
+
+    total = await count_records(session, record_cls, tag_filter)
+    if limit is None:
+        records = await record_cls.query(session, tag_filter, order_by="id", descending=descending)
+        return records[offset:], total
+    records = await record_cls.query(
+        session,
+        tag_filter,
+        limit=limit,
+        offset=offset,
+        order_by="id",
+        descending=descending,
+    )
+    return records, total
 
 
 class ReservationException(Exception):
@@ -5,6 +5,7 @@ from acapy_agent.core.event_bus import EventBus
 from acapy_agent.core.plugin_registry import PluginRegistry
 from acapy_agent.core.protocol_registry import ProtocolRegistry
 
+from ..innkeeper.config import get_config
 from .schema_storage_service import SchemaStorageService, subscribe
 
 LOGGER = logging.getLogger(__name__)
@@ -25,7 +26,8 @@ async def setup(context: InjectionContext):
     if not bus:
         raise ValueError("EventBus missing in context")
 
-    srv = SchemaStorageService()
+    _config = get_config(context.settings)
+    srv = SchemaStorageService(max_concurrency=_config.storage_sync.max_concurrency)
     context.injector.bind_instance(SchemaStorageService, srv)
 
     subscribe(bus)
@@ -1,8 +1,9 @@
 import functools
+import json
 import logging
 
 from aiohttp import web
-from aiohttp_apispec import docs, response_schema, match_info_schema, request_schema
+from aiohttp_apispec import docs, response_schema, match_info_schema, request_schema, use_kwargs
 from acapy_agent.admin.request_context import AdminRequestContext
 
 from acapy_agent.messaging.models.base import BaseModelError
@@ -12,6 +13,10 @@ from acapy_agent.admin.decorators.auth import tenant_authentication
 from acapy_agent.storage.error import StorageNotFoundError, StorageError
 from marshmallow import fields
 
+from ..innkeeper.etag import json_response_with_etag, record_etag
+from ..innkeeper.jobs import JOBS, background_requested, item_progress
+from ..innkeeper.models import JobRecord, JobRecordSchema
+
 from .models import SchemaStorageRecordSchema
 from .schema_storage_service import SchemaStorageService
 
@@ -56,6 +61,17 @@ class SchemaStorageAddSchema(OpenAPISchema):
     schema_id = fields.Str(metadata={"description": "Schema identifier"}, required=True)
 
 
+class SchemaStorageSyncQuerySchema(OpenAPISchema):
+    stream = fields.Bool(
+        required=False,
+        metadata={"description": "Stream per schema progress as newline delimited JSON, results last"},
+    )
+    background = fields.Bool(
+        required=False,
+        metadata={"description": "Run as a job and return 202 with the job to poll"},
+    )
+
+
 class SchemaStorageOperationResponseSchema(OpenAPISchema):
     """Response schema for simple operations."""
 
@@ -81,9 +97,12 @@ async def schema_storage_list(request: web.BaseRequest):
     tag_filter = {}
     post_filter = {}
     records = await storage_srv.list_items(profile, tag_filter, post_filter)
-    results = [record.serialize() for record in records]
 
-    return web.json_response({"results": results})
+    return json_response_with_etag(
+        request,
+        record_etag(*records),
+        lambda: {"results": [record.serialize() for record in records]},
+    )
 
 
 @docs(
@@ -120,7 +139,7 @@ async def schema_storage_get(request: web.BaseRequest):
 
     record = await storage_srv.read_item(profile, schema_id)
 
-    return web.json_response(record.serialize())
+    return json_response_with_etag(request, record_etag(record), record.serialize)
 
 
 @docs(
@@ -144,6 +163,8 @@ async def schema_storage_remove(request: web.BaseRequest):
 @docs(
     tags=[SWAGGER_CATEGORY],
 )
+@use_kwargs(SchemaStorageSyncQuerySchema(), location="query")
+@response_schema(JobRecordSchema(), 202, description="")
 @response_schema(SchemaStorageListSchema(), 200, description="")
 @error_handler
 @tenant_authentication
@@ -152,10 +173,36 @@ async def schema_storage_sync_created(request: web.BaseRequest):
     profile = context.profile
     storage_srv = context.inject_or(SchemaStorageService)
 
-    records = await storage_srv.sync_created(profile)
-    results = [record.serialize() for record in records]
+    if background_requested(request):
+
+        async def run(job: JobRecord):
+            await storage_srv.sync_created(profile, progress=item_progress(job, "schema_id"))
+
+        # safe to interrupt, every schema is added on its own
+        job = await JOBS.start(
+            "schema_sync",
+            run,
+            wallet_id=profile.settings.get("wallet.id"),
+            interruptible=True,
+        )
+        return web.json_response(job.serialize(), status=202)
+
+    if request.query.get("stream", "false").lower() not in {"true", "1", "yes"}:
+        records = await storage_srv.sync_created(profile)
+        results = [record.serialize() for record in records]
+
+        return web.json_response({"results": results})
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+
+    async def write_line(entry: dict):
+        await response.write(json.dumps(entry).encode("utf-8") + b"\n")
 
-    return web.json_response({"results": results})
+    records = await storage_srv.sync_created(profile, progress=write_line)
+    await write_line({"results": [record.serialize() for record in records]})
+    await response.write_eof()
+    return response
 
 
 async def register(app: web.Application):
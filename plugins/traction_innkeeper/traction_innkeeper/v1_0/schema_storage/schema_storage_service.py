@@ -1,6 +1,7 @@
+import asyncio
 import logging
 import re
-from typing import Optional, Tuple
+from typing import Awaitable, Callable, Optional, Tuple
 
 from acapy_agent.core.event_bus import Event, EventBus
 from acapy_agent.core.profile import Profile
@@ -12,8 +13,10 @@ from acapy_agent.ledger.multiple_ledger.ledger_requests_executor import (
 from acapy_agent.messaging.schemas.util import SCHEMA_SENT_RECORD_TYPE
 from acapy_agent.multitenant.base import BaseMultitenantManager
 from acapy_agent.storage.base import BaseStorage
-from acapy_agent.storage.error import StorageNotFoundError
+from acapy_agent.storage.error import StorageDuplicateError, StorageNotFoundError
 
+from ..innkeeper.ledger_cache import ANONCREDS_SCHEMA, LEDGER_CACHE, SCHEMA, ledger_key
+from ..innkeeper.metrics import timed_event_handler
 from .models import SchemaStorageRecord
 from acapy_agent.messaging.schemas.util import (
     EVENT_LISTENER_PATTERN as INDY_SCHEMA_EVENT_PATTERN,
@@ -31,10 +34,16 @@ except (ImportError, AttributeError):
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_MAX_CONCURRENCY = 8
+
+# async callback receiving one progress entry per schema during sync_created
+SyncProgress = Callable[[dict], Awaitable[None]]
+
 
 class SchemaStorageService:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
         self._logger = logging.getLogger(__name__)
+        self._max_concurrency = max(max_concurrency, 1)
 
     @property
     def logger(self) -> logging.Logger:
@@ -91,6 +100,10 @@ class SchemaStorageService:
         from acapy_agent.anoncreds.registry import AnonCredsRegistry
         from acapy_agent.anoncreds.base import AnonCredsResolutionError
 
+        cached = LEDGER_CACHE.get(ledger_key(profile), ANONCREDS_SCHEMA, schema_id)
+        if cached:
+            return cached["schema"], cached["schema_dict"], cached["ledger_id"]
+
         try:
             anoncreds_registry = profile.inject(AnonCredsRegistry)
             schema_result = await anoncreds_registry.get_schema(profile, schema_id)
@@ -113,7 +126,6 @@ class SchemaStorageService:
                 ledger_id = schema_result.resolution_metadata.get("ledger_id")
 
             self.logger.debug(f"anoncreds schema = {schema}")
-            return schema, schema_dict, ledger_id
         except AnonCredsResolutionError:
             # Registry doesn't support this identifier
             self.logger.error(f"Registry could not resolve schema: {schema_id}")
@@ -123,12 +135,19 @@ class SchemaStorageService:
             self.logger.error(f"Error fetching schema from registry: {err}")
             raise StorageNotFoundError(f"AnonCreds schema not found: {schema_id}") from err
 
+        self._cache_schema(profile, ANONCREDS_SCHEMA, schema_id, schema, schema_dict, ledger_id)
+        return schema, schema_dict, ledger_id
+
     async def _fetch_schema_from_ledger(self, profile: Profile, schema_id: str) -> Tuple[dict, dict, Optional[str]]:
         """Fetch Indy schema from ledger.
 
         Returns:
             tuple: (schema dict, schema_dict, ledger_id)
         """
+        cached = LEDGER_CACHE.get(ledger_key(profile), SCHEMA, schema_id)
+        if cached:
+            return cached["schema"], cached["schema_dict"], cached["ledger_id"]
+
         async with profile.session() as session:
             multitenant_mgr = session.inject_or(BaseMultitenantManager)
             if multitenant_mgr:
@@ -152,8 +171,23 @@ class SchemaStorageService:
         if schema is None:
             raise StorageNotFoundError(f"Schema not found on ledger: {schema_id}")
 
+        self._cache_schema(profile, SCHEMA, schema_id, schema, schema, ledger_id)
         return schema, schema, ledger_id
 
+    def _cache_schema(
+        self,
+        profile: Profile,
+        kind: str,
+        schema_id: str,
+        schema: dict,
+        schema_dict: dict,
+        ledger_id: Optional[str],
+    ):
+        """Share a resolved schema with every tenant on the ledger; published schemas never change."""
+        value = {"schema": schema, "schema_dict": schema_dict, "ledger_id": ledger_id}
+        LEDGER_CACHE.put(ledger_key(profile), kind, schema_id, value)
+        LEDGER_CACHE.schedule_flush()
+
     async def _create_storage_record(self, profile: Profile, data: dict) -> SchemaStorageRecord:
         """Create and save a schema storage record."""
         rec: SchemaStorageRecord = SchemaStorageRecord.deserialize(data)
@@ -174,6 +208,14 @@ class SchemaStorageService:
             self.logger.info(f"< add_item({schema_id}): {rec}")
             return rec
 
+        rec = await self._add_new_item(profile, data)
+
+        self.logger.info(f"< add_item({schema_id}): {rec}")
+        return rec
+
+    async def _add_new_item(self, profile: Profile, data: dict) -> SchemaStorageRecord:
+        """Fetch schema details if needed and store a record known not to exist yet."""
+        schema_id = data["schema_id"]
         # Auto-detect if anoncreds based on wallet type
         is_anoncreds = self._is_anoncreds_wallet(profile)
 
@@ -208,7 +250,6 @@ class SchemaStorageService:
             self.logger.error("Error adding schema storage record.", err)
             raise err
 
-        self.logger.info(f"< add_item({schema_id}): {rec}")
         return rec
 
     async def remove_item(self, profile: Profile, schema_id: str):
@@ -233,21 +274,60 @@ class SchemaStorageService:
         self.logger.info(f"< remove_item({schema_id}): {result}")
         return result
 
-    async def sync_created(self, profile: Profile):
+    async def sync_created(self, profile: Profile, progress: Optional[SyncProgress] = None):
         self.logger.info("> sync_created()")
 
         # find all known schema ids that i created...
-        session = await profile.session()
-        storage = session.inject(BaseStorage)
-        schema_ids = await storage.find_all_records(
-            type_filter=SCHEMA_SENT_RECORD_TYPE,
-            tag_query={},
-        )
+        async with profile.session() as session:
+            storage = session.inject(BaseStorage)
+            sent_records = await storage.find_all_records(
+                type_filter=SCHEMA_SENT_RECORD_TYPE,
+                tag_query={},
+            )
+        schema_ids = list(dict.fromkeys(rec.value for rec in sent_records))
         self.logger.debug(f"created count = {len(schema_ids)}")
 
-        # for all found... go get details from ledger and put schema into storage.
+        # one query for everything already in storage, those skip the ledger
+        stored = {rec.schema_id for rec in await self.list_items(profile)}
+        total = len(schema_ids)
+        done = 0
+        errors = []
+
+        async def report(schema_id: str, status: str, error: str = None):
+            nonlocal done
+            done += 1
+            if progress:
+                entry = {"schema_id": schema_id, "status": status, "done": done, "total": total}
+                if error:
+                    entry["error"] = error
+                await progress(entry)
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def sync_one(schema_id: str):
+            # for all missing... go get details from ledger and put schema into storage.
+            async with semaphore:
+                try:
+                    await self._add_new_item(profile, {"schema_id": schema_id})
+                except StorageDuplicateError:
+                    # stored by the event handler while we were fetching
+                    await report(schema_id, "exists")
+                    return
+                except Exception as err:
+                    self.logger.error(f"Error syncing schema {schema_id}: {err}")
+                    errors.append(err)
+                    await report(schema_id, "error", str(err))
+                    return
+            await report(schema_id, "added")
+
         for schema_id in schema_ids:
-            await self.add_item(profile, {"schema_id": schema_id.value})
+            if schema_id in stored:
+                await report(schema_id, "exists")
+        await asyncio.gather(*(sync_one(schema_id) for schema_id in schema_ids if schema_id not in stored))
+
+        if errors and not progress:
+            # nothing streamed the failures to the caller, fail like a single add would
+            raise errors[0]
 
         records = await self.list_items(profile)
 
@@ -318,6 +398,7 @@ def _normalize_schema_event_payload(event: Event) -> dict:
     return {}
 
 
+@timed_event_handler
 async def schemas_event_handler(profile: Profile, event: Event):
     LOGGER.info("> schemas_event_handler")
     LOGGER.debug(f"profile = {profile}")
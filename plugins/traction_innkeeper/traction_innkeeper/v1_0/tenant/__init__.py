@@ -1,19 +1,33 @@
 import logging
+from contextvars import ContextVar, Token
+from typing import Optional
 
 from acapy_agent.config.injection_context import InjectionContext
 from acapy_agent.core.event_bus import EventBus
 from acapy_agent.core.plugin_registry import PluginRegistry
 from acapy_agent.core.protocol_registry import ProtocolRegistry
 
+from ..innkeeper.config import get_config
 from .holder_revocation_service import subscribe, HolderRevocationService
 
 LOGGER = logging.getLogger(__name__)
 
 LOG_FORMAT_PATTERN = "%(asctime)s  TENANT: %(tenant_id)s %(levelname)s %(pathname)s:%(lineno)d %(message)s"
 
+# tenant_id of the request (or task) currently running; asyncio copies the
+# context per task so concurrent requests never see each other's value.
+TENANT_ID_CONTEXT: ContextVar[Optional[str]] = ContextVar("traction_tenant_id", default=None)
+
 base_log_record_factory = logging.getLogRecordFactory()
 
 
+def tenant_log_record_factory(*args, **kwargs):
+    """Log record factory that tags records with the current context's tenant_id."""
+    record = base_log_record_factory(*args, **kwargs)
+    record.tenant_id = TENANT_ID_CONTEXT.get()
+    return record
+
+
 class ContextFilter(logging.Filter):
     """Custom logging filter to adapt logs with contextual tenant_id."""
 
@@ -26,32 +40,39 @@ class ContextFilter(logging.Filter):
         """Filter log records and add tenant id to them."""
 
         if not hasattr(record, "tenant_id") or not record.tenant_id:
-            record.tenant_id = None
+            record.tenant_id = TENANT_ID_CONTEXT.get()
         return True
 
 
 def setup_multitenant_logging():
     """Setup method for multitenant logging"""
 
+    global base_log_record_factory
+    # install the tenant aware factory once, chaining whatever factory is current
+    current_factory = logging.getLogRecordFactory()
+    if current_factory is not tenant_log_record_factory:
+        base_log_record_factory = current_factory
+        logging.setLogRecordFactory(tenant_log_record_factory)
+
     root_logger = logging.getLogger()
     for handler in root_logger.handlers:
         handler.setFormatter(logging.Formatter(LOG_FORMAT_PATTERN))
         handler.addFilter(ContextFilter())
 
 
-def log_records_inject(tenant_id: str):
-    """Injects tenant_id into log records"""
+def log_records_inject(tenant_id: str) -> Token:
+    """Tag log records emitted in the current context with tenant_id.
+
+    Returns a token to pass to log_records_reset once the request is done.
+    """
+
+    return TENANT_ID_CONTEXT.set(tenant_id)
 
-    try:
 
-        def modded_log_record_factory(*args, **kwargs):
-            record = base_log_record_factory(*args, **kwargs)
-            record.tenant_id = tenant_id
-            return record
+def log_records_reset(token: Token):
+    """Restore the tenant_id that was current before log_records_inject."""
 
-        logging.setLogRecordFactory(modded_log_record_factory)
-    except Exception as e:  # pylint: disable=broad-except
-        LOGGER.error("There was a problem injecting tenant_id into the logs: %s", e)
+    TENANT_ID_CONTEXT.reset(token)
 
 
 async def setup(context: InjectionContext):
@@ -69,7 +90,12 @@ async def setup(context: InjectionContext):
     if not bus:
         raise ValueError("EventBus missing in context")
 
-    srv = HolderRevocationService()
+    _config = get_config(context.settings).revocation_notifications
+    srv = HolderRevocationService(
+        batch_window_ms=_config.batch_window_ms,
+        max_batch_size=_config.max_batch_size,
+        max_pending=_config.max_pending,
+    )
     context.injector.bind_instance(HolderRevocationService, srv)
 
     subscribe(bus)
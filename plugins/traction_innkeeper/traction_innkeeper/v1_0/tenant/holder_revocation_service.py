@@ -1,8 +1,11 @@
+import asyncio
 import logging
 import re
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
 from acapy_agent.core.event_bus import EventBus, Event
-from acapy_agent.core.profile import Profile
+from acapy_agent.core.profile import Profile, ProfileSession
+from acapy_agent.core.util import SHUTDOWN_EVENT_PATTERN
 from acapy_agent.messaging.models.base import BaseModelError
 from acapy_agent.protocols.issue_credential.v2_0.models.cred_ex_record import (
     V20CredExRecord,
@@ -10,15 +13,55 @@ from acapy_agent.protocols.issue_credential.v2_0.models.cred_ex_record import (
 from acapy_agent.protocols.issue_credential.v2_0.models.detail.indy import (
     V20CredExRecordIndy,
 )
-from acapy_agent.storage.error import StorageError, StorageNotFoundError
+from acapy_agent.storage.error import StorageDuplicateError, StorageError, StorageNotFoundError
+
+from ..innkeeper.metrics import timed_event_handler
+from .models import HolderCredRevIndexRecord
 
 LOGGER = logging.getLogger(__name__)
 REVOCATION_NOTIFICATION_EVENT_PATTERN = re.compile("acapy::revocation-notification::.*")
+CRED_EX_V20_INDEX_EVENT_PATTERN = re.compile(
+    f"acapy::record::{V20CredExRecord.RECORD_TOPIC}::({V20CredExRecord.STATE_DONE}|{V20CredExRecord.STATE_DELETED})$"
+)
+
+DEFAULT_BATCH_WINDOW_MS = 200
+DEFAULT_MAX_BATCH_SIZE = 100
+DEFAULT_MAX_PENDING = 1000
+
+# (rev_reg_id, cred_rev_id) of a revoked credential
+RevocationKey = Tuple[str, str]
+
+
+class RevocationBatch:
+    """Revocation notifications for one wallet collected during a batch window."""
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+        # a repeated notification only replaces the comment of the earlier one
+        self.notifications: Dict[RevocationKey, str] = {}
+        self.timer: Optional[asyncio.Task] = None
 
 
 class HolderRevocationService:
-    def __init__(self):
+    def __init__(
+        self,
+        batch_window_ms: int = DEFAULT_BATCH_WINDOW_MS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
         self._logger = logging.getLogger(__name__)
+        self._batch_window = max(batch_window_ms, 0) / 1000
+        self._max_batch_size = max(max_batch_size, 1)
+        self._max_pending = max(max_pending, 1)
+        self._batches: Dict[str, RevocationBatch] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
+        # notifications queued but not yet applied, across all wallets
+        self._pending = 0
+        self._pending_changed = asyncio.Condition()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
 
     def parse_thread_id(self, thread_id: str):
         self._logger.info(f"> parse_thread_id({thread_id})")
@@ -31,21 +74,20 @@ class HolderRevocationService:
     async def find_credential_exchange_v20(self, profile, revoc_reg_id, revocation_id) -> V20CredExRecord:
         self._logger.info(f"> find_credential_exchange_v20(revoc_reg_id={revoc_reg_id}, revocation_id={revocation_id})")
         result = None
-        tag_filter = {}
-        post_filter = {"rev_reg_id": revoc_reg_id, "cred_rev_id": revocation_id}
 
         # there should be one and only one...
         # throw errors?
         try:
             async with profile.session() as session:
-                # Query detail records to find cred_ex_id
-                detail_records = await V20CredExRecordIndy.query(
-                    session=session,
-                    tag_filter=tag_filter,
-                    post_filter_positive=post_filter,
-                )
-                if detail_records:
-                    cred_ex_id = detail_records[0].cred_ex_id
+                try:
+                    index = await HolderCredRevIndexRecord.retrieve_by_revocation_id(
+                        session, revoc_reg_id, revocation_id
+                    )
+                    cred_ex_id = index.cred_ex_id
+                except StorageNotFoundError:
+                    # credentials received before the index existed
+                    cred_ex_id = await self._scan_credential_exchange_v20(session, revoc_reg_id, revocation_id)
+                if cred_ex_id:
                     # Retrieve the main credential exchange record
                     result = await V20CredExRecord.retrieve_by_id(session, cred_ex_id)
         except (StorageError, BaseModelError) as err:
@@ -55,6 +97,56 @@ class HolderRevocationService:
         )
         return result
 
+    async def _scan_credential_exchange_v20(self, session, revoc_reg_id, revocation_id) -> str:
+        """Find the cred_ex_id by reading every indy detail record, and index it for next time."""
+        tag_filter = {}
+        post_filter = {"rev_reg_id": revoc_reg_id, "cred_rev_id": revocation_id}
+        # Query detail records to find cred_ex_id
+        detail_records = await V20CredExRecordIndy.query(
+            session=session,
+            tag_filter=tag_filter,
+            post_filter_positive=post_filter,
+        )
+        if not detail_records:
+            return None
+        cred_ex_id = detail_records[0].cred_ex_id
+        await self._save_index(session, revoc_reg_id, revocation_id, cred_ex_id)
+        return cred_ex_id
+
+    async def _save_index(self, session, rev_reg_id, cred_rev_id, cred_ex_id):
+        index = HolderCredRevIndexRecord(rev_reg_id=rev_reg_id, cred_rev_id=cred_rev_id, cred_ex_id=cred_ex_id)
+        try:
+            await index.save(session, reason="index holder credential revocation id")
+        except StorageDuplicateError:
+            # already indexed
+            pass
+
+    async def index_credential_exchange_v20(self, profile, cred_ex_id):
+        """Index a received credential by its revocation ids, if it is revocable."""
+        self._logger.info(f"> index_credential_exchange_v20({cred_ex_id})")
+        indexed = False
+        try:
+            async with profile.session() as session:
+                for detail in await V20CredExRecordIndy.query_by_cred_ex_id(session, cred_ex_id):
+                    if detail.rev_reg_id and detail.cred_rev_id:
+                        await self._save_index(session, detail.rev_reg_id, detail.cred_rev_id, cred_ex_id)
+                        indexed = True
+        except (StorageError, BaseModelError) as err:
+            self._logger.warning("error indexing credential exchange (v2.0)", err)
+        self._logger.info(f"< index_credential_exchange_v20({cred_ex_id}): {indexed}")
+        return indexed
+
+    async def remove_credential_exchange_index_v20(self, profile, cred_ex_id):
+        """Drop the index records of a deleted credential exchange."""
+        self._logger.info(f"> remove_credential_exchange_index_v20({cred_ex_id})")
+        try:
+            async with profile.session() as session:
+                for index in await HolderCredRevIndexRecord.query_by_cred_ex_id(session, cred_ex_id):
+                    await index.delete_record(session)
+        except (StorageError, BaseModelError) as err:
+            self._logger.warning("error removing credential exchange index (v2.0)", err)
+        self._logger.info(f"< remove_credential_exchange_index_v20({cred_ex_id})")
+
     async def set_credential_exchange_revoked_v20(self, profile, cred_ex_id, comment) -> V20CredExRecord:
         self._logger.info(f"> set_credential_exchange_revoked_v20({cred_ex_id})")
         result = None
@@ -72,21 +164,160 @@ class HolderRevocationService:
         self._logger.info(f"< set_credential_exchange_revoked_v20({cred_ex_id}): revoked = {revoked}")
         return result
 
+    async def find_credential_exchange_ids_v20(
+        self, session: ProfileSession, keys: Iterable[RevocationKey]
+    ) -> Dict[RevocationKey, str]:
+        """Map each (rev_reg_id, cred_rev_id) in keys to its cred_ex_id, skipping unknown credentials."""
+        found = {}
+        missing = []
+        for key in keys:
+            try:
+                index = await HolderCredRevIndexRecord.retrieve_by_revocation_id(session, *key)
+                found[key] = index.cred_ex_id
+            except StorageNotFoundError:
+                missing.append(key)
+
+        if missing:
+            # credentials received before the index existed, one scan covers all of them
+            post_filter = {
+                "rev_reg_id": list({rev_reg_id for rev_reg_id, _ in missing}),
+                "cred_rev_id": list({cred_rev_id for _, cred_rev_id in missing}),
+            }
+            detail_records = await V20CredExRecordIndy.query(
+                session=session,
+                tag_filter={},
+                post_filter_positive=post_filter,
+                alt=True,
+            )
+            wanted = set(missing)
+            for detail in detail_records:
+                key = (detail.rev_reg_id, detail.cred_rev_id)
+                if key in wanted and key not in found:
+                    found[key] = detail.cred_ex_id
+                    await self._save_index(session, *key, detail.cred_ex_id)
+        return found
+
+    async def revoke_credential_exchanges_v20(
+        self, profile: Profile, notifications: Mapping[RevocationKey, str]
+    ) -> List[V20CredExRecord]:
+        """Mark the credential exchanges of all notified credentials revoked in one transaction.
+
+        notifications maps (rev_reg_id, cred_rev_id) to the issuer's comment.
+        """
+        self._logger.info(f"> revoke_credential_exchanges_v20({len(notifications)})")
+        async with profile.session() as session:
+            cred_ex_ids = await self.find_credential_exchange_ids_v20(session, notifications.keys())
+
+        results = []
+        if cred_ex_ids:
+            async with profile.transaction() as txn:
+                for key, cred_ex_id in cred_ex_ids.items():
+                    try:
+                        result = await V20CredExRecord.retrieve_by_id(txn, cred_ex_id, for_update=True)
+                    except StorageNotFoundError as err:
+                        self._logger.warning("error finding credential exchange (v2.0)", err)
+                        continue
+                    result.state = V20CredExRecord.STATE_CREDENTIAL_REVOKED
+                    result.error_msg = notifications[key]
+                    await result.save(txn, reason="revoke credential")
+                    results.append(result)
+                await txn.commit()
+        self._logger.info(f"< revoke_credential_exchanges_v20({len(notifications)}): revoked = {len(results)}")
+        return results
+
+    def _wallet_key(self, profile: Profile) -> str:
+        return profile.settings.get("wallet.id") or profile.name
+
+    async def queue_revocation(self, profile: Profile, revoc_reg_id: str, revocation_id: str, comment: str):
+        """Queue a revocation notification to be applied with others for the same wallet.
+
+        A batch is applied once the batch window passes or it reaches
+        max_batch_size. While max_pending notifications are queued the caller
+        waits, so a flood of notifications cannot grow the queue without bound.
+        """
+        async with self._pending_changed:
+            await self._pending_changed.wait_for(lambda: self._pending < self._max_pending)
+            wallet_key = self._wallet_key(profile)
+            batch = self._batches.get(wallet_key)
+            if batch is None:
+                batch = self._batches[wallet_key] = RevocationBatch(profile)
+                batch.timer = self._start_flush_task(self._flush_after_window(wallet_key, batch))
+            key = (revoc_reg_id, revocation_id)
+            if key not in batch.notifications:
+                self._pending += 1
+            batch.notifications[key] = comment
+            full = len(batch.notifications) >= self._max_batch_size
+            if full:
+                del self._batches[wallet_key]
+                batch.timer.cancel()
+        if full:
+            await self._flush(batch)
+
+    def _start_flush_task(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+        return task
+
+    async def _flush_after_window(self, wallet_key: str, batch: RevocationBatch):
+        await asyncio.sleep(self._batch_window)
+        if self._batches.get(wallet_key) is batch:
+            del self._batches[wallet_key]
+            await self._flush(batch)
+
+    async def _flush(self, batch: RevocationBatch):
+        count = len(batch.notifications)
+        try:
+            await self.revoke_credential_exchanges_v20(batch.profile, batch.notifications)
+        except Exception as err:
+            self._logger.error(f"error applying {count} revocation notification(s)", exc_info=err)
+        finally:
+            async with self._pending_changed:
+                self._pending -= count
+                self._pending_changed.notify_all()
+
+    async def flush_all(self):
+        """Apply every queued batch now instead of waiting for its window."""
+        batches = list(self._batches.values())
+        self._batches.clear()
+        for batch in batches:
+            batch.timer.cancel()
+        await asyncio.gather(*(self._flush(batch) for batch in batches))
+
 
 def subscribe(bus: EventBus):
     bus.subscribe(REVOCATION_NOTIFICATION_EVENT_PATTERN, revocation_notification_handler)
+    bus.subscribe(CRED_EX_V20_INDEX_EVENT_PATTERN, credential_exchange_index_handler)
+    bus.subscribe(SHUTDOWN_EVENT_PATTERN, on_shutdown)
+
+
+async def on_shutdown(profile: Profile, event: Event):
+    """Apply queued revocation notifications before the agent goes away."""
+    srv = profile.inject_or(HolderRevocationService)
+    if srv:
+        await srv.flush_all()
+
+
+async def credential_exchange_index_handler(profile: Profile, event: Event):
+    """Keep the holder revocation index in step with received credentials."""
+    payload = event.payload
+    if payload.get("role") != V20CredExRecord.ROLE_HOLDER:
+        return
+    srv = profile.inject(HolderRevocationService)
+    if payload.get("state") == V20CredExRecord.STATE_DELETED:
+        await srv.remove_credential_exchange_index_v20(profile, payload["cred_ex_id"])
+    else:
+        await srv.index_credential_exchange_v20(profile, payload["cred_ex_id"])
 
 
+@timed_event_handler
 async def revocation_notification_handler(profile: Profile, event: Event):
     LOGGER.info("> revocation_notification_handler")
     thread_id = event.payload["thread_id"]
     comment = event.payload["comment"]
     srv = profile.inject(HolderRevocationService)
     revoc_reg_id, revocation_id = srv.parse_thread_id(thread_id)
-    # find it...
-    record = await srv.find_credential_exchange_v20(profile, revoc_reg_id, revocation_id)
-    if record:
-        # mark as revoked...
-        await srv.set_credential_exchange_revoked_v20(profile, record.cred_ex_id, comment)
+    # find and mark as revoked together with other notifications for this wallet
+    await srv.queue_revocation(profile, revoc_reg_id, revocation_id, comment)
 
     LOGGER.info("< revocation_notification_handler")
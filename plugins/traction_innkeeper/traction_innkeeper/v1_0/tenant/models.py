@@ -0,0 +1,103 @@
+from typing import Optional
+
+from acapy_agent.core.profile import ProfileSession
+from acapy_agent.messaging.models.base_record import BaseRecord, BaseRecordSchema
+from marshmallow import EXCLUDE, fields
+
+
+class HolderCredRevIndexRecord(BaseRecord):
+    """Traction holder index of (rev_reg_id, cred_rev_id) to credential exchange.
+
+    The record id is derived from the revocation ids, so a revocation
+    notification resolves its credential exchange with a single lookup.
+    """
+
+    class Meta:
+        """HolderCredRevIndexRecord Meta."""
+
+        schema_class = "HolderCredRevIndexRecordSchema"
+
+    RECORD_TYPE = "holder_cred_rev_index"
+    RECORD_ID_NAME = "index_id"
+    TAG_NAMES = {"cred_ex_id"}
+
+    def __init__(
+        self,
+        *,
+        index_id: str = None,
+        rev_reg_id: str = None,
+        cred_rev_id: str = None,
+        cred_ex_id: str = None,
+        **kwargs,
+    ):
+        """Construct record."""
+        if index_id is None and rev_reg_id and cred_rev_id:
+            index_id = self.make_index_id(rev_reg_id, cred_rev_id)
+        super().__init__(index_id, new_with_id=index_id is not None, **kwargs)
+        self.rev_reg_id = rev_reg_id
+        self.cred_rev_id = cred_rev_id
+        self.cred_ex_id = cred_ex_id
+
+    @staticmethod
+    def make_index_id(rev_reg_id: str, cred_rev_id: str) -> str:
+        """Return the record id for a revocation registry and credential revocation id."""
+        return f"{rev_reg_id}::{cred_rev_id}"
+
+    @property
+    def index_id(self) -> Optional[str]:
+        """Return record id."""
+        return self._id
+
+    @property
+    def record_value(self) -> dict:
+        """Return record value."""
+        return {
+            prop: getattr(self, prop)
+            for prop in (
+                "rev_reg_id",
+                "cred_rev_id",
+                "cred_ex_id",
+            )
+        }
+
+    @classmethod
+    async def retrieve_by_revocation_id(
+        cls, session: ProfileSession, rev_reg_id: str, cred_rev_id: str
+    ) -> "HolderCredRevIndexRecord":
+        """Retrieve the index record for a revoked credential."""
+        return await cls.retrieve_by_id(session, cls.make_index_id(rev_reg_id, cred_rev_id))
+
+    @classmethod
+    async def query_by_cred_ex_id(cls, session: ProfileSession, cred_ex_id: str) -> list:
+        """Retrieve the index records pointing at a credential exchange."""
+        return await cls.query(session, {"cred_ex_id": cred_ex_id})
+
+
+class HolderCredRevIndexRecordSchema(BaseRecordSchema):
+    """Traction holder credential revocation index record schema."""
+
+    class Meta:
+        """HolderCredRevIndexRecordSchema Meta."""
+
+        model_class = "HolderCredRevIndexRecord"
+        unknown = EXCLUDE
+
+    index_id = fields.Str(
+        required=True,
+        metadata={"description": "Revocation registry id and credential revocation id"},
+    )
+
+    rev_reg_id = fields.Str(
+        required=True,
+        metadata={"description": "Revocation registry identifier"},
+    )
+
+    cred_rev_id = fields.Str(
+        required=True,
+        metadata={"description": "Credential revocation identifier"},
+    )
+
+    cred_ex_id = fields.Str(
+        required=True,
+        metadata={"description": "Credential exchange identifier"},
+    )
@@ -17,7 +17,6 @@ from acapy_agent.multitenant.admin.routes import (
 )
 from acapy_agent.multitenant.base import BaseMultitenantManager
 from acapy_agent.storage.error import StorageNotFoundError
-from acapy_agent.version import __version__
 from acapy_agent.wallet.models.wallet_record import (
     WalletRecordSchema,
     WalletRecord,
@@ -25,23 +24,34 @@ from acapy_agent.wallet.models.wallet_record import (
 from acapy_agent.admin.decorators.auth import tenant_authentication
 from marshmallow import fields, validate
 
+from ..endorser.endorser_connection_service import ENDORSER_CONNECTION_CACHE
 from ..innkeeper.routes import (
     error_handler,
+    JobIdMatchInfoSchema,
     TenantAuthenticationApiIdMatchInfoSchema,
     TenantAuthenticationApiListSchema,
     TenantAuthenticationApiRecordSchema,
     TenantAuthenticationsApiResponseSchema,
     TenantAuthenticationApiOperationResponseSchema,
 )
+from ..innkeeper.etag import json_response_with_etag, record_etag
+from ..innkeeper.jobs import JOBS
+from ..innkeeper.server_config import TENANT_SERVER_CONFIG
+from ..innkeeper.tenant_context import (
+    REQUEST_KEY as TENANT_CONTEXT_KEY,
+    TenantRequestContext,
+    tenant_request_context,
+)
 from ..innkeeper.tenant_manager import TenantManager
 from ..innkeeper.models import (
+    JobRecordSchema,
     TenantAuthenticationApiRecord,
     TenantRecord,
     TenantRecordSchema,
 )
 from ..innkeeper.utils import create_api_key, TenantConfigSchema, TenantApiKeyException
 
-from ..tenant import log_records_inject
+from ..tenant import log_records_inject, log_records_reset
 
 LOGGER = logging.getLogger(__name__)
 
@@ -92,6 +102,9 @@ class TenantLedgerIdConfigSchema(OpenAPISchema):
 async def setup_tenant_context(request: web.Request, handler):
     """Middle ware to extract tenant_id and provide it to log formatter
 
+    The tenant_id is held in a contextvar for the duration of the request so
+    log records are tagged with the right tenant under concurrent requests.
+
     In addition this will also ensure tenants are not suspended before
     accessing endpoints.
 
@@ -99,27 +112,27 @@ async def setup_tenant_context(request: web.Request, handler):
     last. At this point the wallet_id has been extracted from a previous
     middleware function and is used to query the tenant record.
 
-    Note: this function is very similar to tenant_self. Can we combine this logic?
+    The record is kept on the request (see tenant_request_context) for the
+    handlers to reuse.
     """
-    context: AdminRequestContext = request["context"]
-    wallet_id, tenant_id = context.profile.settings.get("wallet.id"), None
-
-    if wallet_id:
-        mgr = context.inject(TenantManager)
-        profile = mgr.profile
-
-        async with profile.session() as session:
-            # Tenant records must always be fetched by their wallet id.
-            rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-            LOGGER.debug(rec)
-            tenant_id = rec.tenant_id
-            # Ensure tokens are not associated with suspended tenants
-            if TenantRecord.STATE_DELETED == rec.state:
-                raise web.HTTPUnauthorized(reason="Tenant Is Suspended")
-
-    log_records_inject(tenant_id)
+    # handlers share the tenant record through the request
+    tenant_ctx = request[TENANT_CONTEXT_KEY] = TenantRequestContext(request["context"])
+    tenant_id = None
+    if tenant_ctx.wallet_id:
+        # TenantRecord saves/deletes invalidate the cache, so a suspension is
+        # seen on the next request without a storage round-trip on every call.
+        rec = await tenant_ctx.tenant()
+        LOGGER.debug(rec)
+        tenant_id = rec.tenant_id
+        # Ensure tokens are not associated with suspended tenants
+        if TenantRecord.STATE_DELETED == rec.state:
+            raise web.HTTPUnauthorized(reason="Tenant Is Suspended")
 
-    return await handler(request)
+    token = log_records_inject(tenant_id)
+    try:
+        return await handler(request)
+    finally:
+        log_records_reset(token)
 
 
 @docs(
@@ -129,20 +142,10 @@ async def setup_tenant_context(request: web.Request, handler):
 @error_handler
 @tenant_authentication
 async def tenant_self(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    # we need the caller's wallet id
-    wallet_id = context.profile.settings.get("wallet.id")
+    rec = await tenant_request_context(request).tenant()
+    LOGGER.debug(rec)
 
-    # records are under base/root profile, use Tenant Manager profile
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-
-    async with profile.session() as session:
-        # Tenants must always be fetch by their wallet id.
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-        LOGGER.debug(rec)
-
-    return web.json_response(rec.serialize())
+    return json_response_with_etag(request, record_etag(rec), rec.serialize)
 
 
 @docs(tags=[SWAGGER_CATEGORY], summary="Get a tenant subwallet")
@@ -162,9 +165,12 @@ async def tenant_wallet_get(request: web.BaseRequest):
     # duplicate code.
     async with profile.session() as session:
         wallet_record = await WalletRecord.retrieve_by_id(session, wallet_id)
-    result = format_wallet_record(wallet_record)
 
-    return web.json_response(result)
+    return json_response_with_etag(
+        request,
+        record_etag(wallet_record),
+        lambda: format_wallet_record(wallet_record),
+    )
 
 
 @docs(tags=[SWAGGER_CATEGORY], summary="Get tenant setting")
@@ -172,25 +178,17 @@ async def tenant_wallet_get(request: web.BaseRequest):
 @error_handler
 @tenant_authentication
 async def tenant_config_get(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-    async with profile.session() as session:
-        tenant_record = await TenantRecord.query_by_wallet_id(session, wallet_id)
-    endorser_config = tenant_record.connected_to_endorsers
-    public_did_config = tenant_record.created_public_did
-    tenant_issuer_flag = tenant_record.auto_issuer
-    enable_ledger_switch = tenant_record.enable_ledger_switch
-    curr_ledger_id = tenant_record.curr_ledger_id
-    return web.json_response(
-        {
-            "connect_to_endorser": endorser_config,
-            "create_public_did": public_did_config,
-            "auto_issuer": tenant_issuer_flag,
-            "enable_ledger_switch": enable_ledger_switch,
-            "curr_ledger_id": curr_ledger_id,
-        }
+    tenant_record = await tenant_request_context(request).tenant()
+    return json_response_with_etag(
+        request,
+        record_etag(tenant_record),
+        lambda: {
+            "connect_to_endorser": tenant_record.connected_to_endorsers,
+            "create_public_did": tenant_record.created_public_did,
+            "auto_issuer": tenant_record.auto_issuer,
+            "enable_ledger_switch": tenant_record.enable_ledger_switch,
+            "curr_ledger_id": tenant_record.curr_ledger_id,
+        },
     )
 
 
@@ -200,17 +198,17 @@ async def tenant_config_get(request: web.BaseRequest):
 @error_handler
 @tenant_authentication
 async def tenant_config_ledger_id_set(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
     body = await request.json()
     curr_ledger_id = body.get("ledger_id")
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-    async with profile.session() as session:
-        tenant_record = await TenantRecord.query_by_wallet_id(session, wallet_id)
+    tenant_ctx = tenant_request_context(request)
+    async with tenant_ctx.session() as session:
+        tenant_record = await tenant_ctx.tenant(session, for_update=True)
         if curr_ledger_id:
             tenant_record.curr_ledger_id = curr_ledger_id
         await tenant_record.save(session)
+    if curr_ledger_id:
+        # the endorser connection of the old ledger no longer applies
+        ENDORSER_CONNECTION_CACHE.invalidate(tenant_ctx.wallet_id)
     return web.json_response(
         {
             "ledger_id": curr_ledger_id,
@@ -282,20 +280,14 @@ async def tenant_wallet_update(request: web.BaseRequest):
 @error_handler
 @tenant_authentication
 async def tenant_email_update(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    # we need the caller's wallet id
-    wallet_id = context.profile.settings.get("wallet.id")
-
     # this is from multitenant / admin / routes.py -> wallet_update
     # (mostly) duplicate code.
     body: dict = await request.json()
     contact_email = body["contact_email"]
 
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-
-    async with profile.session() as session:
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
+    tenant_ctx = tenant_request_context(request)
+    async with tenant_ctx.session() as session:
+        rec = await tenant_ctx.tenant(session, for_update=True)
         rec.contact_email = contact_email
         await rec.save(session, reason="updated email")
 
@@ -309,17 +301,14 @@ async def tenant_email_update(request: web.BaseRequest):
 @tenant_authentication
 async def tenant_api_key(request: web.BaseRequest):
     context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
 
     # keys are under base/root profile, use Tenant Manager profile
     mgr = context.inject(TenantManager)
-    profile = mgr.profile
 
-    async with profile.session() as session:
-        # use the id from the Tenant record and fetch associated api keys
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-        LOGGER.debug(rec)
-        tenant_id = rec.tenant_id
+    # use the id from the Tenant record and fetch associated api keys
+    rec = await tenant_request_context(request).tenant()
+    LOGGER.debug(rec)
+    tenant_id = rec.tenant_id
 
     try:
         body = await request.json()
@@ -343,26 +332,19 @@ async def tenant_api_key(request: web.BaseRequest):
 @error_handler
 @tenant_authentication
 async def tenant_api_key_get(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
     tenant_authentication_api_id = request.match_info["tenant_authentication_api_id"]
 
-    # records are under base/root profile, use Tenant Manager profile
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-
-    async with profile.session() as session:
-        # use the id from the Tenant record and fetch associated api key
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-        LOGGER.debug(rec)
-        tenant_id = rec.tenant_id
+    # use the id from the Tenant record and fetch associated api key
+    tenant_ctx = tenant_request_context(request)
+    tenant_id = (await tenant_ctx.tenant()).tenant_id
 
+    async with tenant_ctx.session() as session:
         rec = await TenantAuthenticationApiRecord.retrieve_by_auth_api_id(session, tenant_authentication_api_id)
-        LOGGER.debug(rec)
+    LOGGER.debug(rec)
 
-        # if rec tenant_id does not match the tenant_id from the wallet, raise 404
-        if rec.tenant_id != tenant_id:
-            raise web.HTTPNotFound(reason="No such record")
+    # if rec tenant_id does not match the tenant_id from the wallet, raise 404
+    if rec.tenant_id != tenant_id:
+        raise web.HTTPNotFound(reason="No such record")
 
     return web.json_response(rec.serialize())
 
@@ -372,19 +354,11 @@ async def tenant_api_key_get(request: web.BaseRequest):
 @error_handler
 @tenant_authentication
 async def tenant_api_key_list(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
-
-    # records are under base/root profile, use Tenant Manager profile
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-
-    async with profile.session() as session:
-        # use the id from the Tenant record and fetch associated api keys
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-        LOGGER.debug(rec)
-        tenant_id = rec.tenant_id
+    # use the id from the Tenant record and fetch associated api keys
+    tenant_ctx = tenant_request_context(request)
+    tenant_id = (await tenant_ctx.tenant()).tenant_id
 
+    async with tenant_ctx.session() as session:
         records = await TenantAuthenticationApiRecord.query_by_tenant_id(session, tenant_id)
     results = [record.serialize() for record in records]
 
@@ -397,21 +371,14 @@ async def tenant_api_key_list(request: web.BaseRequest):
 @error_handler
 @tenant_authentication
 async def tenant_api_key_delete(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
     tenant_authentication_api_id = request.match_info["tenant_authentication_api_id"]
 
-    # records are under base/root profile, use Tenant Manager profile
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
+    # use the id from the Tenant record and fetch associated api key
+    tenant_ctx = tenant_request_context(request)
+    tenant_id = (await tenant_ctx.tenant()).tenant_id
 
     result = False
-    async with profile.session() as session:
-        # use the id from the Tenant record and fetch associated api key
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-        LOGGER.debug(rec)
-        tenant_id = rec.tenant_id
-
+    async with tenant_ctx.session() as session:
         rec = await TenantAuthenticationApiRecord.retrieve_by_auth_api_id(session, tenant_authentication_api_id)
         LOGGER.debug(rec)
 
@@ -441,41 +408,34 @@ async def tenant_server_config_handler(request: web.BaseRequest):
     mgr = context.inject(TenantManager)
     profile = mgr.profile
 
-    config = {
-        k: (profile.context.settings[k])
-        for k in profile.context.settings
-        if k
-        not in [
-            "default_label",
-            "admin.admin_api_key",
-            "admin.admin_insecure_mode",
-            "admin.enabled",
-            "admin.host",
-            "admin.port",
-            "admin.webhook_urls",
-            "admin.admin_client_max_request_size",
-            "multitenant.jwt_secret",
-            "wallet.key",
-            "wallet.name",
-            "multitenant.wallet_name",
-            "wallet.storage_type",
-            "wallet.storage_config",
-            "wallet.rekey",
-            "wallet.seed",
-            "wallet.storage_creds",
-        ]
-    }
-    try:
-        del config["plugin_config"]["traction_innkeeper"]["innkeeper_wallet"]
-        config["config"]["ledger.ledger_config_list"] = [
-            {k: v for k, v in d.items() if k != "genesis_transactions"}
-            for d in config["config"]["ledger.ledger_config_list"]
-        ]
-    except KeyError as e:
-        LOGGER.warn(f"The key to be removed: '{e.args[0]}' is missing from the dictionary.")
-    config["version"] = __version__
+    return TENANT_SERVER_CONFIG.response(request, profile.context.settings)
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Get the progress of a job")
+@match_info_schema(JobIdMatchInfoSchema())
+@response_schema(JobRecordSchema(), 200, description="")
+@error_handler
+@tenant_authentication
+async def tenant_job_get(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+    wallet_id = context.profile.settings.get("wallet.id")
 
-    return web.json_response({"config": config})
+    # a tenant only sees the jobs it started
+    job = await JOBS.get(request.match_info["job_id"], wallet_id)
+    return web.json_response(job.serialize())
+
+
+@docs(tags=[SWAGGER_CATEGORY], summary="Cancel a job")
+@match_info_schema(JobIdMatchInfoSchema())
+@response_schema(JobRecordSchema(), 200, description="")
+@error_handler
+@tenant_authentication
+async def tenant_job_cancel(request: web.BaseRequest):
+    context: AdminRequestContext = request["context"]
+    wallet_id = context.profile.settings.get("wallet.id")
+
+    job = await JOBS.cancel(request.match_info["job_id"], wallet_id)
+    return web.json_response(job.serialize())
 
 
 @docs(
@@ -484,19 +444,14 @@ async def tenant_server_config_handler(request: web.BaseRequest):
 @response_schema(TenantRecordSchema(), 200, description="")
 @error_handler
 async def tenant_delete_soft(request: web.BaseRequest):
-    context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
-
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-    async with profile.session() as session:
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-        if rec:
-            await rec.soft_delete(session)
-            LOGGER.info("Tenant %s soft deleted.", rec.tenant_id)
-            return web.json_response({"success": f"Tenant {rec.tenant_id} soft deleted."})
-        else:
+    tenant_ctx = tenant_request_context(request)
+    async with tenant_ctx.session() as session:
+        rec = await tenant_ctx.tenant(session, for_update=True)
+        if not rec:
             raise web.HTTPNotFound(reason="Tenant not found.")
+        await rec.soft_delete(session)
+    LOGGER.info("Tenant %s soft deleted.", rec.tenant_id)
+    return web.json_response({"success": f"Tenant {rec.tenant_id} soft deleted."})
 
 
 @docs(
@@ -506,21 +461,20 @@ async def tenant_delete_soft(request: web.BaseRequest):
 @error_handler
 async def tenant_delete(request: web.BaseRequest):
     context: AdminRequestContext = request["context"]
-    wallet_id = context.profile.settings.get("wallet.id")
+    tenant_ctx = tenant_request_context(request)
 
-    mgr = context.inject(TenantManager)
-    profile = mgr.profile
-    async with profile.session() as session:
-        rec = await TenantRecord.query_by_wallet_id(session, wallet_id)
-        if rec:
-            multitenant_mgr = context.profile.inject(BaseMultitenantManager)
+    rec = await tenant_ctx.tenant(for_update=True)
+    if rec:
+        multitenant_mgr = context.profile.inject(BaseMultitenantManager)
 
-            await multitenant_mgr.remove_wallet(rec.wallet_id)
+        # no session is held while the wallet is removed
+        await multitenant_mgr.remove_wallet(rec.wallet_id)
+        async with tenant_ctx.session() as session:
             await rec.delete_record(session)
-            LOGGER.info("Tenant %s rd deleted.", rec.tenant_id)
-            return web.json_response(rec.serialize())
-        else:
-            raise web.HTTPNotFound(reason=f"Tenant with wallet id {wallet_id} not found.")
+        LOGGER.info("Tenant %s rd deleted.", rec.tenant_id)
+        return web.json_response(rec.serialize())
+    else:
+        raise web.HTTPNotFound(reason=f"Tenant with wallet id {tenant_ctx.wallet_id} not found.")
 
 
 async def register(app: web.Application):
@@ -555,6 +509,8 @@ async def register(app: web.Application):
                 tenant_server_config_handler,
                 allow_head=False,
             ),
+            web.get("/tenant/jobs/{job_id}", tenant_job_get, allow_head=False),
+            web.post("/tenant/jobs/{job_id}/cancel", tenant_job_cancel),
             web.delete("/tenant/hard", tenant_delete),
             web.delete("/tenant/soft", tenant_delete_soft),
         ]
@@ -129,6 +129,7 @@ def mock_creddef_storage_service(mock_profile: MagicMock):
     service.list_items = AsyncMock()
     service.read_item = AsyncMock()
     service.remove_item = AsyncMock()
+    service.sync_created = AsyncMock()
 
     # Configure injection
     mock_profile._injectables[CredDefStorageService] = service
@@ -149,9 +150,9 @@ async def test_creddef_storage_list(
     profile = mock_context.profile
 
     # Mock service response
-    mock_rec_1 = MagicMock(spec=CredDefStorageRecord)
+    mock_rec_1 = MagicMock(spec=CredDefStorageRecord, _id="1", updated_at="2024-01-01T00:00:00.000000Z")
     mock_rec_1.serialize.return_value = {"cred_def_id": "cred-def-1"}
-    mock_rec_2 = MagicMock(spec=CredDefStorageRecord)
+    mock_rec_2 = MagicMock(spec=CredDefStorageRecord, _id="2", updated_at="2024-01-01T00:00:00.000000Z")
     mock_rec_2.serialize.return_value = {"cred_def_id": "cred-def-2"}
     mock_creddef_storage_service.list_items.return_value = [mock_rec_1, mock_rec_2]
 
@@ -221,7 +222,7 @@ async def test_creddef_storage_get(
     mock_request._set_match_info("cred_def_id", TEST_CRED_DEF_ID)
 
     # Mock service response
-    mock_rec = MagicMock(spec=CredDefStorageRecord)
+    mock_rec = MagicMock(spec=CredDefStorageRecord, _id="1", updated_at="2024-01-01T00:00:00.000000Z")
     mock_rec.serialize.return_value = {
         "cred_def_id": TEST_CRED_DEF_ID,
         "issuer_did": TEST_ISSUER_DID,
@@ -351,6 +352,27 @@ async def test_creddef_storage_remove_storage_error(
     assert "Cannot delete" in str(excinfo.value)
 
 
+# Test Sync Created Cred Defs (POST /credential-definition-storage/sync-created)
+@pytest.mark.asyncio
+async def test_creddef_storage_sync_created(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_creddef_storage_service: AsyncMock,
+):
+    """Test POST /credential-definition-storage/sync-created endpoint."""
+    profile = mock_context.profile
+    mock_rec = MagicMock(spec=CredDefStorageRecord, _id="1", updated_at="2024-01-01T00:00:00.000000Z")
+    mock_rec.serialize.return_value = {"cred_def_id": TEST_CRED_DEF_ID}
+    mock_creddef_storage_service.sync_created.return_value = [mock_rec]
+
+    response = await test_module.creddef_storage_sync_created(mock_request)
+
+    mock_context.inject_or.assert_called_once_with(CredDefStorageService)
+    mock_creddef_storage_service.sync_created.assert_awaited_once_with(profile)
+    assert response.status == 200
+    assert json.loads(response.body) == {"results": [{"cred_def_id": TEST_CRED_DEF_ID}]}
+
+
 # --- Optional: Test register and post_process_routes ---
 # These are usually simple and less critical to unit test,
 # but can be added for completeness if desired.
@@ -367,7 +389,7 @@ async def test_register():
     # Check that add_routes was called once with a list containing the expected routes
     assert len(calls) == 1
     registered_routes = calls[0][0][0]  # Get the list of web.RouteDef objects
-    assert len(registered_routes) == 4
+    assert len(registered_routes) == 5
     # Check paths and methods (can be more specific if needed)
     assert any(r.method == "GET" and r.path == "/credential-definition-storage" for r in registered_routes)
     assert any(r.method == "POST" and r.path == "/credential-definition-storage" for r in registered_routes)
@@ -377,6 +399,9 @@ async def test_register():
     assert any(
         r.method == "DELETE" and r.path == "/credential-definition-storage/{cred_def_id}" for r in registered_routes
     )
+    assert any(
+        r.method == "POST" and r.path == "/credential-definition-storage/sync-created" for r in registered_routes
+    )
 
 
 def test_post_process_routes():
@@ -1,12 +1,14 @@
+import json
 import logging
 from unittest.mock import MagicMock, AsyncMock, patch, call, ANY
 
 import pytest
 from acapy_agent.core.profile import Profile
-from acapy_agent.storage.error import StorageNotFoundError
+from acapy_agent.storage.error import StorageDuplicateError, StorageError, StorageNotFoundError
 from acapy_agent.core.event_bus import Event
 
 # Assuming models and service are importable like this
+from traction_innkeeper.v1_0.innkeeper.ledger_cache import LEDGER_CACHE
 from traction_innkeeper.v1_0.creddef_storage.models import CredDefStorageRecord
 from traction_innkeeper.v1_0.creddef_storage.creddef_storage_service import (
     CredDefStorageService,
@@ -34,6 +36,13 @@ TEST_CONTEXT = {
 
 
 # --- Fixtures ---
+@pytest.fixture(autouse=True)
+def clear_ledger_cache():
+    LEDGER_CACHE.clear()
+    yield
+    LEDGER_CACHE.clear()
+
+
 @pytest.fixture
 def mock_profile():
     """Provides a mocked Profile with a working async session manager."""
@@ -399,6 +408,231 @@ async def test_remove_item_delete_error(
     mock_creddef_storage_record.delete_record.assert_awaited_once_with(session)
 
 
+@pytest.mark.asyncio
+async def test_fetch_tag_is_cached(
+    creddef_storage_service: CredDefStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """A tag resolved from the registry is served from the shared cache afterwards."""
+    profile, _ = mock_profile
+    registry = MagicMock()
+    registry.get_credential_definition = AsyncMock(
+        return_value=MagicMock(credential_definition=MagicMock(tag="remote"))
+    )
+    profile.inject.return_value = registry
+
+    assert await creddef_storage_service._fetch_tag(profile, TEST_CRED_DEF_ID) == "remote"
+    assert await creddef_storage_service._fetch_tag(profile, TEST_CRED_DEF_ID) == "remote"
+
+    registry.get_credential_definition.assert_awaited_once_with(profile, TEST_CRED_DEF_ID)
+
+
+# --- Test Cases for sync_created ---
+
+
+def _sync_profile(mock_profile, wallet_type="askar"):
+    profile, session = mock_profile
+    profile.settings = {"wallet.type": wallet_type}
+    txn = AsyncMock(name="MockTransaction")
+    txn.__aenter__.return_value = txn
+    txn.__aexit__.return_value = None
+    profile.transaction = MagicMock(return_value=txn)
+    return profile, session, txn
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.creddef_storage.creddef_storage_service.IssuerRevRegRecord.query",
+    new_callable=AsyncMock,
+)
+@patch(
+    "traction_innkeeper.v1_0.creddef_storage.models.CredDefStorageRecord.save",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_indy(
+    mock_save: AsyncMock,
+    mock_rev_reg_query: AsyncMock,
+    creddef_storage_service: CredDefStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+    mock_creddef_storage_record: AsyncMock,
+):
+    """Missing Indy cred defs are saved in one transaction with their tag taken from the id."""
+    profile, session, txn = _sync_profile(mock_profile)
+    new_id = f"{TEST_ISSUER_DID}:3:CL:1234:revocable"
+    storage = MagicMock()
+    storage.find_all_records = AsyncMock(
+        return_value=[
+            MagicMock(value=TEST_CRED_DEF_ID, tags={"schema_id": TEST_SCHEMA_ID}),
+            MagicMock(value=new_id, tags={"schema_id": TEST_SCHEMA_ID}),
+        ]
+    )
+    session.inject = MagicMock(return_value=storage)
+    mock_rev_reg_query.return_value = [MagicMock(cred_def_id=new_id, max_cred_num=100)]
+    creddef_storage_service.list_items = AsyncMock(return_value=[mock_creddef_storage_record])
+    creddef_storage_service._fetch_tag = AsyncMock()
+    progress = AsyncMock()
+
+    result = await creddef_storage_service.sync_created(profile, progress)
+
+    assert result == [mock_creddef_storage_record]
+    creddef_storage_service._fetch_tag.assert_not_awaited()
+    mock_save.assert_awaited_once_with(txn, reason=ANY)
+    txn.commit.assert_awaited_once()
+    assert [(c.args[0]["status"], c.args[0]["done"]) for c in progress.await_args_list] == [
+        ("exists", 1),
+        ("resolved", 2),
+        ("added", 2),
+    ]
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.creddef_storage.models.CredDefStorageRecord.save",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_anoncreds_fetches_missing_tags_only(
+    mock_save: AsyncMock,
+    creddef_storage_service: CredDefStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """AnonCreds tags come from the local store; the registry is only asked when absent."""
+    profile, session, txn = _sync_profile(mock_profile, "askar-anoncreds")
+    session.handle = MagicMock()
+    session.handle.fetch_all = AsyncMock(
+        return_value=[
+            MagicMock(
+                value=json.dumps({"tag": "local"}),
+                tags={"schema_id": TEST_SCHEMA_ID, "support_revocation": "True", "max_cred_num": "10"},
+            ),
+            MagicMock(value=json.dumps({}), tags={"schema_id": TEST_SCHEMA_ID}),
+        ]
+    )
+    entries = session.handle.fetch_all.return_value
+    entries[0].name = "did:example:1"
+    entries[1].name = "did:example:2"
+    creddef_storage_service.list_items = AsyncMock(return_value=[])
+    creddef_storage_service._fetch_tag = AsyncMock(return_value="remote")
+
+    await creddef_storage_service.sync_created(profile)
+
+    creddef_storage_service._fetch_tag.assert_awaited_once_with(profile, "did:example:2")
+    assert mock_save.await_count == 2
+    txn.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.creddef_storage.models.CredDefStorageRecord.save",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_duplicate_falls_back_to_add_item(
+    mock_save: AsyncMock,
+    creddef_storage_service: CredDefStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """A batch that races the event handler is retried record by record."""
+    profile, session, _ = _sync_profile(mock_profile)
+    storage = MagicMock()
+    storage.find_all_records = AsyncMock(
+        return_value=[MagicMock(value=TEST_CRED_DEF_ID, tags={"schema_id": TEST_SCHEMA_ID})]
+    )
+    session.inject = MagicMock(return_value=storage)
+    mock_save.side_effect = StorageDuplicateError("exists")
+    creddef_storage_service.list_items = AsyncMock(return_value=[])
+    creddef_storage_service.add_item = AsyncMock()
+
+    with patch(
+        "traction_innkeeper.v1_0.creddef_storage.creddef_storage_service.IssuerRevRegRecord.query",
+        AsyncMock(return_value=[]),
+    ):
+        await creddef_storage_service.sync_created(profile)
+
+    creddef_storage_service.add_item.assert_awaited_once_with(
+        profile,
+        {
+            "cred_def_id": TEST_CRED_DEF_ID,
+            "schema_id": TEST_SCHEMA_ID,
+            "tag": TEST_TAG,
+            "support_revocation": False,
+        },
+    )
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.creddef_storage.models.CredDefStorageRecord.save",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_reports_each_outcome(
+    mock_save: AsyncMock,
+    creddef_storage_service: CredDefStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """Progress follows each tag as it resolves, then the insert outcome of each record."""
+    profile, session, _ = _sync_profile(mock_profile, "askar-anoncreds")
+    session.handle = MagicMock()
+    session.handle.fetch_all = AsyncMock(
+        return_value=[
+            MagicMock(value=json.dumps({}), tags={"schema_id": TEST_SCHEMA_ID}),
+            MagicMock(value=json.dumps({}), tags={"schema_id": TEST_SCHEMA_ID}),
+        ]
+    )
+    entries = session.handle.fetch_all.return_value
+    entries[0].name = "did:example:1"
+    entries[1].name = "did:example:2"
+    mock_save.side_effect = StorageDuplicateError("exists")
+    creddef_storage_service.list_items = AsyncMock(return_value=[])
+    creddef_storage_service.add_item = AsyncMock(side_effect=[MagicMock(), StorageError("boom")])
+    seen = []
+
+    async def fetch_tag(profile, cred_def_id):
+        # the other tag resolved is already reported while this one resolves
+        seen.append(len(progress.await_args_list))
+        return "remote"
+
+    creddef_storage_service._fetch_tag = fetch_tag
+    progress = AsyncMock()
+
+    await creddef_storage_service.sync_created(profile, progress)
+
+    assert seen == [0, 1]
+    assert [(c.args[0]["cred_def_id"], c.args[0]["status"]) for c in progress.await_args_list] == [
+        ("did:example:1", "resolved"),
+        ("did:example:2", "resolved"),
+        ("did:example:1", "added"),
+        ("did:example:2", "error"),
+    ]
+    assert progress.await_args_list[-1].args[0]["error"] == "boom"
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.creddef_storage.models.CredDefStorageRecord.save",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_raises_without_progress(
+    mock_save: AsyncMock,
+    creddef_storage_service: CredDefStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """Without a progress callback a failed insert fails the sync."""
+    profile, session, _ = _sync_profile(mock_profile)
+    storage = MagicMock()
+    storage.find_all_records = AsyncMock(
+        return_value=[MagicMock(value=TEST_CRED_DEF_ID, tags={"schema_id": TEST_SCHEMA_ID})]
+    )
+    session.inject = MagicMock(return_value=storage)
+    mock_save.side_effect = StorageError("boom")
+    creddef_storage_service.list_items = AsyncMock(return_value=[])
+
+    with patch(
+        "traction_innkeeper.v1_0.creddef_storage.creddef_storage_service.IssuerRevRegRecord.query",
+        AsyncMock(return_value=[]),
+    ):
+        with pytest.raises(StorageError):
+            await creddef_storage_service.sync_created(profile)
+
+
 # --- Test Cases for Event Handler ---
 
 
@@ -15,6 +15,8 @@ from traction_innkeeper.v1_0.innkeeper.models import TenantRecord
 # Import the module containing the service and handler to be tested
 from traction_innkeeper.v1_0.endorser import endorser_connection_service as test_module
 from traction_innkeeper.v1_0.endorser.endorser_connection_service import (
+    ENDORSER_CONNECTION_CACHE,
+    EndorserConnectionCache,
     EndorserConnectionService,
     connections_event_handler,
     CONNECTIONS_EVENT_PATTERN,
@@ -36,6 +38,13 @@ TEST_CONN_ID = "conn-id-xyz-789"
 
 
 # --- Fixtures ---
+@pytest.fixture(autouse=True)
+def clear_cache():
+    ENDORSER_CONNECTION_CACHE.clear()
+    yield
+    ENDORSER_CONNECTION_CACHE.clear()
+
+
 @pytest.fixture
 def mock_profile():
     """Provides a mocked Profile with settings, session, and inject."""
@@ -489,7 +498,8 @@ async def test_connections_event_handler_state_not_completed(
 
     await connections_event_handler(profile, mock_event)
 
-    profile.settings.get.assert_called_once_with("endorser.endorser_alias")
+    profile.settings.get.assert_any_call("endorser.endorser_alias")
+    profile.settings.get.assert_any_call("wallet.id")
     mock_deserialize.assert_called_once_with(mock_event.payload)
     profile.session.assert_not_called()  # Should exit before checking metadata
 
@@ -514,9 +524,200 @@ async def test_connections_event_handler_metadata_exists(
 
     await connections_event_handler(profile, mock_event)
 
-    profile.settings.get.assert_called_once_with("endorser.endorser_alias")
+    profile.settings.get.assert_any_call("endorser.endorser_alias")
+    profile.settings.get.assert_any_call("wallet.id")
     mock_deserialize.assert_called_once_with(mock_event.payload)
     profile.session.assert_called_once()  # Only called once for metadata_get_all
     mock_conn_record.metadata_get_all.assert_awaited_once_with(session)
     # Ensure setting logic was not called
     mock_conn_record.metadata_set.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch.object(test_module.ConnRecord, "deserialize")
+async def test_connections_event_handler_metadata_cached(
+    mock_deserialize: MagicMock,
+    mock_profile: tuple[MagicMock, AsyncMock],
+    mock_event: MagicMock,
+    mock_conn_record: AsyncMock,
+):
+    """Once endorser metadata is known to be set, later events skip storage."""
+    profile, _ = mock_profile
+    profile.settings.get.return_value = TEST_ENDORSER_ALIAS
+    mock_deserialize.return_value = mock_conn_record
+    mock_conn_record.metadata_get_all.return_value = {"transaction-jobs": {"transaction_my_job": "TRANSACTION_AUTHOR"}}
+
+    await connections_event_handler(profile, mock_event)
+    await connections_event_handler(profile, mock_event)
+
+    profile.session.assert_called_once()
+    mock_conn_record.metadata_get_all.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch.object(test_module.ConnRecord, "deserialize")
+async def test_connections_event_handler_state_change_clears_metadata_flag(
+    mock_deserialize: MagicMock,
+    mock_profile: tuple[MagicMock, AsyncMock],
+    mock_event: MagicMock,
+    mock_conn_record: AsyncMock,
+):
+    """A connection leaving the completed state is checked again when it returns."""
+    profile, _ = mock_profile
+    profile.settings.get.return_value = TEST_ENDORSER_ALIAS
+    mock_deserialize.return_value = mock_conn_record
+    mock_conn_record.metadata_get_all.return_value = {"transaction-jobs": {"transaction_my_job": "TRANSACTION_AUTHOR"}}
+
+    await connections_event_handler(profile, mock_event)
+    mock_conn_record.state = ConnRecord.State.ABANDONED
+    await connections_event_handler(profile, mock_event)
+    mock_conn_record.state = ConnRecord.State.COMPLETED
+    await connections_event_handler(profile, mock_event)
+
+    assert mock_conn_record.metadata_get_all.await_count == 2
+
+
+def _endorser_settings(wallet_id=TEST_TENANT_WALLET_ID):
+    settings = {
+        "endorser.endorser_alias": TEST_ENDORSER_ALIAS,
+        "endorser.endorser_public_did": TEST_ENDORSER_DID,
+        "wallet.id": wallet_id,
+    }
+    return settings.get
+
+
+@pytest.mark.asyncio
+@patch.object(test_module.ConnRecord, "retrieve_by_id", new_callable=AsyncMock)
+@patch.object(test_module.ConnRecord, "retrieve_by_alias", new_callable=AsyncMock)
+async def test_endorser_connection_cached_id(
+    mock_retrieve_by_alias: AsyncMock,
+    mock_retrieve_by_id: AsyncMock,
+    endorser_service: EndorserConnectionService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+    mock_conn_record: AsyncMock,
+):
+    """The alias query runs once per wallet; later calls read the record by id."""
+    profile, session = mock_profile
+    profile.settings.get.side_effect = _endorser_settings()
+    mock_retrieve_by_alias.return_value = [mock_conn_record]
+    mock_retrieve_by_id.return_value = mock_conn_record
+
+    assert await endorser_service.endorser_connection(profile) == mock_conn_record
+    assert await endorser_service.endorser_connection(profile) == mock_conn_record
+
+    mock_retrieve_by_alias.assert_awaited_once_with(session, alias=TEST_ENDORSER_ALIAS)
+    mock_retrieve_by_id.assert_awaited_once_with(session, TEST_CONN_ID)
+
+
+@pytest.mark.asyncio
+@patch.object(test_module.ConnRecord, "retrieve_by_alias", new_callable=AsyncMock)
+async def test_endorser_connection_cached_none(
+    mock_retrieve_by_alias: AsyncMock,
+    endorser_service: EndorserConnectionService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """A wallet without an endorser connection is not queried again until one appears."""
+    profile, _ = mock_profile
+    profile.settings.get.side_effect = _endorser_settings()
+    mock_retrieve_by_alias.return_value = []
+
+    assert await endorser_service.endorser_connection(profile) is None
+    assert await endorser_service.endorser_connection(profile) is None
+
+    profile.session.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch.object(test_module.ConnRecord, "retrieve_by_id", new_callable=AsyncMock)
+@patch.object(test_module.ConnRecord, "retrieve_by_alias", new_callable=AsyncMock)
+async def test_endorser_connection_cached_id_gone(
+    mock_retrieve_by_alias: AsyncMock,
+    mock_retrieve_by_id: AsyncMock,
+    endorser_service: EndorserConnectionService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """A cached connection that no longer exists falls back to the alias query."""
+    profile, _ = mock_profile
+    profile.settings.get.side_effect = _endorser_settings()
+    ENDORSER_CONNECTION_CACHE.put(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS, "gone")
+    mock_retrieve_by_id.side_effect = test_module.StorageNotFoundError("gone")
+    mock_retrieve_by_alias.return_value = []
+
+    assert await endorser_service.endorser_connection(profile) is None
+    assert ENDORSER_CONNECTION_CACHE.lookup(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS) == (True, None)
+
+
+@pytest.mark.asyncio
+@patch.object(test_module.ConnRecord, "retrieve_by_id", new_callable=AsyncMock)
+@patch.object(test_module.ConnRecord, "retrieve_by_alias", new_callable=AsyncMock)
+async def test_endorser_connection_ledger_switch(
+    mock_retrieve_by_alias: AsyncMock,
+    mock_retrieve_by_id: AsyncMock,
+    endorser_service: EndorserConnectionService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+    mock_conn_record: AsyncMock,
+):
+    """A wallet switched to another ledger and endorser never gets the old endorser's connection."""
+    profile, session = mock_profile
+    settings = {
+        "endorser.endorser_alias": TEST_ENDORSER_ALIAS,
+        "endorser.endorser_public_did": TEST_ENDORSER_DID,
+        "wallet.id": TEST_TENANT_WALLET_ID,
+    }
+    profile.settings.get.side_effect = settings.get
+    mock_retrieve_by_alias.return_value = [mock_conn_record]
+    mock_retrieve_by_id.return_value = mock_conn_record
+    assert await endorser_service.endorser_connection(profile) == mock_conn_record
+
+    # the ledger switch brings the other ledger's endorser
+    settings["endorser.endorser_alias"] = "OtherEndorser"
+    other_conn_record = MagicMock(connection_id="other-conn-id")
+    mock_retrieve_by_alias.return_value = [other_conn_record]
+    assert await endorser_service.endorser_connection(profile) == other_conn_record
+    mock_retrieve_by_alias.assert_awaited_with(session, alias="OtherEndorser")
+    mock_retrieve_by_id.assert_not_called()
+
+    # a switch to a ledger with the same endorser alias drops the entry
+    test_module.ENDORSER_CONNECTION_CACHE.invalidate(TEST_TENANT_WALLET_ID)
+    assert await endorser_service.endorser_connection(profile) == other_conn_record
+    assert mock_retrieve_by_alias.await_count == 3
+
+
+def test_cache_connection_events():
+    cache = EndorserConnectionCache()
+    record = MagicMock(connection_id=TEST_CONN_ID, alias=TEST_ENDORSER_ALIAS, state=ConnRecord.State.COMPLETED)
+    cache.put(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS, None)
+    cache.connection_changed(TEST_TENANT_WALLET_ID, record)
+    assert cache.lookup(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS) == (True, TEST_CONN_ID)
+    cache.set_has_metadata(TEST_CONN_ID)
+    assert cache.has_metadata(TEST_CONN_ID)
+
+    cache.connection_changed(TEST_TENANT_WALLET_ID, record, deleted=True)
+    assert cache.lookup(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS) == (False, None)
+    assert not cache.has_metadata(TEST_CONN_ID)
+
+
+def test_cache_stale_generation_is_not_cached():
+    cache = EndorserConnectionCache()
+    generation = cache.generation
+    record = MagicMock(connection_id=TEST_CONN_ID, alias=TEST_ENDORSER_ALIAS, state="request")
+    cache.connection_changed(TEST_TENANT_WALLET_ID, record)
+    cache.put(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS, None, generation)
+    assert cache.lookup(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS) == (True, TEST_CONN_ID)
+
+
+def test_cache_is_per_endorser():
+    cache = EndorserConnectionCache()
+    cache.put(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS, TEST_CONN_ID)
+    assert cache.lookup(TEST_TENANT_WALLET_ID, "OtherEndorser") == (False, None)
+    cache.invalidate(TEST_TENANT_WALLET_ID)
+    assert cache.lookup(TEST_TENANT_WALLET_ID, TEST_ENDORSER_ALIAS) == (False, None)
+
+
+def test_cache_lru_eviction():
+    cache = EndorserConnectionCache(max_size=1)
+    cache.put("w1", TEST_ENDORSER_ALIAS, "c1")
+    cache.put("w2", TEST_ENDORSER_ALIAS, "c2")
+    assert cache.lookup("w1", TEST_ENDORSER_ALIAS) == (False, None)
+    assert cache.lookup("w2", TEST_ENDORSER_ALIAS) == (True, "c2")
+    assert cache.stats()["hit_ratio"] == 0.5
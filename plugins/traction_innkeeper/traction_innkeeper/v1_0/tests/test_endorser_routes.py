@@ -11,6 +11,7 @@ from acapy_agent.protocols.didexchange.v1_0.manager import DIDXManagerError
 # Import the module containing the routes to be tested
 # Adjust path as necessary
 from traction_innkeeper.v1_0.endorser import routes as test_module
+from traction_innkeeper.v1_0.innkeeper import tenant_context
 
 # Import Service and Models used for mocking
 from traction_innkeeper.v1_0.endorser.endorser_connection_service import (
@@ -37,6 +38,11 @@ TEST_API_KEY = "test-endorser-api-key"
 # --- Reusable Fixtures (similar to test_innkeeper_routes.py) ---
 
 
+def patch_tenant_record():
+    """Patch TenantRecord where the request's tenant context looks it up, with nothing cached."""
+    return patch.object(tenant_context, "TenantRecord", autospec=True, **{"from_cache.return_value": None})
+
+
 @pytest.fixture
 def mock_profile_inject():
     """Provides a mock injector function and tracks injectable mocks."""
@@ -124,14 +130,21 @@ def mock_request(mock_context: MagicMock):
     request.query = {}
     request.headers = {"x-api-key": TEST_API_KEY}  # Satisfy tenant_authentication
 
+    # the tenant context setup_tenant_context puts on the request
+    items = {
+        "context": mock_context,
+        tenant_context.REQUEST_KEY: tenant_context.TenantRequestContext(mock_context),
+    }
+
     def getitem_side_effect(key):
-        if key == "context":
-            return mock_context
+        if key in items:
+            return items[key]
         if key == "headers":
             return request.headers
         return MagicMock()
 
     request.__getitem__.side_effect = getitem_side_effect
+    request.get = items.get
     request.json = AsyncMock()
     request._set_match_info = lambda key, value: request.match_info.update({key: value})
     return request
@@ -162,7 +175,7 @@ def mock_tenant_mgr(mock_profile: MagicMock, mock_root_profile: MagicMock):
 
 # Test Endorser Connection Set (POST /tenant/endorser-connection)
 @pytest.mark.asyncio
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_endorser_connection_set_success(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
@@ -213,7 +226,7 @@ async def test_endorser_connection_set_success(
 
 
 @pytest.mark.asyncio
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 @pytest.mark.parametrize(
     "endorsers, did",
     [
@@ -246,7 +259,7 @@ async def test_endorser_connection_set_tenant_not_issuer(
 
 
 @pytest.mark.asyncio
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_endorser_connection_set_no_endorser_info(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
@@ -275,7 +288,7 @@ async def test_endorser_connection_set_no_endorser_info(
 
 
 @pytest.mark.asyncio
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_endorser_connection_set_connect_error(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
@@ -0,0 +1,55 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+
+from traction_innkeeper.v1_0.innkeeper.etag import etag_matches, json_response_with_etag, record_etag
+from traction_innkeeper.v1_0.innkeeper.models import TenantRecord
+
+
+def _request(if_none_match=None):
+    request = MagicMock(spec=web.Request)
+    request.headers = {"If-None-Match": if_none_match} if if_none_match else {}
+    return request
+
+
+@pytest.mark.parametrize(
+    "header, matches",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+    ],
+)
+def test_etag_matches(header, matches):
+    assert etag_matches(_request(header), '"abc"') is matches
+
+
+def test_record_etag_follows_updated_at():
+    rec = TenantRecord(tenant_id="t1", tenant_name="name", wallet_id="w1", updated_at="2024-01-01T00:00:00Z")
+    other = TenantRecord(tenant_id="t2", tenant_name="name", wallet_id="w2", updated_at="2024-01-01T00:00:00Z")
+    etag = record_etag(rec)
+    assert record_etag(rec) == etag
+    assert record_etag(other) != etag
+    assert record_etag(rec, other) != etag
+
+    rec.updated_at = "2024-01-01T00:00:01Z"
+    assert record_etag(rec) != etag
+
+
+def test_json_response_with_etag():
+    build = MagicMock(return_value={"ok": True})
+
+    response = json_response_with_etag(_request(), '"abc"', build)
+    assert response.status == 200
+    assert response.headers["ETag"] == '"abc"'
+    assert json.loads(response.body) == {"ok": True}
+
+    build.reset_mock()
+    response = json_response_with_etag(_request('"abc"'), '"abc"', build)
+    assert response.status == 304
+    build.assert_not_called()
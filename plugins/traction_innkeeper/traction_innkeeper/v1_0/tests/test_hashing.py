@@ -0,0 +1,35 @@
+import bcrypt
+import pytest
+
+from traction_innkeeper.v1_0.innkeeper import hashing
+
+
+@pytest.fixture(autouse=True)
+def reset_hashing():
+    hashing.configure(max_workers=2, rounds=4)
+    yield
+    hashing.configure()
+
+
+async def test_hash_password_round_trip():
+    salt, hashed = await hashing.hash_password(b"secret")
+    assert salt.startswith(b"$2b$04$")
+    assert bcrypt.checkpw(b"secret", hashed)
+    assert await hashing.checkpw(b"secret", hashed) is True
+    assert await hashing.checkpw(b"other", hashed) is False
+
+
+async def test_hashing_runs_on_executor_threads():
+    executor = hashing.get_executor()
+    assert executor._max_workers == 2
+    assert hashing.get_executor() is executor
+    assert await hashing.hashpw(b"secret", hashing.gensalt()) is not None
+    assert all(t.name.startswith("traction-bcrypt") for t in executor._threads)
+
+
+def test_configure_replaces_executor():
+    executor = hashing.get_executor()
+    hashing.configure(max_workers=3, rounds=5)
+    assert hashing.get_executor() is not executor
+    assert hashing.get_executor()._max_workers == 3
+    assert hashing.gensalt().startswith(b"$2b$05$")
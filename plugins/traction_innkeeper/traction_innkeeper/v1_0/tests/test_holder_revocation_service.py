@@ -1,10 +1,12 @@
+import asyncio
 import logging
 from unittest.mock import MagicMock, AsyncMock, patch, ANY
 
 import pytest
 from acapy_agent.core.profile import Profile
 from acapy_agent.core.event_bus import Event, EventBus
-from acapy_agent.storage.error import StorageError, StorageNotFoundError
+from acapy_agent.core.util import SHUTDOWN_EVENT_PATTERN
+from acapy_agent.storage.error import StorageDuplicateError, StorageError, StorageNotFoundError
 from acapy_agent.messaging.models.base import BaseModelError
 
 # Assuming models and service are importable like this
@@ -19,9 +21,13 @@ from acapy_agent.protocols.issue_credential.v2_0.models.detail.indy import (
 from traction_innkeeper.v1_0.tenant.holder_revocation_service import (
     HolderRevocationService,
     subscribe,
+    credential_exchange_index_handler,
+    on_shutdown,
     revocation_notification_handler,
+    CRED_EX_V20_INDEX_EVENT_PATTERN,
     REVOCATION_NOTIFICATION_EVENT_PATTERN,
 )
+from traction_innkeeper.v1_0.tenant.models import HolderCredRevIndexRecord
 
 # Disable logging noise during tests
 logging.disable(logging.CRITICAL)
@@ -56,6 +62,20 @@ def mock_profile():
     return profile, mock_session, mock_txn
 
 
+@pytest.fixture(autouse=True)
+def mock_index():
+    """Patches the holder revocation index; by default nothing is indexed yet."""
+    with (
+        patch.object(
+            HolderCredRevIndexRecord,
+            "retrieve_by_revocation_id",
+            AsyncMock(side_effect=StorageNotFoundError("not indexed")),
+        ) as mock_retrieve,
+        patch.object(HolderCredRevIndexRecord, "save", AsyncMock()) as mock_save,
+    ):
+        yield mock_retrieve, mock_save
+
+
 @pytest.fixture
 def holder_revocation_service():
     """Provides a HolderRevocationService instance."""
@@ -204,6 +224,137 @@ async def test_find_credential_exchange_v20_query_error(
     mock_indy_query.assert_awaited_once_with(session=session, tag_filter=ANY, post_filter_positive=ANY)
 
 
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecordIndy.query",
+    new_callable=AsyncMock,
+)
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecord.retrieve_by_id",
+    new_callable=AsyncMock,
+)
+async def test_find_credential_exchange_v20_indexed(
+    mock_retrieve: AsyncMock,
+    mock_indy_query: AsyncMock,
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+    mock_index: tuple,
+    mock_v20_cred_ex_record: AsyncMock,
+):
+    """An indexed credential resolves with one lookup and no detail record scan."""
+    profile, session, _ = mock_profile
+    mock_index_retrieve, _ = mock_index
+    mock_index_retrieve.side_effect = None
+    mock_index_retrieve.return_value = HolderCredRevIndexRecord(
+        rev_reg_id=TEST_REV_REG_ID, cred_rev_id=TEST_REVOCATION_ID, cred_ex_id=TEST_CRED_EX_ID
+    )
+    mock_retrieve.return_value = mock_v20_cred_ex_record
+
+    result = await holder_revocation_service.find_credential_exchange_v20(profile, TEST_REV_REG_ID, TEST_REVOCATION_ID)
+
+    assert result == mock_v20_cred_ex_record
+    mock_index_retrieve.assert_awaited_once_with(session, TEST_REV_REG_ID, TEST_REVOCATION_ID)
+    mock_indy_query.assert_not_awaited()
+    mock_retrieve.assert_awaited_once_with(session, TEST_CRED_EX_ID)
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecordIndy.query",
+    new_callable=AsyncMock,
+)
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecord.retrieve_by_id",
+    new_callable=AsyncMock,
+)
+async def test_find_credential_exchange_v20_scan_backfills_index(
+    mock_retrieve: AsyncMock,
+    mock_indy_query: AsyncMock,
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+    mock_index: tuple,
+    mock_v20_cred_ex_record: AsyncMock,
+    mock_v20_cred_ex_indy_detail: AsyncMock,
+):
+    """A credential found by scanning is indexed so the next lookup is direct."""
+    profile, session, _ = mock_profile
+    _, mock_index_save = mock_index
+    mock_index_save.side_effect = StorageDuplicateError("already indexed")
+    mock_indy_query.return_value = [mock_v20_cred_ex_indy_detail]
+    mock_retrieve.return_value = mock_v20_cred_ex_record
+
+    result = await holder_revocation_service.find_credential_exchange_v20(profile, TEST_REV_REG_ID, TEST_REVOCATION_ID)
+
+    assert result == mock_v20_cred_ex_record
+    mock_index_save.assert_awaited_once_with(session, reason=ANY)
+
+
+# Test index_credential_exchange_v20
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecordIndy.query_by_cred_ex_id",
+    new_callable=AsyncMock,
+)
+async def test_index_credential_exchange_v20(
+    mock_query_by_cred_ex_id: AsyncMock,
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+    mock_index: tuple,
+    mock_v20_cred_ex_indy_detail: AsyncMock,
+):
+    """Revocable credentials are indexed by their revocation ids."""
+    profile, session, _ = mock_profile
+    _, mock_index_save = mock_index
+    mock_query_by_cred_ex_id.return_value = [mock_v20_cred_ex_indy_detail]
+
+    assert await holder_revocation_service.index_credential_exchange_v20(profile, TEST_CRED_EX_ID)
+
+    mock_query_by_cred_ex_id.assert_awaited_once_with(session, TEST_CRED_EX_ID)
+    mock_index_save.assert_awaited_once_with(session, reason=ANY)
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecordIndy.query_by_cred_ex_id",
+    new_callable=AsyncMock,
+)
+async def test_index_credential_exchange_v20_not_revocable(
+    mock_query_by_cred_ex_id: AsyncMock,
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+    mock_index: tuple,
+    mock_v20_cred_ex_indy_detail: AsyncMock,
+):
+    """Credentials without revocation ids are not indexed."""
+    profile, _, _ = mock_profile
+    _, mock_index_save = mock_index
+    mock_v20_cred_ex_indy_detail.rev_reg_id = None
+    mock_v20_cred_ex_indy_detail.cred_rev_id = None
+    mock_query_by_cred_ex_id.return_value = [mock_v20_cred_ex_indy_detail]
+
+    assert not await holder_revocation_service.index_credential_exchange_v20(profile, TEST_CRED_EX_ID)
+
+    mock_index_save.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@patch.object(HolderCredRevIndexRecord, "query_by_cred_ex_id", new_callable=AsyncMock)
+async def test_remove_credential_exchange_index_v20(
+    mock_query_by_cred_ex_id: AsyncMock,
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+):
+    """The index records of a deleted credential exchange are removed."""
+    profile, session, _ = mock_profile
+    index = AsyncMock(spec=HolderCredRevIndexRecord)
+    mock_query_by_cred_ex_id.return_value = [index]
+
+    await holder_revocation_service.remove_credential_exchange_index_v20(profile, TEST_CRED_EX_ID)
+
+    mock_query_by_cred_ex_id.assert_awaited_once_with(session, TEST_CRED_EX_ID)
+    index.delete_record.assert_awaited_once_with(session)
+
+
 # Test set_credential_exchange_revoked_v20
 @pytest.mark.asyncio
 @patch(
@@ -282,71 +433,279 @@ async def test_set_credential_exchange_revoked_v20_save_error(
     txn.commit.assert_not_called()  # Commit shouldn't happen
 
 
+# Test batched revocation
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecordIndy.query",
+    new_callable=AsyncMock,
+)
+async def test_find_credential_exchange_ids_v20(
+    mock_indy_query: AsyncMock,
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+    mock_index: tuple,
+    mock_v20_cred_ex_indy_detail: AsyncMock,
+):
+    """Indexed credentials are looked up directly; the rest share one scan."""
+    _, session, _ = mock_profile
+    mock_index_retrieve, mock_index_save = mock_index
+    indexed_key = (TEST_REV_REG_ID, "1")
+    scanned_key = (TEST_REV_REG_ID, TEST_REVOCATION_ID)
+    unknown_key = (TEST_REV_REG_ID, "2")
+
+    async def retrieve(session, rev_reg_id, cred_rev_id):
+        if (rev_reg_id, cred_rev_id) == indexed_key:
+            return HolderCredRevIndexRecord(rev_reg_id=rev_reg_id, cred_rev_id=cred_rev_id, cred_ex_id="indexed")
+        raise StorageNotFoundError("not indexed")
+
+    mock_index_retrieve.side_effect = retrieve
+    # the alternatives filter can also match a pair that was not asked for
+    other_detail = MagicMock(cred_ex_id="other", rev_reg_id=TEST_REV_REG_ID, cred_rev_id="1")
+    mock_indy_query.return_value = [mock_v20_cred_ex_indy_detail, other_detail]
+
+    result = await holder_revocation_service.find_credential_exchange_ids_v20(
+        session, [indexed_key, scanned_key, unknown_key]
+    )
+
+    assert result == {indexed_key: "indexed", scanned_key: TEST_CRED_EX_ID}
+    mock_indy_query.assert_awaited_once_with(session=session, tag_filter={}, post_filter_positive=ANY, alt=True)
+    mock_index_save.assert_awaited_once_with(session, reason=ANY)
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.tenant.holder_revocation_service.V20CredExRecord.retrieve_by_id",
+    new_callable=AsyncMock,
+)
+async def test_revoke_credential_exchanges_v20_one_transaction(
+    mock_retrieve: AsyncMock,
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+):
+    """All affected records are updated and committed in a single transaction."""
+    profile, _, txn = mock_profile
+    records = {}
+
+    async def retrieve(session, cred_ex_id, for_update=False):
+        if cred_ex_id == "gone":
+            raise StorageNotFoundError("deleted")
+        records[cred_ex_id] = AsyncMock(spec=V20CredExRecord, cred_ex_id=cred_ex_id)
+        return records[cred_ex_id]
+
+    mock_retrieve.side_effect = retrieve
+    holder_revocation_service.find_credential_exchange_ids_v20 = AsyncMock(
+        return_value={("r", "1"): "a", ("r", "2"): "b", ("r", "3"): "gone"}
+    )
+
+    result = await holder_revocation_service.revoke_credential_exchanges_v20(
+        profile, {("r", "1"): "one", ("r", "2"): "two", ("r", "3"): "three"}
+    )
+
+    assert [rec.cred_ex_id for rec in result] == ["a", "b"]
+    assert records["a"].state == V20CredExRecord.STATE_CREDENTIAL_REVOKED
+    assert records["b"].error_msg == "two"
+    records["a"].save.assert_awaited_once_with(txn, reason="revoke credential")
+    profile.transaction.assert_called_once()
+    txn.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_revoke_credential_exchanges_v20_nothing_found(
+    holder_revocation_service: HolderRevocationService,
+    mock_profile: tuple,
+):
+    """No transaction is opened when no credential matches."""
+    profile, _, _ = mock_profile
+    holder_revocation_service.find_credential_exchange_ids_v20 = AsyncMock(return_value={})
+
+    assert await holder_revocation_service.revoke_credential_exchanges_v20(profile, {("r", "1"): "one"}) == []
+    profile.transaction.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_queue_revocation_coalesces_window(mock_profile: tuple):
+    """Notifications within the window are applied together, duplicates once."""
+    profile, _, _ = mock_profile
+    profile.settings = {"wallet.id": "wallet-1"}
+    srv = HolderRevocationService(batch_window_ms=10, max_batch_size=100)
+    srv.revoke_credential_exchanges_v20 = AsyncMock()
+
+    await srv.queue_revocation(profile, "r", "1", "first")
+    await srv.queue_revocation(profile, "r", "2", "second")
+    await srv.queue_revocation(profile, "r", "1", "again")
+    assert srv.pending == 2
+    srv.revoke_credential_exchanges_v20.assert_not_awaited()
+
+    await asyncio.sleep(0.05)
+
+    srv.revoke_credential_exchanges_v20.assert_awaited_once_with(profile, {("r", "1"): "again", ("r", "2"): "second"})
+    assert srv.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_revocation_batches_per_wallet(mock_profile: tuple):
+    """Each wallet's notifications go to their own transaction."""
+    profile, _, _ = mock_profile
+    profile.settings = {"wallet.id": "wallet-1"}
+    other = MagicMock(spec=Profile)
+    other.settings = {"wallet.id": "wallet-2"}
+    srv = HolderRevocationService(batch_window_ms=10)
+    srv.revoke_credential_exchanges_v20 = AsyncMock()
+
+    await srv.queue_revocation(profile, "r", "1", "one")
+    await srv.queue_revocation(other, "r", "1", "one")
+    await srv.flush_all()
+
+    assert srv.revoke_credential_exchanges_v20.await_count == 2
+    assert srv.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_revocation_full_batch_applied_immediately(mock_profile: tuple):
+    """A batch reaching max_batch_size does not wait for the window."""
+    profile, _, _ = mock_profile
+    profile.settings = {"wallet.id": "wallet-1"}
+    srv = HolderRevocationService(batch_window_ms=60000, max_batch_size=2)
+    srv.revoke_credential_exchanges_v20 = AsyncMock()
+
+    await srv.queue_revocation(profile, "r", "1", "one")
+    await srv.queue_revocation(profile, "r", "2", "two")
+
+    srv.revoke_credential_exchanges_v20.assert_awaited_once()
+    assert srv.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_revocation_back_pressure(mock_profile: tuple):
+    """Callers wait while max_pending notifications are queued."""
+    profile, _, _ = mock_profile
+    profile.settings = {"wallet.id": "wallet-1"}
+    srv = HolderRevocationService(batch_window_ms=60000, max_batch_size=100, max_pending=1)
+    srv.revoke_credential_exchanges_v20 = AsyncMock()
+
+    await srv.queue_revocation(profile, "r", "1", "one")
+    blocked = asyncio.create_task(srv.queue_revocation(profile, "r", "2", "two"))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    await srv.flush_all()
+    await asyncio.wait_for(blocked, 1)
+    assert srv.pending == 1
+    await srv.flush_all()
+    assert srv.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_revocation_error_releases_pending(mock_profile: tuple):
+    """A failed batch is logged and does not hold back-pressure slots."""
+    profile, _, _ = mock_profile
+    profile.settings = {"wallet.id": "wallet-1"}
+    srv = HolderRevocationService(max_batch_size=1)
+    srv.revoke_credential_exchanges_v20 = AsyncMock(side_effect=StorageError("boom"))
+
+    await srv.queue_revocation(profile, "r", "1", "one")
+
+    assert srv.pending == 0
+
+
 # --- Test Cases for Global Functions ---
 
 
 # Test subscribe
 def test_subscribe(mock_event_bus: MagicMock):
-    """Test the subscribe function registers the handler."""
+    """Test the subscribe function registers the handlers."""
     subscribe(mock_event_bus)
-    mock_event_bus.subscribe.assert_called_once_with(
-        REVOCATION_NOTIFICATION_EVENT_PATTERN, revocation_notification_handler
-    )
+    mock_event_bus.subscribe.assert_any_call(REVOCATION_NOTIFICATION_EVENT_PATTERN, revocation_notification_handler)
+    mock_event_bus.subscribe.assert_any_call(CRED_EX_V20_INDEX_EVENT_PATTERN, credential_exchange_index_handler)
+    mock_event_bus.subscribe.assert_any_call(SHUTDOWN_EVENT_PATTERN, on_shutdown)
+    assert mock_event_bus.subscribe.call_count == 3
+
+
+def test_index_event_pattern():
+    """Only holder relevant v2.0 cred ex states are routed to the index handler."""
+    assert CRED_EX_V20_INDEX_EVENT_PATTERN.match("acapy::record::issue_credential_v2_0::done")
+    assert CRED_EX_V20_INDEX_EVENT_PATTERN.match("acapy::record::issue_credential_v2_0::deleted")
+    assert not CRED_EX_V20_INDEX_EVENT_PATTERN.match("acapy::record::issue_credential_v2_0::offer-received")
+    assert not CRED_EX_V20_INDEX_EVENT_PATTERN.match("acapy::record::issue_credential_v2_0_indy")
 
 
 # Test revocation_notification_handler
 @pytest.mark.asyncio
-async def test_revocation_notification_handler_success(
+async def test_revocation_notification_handler_queues(
     mock_profile: tuple,
     holder_revocation_service: HolderRevocationService,  # Use fixture
     mock_event: MagicMock,
-    mock_v20_cred_ex_record: AsyncMock,
 ):
-    """Test the revocation_notification_handler successfully finds and updates."""
+    """Test the revocation_notification_handler queues the notification for its wallet."""
     profile, _, _ = mock_profile
 
     # Mock profile.inject to return our service instance
     profile.inject.return_value = holder_revocation_service
-
-    # Mock the service methods specifically for this test
-    holder_revocation_service.parse_thread_id = MagicMock(return_value=(TEST_REV_REG_ID, TEST_REVOCATION_ID))
-    holder_revocation_service.find_credential_exchange_v20 = AsyncMock(return_value=mock_v20_cred_ex_record)
-    holder_revocation_service.set_credential_exchange_revoked_v20 = AsyncMock(
-        return_value=mock_v20_cred_ex_record  # Simulate successful update
-    )
+    holder_revocation_service.queue_revocation = AsyncMock()
 
     await revocation_notification_handler(profile, mock_event)
 
     profile.inject.assert_called_once_with(HolderRevocationService)
-    holder_revocation_service.parse_thread_id.assert_called_once_with(TEST_THREAD_ID)
-    holder_revocation_service.find_credential_exchange_v20.assert_awaited_once_with(
-        profile, TEST_REV_REG_ID, TEST_REVOCATION_ID
-    )
-    holder_revocation_service.set_credential_exchange_revoked_v20.assert_awaited_once_with(
-        profile, TEST_CRED_EX_ID, TEST_COMMENT
+    holder_revocation_service.queue_revocation.assert_awaited_once_with(
+        profile, TEST_REV_REG_ID, TEST_REVOCATION_ID, TEST_COMMENT
     )
 
 
 @pytest.mark.asyncio
-async def test_revocation_notification_handler_record_not_found(
+async def test_on_shutdown_flushes(
     mock_profile: tuple,
     holder_revocation_service: HolderRevocationService,
-    mock_event: MagicMock,
 ):
-    """Test the handler when the credential exchange record is not found."""
+    """Queued notifications are applied on shutdown."""
+    profile, _, _ = mock_profile
+    profile.inject_or = MagicMock(return_value=holder_revocation_service)
+    holder_revocation_service.flush_all = AsyncMock()
+
+    await on_shutdown(profile, MagicMock(spec=Event))
+
+    holder_revocation_service.flush_all.assert_awaited_once()
+
+
+# Test credential_exchange_index_handler
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "state, method",
+    [
+        (V20CredExRecord.STATE_DONE, "index_credential_exchange_v20"),
+        (V20CredExRecord.STATE_DELETED, "remove_credential_exchange_index_v20"),
+    ],
+)
+async def test_credential_exchange_index_handler(
+    state: str,
+    method: str,
+    mock_profile: tuple,
+    holder_revocation_service: HolderRevocationService,
+):
+    """Holder cred ex events add or remove index records."""
     profile, _, _ = mock_profile
     profile.inject.return_value = holder_revocation_service
-    holder_revocation_service.parse_thread_id = MagicMock(return_value=(TEST_REV_REG_ID, TEST_REVOCATION_ID))
-    # Simulate find returning None
-    holder_revocation_service.find_credential_exchange_v20 = AsyncMock(return_value=None)
-    holder_revocation_service.set_credential_exchange_revoked_v20 = AsyncMock()
+    setattr(holder_revocation_service, method, AsyncMock())
+    event = MagicMock(spec=Event)
+    event.payload = {"cred_ex_id": TEST_CRED_EX_ID, "role": V20CredExRecord.ROLE_HOLDER, "state": state}
 
-    await revocation_notification_handler(profile, mock_event)
+    await credential_exchange_index_handler(profile, event)
 
-    profile.inject.assert_called_once_with(HolderRevocationService)
-    holder_revocation_service.parse_thread_id.assert_called_once_with(TEST_THREAD_ID)
-    holder_revocation_service.find_credential_exchange_v20.assert_awaited_once_with(
-        profile, TEST_REV_REG_ID, TEST_REVOCATION_ID
-    )
-    # Ensure set_credential_exchange_revoked_v20 was NOT called
-    holder_revocation_service.set_credential_exchange_revoked_v20.assert_not_awaited()
+    getattr(holder_revocation_service, method).assert_awaited_once_with(profile, TEST_CRED_EX_ID)
+
+
+@pytest.mark.asyncio
+async def test_credential_exchange_index_handler_ignores_issuer(
+    mock_profile: tuple,
+):
+    """Issuer side cred ex events are not indexed."""
+    profile, _, _ = mock_profile
+    event = MagicMock(spec=Event)
+    event.payload = {
+        "cred_ex_id": TEST_CRED_EX_ID,
+        "role": V20CredExRecord.ROLE_ISSUER,
+        "state": V20CredExRecord.STATE_DONE,
+    }
+
+    await credential_exchange_index_handler(profile, event)
+
+    profile.inject.assert_not_called()
@@ -14,3 +14,74 @@ def test_get_config():
     c = get_config({"plugin_config": {"traction_innkeeper": {"innkeeper_wallet": {"tenant_id": "x"}}}})
     assert c.innkeeper_wallet.tenant_id == "x"
     assert get_config({}).reservation.expiry_minutes == 60
+
+
+def test_get_config_tenant_cache():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"tenant_cache": {"ttl_seconds": 5}}}})
+    assert c.tenant_cache.ttl_seconds == 5
+    assert c.tenant_cache.max_size == 10000
+    assert get_config({}).tenant_cache.ttl_seconds == 30
+
+
+def test_get_config_password_hashing():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"password_hashing": {"max_workers": 2}}}})
+    assert c.password_hashing.max_workers == 2
+    assert c.password_hashing.bcrypt_rounds == 12
+    assert get_config({}).password_hashing.max_workers == 4
+
+
+def test_get_config_storage_sync():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"storage_sync": {"max_concurrency": 2}}}})
+    assert c.storage_sync.max_concurrency == 2
+    assert get_config({}).storage_sync.max_concurrency == 8
+
+
+def test_get_config_ledger_cache():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"ledger_cache": {"persist_path": "/tmp/cache.json"}}}})
+    assert c.ledger_cache.persist_path == "/tmp/cache.json"
+    assert c.ledger_cache.max_size == 5000
+    assert get_config({}).ledger_cache.persist_path is None
+
+
+def test_get_config_revocation_notifications():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"revocation_notifications": {"max_pending": 10}}}})
+    assert c.revocation_notifications.max_pending == 10
+    assert c.revocation_notifications.batch_window_ms == 200
+    assert get_config({}).revocation_notifications.max_batch_size == 100
+
+
+def test_get_config_bulk_provisioning():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"bulk_provisioning": {"max_tenants": 50}}}})
+    assert c.bulk_provisioning.max_tenants == 50
+    assert c.bulk_provisioning.max_concurrency == 8
+    assert c.bulk_provisioning.chunk_size == 100
+
+
+def test_get_config_jobs():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"jobs": {"max-workers": 2}}}})
+    assert c.jobs.max_workers == 2
+    assert c.jobs.retention_hours == 24
+
+
+def test_get_config_storage_budget():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"storage_budget": {"max-sessions": 0}}}})
+    assert c.storage_budget.max_sessions == 0
+    assert c.storage_budget.max_operations == 25
+
+
+def test_get_config_loop_monitor():
+    c = get_config({"plugin_config": {"traction_innkeeper": {}}})
+    assert c.loop_monitor.enabled is False
+
+    c = get_config({"plugin_config": {"traction_innkeeper": {"loop_monitor": {"enabled": True, "threshold-ms": 500}}}})
+    assert c.loop_monitor.enabled is True
+    assert c.loop_monitor.threshold_ms == 500
+    assert c.loop_monitor.interval_ms == 100
+
+
+def test_get_config_reservation_reaper():
+    c = get_config({"plugin_config": {"traction_innkeeper": {"reservation": {"reaper-interval-minutes": 0}}}})
+    assert c.reservation.reaper_interval_minutes == 0
+    assert c.reservation.reaper_batch_size == 100
+    assert c.reservation.reaper_retention_days == 30
+    assert c.reservation.expiry_minutes == 60
@@ -5,13 +5,16 @@ from unittest.mock import MagicMock, AsyncMock, patch, ANY
 import pytest
 from aiohttp import web
 from acapy_agent.core.profile import Profile
+from acapy_agent.utils.testing import create_test_profile
 
 # Import the module containing the routes to be tested
 # Note: Adjust the import path based on your project structure
+from traction_innkeeper.v1_0.endorser.endorser_connection_service import ENDORSER_CONNECTION_CACHE
 from traction_innkeeper.v1_0.innkeeper import routes as test_module
 
 # Import Schemas and Models used for mocking return types or validation
 from traction_innkeeper.v1_0.innkeeper.models import (
+    JobRecord,
     ReservationRecord,
     TenantRecord,
     TenantAuthenticationApiRecord,
@@ -135,6 +138,7 @@ def mock_tenant_mgr(mock_profile: MagicMock):
     # Mock config attributes needed by routes
     mgr._config = MagicMock()
     mgr._config.reservation = MagicMock(auto_approve=False)
+    mgr._config.bulk_provisioning = MagicMock(max_tenants=2)
     mgr._config.innkeeper_wallet = MagicMock(spec=InnkeeperWalletConfig)
     mgr._config.innkeeper_wallet.connect_to_endorser = []
     mgr._config.innkeeper_wallet.create_public_did = []
@@ -152,6 +156,16 @@ def mock_multitenant_mgr(mock_profile: MagicMock):
     return mgr
 
 
+@pytest.fixture
+async def askar_profile(mock_context: MagicMock, mock_tenant_mgr: AsyncMock):
+    """Provides an in-memory Askar profile as the Tenant Manager profile."""
+    profile = await create_test_profile()
+    mock_tenant_mgr.profile = profile
+    mock_context.inject.return_value = mock_tenant_mgr
+    yield profile
+    await profile.close()
+
+
 # --- Test Cases ---
 
 
@@ -248,7 +262,9 @@ async def test_tenant_config_update(
         "tenant_id": TEST_TENANT_ID,
         "wallet_id": TEST_WALLET_ID,
     }
+    mock_tenant_rec.wallet_id = TEST_WALLET_ID
     MockTenantRecordCls.retrieve_by_id = AsyncMock(return_value=mock_tenant_rec)
+    ENDORSER_CONNECTION_CACHE.put(TEST_WALLET_ID, "endorser", "old-ledger-endorser-conn")
 
     response = await test_module.tenant_config_update(mock_request)
 
@@ -262,6 +278,8 @@ async def test_tenant_config_update(
     assert mock_tenant_rec.created_public_did == update_body["create_public_did"]
     assert mock_tenant_rec.enable_ledger_switch == update_body["enable_ledger_switch"]
     assert mock_tenant_rec.curr_ledger_id == update_body["curr_ledger_id"]
+    # the old ledger's endorser connection is looked up again
+    assert ENDORSER_CONNECTION_CACHE.lookup(TEST_WALLET_ID, "endorser") == (False, None)
 
     mock_tenant_rec.save.assert_awaited_once_with(ANY)
     mock_tenant_rec.serialize.assert_called_once()
@@ -317,9 +335,11 @@ async def test_innkeeper_tenant_res_update(
 # Test Reservations List (GET /innkeeper/reservations/)
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
+@patch(f"{test_module.__name__}.query_records_page", new_callable=AsyncMock)
 @patch(f"{test_module.__name__}.ReservationRecord", autospec=True)
 async def test_innkeeper_reservations_list(
     MockReservationRecordCls: MagicMock,
+    mock_query_page: AsyncMock,
     mock_request: MagicMock,
     mock_context: MagicMock,
 ):
@@ -331,17 +351,72 @@ async def test_innkeeper_reservations_list(
     mock_rec_1.serialize.return_value = {"reservation_id": "res-1"}
     mock_rec_2 = MagicMock(spec=ReservationRecord)
     mock_rec_2.serialize.return_value = {"reservation_id": "res-2"}
-    MockReservationRecordCls.query = AsyncMock(return_value=[mock_rec_1, mock_rec_2])
+    mock_query_page.return_value = ([mock_rec_1, mock_rec_2], 2)
 
     response = await test_module.innkeeper_reservations_list(mock_request)
 
     assert profile.settings.get("wallet.innkeeper") is True
     mock_context.inject.assert_called_once_with(test_module.TenantManager)
-    MockReservationRecordCls.query.assert_awaited_once_with(
-        session=ANY, tag_filter={}, post_filter_positive={}, alt=True
+    mock_query_page.assert_awaited_once_with(
+        ANY, MockReservationRecordCls, {}, limit=None, offset=0, post_filter=None, descending=False
     )
     assert response.status == 200
-    assert json.loads(response.body) == {"results": [{"reservation_id": "res-1"}, {"reservation_id": "res-2"}]}
+    assert json.loads(response.body) == {
+        "results": [{"reservation_id": "res-1"}, {"reservation_id": "res-2"}],
+        "total": 2,
+        "limit": None,
+        "offset": 0,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+@patch(f"{test_module.__name__}.query_records_page", new_callable=AsyncMock)
+async def test_innkeeper_reservations_list_requested_page(
+    mock_query_page: AsyncMock,
+    mock_request: MagicMock,
+):
+    """Test GET /innkeeper/reservations/ for a page of the approval queue."""
+    mock_request.query.update(
+        {"state": ReservationRecord.STATE_REQUESTED, "tenant_name": "Acme", "limit": "25", "offset": "50"}
+    )
+    mock_query_page.return_value = ([], 60)
+
+    response = await test_module.innkeeper_reservations_list(mock_request)
+
+    mock_query_page.assert_awaited_once_with(
+        ANY,
+        ReservationRecord,
+        {"state": ReservationRecord.STATE_REQUESTED},
+        limit=25,
+        offset=50,
+        post_filter=ANY,
+        descending=False,
+    )
+    assert json.loads(response.body) == {"results": [], "total": 60, "limit": 25, "offset": 50}
+    # the name prefix is matched in process, ignoring case
+    post_filter = mock_query_page.await_args.kwargs["post_filter"]
+    assert post_filter(ReservationRecord(tenant_name="acme corp"))
+    assert not post_filter(ReservationRecord(tenant_name="Other"))
+
+
+@pytest.mark.asyncio
+async def test_innkeeper_reservations_list_name_prefix_askar(mock_request: MagicMock, askar_profile: Profile):
+    """Test the tenant name prefix against Askar, where tenant_name is an encrypted tag."""
+    async with askar_profile.session() as session:
+        for name in ("Acme Corp", "acme labs", "Other", "Acme Three"):
+            await ReservationRecord(
+                state=ReservationRecord.STATE_REQUESTED,
+                tenant_name=name,
+                contact_email="a@example.com",
+            ).save(session)
+    mock_request.query.update({"tenant_name": "acme", "limit": "2", "offset": "1"})
+
+    response = await test_module.innkeeper_reservations_list(mock_request)
+
+    body = json.loads(response.body)
+    assert body["total"] == 3
+    assert [result["tenant_name"] for result in body["results"]] == ["acme labs", "Acme Three"]
 
 
 # Test Reservation Approve (PUT /innkeeper/reservations/{reservation_id}/approve)
@@ -512,9 +587,11 @@ async def test_innkeeper_reservations_deny_conflict(
 # Test Tenants List (GET /innkeeper/tenants/)
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
+@patch(f"{test_module.__name__}.query_records_page", new_callable=AsyncMock)
 @patch(f"{test_module.__name__}.TenantRecord", autospec=True)
 async def test_innkeeper_tenants_list_default(
     MockTenantRecordCls: MagicMock,
+    mock_query_page: AsyncMock,
     mock_request: MagicMock,
     mock_context: MagicMock,
 ):
@@ -528,28 +605,39 @@ async def test_innkeeper_tenants_list_default(
         "tenant_id": "t-1",
         "state": TenantRecord.STATE_ACTIVE,
     }
-    MockTenantRecordCls.query = AsyncMock(return_value=[mock_rec_1])
+    mock_query_page.return_value = ([mock_rec_1], 1)
 
     response = await test_module.innkeeper_tenants_list(mock_request)
 
     assert profile.settings.get("wallet.innkeeper") is True
     mock_context.inject.assert_called_once_with(test_module.TenantManager)
-    # Default filter is state=active
-    MockTenantRecordCls.query.assert_awaited_once_with(
-        session=ANY,
-        tag_filter={"state": TenantRecord.STATE_ACTIVE},
-        post_filter_positive={},
-        alt=True,
+    # Default filter is state=active, unpaged, created order
+    mock_query_page.assert_awaited_once_with(
+        ANY,
+        MockTenantRecordCls,
+        {"state": TenantRecord.STATE_ACTIVE},
+        limit=None,
+        offset=0,
+        sort_key=None,
+        post_filter=None,
+        descending=False,
     )
     assert response.status == 200
-    assert json.loads(response.body) == {"results": [{"tenant_id": "t-1", "state": TenantRecord.STATE_ACTIVE}]}
+    assert json.loads(response.body) == {
+        "results": [{"tenant_id": "t-1", "state": TenantRecord.STATE_ACTIVE}],
+        "total": 1,
+        "limit": None,
+        "offset": 0,
+    }
 
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
+@patch(f"{test_module.__name__}.query_records_page", new_callable=AsyncMock)
 @patch(f"{test_module.__name__}.TenantRecord", autospec=True)
 async def test_innkeeper_tenants_list_deleted(
     MockTenantRecordCls: MagicMock,
+    mock_query_page: AsyncMock,
     mock_request: MagicMock,
     mock_context: MagicMock,
 ):
@@ -565,27 +653,33 @@ async def test_innkeeper_tenants_list_deleted(
         "tenant_id": "t-del",
         "state": TenantRecord.STATE_DELETED,
     }
-    MockTenantRecordCls.query = AsyncMock(return_value=[mock_rec_1])
+    mock_query_page.return_value = ([mock_rec_1], 1)
 
     response = await test_module.innkeeper_tenants_list(mock_request)
 
     assert profile.settings.get("wallet.innkeeper") is True
     mock_context.inject.assert_called_once_with(test_module.TenantManager)
-    MockTenantRecordCls.query.assert_awaited_once_with(
-        session=ANY,
-        tag_filter={"state": TenantRecord.STATE_DELETED},
-        post_filter_positive={},
-        alt=True,
+    mock_query_page.assert_awaited_once_with(
+        ANY,
+        MockTenantRecordCls,
+        {"state": TenantRecord.STATE_DELETED},
+        limit=None,
+        offset=0,
+        sort_key=None,
+        post_filter=None,
+        descending=False,
     )
     assert response.status == 200
-    assert json.loads(response.body) == {"results": [{"tenant_id": "t-del", "state": TenantRecord.STATE_DELETED}]}
+    assert json.loads(response.body)["results"] == [{"tenant_id": "t-del", "state": TenantRecord.STATE_DELETED}]
 
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
+@patch(f"{test_module.__name__}.query_records_page", new_callable=AsyncMock)
 @patch(f"{test_module.__name__}.TenantRecord", autospec=True)
 async def test_innkeeper_tenants_list_all(
     MockTenantRecordCls: MagicMock,
+    mock_query_page: AsyncMock,
     mock_request: MagicMock,
     mock_context: MagicMock,
 ):
@@ -606,21 +700,76 @@ async def test_innkeeper_tenants_list_all(
         "tenant_id": "t-del",
         "state": TenantRecord.STATE_DELETED,
     }
-    MockTenantRecordCls.query = AsyncMock(return_value=[mock_rec_1, mock_rec_2])
+    mock_query_page.return_value = ([mock_rec_1, mock_rec_2], 2)
 
     response = await test_module.innkeeper_tenants_list(mock_request)
 
     assert profile.settings.get("wallet.innkeeper") is True
     mock_context.inject.assert_called_once_with(test_module.TenantManager)
     # No state filter when state=all
-    MockTenantRecordCls.query.assert_awaited_once_with(session=ANY, tag_filter={}, post_filter_positive={}, alt=True)
+    assert mock_query_page.await_args.args[2] == {}
     assert response.status == 200
-    assert json.loads(response.body) == {
-        "results": [
-            {"tenant_id": "t-1", "state": TenantRecord.STATE_ACTIVE},
-            {"tenant_id": "t-del", "state": TenantRecord.STATE_DELETED},
-        ]
-    }
+    assert json.loads(response.body)["results"] == [
+        {"tenant_id": "t-1", "state": TenantRecord.STATE_ACTIVE},
+        {"tenant_id": "t-del", "state": TenantRecord.STATE_DELETED},
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+@patch(f"{test_module.__name__}.query_records_page", new_callable=AsyncMock)
+async def test_innkeeper_tenants_list_paged(
+    mock_query_page: AsyncMock,
+    mock_request: MagicMock,
+):
+    """Test GET /innkeeper/tenants/ with paging, name prefix and ordering."""
+    mock_request.query.update(
+        {
+            "limit": "10",
+            "offset": "20",
+            "tenant_name": "Acme",
+            "order_by": "tenant_name",
+            "descending": "true",
+        }
+    )
+    mock_query_page.return_value = ([], 25)
+
+    response = await test_module.innkeeper_tenants_list(mock_request)
+
+    mock_query_page.assert_awaited_once_with(
+        ANY,
+        TenantRecord,
+        {"state": TenantRecord.STATE_ACTIVE},
+        limit=10,
+        offset=20,
+        sort_key=test_module.tenant_name_sort_key,
+        post_filter=ANY,
+        descending=True,
+    )
+    assert json.loads(response.body) == {"results": [], "total": 25, "limit": 10, "offset": 20}
+
+
+@pytest.mark.asyncio
+async def test_innkeeper_tenants_list_name_prefix_askar(mock_request: MagicMock, askar_profile: Profile):
+    """Test the tenant name prefix against Askar, where tenant_name is an encrypted tag."""
+    async with askar_profile.session() as session:
+        for name, state in (
+            ("Acme Corp", TenantRecord.STATE_ACTIVE),
+            ("acme labs", TenantRecord.STATE_ACTIVE),
+            ("Acme Gone", TenantRecord.STATE_DELETED),
+            ("Other", TenantRecord.STATE_ACTIVE),
+        ):
+            await TenantRecord(tenant_name=name, wallet_id=name, state=state).save(session)
+
+    mock_request.query.update({"tenant_name": "ACME"})
+    body = json.loads((await test_module.innkeeper_tenants_list(mock_request)).body)
+    assert body["total"] == 2
+    assert [result["tenant_name"] for result in body["results"]] == ["Acme Corp", "acme labs"]
+
+    mock_request.query.update({"state": "all", "order_by": "tenant_name", "descending": "true", "limit": "2"})
+    body = json.loads((await test_module.innkeeper_tenants_list(mock_request)).body)
+    assert body["total"] == 3
+    assert [result["tenant_name"] for result in body["results"]] == ["acme labs", "Acme Gone"]
 
 
 # Test Tenant Get (GET /innkeeper/tenants/{tenant_id})
@@ -639,7 +788,7 @@ async def test_innkeeper_tenant_get(
     mock_request._set_match_info("tenant_id", TEST_TENANT_ID)
 
     # Mock TenantRecord retrieval
-    mock_tenant_rec = MagicMock(spec=TenantRecord)
+    mock_tenant_rec = MagicMock(spec=TenantRecord, _id=TEST_TENANT_ID, updated_at="2024-01-01T00:00:00.000000Z")
     mock_tenant_rec.serialize.return_value = {"tenant_id": TEST_TENANT_ID}
     MockTenantRecordCls.retrieve_by_id = AsyncMock(return_value=mock_tenant_rec)
 
@@ -745,6 +894,30 @@ async def test_innkeeper_tenant_hard_delete(
     assert json.loads(response.body) == {"success": f"Tenant {TEST_TENANT_ID} hard deleted."}
 
 
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+async def test_innkeeper_tenant_hard_delete_background(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_tenant_mgr: MagicMock,
+):
+    """Test ?background=true hard deletes the tenant in a job."""
+    mock_request._set_match_info("tenant_id", TEST_TENANT_ID)
+    mock_request.query["background"] = "true"
+    mock_context.inject.return_value = mock_tenant_mgr
+    job = JobRecord(job_id="j1", job_type="tenant_hard_delete", total=1)
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        mock_jobs.start = AsyncMock(return_value=job)
+        response = await test_module.innkeeper_tenant_hard_delete(mock_request)
+
+    assert response.status == 202
+    assert json.loads(response.body)["state"] == JobRecord.STATE_PENDING
+    mock_jobs.start.assert_awaited_once_with("tenant_hard_delete", ANY, total=1)
+    await mock_jobs.start.call_args.args[1](job)
+    mock_tenant_mgr.hard_delete_tenants.assert_awaited_once_with([TEST_TENANT_ID], job)
+
+
 # Test Tenant Restore (PUT /innkeeper/tenants/{tenant_id}/restore)
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
@@ -799,6 +972,182 @@ async def test_innkeeper_tenant_restore_not_deleted(
     MockTenantRecordCls.retrieve_by_id.assert_awaited_once_with(ANY, TEST_TENANT_ID)
 
 
+# Test Bulk Tenants (POST /innkeeper/tenants/bulk)
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+async def test_innkeeper_tenants_bulk(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_tenant_mgr: MagicMock,
+):
+    """Test POST /innkeeper/tenants/bulk streams one NDJSON line per tenant."""
+    specs = [
+        {"tenant_name": "one", "contact_email": "one@example.com"},
+        {"tenant_name": "two", "contact_email": "two@example.com"},
+    ]
+    mock_request._set_json_body({"tenants": specs})
+    mock_context.inject.return_value = mock_tenant_mgr
+
+    async def provision_tenants(specs, progress):
+        for index, spec in enumerate(specs):
+            await progress({"index": index, "tenant_name": spec["tenant_name"], "status": "created"})
+        return len(specs)
+
+    mock_tenant_mgr.provision_tenants = AsyncMock(side_effect=provision_tenants)
+    mock_response = MagicMock()
+    mock_response.prepare = AsyncMock()
+    mock_response.write = AsyncMock()
+    mock_response.write_eof = AsyncMock()
+
+    with patch.object(test_module.web, "StreamResponse", return_value=mock_response):
+        response = await test_module.innkeeper_tenants_bulk(mock_request)
+
+    assert response is mock_response
+    mock_response.prepare.assert_awaited_once_with(mock_request)
+    mock_tenant_mgr.provision_tenants.assert_awaited_once_with(specs, ANY)
+    lines = [json.loads(awaited.args[0]) for awaited in mock_response.write.await_args_list]
+    assert [line["tenant_name"] for line in lines] == ["one", "two"]
+    mock_response.write_eof.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+@pytest.mark.parametrize("count", [0, 3])
+async def test_innkeeper_tenants_bulk_size_limits(
+    count: int,
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_tenant_mgr: MagicMock,
+):
+    """Test POST /innkeeper/tenants/bulk rejects empty and oversized requests."""
+    specs = [{"tenant_name": f"t{i}", "contact_email": "e"} for i in range(count)]
+    mock_request._set_json_body({"tenants": specs})
+    mock_context.inject.return_value = mock_tenant_mgr
+
+    with pytest.raises(web.HTTPBadRequest):
+        await test_module.innkeeper_tenants_bulk(mock_request)
+    mock_tenant_mgr.provision_tenants.assert_not_called()
+
+
+# Test Bulk Tenant Changes (POST /innkeeper/tenants/bulk/...)
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+@pytest.mark.parametrize(
+    "handler, job_type, method",
+    [
+        ("innkeeper_tenants_bulk_delete", "tenant_soft_delete", "soft_delete_tenants"),
+        ("innkeeper_tenants_bulk_restore", "tenant_restore", "restore_tenants"),
+        ("innkeeper_tenants_bulk_hard_delete", "tenant_hard_delete", "hard_delete_tenants"),
+    ],
+)
+async def test_innkeeper_tenants_bulk_change(
+    handler: str,
+    job_type: str,
+    method: str,
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_tenant_mgr: MagicMock,
+):
+    """Test the bulk change endpoints start a job for the de-duplicated tenant ids."""
+    mock_request._set_json_body({"tenant_ids": ["t1", "t2", "t1"]})
+    mock_context.inject.return_value = mock_tenant_mgr
+    job = JobRecord(job_id="j1", job_type=job_type, total=2)
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        mock_jobs.start = AsyncMock(return_value=job)
+        response = await getattr(test_module, handler)(mock_request)
+
+    assert response.status == 202
+    assert json.loads(response.body)["job_id"] == job.job_id
+    mock_jobs.start.assert_awaited_once_with(job_type, ANY, total=2)
+    # the job runs the matching TenantManager method over the ids
+    run = mock_jobs.start.call_args.args[1]
+    await run(job)
+    getattr(mock_tenant_mgr, method).assert_awaited_once_with(["t1", "t2"], job)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+async def test_innkeeper_tenants_bulk_change_tag_filter(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_tenant_mgr: MagicMock,
+):
+    """Test a tag filter is resolved to tenant ids before the job starts."""
+    tag_filter = {"state": "deleted"}
+    mock_request._set_json_body({"tag_filter": tag_filter, "tenant_name_prefix": "test-"})
+    mock_context.inject.return_value = mock_tenant_mgr
+    mock_tenant_mgr.find_tenant_ids = AsyncMock(return_value=["t1", "t2", "t3"])
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        mock_jobs.start = AsyncMock(return_value=JobRecord(job_id="j1", job_type="tenant_hard_delete", total=3))
+        await test_module.innkeeper_tenants_bulk_hard_delete(mock_request)
+
+    mock_tenant_mgr.find_tenant_ids.assert_awaited_once_with(tag_filter, name_prefix="test-")
+    mock_jobs.start.assert_awaited_once_with("tenant_hard_delete", ANY, total=3)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"tenant_ids": [], "tag_filter": {}},
+        {"tenant_ids": ["t1"], "tag_filter": {"state": "active"}},
+        {"tenant_ids": ["t1"], "tenant_name_prefix": "test-"},
+        {"tenant_ids": ["t1", "t2", "t3"]},
+    ],
+)
+async def test_innkeeper_tenants_bulk_change_bad_request(
+    body: dict,
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_tenant_mgr: MagicMock,
+):
+    """Test bulk changes need exactly one of tenant_ids / tag_filter, within max_tenants."""
+    mock_request._set_json_body(body)
+    mock_context.inject.return_value = mock_tenant_mgr
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        with pytest.raises(web.HTTPBadRequest):
+            await test_module.innkeeper_tenants_bulk_delete(mock_request)
+    mock_jobs.start.assert_not_called()
+
+
+# Test Job Get (GET /innkeeper/jobs/{job_id})
+@pytest.mark.asyncio
+async def test_innkeeper_job_get(mock_request: MagicMock):
+    """Test GET /innkeeper/jobs/{job_id} returns the job progress or 404."""
+    job = JobRecord(job_id="j1", job_type="tenant_soft_delete", total=2)
+    job.item_succeeded()
+    mock_request._set_match_info("job_id", job.job_id)
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        mock_jobs.get = AsyncMock(return_value=job)
+        response = await test_module.innkeeper_job_get(mock_request)
+        assert json.loads(response.body)["processed"] == 1
+
+        mock_jobs.get.side_effect = StorageNotFoundError("no job")
+        with pytest.raises(web.HTTPNotFound):
+            await test_module.innkeeper_job_get(mock_request)
+
+
+# Test Job Cancel (POST /innkeeper/jobs/{job_id}/cancel)
+@pytest.mark.asyncio
+async def test_innkeeper_job_cancel(mock_request: MagicMock):
+    """Test POST /innkeeper/jobs/{job_id}/cancel cancels any job."""
+    job = JobRecord(job_id="j1", job_type="tenant_soft_delete", state=JobRecord.STATE_CANCELLED)
+    mock_request._set_match_info("job_id", job.job_id)
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        mock_jobs.cancel = AsyncMock(return_value=job)
+        response = await test_module.innkeeper_job_cancel(mock_request)
+
+    mock_jobs.cancel.assert_awaited_once_with("j1")
+    assert json.loads(response.body)["state"] == JobRecord.STATE_CANCELLED
+
+
 # Test Tenant Adopt (POST /innkeeper/tenants/adopt)
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
@@ -1010,9 +1359,11 @@ async def test_innkeeper_authentications_api_create(
 # Test List API Keys (GET /innkeeper/authentications/api/)
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
+@patch(f"{test_module.__name__}.query_records_page", new_callable=AsyncMock)
 @patch(f"{test_module.__name__}.TenantAuthenticationApiRecord", autospec=True)
 async def test_innkeeper_authentications_api_list(
     MockTenantAuthApiRecordCls: MagicMock,
+    mock_query_page: AsyncMock,
     mock_request: MagicMock,
     mock_context: MagicMock,
 ):
@@ -1024,21 +1375,30 @@ async def test_innkeeper_authentications_api_list(
     mock_rec_1.serialize.return_value = {"tenant_authentication_api_id": "api-1"}
     mock_rec_2 = MagicMock(spec=TenantAuthenticationApiRecord)
     mock_rec_2.serialize.return_value = {"tenant_authentication_api_id": "api-2"}
-    MockTenantAuthApiRecordCls.query = AsyncMock(return_value=[mock_rec_1, mock_rec_2])
+    mock_query_page.return_value = ([mock_rec_1, mock_rec_2], 2)
+    mock_request.query.update({"tenant_id": TEST_TENANT_ID, "limit": "2", "descending": "true"})
 
     response = await test_module.innkeeper_authentications_api_list(mock_request)
 
     assert profile.settings.get("wallet.innkeeper") is True
     mock_context.inject.assert_called_once_with(test_module.TenantManager)
-    MockTenantAuthApiRecordCls.query.assert_awaited_once_with(
-        session=ANY, tag_filter={}, post_filter_positive={}, alt=True
+    mock_query_page.assert_awaited_once_with(
+        ANY,
+        MockTenantAuthApiRecordCls,
+        {"tenant_id": TEST_TENANT_ID},
+        limit=2,
+        offset=0,
+        descending=True,
     )
     assert response.status == 200
     assert json.loads(response.body) == {
         "results": [
             {"tenant_authentication_api_id": "api-1"},
             {"tenant_authentication_api_id": "api-2"},
-        ]
+        ],
+        "total": 2,
+        "limit": 2,
+        "offset": 0,
     }
 
 
@@ -1154,3 +1514,79 @@ async def test_innkeeper_config_handler(
     assert response_body["config"]["wallet.id"] == TEST_INNKEEPER_WALLET_ID
     assert response_body["config"]["version"] == __version__
     assert response_body["config"]["some_other_setting"] == "value"
+
+
+# Test Loop Stalls (GET /innkeeper/server/loop-stalls)
+@pytest.mark.asyncio
+async def test_innkeeper_loop_stalls(mock_request: MagicMock, mock_tenant_mgr: AsyncMock):
+    """Test GET /innkeeper/server/loop-stalls lists stalls, or reports the monitor disabled."""
+    mock_request["context"].inject = mock_request["context"].profile.inject
+    mock_tenant_mgr.profile.inject_or = MagicMock(return_value=None)
+
+    response = await test_module.innkeeper_loop_stalls(mock_request)
+    assert json.loads(response.body) == {"enabled": False, "threshold_ms": None, "results": []}
+
+    stall = {"detected_at": "2024-01-01T00:00:00Z", "lag_ms": 800, "handler": "h", "stack": []}
+    monitor = MagicMock(spec=test_module.LoopMonitor, running=True, threshold_ms=250)
+    monitor.stalls.return_value = [stall]
+    mock_tenant_mgr.profile.inject_or.return_value = monitor
+
+    response = await test_module.innkeeper_loop_stalls(mock_request)
+    mock_tenant_mgr.profile.inject_or.assert_called_with(test_module.LoopMonitor)
+    assert json.loads(response.body) == {"enabled": True, "threshold_ms": 250, "results": [stall]}
+
+
+# Test Profile (POST /innkeeper/server/profile)
+@pytest.mark.asyncio
+async def test_innkeeper_profile(mock_request: MagicMock):
+    """Test POST /innkeeper/server/profile returns collapsed stacks or pstats, one at a time."""
+    profile = MagicMock(sample_count=2, duration=1.0)
+    profile.collapsed.return_value = "handler;a;b 2\n"
+    profile.pstats.return_value = b"stats"
+    mock_request.query = {"seconds": "1"}
+
+    with patch.object(test_module, "PROFILER") as mock_profiler:
+        mock_profiler.profile = AsyncMock(return_value=profile)
+        response = await test_module.innkeeper_profile(mock_request)
+        mock_profiler.profile.assert_awaited_once_with(1, test_module.DEFAULT_INTERVAL_MS / 1000)
+        assert response.text == "handler;a;b 2\n"
+
+        mock_request.query = {"format": "pstats"}
+        response = await test_module.innkeeper_profile(mock_request)
+        assert response.body == b"stats"
+        assert "attachment" in response.headers["Content-Disposition"]
+
+        mock_profiler.profile.side_effect = test_module.ProfileInProgressError("busy")
+        with pytest.raises(web.HTTPConflict):
+            await test_module.innkeeper_profile(mock_request)
+
+
+# Test Memory Tracing (/innkeeper/server/memory/...)
+@pytest.mark.asyncio
+async def test_innkeeper_memory_routes(mock_request: MagicMock):
+    """Test the memory tracing routes map tracer errors to 404 and 409."""
+    with patch.object(test_module, "MEMORY") as mock_memory:
+        mock_memory.status.return_value = {"tracing": True}
+        mock_request.body_exists = True
+        mock_request._set_json_body({"frames": 3})
+        response = await test_module.innkeeper_memory_start(mock_request)
+        mock_memory.start.assert_called_once_with(3)
+        assert json.loads(response.body) == {"tracing": True}
+
+        mock_memory.stop.side_effect = test_module.MemoryTracingError("not started")
+        with pytest.raises(web.HTTPConflict):
+            await test_module.innkeeper_memory_stop(mock_request)
+
+        mock_request._set_match_info("name", "before")
+        mock_memory.snapshot = AsyncMock(return_value={"name": "before", "size": 1, "count": 1})
+        response = await test_module.innkeeper_memory_snapshot(mock_request)
+        mock_memory.snapshot.assert_awaited_once_with("before")
+
+        mock_request.query = {"snapshot": "before", "limit": "5"}
+        mock_memory.diff = AsyncMock(return_value={"results": []})
+        response = await test_module.innkeeper_memory_diff(mock_request)
+        mock_memory.diff.assert_awaited_once_with("before", None, 5)
+
+        mock_memory.diff.side_effect = test_module.SnapshotNotFoundError("no snapshot")
+        with pytest.raises(web.HTTPNotFound):
+            await test_module.innkeeper_memory_diff(mock_request)
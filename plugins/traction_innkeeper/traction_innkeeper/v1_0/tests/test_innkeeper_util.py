@@ -4,9 +4,13 @@ from unittest.mock import MagicMock, AsyncMock, patch
 
 import bcrypt
 
+from acapy_agent.storage.askar import AskarStorage
+from acapy_agent.storage.base import BaseStorage
+
 from traction_innkeeper.v1_0.innkeeper.models import (
     ReservationRecord,
     TenantAuthenticationApiRecord,
+    TenantRecord,
 )
 from traction_innkeeper.v1_0.innkeeper.tenant_manager import TenantManager
 
@@ -14,9 +18,11 @@ from traction_innkeeper.v1_0.innkeeper.bcrypt_compat import limit_for_bcrypt
 from traction_innkeeper.v1_0.innkeeper.utils import (
     ReservationException,
     approve_reservation,
+    count_records,
     create_api_key,
     generate_api_key_data,
     generate_reservation_token_data,
+    query_records_page,
     refresh_registration_token,
 )
 
@@ -38,12 +44,12 @@ class MockTenantRecord:
     STATE_DELETED: str = "deleted"
 
 
-def test_generate_api_key_data():
+async def test_generate_api_key_data():
     """
     Test the generation of API key data.
     Verifies types and that the hash matches the generated key.
     """
-    key, salt, hash_val = generate_api_key_data()
+    key, salt, hash_val = await generate_api_key_data()
     # Check types
     assert isinstance(key, str)
     assert isinstance(salt, bytes)
@@ -58,13 +64,13 @@ def test_generate_api_key_data():
     assert bcrypt.checkpw(b"wrongpassword", hash_val) is False
 
 
-def test_generate_reservation_token_data():
+async def test_generate_reservation_token_data():
     """
     Test the generation of reservation token data.
     Verifies types, hash matching, and expiry calculation.
     """
     test_expiry_minutes = 30
-    pwd, salt, hash_val, expiry = generate_reservation_token_data(test_expiry_minutes)
+    pwd, salt, hash_val, expiry = await generate_reservation_token_data(test_expiry_minutes)
 
     # Check types
     assert isinstance(pwd, str)
@@ -118,6 +124,8 @@ async def test_create_api_key_success():
     mock_profile.session.return_value.__aexit__.return_value = None  # Or AsyncMock() if needed
     mock_manager.profile = mock_profile
 
+    mock_rec.format_api_key = MagicMock(side_effect=lambda secret: f"test-api-rec-id-123.{secret}")
+
     # 3. Call the function under test
     generated_key, returned_id = await create_api_key(mock_rec, mock_manager)
 
@@ -125,14 +133,17 @@ async def test_create_api_key_success():
     assert isinstance(generated_key, str)
     assert len(generated_key) > 0  # Key should be generated
     assert returned_id == "test-api-rec-id-123"
+    # Key is prefixed with the record id
+    prefix, secret = generated_key.split(".")
+    assert prefix == "test-api-rec-id-123"
 
     # Check that record attributes were set
     assert mock_rec.api_key_token_salt is not None
     assert mock_rec.api_key_token_hash is not None
 
-    # Verify the generated key matches the hash stored on the mock record
+    # Verify the generated secret matches the hash stored on the mock record
     assert bcrypt.checkpw(
-        generated_key.encode("utf-8"),
+        secret.encode("utf-8"),
         mock_rec.api_key_token_hash.encode("utf-8"),  # Assuming stored hash is str, adjust if bytes
     )
 
@@ -167,7 +178,10 @@ class MockReservationRecord:
 
 
 @pytest.mark.asyncio
-@patch("traction_innkeeper.v1_0.innkeeper.utils.generate_reservation_token_data")  # Patch the helper function
+@patch(
+    "traction_innkeeper.v1_0.innkeeper.utils.generate_reservation_token_data",
+    new_callable=AsyncMock,
+)  # Patch the helper function
 async def test_approve_reservation_success(mock_generate_token_data):
     """Test successful reservation approval."""
     # 1. Configure Mock for generate_reservation_token_data
@@ -213,7 +227,7 @@ async def test_approve_reservation_success(mock_generate_token_data):
 
         # 6. Assertions
         mock_retrieve.assert_awaited_once_with(mock_session, reservation_id, for_update=True)
-        mock_generate_token_data.assert_called_once_with(60)  # Check expiry used
+        mock_generate_token_data.assert_awaited_once_with(60)  # Check expiry used
 
         # Check record attributes were updated before save
         assert mock_rec.state == MockReservationRecord.STATE_APPROVED
@@ -240,6 +254,10 @@ async def test_approve_reservation_wrong_state():
 
     # 2. Mock TenantManager and session
     mock_manager = MagicMock(spec=TenantManager)
+    mock_manager._config = MagicMock()
+    mock_manager._config.reservation = MagicMock()
+    # Config needed, the token is generated before the state is checked
+    mock_manager._config.reservation.expiry_minutes = 30
     mock_session = AsyncMock()
     mock_profile = MagicMock()
     mock_profile.session.return_value.__aenter__.return_value = mock_session
@@ -259,21 +277,57 @@ async def test_approve_reservation_wrong_state():
         mock_rec.save.assert_not_awaited()
 
 
+@pytest.mark.asyncio
+async def test_reservation_tokens_hashed_before_session():
+    """Test approve and refresh hash the token before opening the session."""
+    calls = []
+
+    async def hash_password(password):
+        calls.append("hash")
+        return b"salt", b"hash"
+
+    def open_session():
+        calls.append("session")
+        ctx = MagicMock()
+        ctx.__aenter__ = AsyncMock(return_value=AsyncMock())
+        ctx.__aexit__ = AsyncMock(return_value=None)
+        return ctx
+
+    mock_manager = MagicMock(spec=TenantManager)
+    mock_manager._config = MagicMock()
+    mock_manager._config.reservation.expiry_minutes = 30
+    mock_manager.profile = MagicMock()
+    mock_manager.profile.session.side_effect = open_session
+
+    requested = AsyncMock(spec=ReservationRecord)
+    requested.state = MockReservationRecord.STATE_REQUESTED
+    approved = AsyncMock(spec=ReservationRecord)
+    approved.state = MockReservationRecord.STATE_APPROVED
+
+    with patch("traction_innkeeper.v1_0.innkeeper.utils.hashing.hash_password", hash_password):
+        with patch.object(ReservationRecord, "retrieve_by_reservation_id", return_value=requested):
+            await approve_reservation("res-1", "notes", mock_manager)
+        assert calls == ["hash", "session"]
+
+        calls.clear()
+        with patch.object(ReservationRecord, "retrieve_by_reservation_id", return_value=approved):
+            await refresh_registration_token("res-2", mock_manager)
+        assert calls == ["hash", "session"]
+
+
 @pytest.mark.asyncio
 @patch("traction_innkeeper.v1_0.innkeeper.utils.uuid")  # Patch uuid module used inside refresh function
-@patch("traction_innkeeper.v1_0.innkeeper.utils.bcrypt")  # Patch bcrypt module used inside refresh function
+@patch("traction_innkeeper.v1_0.innkeeper.utils.hashing")  # Patch hashing module used inside refresh function
 @patch("traction_innkeeper.v1_0.innkeeper.utils.datetime")  # Patch datetime module used inside refresh function
-async def test_refresh_registration_token_success(mock_datetime, mock_bcrypt, mock_uuid):
+async def test_refresh_registration_token_success(mock_datetime, mock_hashing, mock_uuid):
     """Test successful token refresh."""
     # 1. Configure mocks for token generation primitives
     test_new_pwd_uuid = "new-uuid-pwd-456"
     mock_uuid.uuid4.return_value.hex = test_new_pwd_uuid
 
     test_new_salt = b"$2b$12$abcdefghijklmnopqrstuvwx."  # Example salt bytes
-    mock_bcrypt.gensalt.return_value = test_new_salt
-
     test_new_hash = b"$2b$12$abcdefghijklmnopqrstuvwx.hashedpasswordvalue"  # Example hash bytes
-    mock_bcrypt.hashpw.return_value = test_new_hash
+    mock_hashing.hash_password = AsyncMock(return_value=(test_new_salt, test_new_hash))
 
     fixed_now = datetime.datetime(2023, 10, 27, 12, 0, 0, tzinfo=datetime.timezone.utc)
     mock_datetime.utcnow.return_value = fixed_now.replace(tzinfo=None)  # utcnow returns naive
@@ -312,8 +366,7 @@ async def test_refresh_registration_token_success(mock_datetime, mock_bcrypt, mo
 
         # Check token generation calls
         mock_uuid.uuid4.assert_called_once()
-        mock_bcrypt.gensalt.assert_called_once()
-        mock_bcrypt.hashpw.assert_called_once_with(test_new_pwd_uuid.encode("utf-8"), test_new_salt)
+        mock_hashing.hash_password.assert_awaited_once_with(test_new_pwd_uuid.encode("utf-8"))
         mock_datetime.utcnow.assert_called_once()  # Used for expiry calculation
 
         # Check record attributes were updated
@@ -391,8 +444,8 @@ async def test_refresh_registration_token_retrieval_fails():
 @pytest.mark.asyncio
 async def test_refresh_registration_token_save_fails():
     """Test token refresh fails if saving the record fails."""
-    # (Setup mocks for uuid, bcrypt, datetime as in the success case)
-    # ... (Copy mocks for uuid, bcrypt, datetime from success test) ...
+    # (Setup mocks for uuid, hashing, datetime as in the success case)
+    # ... (Copy mocks for uuid, hashing, datetime from success test) ...
 
     # 1. Mock ReservationRecord instance
     mock_rec = AsyncMock(spec=ReservationRecord)
@@ -418,7 +471,10 @@ async def test_refresh_registration_token_save_fails():
         # Use patches for token generation primitives like in success case
         with (
             patch("traction_innkeeper.v1_0.innkeeper.utils.uuid"),
-            patch("traction_innkeeper.v1_0.innkeeper.utils.bcrypt"),
+            patch(
+                "traction_innkeeper.v1_0.innkeeper.utils.hashing.hash_password",
+                AsyncMock(return_value=(b"salt", b"hash")),
+            ),
             patch("traction_innkeeper.v1_0.innkeeper.utils.datetime"),
         ):
             # 4. Call and assert exception
@@ -427,3 +483,67 @@ async def test_refresh_registration_token_save_fails():
 
             # 5. Assert save was attempted
             mock_rec.save.assert_awaited_once_with(mock_session)
+
+
+@pytest.mark.asyncio
+async def test_count_records_askar_counts_in_storage():
+    storage = MagicMock(spec=AskarStorage)
+    storage.session = MagicMock()
+    storage.session.handle.count = AsyncMock(return_value=7)
+    session = MagicMock()
+    session.inject.return_value = storage
+
+    assert await count_records(session, TenantRecord, {"state": "active"}) == 7
+    session.inject.assert_called_once_with(BaseStorage)
+    storage.session.handle.count.assert_awaited_once_with(TenantRecord.RECORD_TYPE, {"state": "active"})
+    storage.find_all_records.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_count_records_other_storage_fetches():
+    storage = MagicMock(spec=BaseStorage)
+    storage.find_all_records = AsyncMock(return_value=[MagicMock(), MagicMock()])
+    session = MagicMock()
+    session.inject.return_value = storage
+
+    assert await count_records(session, TenantRecord) == 2
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.utils.count_records", new_callable=AsyncMock)
+async def test_query_records_page_reads_page_from_storage(mock_count):
+    mock_count.return_value = 42
+    page = [MagicMock(), MagicMock()]
+    session = MagicMock()
+    with patch.object(TenantRecord, "query", AsyncMock(return_value=page)) as mock_query:
+        records, total = await query_records_page(session, TenantRecord, {"state": "active"}, limit=2, offset=4)
+
+    assert records == page
+    assert total == 42
+    mock_query.assert_awaited_once_with(
+        session,
+        {"state": "active"},
+        limit=2,
+        offset=4,
+        order_by="id",
+        descending=False,
+    )
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.utils.count_records", new_callable=AsyncMock)
+async def test_query_records_page_sorted_in_process(mock_count):
+    recs = [TenantRecord(tenant_name=name) for name in ("bravo", "Alpha", "charlie")]
+    with patch.object(TenantRecord, "query", AsyncMock(return_value=recs)):
+        records, total = await query_records_page(
+            MagicMock(),
+            TenantRecord,
+            limit=2,
+            offset=0,
+            sort_key=lambda rec: rec.tenant_name.lower(),
+            descending=True,
+        )
+
+    assert [rec.tenant_name for rec in records] == ["charlie", "bravo"]
+    assert total == 3
+    mock_count.assert_not_awaited()
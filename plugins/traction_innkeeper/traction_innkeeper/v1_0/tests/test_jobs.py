@@ -0,0 +1,258 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from acapy_agent.messaging.util import datetime_to_str
+from acapy_agent.storage.error import StorageNotFoundError
+
+from traction_innkeeper.v1_0.innkeeper.jobs import JobManager, item_progress
+from traction_innkeeper.v1_0.innkeeper.models import JobRecord
+
+OLD = datetime_to_str(datetime.now(timezone.utc) - timedelta(days=2))
+RECENT = datetime_to_str(datetime.now(timezone.utc))
+
+
+@pytest.fixture
+def mock_profile():
+    profile = MagicMock()
+    profile.session.return_value.__aenter__.return_value = AsyncMock()
+    txn = AsyncMock()
+    profile.transaction.return_value.__aenter__.return_value = txn
+    return profile, txn
+
+
+@pytest.fixture
+def saved_states():
+    states = []
+
+    async def save(self, session, *, reason=None, **kwargs):
+        if not self._id:
+            self._id = str(uuid.uuid4())
+        states.append(self.state)
+
+    with patch.object(JobRecord, "save", save):
+        yield states
+
+
+@pytest.fixture
+def manager(mock_profile, saved_states):
+    profile, _ = mock_profile
+    mgr = JobManager()
+    mgr.configure(1, 24, profile)
+    # nothing to purge in these tests
+    mgr._purge = AsyncMock()
+    return mgr
+
+
+async def _wait_for(job: JobRecord):
+    while not job.finished:
+        await asyncio.sleep(0)
+
+
+def test_job_progress():
+    job = JobRecord(job_id="j1", job_type="tenant_soft_delete", total=3)
+    job.item_succeeded(2)
+    job.item_failed("t3", "not found")
+    serialized = job.serialize()
+    assert serialized["state"] == JobRecord.STATE_PENDING
+    assert serialized["processed"] == 3
+    assert serialized["succeeded"] == 2
+    assert serialized["errors"] == [{"id": "t3", "error": "not found"}]
+    # in-process bookkeeping is not stored
+    assert "cancel_requested" not in job.value
+
+
+async def test_job_runs_in_background(manager: JobManager, saved_states: list):
+    release = asyncio.Event()
+
+    async def run(job: JobRecord):
+        await release.wait()
+        job.item_succeeded()
+
+    job = await manager.start("test", run, total=1, wallet_id="w1")
+    assert job.job_id
+    assert await manager.get(job.job_id) is job
+
+    release.set()
+    await _wait_for(job)
+    assert job.state == JobRecord.STATE_COMPLETED
+    assert job.succeeded == 1
+    assert saved_states == [JobRecord.STATE_PENDING, JobRecord.STATE_RUNNING, JobRecord.STATE_COMPLETED]
+
+
+async def test_jobs_wait_for_a_worker(manager: JobManager):
+    release = asyncio.Event()
+
+    async def run(job: JobRecord):
+        await release.wait()
+
+    first = await manager.start("test", run)
+    second = await manager.start("test", run)
+    await asyncio.sleep(0)
+    assert first.state == JobRecord.STATE_RUNNING
+    assert second.state == JobRecord.STATE_PENDING
+
+    release.set()
+    await _wait_for(second)
+    assert first.state == second.state == JobRecord.STATE_COMPLETED
+
+
+async def test_job_failure_is_recorded(manager: JobManager):
+    async def run(job: JobRecord):
+        raise ValueError("boom")
+
+    job = await manager.start("test", run)
+    await _wait_for(job)
+    assert job.state == JobRecord.STATE_FAILED
+    assert job.error == "boom"
+
+
+async def test_cancel_pending_job(manager: JobManager):
+    release = asyncio.Event()
+    ran = []
+
+    async def run(job: JobRecord):
+        ran.append(job)
+        await release.wait()
+
+    first = await manager.start("test", run)
+    second = await manager.start("test", run)
+    await asyncio.sleep(0)
+
+    await manager.cancel(second.job_id)
+    await _wait_for(second)
+    assert second.state == JobRecord.STATE_CANCELLED
+    assert ran == [first]
+
+    release.set()
+    await _wait_for(first)
+
+
+async def test_cancel_running_job_stops_at_safe_point(manager: JobManager):
+    release = asyncio.Event()
+
+    async def run(job: JobRecord):
+        await release.wait()
+        # the job decides where it stops
+        if not job.cancel_requested:
+            job.item_succeeded()
+
+    job = await manager.start("test", run)
+    await asyncio.sleep(0)
+    await manager.cancel(job.job_id)
+    assert job.state == JobRecord.STATE_RUNNING
+
+    release.set()
+    await _wait_for(job)
+    assert job.state == JobRecord.STATE_CANCELLED
+    assert job.succeeded == 0
+
+
+async def test_cancel_interruptible_job(manager: JobManager):
+    async def run(job: JobRecord):
+        await asyncio.Event().wait()
+
+    job = await manager.start("test", run, interruptible=True)
+    await asyncio.sleep(0)
+    await manager.cancel(job.job_id)
+    await _wait_for(job)
+    assert job.state == JobRecord.STATE_CANCELLED
+
+
+async def test_get_is_scoped_to_wallet(manager: JobManager):
+    job = JobRecord(job_id="j1", job_type="schema_sync", wallet_id="w1", state=JobRecord.STATE_COMPLETED)
+
+    with patch.object(JobRecord, "retrieve_by_id", AsyncMock(return_value=job)):
+        assert await manager.get("j1") is job
+        assert await manager.get("j1", "w1") is job
+        with pytest.raises(StorageNotFoundError):
+            await manager.get("j1", "w2")
+        # finished jobs are left as they are
+        assert (await manager.cancel("j1")).state == JobRecord.STATE_COMPLETED
+
+
+async def test_recover_fails_stale_jobs(manager: JobManager, mock_profile, saved_states: list):
+    _, txn = mock_profile
+    stale = JobRecord(job_id="j1", job_type="test", state=JobRecord.STATE_RUNNING, updated_at=OLD)
+    alive = JobRecord(job_id="j2", job_type="test", state=JobRecord.STATE_RUNNING, updated_at=RECENT)
+
+    with patch.object(JobRecord, "query", AsyncMock(return_value=[stale, alive])):
+        await manager.recover()
+
+    assert stale.state == JobRecord.STATE_FAILED
+    assert alive.state == JobRecord.STATE_RUNNING
+    assert saved_states == [JobRecord.STATE_FAILED]
+    txn.commit.assert_awaited_once()
+
+
+async def test_purge_deletes_old_finished_jobs(mock_profile):
+    profile, txn = mock_profile
+    manager = JobManager()
+    manager.configure(1, 24, profile)
+    old = JobRecord(job_id="j1", job_type="test", state=JobRecord.STATE_COMPLETED, updated_at=OLD)
+    recent = JobRecord(job_id="j2", job_type="test", state=JobRecord.STATE_FAILED, updated_at=RECENT)
+    mock_query = AsyncMock(return_value=[old, recent])
+
+    with (
+        patch.object(JobRecord, "query", mock_query),
+        patch.object(JobRecord, "delete_record", autospec=True) as mock_delete,
+    ):
+        await manager._purge()
+        # purges are throttled
+        await manager._purge()
+
+    mock_delete.assert_awaited_once_with(old, txn)
+    mock_query.assert_awaited_once()
+
+
+async def test_progress_during_save_stays_dirty(mock_profile):
+    profile, _ = mock_profile
+    manager = JobManager()
+    manager.configure(1, 24, profile)
+    job = JobRecord(job_id="j1", job_type="schema_sync", total=2)
+    job.item_succeeded()
+
+    async def save(self, session, *, reason=None, **kwargs):
+        # progress recorded while the save is awaited is not in the saved value
+        job.item_succeeded()
+
+    with patch.object(JobRecord, "save", save):
+        await manager._save(job, "Job progress")
+    assert job.dirty
+
+    with patch.object(JobRecord, "save", AsyncMock(side_effect=Exception("boom"))):
+        job.dirty = False
+        job.item_succeeded()
+        with pytest.raises(Exception):
+            await manager._save(job, "Job progress")
+    assert job.dirty
+
+
+async def test_item_progress():
+    job = JobRecord(job_id="j1", job_type="schema_sync")
+    progress = item_progress(job, "schema_id")
+
+    await progress({"schema_id": "s1", "status": "added", "done": 1, "total": 2})
+    await progress({"schema_id": "s2", "status": "error", "error": "boom", "done": 2, "total": 2})
+
+    assert job.total == 2
+    assert job.succeeded == 1
+    assert job.errors == [{"id": "s2", "error": "boom"}]
+
+
+async def test_item_progress_resolved_ahead():
+    job = JobRecord(job_id="j1", job_type="cred_def_sync")
+    progress = item_progress(job, "cred_def_id")
+
+    await progress({"cred_def_id": "c1", "status": "resolved", "done": 1, "total": 2})
+    await progress({"cred_def_id": "c2", "status": "resolved", "done": 2, "total": 2})
+    # progress shows before the batch is saved
+    assert job.processed == 2
+
+    await progress({"cred_def_id": "c1", "status": "added", "done": 2, "total": 2})
+    await progress({"cred_def_id": "c2", "status": "error", "error": "boom", "done": 2, "total": 2})
+    assert job.succeeded == 1
+    assert job.failed == 1
+    assert job.errors == [{"id": "c2", "error": "boom"}]
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from traction_innkeeper.v1_0.innkeeper.ledger_cache import (
+    CRED_DEF,
+    SCHEMA,
+    LedgerObjectCache,
+    ledger_key,
+)
+
+LEDGER = "test-ledger"
+
+
+def test_get_put_counts_hits_and_misses():
+    cache = LedgerObjectCache(max_size=10)
+    assert cache.get(LEDGER, SCHEMA, "s1") is None
+    cache.put(LEDGER, SCHEMA, "s1", {"schema": {"id": "s1"}})
+    assert cache.get(LEDGER, SCHEMA, "s1") == {"schema": {"id": "s1"}}
+    assert cache.get(LEDGER, CRED_DEF, "s1") is None
+    assert cache.get("other-ledger", SCHEMA, "s1") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["size"] == 1
+
+
+def test_cached_value_is_a_copy():
+    cache = LedgerObjectCache(max_size=10)
+    cache.put(LEDGER, CRED_DEF, "c1", {"tag": "default"})
+    cache.get(LEDGER, CRED_DEF, "c1")["tag"] = "changed"
+    assert cache.get(LEDGER, CRED_DEF, "c1") == {"tag": "default"}
+
+
+def test_lru_eviction():
+    cache = LedgerObjectCache(max_size=2)
+    cache.put(LEDGER, CRED_DEF, "c1", {"tag": "1"})
+    cache.put(LEDGER, CRED_DEF, "c2", {"tag": "2"})
+    cache.get(LEDGER, CRED_DEF, "c1")
+    cache.put(LEDGER, CRED_DEF, "c3", {"tag": "3"})
+    assert cache.get(LEDGER, CRED_DEF, "c2") is None
+    assert cache.get(LEDGER, CRED_DEF, "c1") is not None
+    assert cache.evictions == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = LedgerObjectCache(max_size=0)
+    cache.put(LEDGER, CRED_DEF, "c1", {"tag": "1"})
+    assert cache.get(LEDGER, CRED_DEF, "c1") is None
+
+
+@pytest.mark.asyncio
+async def test_flush_and_load(tmp_path):
+    path = str(tmp_path / "ledger_cache.json")
+    cache = LedgerObjectCache(max_size=10, persist_path=path)
+    cache.put(LEDGER, CRED_DEF, "c1", {"tag": "1"})
+    cache.put(LEDGER, CRED_DEF, "c2", {"tag": "2"})
+    await cache.flush()
+    assert len(json.loads(open(path).read())) == 2
+
+    reloaded = LedgerObjectCache(max_size=1, persist_path=path)
+    # loaded in LRU order, so trimming keeps the most recent entry
+    assert reloaded.get(LEDGER, CRED_DEF, "c1") is None
+    assert reloaded.get(LEDGER, CRED_DEF, "c2") == {"tag": "2"}
+
+
+@pytest.mark.asyncio
+async def test_flush_only_when_dirty(tmp_path):
+    cache = LedgerObjectCache(max_size=10, persist_path=str(tmp_path / "ledger_cache.json"))
+    with patch.object(cache, "_write") as mock_write:
+        await cache.flush()
+        mock_write.assert_not_called()
+        cache.put(LEDGER, CRED_DEF, "c1", {"tag": "1"})
+        await cache.flush()
+        await cache.flush()
+        mock_write.assert_called_once()
+
+
+def test_load_ignores_corrupt_file(tmp_path):
+    path = tmp_path / "ledger_cache.json"
+    path.write_text("not json")
+    cache = LedgerObjectCache(max_size=10, persist_path=str(path))
+    assert cache.stats()["size"] == 0
+
+
+def test_load_drops_entries_without_ledger(tmp_path):
+    path = tmp_path / "ledger_cache.json"
+    path.write_text(json.dumps({"cred_def::c1": {"tag": "1"}, f"{LEDGER}::cred_def::c2": {"tag": "2"}}))
+    cache = LedgerObjectCache(max_size=10, persist_path=str(path))
+    assert cache.stats()["size"] == 1
+    assert cache.get(LEDGER, CRED_DEF, "c2") == {"tag": "2"}
+
+
+@pytest.mark.asyncio
+async def test_schedule_flush_batches_writes(tmp_path):
+    cache = LedgerObjectCache(max_size=10, persist_path=str(tmp_path / "ledger_cache.json"), flush_interval=0.01)
+    with patch.object(cache, "_write") as mock_write:
+        for n in range(3):
+            cache.put(LEDGER, CRED_DEF, f"c{n}", {"tag": str(n)})
+            cache.schedule_flush()
+        mock_write.assert_not_called()
+        await asyncio.sleep(0.05)
+        mock_write.assert_called_once()
+        assert len(mock_write.call_args.args[1]) == 3
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_changes(tmp_path):
+    path = tmp_path / "ledger_cache.json"
+    cache = LedgerObjectCache(max_size=10, persist_path=str(path), flush_interval=60)
+    cache.put(LEDGER, CRED_DEF, "c1", {"tag": "1"})
+    cache.schedule_flush()
+    await cache.close()
+    assert json.loads(path.read_text()) == {f"{LEDGER}::cred_def::c1": {"tag": "1"}}
+
+
+def test_ledger_key():
+    profile = MagicMock(settings={"ledger.write_ledger": "bcovrin-test", "ledger.pool_name": "pool"})
+    assert ledger_key(profile) == "bcovrin-test"
+    profile.settings = {"ledger.pool_name": "pool"}
+    assert ledger_key(profile) == "pool"
+    profile.settings = {}
+    assert ledger_key(profile) == "default"
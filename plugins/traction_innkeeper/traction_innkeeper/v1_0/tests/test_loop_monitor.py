@@ -0,0 +1,79 @@
+import asyncio
+import functools
+import time
+from unittest.mock import patch
+
+from traction_innkeeper.v1_0.innkeeper import loop_monitor
+from traction_innkeeper.v1_0.innkeeper.config import LoopMonitorConfig
+from traction_innkeeper.v1_0.innkeeper.loop_monitor import LoopMonitor
+
+
+def _config(**kwargs) -> LoopMonitorConfig:
+    config = LoopMonitorConfig.default()
+    return config.model_copy(update={"enabled": True, "interval_ms": 10, "threshold_ms": 50, **kwargs})
+
+
+def passes_through(func):
+    @functools.wraps(func)
+    async def wrapper(request):
+        return await func(request)
+
+    return wrapper
+
+
+@passes_through
+async def blocking_handler(request):
+    time.sleep(0.2)
+    return "done"
+
+
+async def middleware(request, handler):
+    return await handler(request)
+
+
+async def _settle(monitor: LoopMonitor):
+    # let the monitor come back from the stall and report it
+    for _ in range(10):
+        await asyncio.sleep(0.02)
+        if monitor.stalls():
+            return
+
+
+async def test_stall_is_attributed_to_plugin_handler():
+    monitor = LoopMonitor(_config())
+    monitor.start()
+    await asyncio.sleep(0.03)
+    try:
+        # the functions of this module stand in for the plugin's
+        with patch.object(loop_monitor, "PLUGIN_MODULE", __name__):
+            assert await asyncio.get_running_loop().create_task(middleware(None, blocking_handler)) == "done"
+            await _settle(monitor)
+    finally:
+        await monitor.stop()
+
+    [stall] = monitor.stalls()
+    assert stall["lag_ms"] >= 100
+    assert stall["handler"] == f"{__name__}.blocking_handler"
+    assert any("blocking_handler" in line for line in stall["stack"])
+    assert not monitor.running
+
+
+async def test_no_stall_below_threshold():
+    monitor = LoopMonitor(_config(threshold_ms=500))
+    monitor.start()
+    try:
+        time.sleep(0.05)
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert monitor.stalls() == []
+
+
+async def test_recent_stalls_are_bounded():
+    monitor = LoopMonitor(_config(max_stalls=2))
+    for lag in (0.1, 0.2, 0.3):
+        monitor._stalled(lag)
+
+    assert [stall["lag_ms"] for stall in monitor.stalls()] == [300, 200]
+    assert monitor.stalls()[0]["handler"] is None
@@ -0,0 +1,105 @@
+import threading
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+
+from traction_innkeeper.v1_0.innkeeper import memory
+from traction_innkeeper.v1_0.innkeeper.memory import (
+    MemoryTracer,
+    MemoryTracingError,
+    SnapshotNotFoundError,
+)
+
+# kept alive between snapshots so the diff sees them
+LEAKED = []
+
+
+@pytest.fixture
+def tracer():
+    tracer = MemoryTracer()
+    yield tracer
+    LEAKED.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def leak():
+    LEAKED.extend(bytearray(1024) for _ in range(200))
+
+
+async def test_diff_groups_allocations_by_module(tracer: MemoryTracer):
+    tracer.start()
+    await tracer.snapshot("before")
+    leak()
+    await tracer.snapshot("after")
+
+    # the functions of this module stand in for the plugin's
+    with patch.object(memory, "PLUGIN_MODULE", __name__):
+        diff = await tracer.diff("before", "after", limit=5)
+
+    [entry] = [entry for entry in diff["results"] if entry["module"] == __name__]
+    assert entry["size_diff"] >= 200 * 1024
+    assert entry["count_diff"] >= 200
+    assert entry["plugin"] is True
+    assert diff["plugin_results"] == [entry]
+    assert diff["plugin_size_diff"] == entry["size_diff"]
+    assert len(diff["results"]) <= 5
+
+
+async def test_diff_to_memory_in_use(tracer: MemoryTracer):
+    tracer.start()
+    await tracer.snapshot("before")
+    leak()
+
+    diff = await tracer.diff("before")
+    assert any(entry["module"] == __name__ for entry in diff["results"])
+
+
+async def test_snapshots_need_tracing(tracer: MemoryTracer):
+    with pytest.raises(MemoryTracingError):
+        await tracer.snapshot("before")
+
+    tracer.start()
+    with pytest.raises(MemoryTracingError):
+        tracer.start()
+    with pytest.raises(SnapshotNotFoundError):
+        await tracer.diff("missing")
+
+    await tracer.snapshot("before")
+    assert tracer.status()["snapshots"] == ["before"]
+    tracer.stop()
+    assert tracer.status() == {
+        "tracing": False,
+        "frames": None,
+        "traced_size": 0,
+        "traced_peak": 0,
+        "snapshots": [],
+    }
+
+
+async def test_snapshots_are_bounded(tracer: MemoryTracer):
+    tracer.start()
+    with patch.object(memory, "MAX_SNAPSHOTS", 2):
+        for name in ("a", "b", "c", "b"):
+            await tracer.snapshot(name)
+
+    assert tracer.status()["snapshots"] == ["c", "b"]
+
+
+async def test_snapshot_is_filtered_and_summed_off_the_loop(tracer: MemoryTracer):
+    tracer.start()
+    threads = []
+    take_filtered_snapshot = memory._take_filtered_snapshot
+
+    def take():
+        threads.append(threading.get_ident())
+        return take_filtered_snapshot()
+
+    with patch.object(memory, "_take_filtered_snapshot", take):
+        result = await tracer.snapshot("before")
+
+    assert threads and threads[0] != threading.get_ident()
+    assert result["name"] == "before"
+    assert result["size"] > 0
+    assert result["count"] > 0
@@ -0,0 +1,225 @@
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+
+from traction_innkeeper.v1_0.innkeeper import metrics
+from traction_innkeeper.v1_0.innkeeper.metrics import (
+    EVENT_HANDLER_SECONDS,
+    EVENT_HANDLER_SESSIONS,
+    EVENT_HANDLER_STORAGE_OPS,
+    REQUEST_SECONDS,
+    REQUEST_SESSIONS,
+    REQUEST_STORAGE_OPS,
+    SESSIONS_HEADER,
+    STORAGE_OPS_HEADER,
+    STORAGE_OPS_TOTAL,
+    Histogram,
+    MetricsRegistry,
+    cache_stats,
+    configure_storage_budget,
+    instrument_profile,
+    instrument_storage,
+    metrics_middleware,
+    timed_event_handler,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.METRICS.clear()
+    yield
+    metrics.METRICS.clear()
+    configure_storage_budget(0, 0)
+
+
+class FakeStorage:
+    async def get_record(self, record_type, record_id):
+        return record_id
+
+    async def find_all_records(self, record_type, tag_query=None):
+        return []
+
+
+class FakeProfile:
+    def session(self, context=None):
+        return "session"
+
+    def transaction(self, context=None):
+        return "transaction"
+
+
+def _request(handler, canonical="/innkeeper/tenants/{tenant_id}", module="traction_innkeeper.v1_0.innkeeper.routes"):
+    handler.__module__ = module
+    request = MagicMock(spec=web.Request)
+    request.method = "GET"
+    request.match_info.handler = handler
+    request.match_info.route.resource.canonical = canonical
+    return request
+
+
+def test_histogram_render():
+    histogram = Histogram("latency", "Latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+    assert "# TYPE latency histogram" in lines
+    assert 'latency_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_count{route="/a"} 3' in lines
+
+
+def test_cache_stats():
+    assert cache_stats(3, 1, size=2) == {"size": 2, "hits": 3, "misses": 1, "hit_ratio": 0.75}
+    assert cache_stats(0, 0)["hit_ratio"] == 0.0
+
+
+def test_cache_stats_are_read_at_render():
+    registry = MetricsRegistry()
+    cache = MagicMock()
+    cache.stats.return_value = {"hits": 3, "misses": 1, "hit_ratio": 0.75, "size": 2}
+    registry.register_cache("tenant", cache)
+
+    text = registry.render()
+    assert 'traction_innkeeper_cache_hits_total{cache="tenant"} 3' in text
+    assert 'traction_innkeeper_cache_hit_ratio{cache="tenant"} 0.75' in text
+    cache.stats.assert_called_once()
+
+
+async def test_middleware_times_plugin_routes_and_counts_storage_ops():
+    instrument_storage(FakeStorage)
+    instrument_storage(FakeStorage)  # a second call does not count twice
+    storage = FakeStorage()
+
+    async def handler(request):
+        await storage.get_record("innkeeper_tenant", "t1")
+        await storage.find_all_records("innkeeper_tenant")
+        return web.json_response({})
+
+    response = await metrics_middleware(_request(handler), handler)
+
+    assert response.status == 200
+    route = ("GET", "/innkeeper/tenants/{tenant_id}")
+    assert REQUEST_SECONDS.count(*route, "200") == 1
+    assert REQUEST_STORAGE_OPS.count(*route) == 1
+    assert REQUEST_STORAGE_OPS._series[route][1] == 2
+    assert STORAGE_OPS_TOTAL.value("get_record") == 1
+
+    # operations outside a request are only counted in total
+    await storage.get_record("innkeeper_tenant", "t1")
+    assert STORAGE_OPS_TOTAL.value("get_record") == 2
+    assert REQUEST_STORAGE_OPS._series[route][1] == 2
+
+
+async def test_middleware_records_http_errors():
+    async def handler(request):
+        raise web.HTTPNotFound()
+
+    with pytest.raises(web.HTTPNotFound):
+        await metrics_middleware(_request(handler), handler)
+    assert REQUEST_SECONDS.count("GET", "/innkeeper/tenants/{tenant_id}", "404") == 1
+
+
+async def test_middleware_skips_other_routes():
+    async def handler(request):
+        return web.json_response({})
+
+    await metrics_middleware(_request(handler, "/status", "acapy_agent.admin.routes"), handler)
+    assert REQUEST_SECONDS._series == {}
+
+
+async def test_timed_event_handler():
+    @timed_event_handler
+    async def schemas_event_handler(profile, event):
+        return "done"
+
+    assert await schemas_event_handler(MagicMock(), MagicMock()) == "done"
+    assert EVENT_HANDLER_SECONDS.count("schemas_event_handler") == 1
+
+
+async def test_storage_usage_per_request_and_event_handler(caplog):
+    instrument_storage(FakeStorage)
+    instrument_profile(FakeProfile)
+    instrument_profile(FakeProfile)  # a second call does not count twice
+    configure_storage_budget(max_operations=1, max_sessions=0, usage_headers=True)
+    storage = FakeStorage()
+    profile = FakeProfile()
+
+    @timed_event_handler
+    async def schemas_event_handler(profile, event):
+        profile.session()
+        await storage.get_record("schema_storage", "s1")
+
+    async def handler(request):
+        assert profile.transaction() == "transaction"
+        profile.session()
+        await storage.get_record("innkeeper_tenant", "t1")
+        # the event handler's usage is its own
+        await schemas_event_handler(profile, MagicMock())
+        await storage.get_record("innkeeper_tenant", "t1")
+        return web.json_response({})
+
+    with caplog.at_level(logging.WARNING, logger=metrics.__name__):
+        response = await metrics_middleware(_request(handler), handler)
+
+    assert response.headers[STORAGE_OPS_HEADER] == "2"
+    assert response.headers[SESSIONS_HEADER] == "2"
+    route = ("GET", "/innkeeper/tenants/{tenant_id}")
+    assert REQUEST_STORAGE_OPS._series[route][1] == 2
+    assert REQUEST_SESSIONS._series[route][1] == 2
+    assert EVENT_HANDLER_STORAGE_OPS._series[("schemas_event_handler",)][1] == 1
+    assert EVENT_HANDLER_SESSIONS._series[("schemas_event_handler",)][1] == 1
+    # only the request went over the budget
+    [warning] = caplog.messages
+    assert warning.startswith("GET /innkeeper/tenants/{tenant_id} used 2 storage operations and 2 sessions")
+
+
+async def test_usage_headers_only_in_debug_mode():
+    configure_storage_budget(0, 0, usage_headers=False)
+
+    async def handler(request):
+        return web.json_response({})
+
+    response = await metrics_middleware(_request(handler), handler)
+    assert STORAGE_OPS_HEADER not in response.headers
+
+    configure_storage_budget(0, 0, usage_headers=True)
+
+    async def not_found(request):
+        raise web.HTTPNotFound()
+
+    with pytest.raises(web.HTTPNotFound) as err:
+        await metrics_middleware(_request(not_found), not_found)
+    assert err.value.headers[STORAGE_OPS_HEADER] == "0"
+
+
+def test_instrument_wallet_classes(monkeypatch):
+    class OtherProfile(FakeProfile):
+        pass
+
+    class OtherStorage(FakeStorage):
+        pass
+
+    classes = {"a.Profile": FakeProfile, "b.Profile": OtherProfile, "a.Storage": OtherStorage}
+
+    def load_class(class_path):
+        if class_path not in classes:
+            raise metrics.ClassNotFoundError(class_path)
+        return classes[class_path]
+
+    monkeypatch.setattr(metrics, "PROFILE_CLASSES", ("a.Profile", "b.Profile", "missing.Profile"))
+    monkeypatch.setattr(metrics, "STORAGE_CLASSES", ("a.Storage",))
+    monkeypatch.setattr(metrics.ClassLoader, "load_class", load_class)
+    metrics.instrument_wallet_classes()
+
+    # every profile class counts its own sessions, not only the root one's
+    assert OtherProfile.__dict__.get("_traction_metrics")
+    assert FakeProfile.__dict__.get("_traction_metrics")
+    assert OtherStorage.__dict__.get("_traction_metrics")
+    # inherited from an instrumented class, so not counted twice
+    OtherProfile().session()
+    assert metrics.SESSIONS_TOTAL.value("session") == 1
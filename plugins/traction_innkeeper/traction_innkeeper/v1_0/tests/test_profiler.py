@@ -0,0 +1,64 @@
+import asyncio
+import pstats
+import time
+from unittest.mock import patch
+
+import pytest
+
+from traction_innkeeper.v1_0.innkeeper import loop_monitor
+from traction_innkeeper.v1_0.innkeeper.profiler import (
+    IDLE,
+    ProfileInProgressError,
+    SamplingProfiler,
+)
+
+
+async def busy_handler(request):
+    # block the loop in short slices so the sampler sees this handler
+    for _ in range(10):
+        time.sleep(0.01)
+        await asyncio.sleep(0)
+
+
+async def _profile_busy_handler(profiler: SamplingProfiler):
+    loop = asyncio.get_running_loop()
+    # the functions of this module stand in for the plugin's
+    with patch.object(loop_monitor, "PLUGIN_MODULE", __name__):
+        profiling = loop.create_task(profiler.profile(0.3, 0.002))
+        await asyncio.sleep(0.02)
+        await loop.create_task(busy_handler(None))
+        return await profiling
+
+
+async def test_samples_are_labelled_by_handler():
+    profile = await _profile_busy_handler(SamplingProfiler())
+
+    handler = f"{__name__}.busy_handler"
+    lines = profile.collapsed().splitlines()
+    assert any(line.startswith(f"{handler};") and "busy_handler" in line for line in lines)
+    assert any(line.startswith(f"{IDLE} ") for line in lines)
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profile.sample_count
+
+
+async def test_pstats_output_loads(tmp_path):
+    profile = await _profile_busy_handler(SamplingProfiler())
+    path = tmp_path / "profile.pstats"
+    path.write_bytes(profile.pstats())
+
+    stats = pstats.Stats(str(path))
+    handler = ("~", 0, f"{__name__}.busy_handler")
+    assert stats.stats[handler][3] > 0
+    # the label is the root of the handler's stacks
+    assert any(handler in callers for *_, callers in stats.stats.values())
+    assert stats.total_tt > 0
+
+
+async def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    profiling = asyncio.get_running_loop().create_task(profiler.profile(0.05, 0.01))
+    await asyncio.sleep(0)
+    assert profiler.running
+    with pytest.raises(ProfileInProgressError):
+        await profiler.profile(0.05, 0.01)
+    await profiling
+    assert not profiler.running
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from acapy_agent.messaging.util import datetime_to_str
+
+from traction_innkeeper.v1_0.innkeeper.config import ReservationConfig
+from traction_innkeeper.v1_0.innkeeper.models import ReservationRecord
+from traction_innkeeper.v1_0.innkeeper.reservation_reaper import ReservationReaper
+
+NOW = datetime.now(timezone.utc)
+OLD = NOW - timedelta(days=31)
+RECENT = NOW - timedelta(days=1)
+
+
+def _config(**kwargs) -> ReservationConfig:
+    config = ReservationConfig.default()
+    return config.model_copy(update=kwargs)
+
+
+def _reservation(name: str, state: str, expiry=None, updated_at=OLD) -> ReservationRecord:
+    return ReservationRecord(
+        reservation_id=f"00000000-0000-0000-0000-00000000000{name}",
+        state=state,
+        tenant_name=name,
+        reservation_token_expiry=expiry,
+        updated_at=datetime_to_str(updated_at),
+    )
+
+
+@pytest.fixture
+def mock_profile():
+    profile = MagicMock()
+    session = AsyncMock()
+    profile.session.return_value.__aenter__.return_value = session
+    txn = AsyncMock()
+    profile.transaction.return_value.__aenter__.return_value = txn
+    return profile, txn
+
+
+async def test_reap_deletes_expired_and_old_denied(mock_profile):
+    profile, txn = mock_profile
+    approved_old = _reservation("1", ReservationRecord.STATE_APPROVED, expiry=OLD)
+    approved_recent = _reservation("2", ReservationRecord.STATE_APPROVED, expiry=RECENT)
+    approved_no_expiry = _reservation("3", ReservationRecord.STATE_APPROVED)
+    denied_old = _reservation("4", ReservationRecord.STATE_DENIED)
+    denied_recent = _reservation("5", ReservationRecord.STATE_DENIED, updated_at=RECENT)
+    pages = {
+        ReservationRecord.STATE_APPROVED: [approved_old, approved_recent, approved_no_expiry],
+        ReservationRecord.STATE_DENIED: [denied_old, denied_recent],
+    }
+
+    async def query(session, tag_filter, **kwargs):
+        return pages[tag_filter["state"]]
+
+    reaper = ReservationReaper(profile, _config())
+    with (
+        patch.object(ReservationRecord, "query", AsyncMock(side_effect=query)),
+        patch.object(ReservationRecord, "delete_record", autospec=True) as mock_delete,
+    ):
+        assert await reaper.reap() == 2
+
+    assert [awaited.args[0] for awaited in mock_delete.await_args_list] == [approved_old, denied_old]
+    assert txn.commit.await_count == 2
+
+
+async def test_reap_pages_past_kept_records(mock_profile):
+    profile, _ = mock_profile
+    kept = [_reservation(str(i), ReservationRecord.STATE_DENIED, updated_at=RECENT) for i in range(2)]
+    old = [_reservation(str(i + 2), ReservationRecord.STATE_DENIED) for i in range(2)]
+    mock_query = AsyncMock(side_effect=[[], [kept[0], old[0]], [kept[1], old[1]], []])
+
+    reaper = ReservationReaper(profile, _config(reaper_batch_size=2))
+    with (
+        patch.object(ReservationRecord, "query", mock_query),
+        patch.object(ReservationRecord, "delete_record", autospec=True),
+    ):
+        assert await reaper.reap() == 2
+
+    # the deleted records free up their slots, so only kept records move the offset
+    offsets = [awaited.kwargs["offset"] for awaited in mock_query.await_args_list]
+    assert offsets == [0, 0, 1, 2]
+
+
+async def test_start_and_stop(mock_profile):
+    profile, _ = mock_profile
+    reaper = ReservationReaper(profile, _config(reaper_interval_minutes=1))
+    with patch.object(ReservationReaper, "reap", AsyncMock()):
+        reaper.start()
+        await asyncio.sleep(0)
+        assert reaper._task is not None
+        await reaper.stop()
+    assert reaper._task is None
+
+
+def test_disabled_reaper_does_not_start(mock_profile):
+    profile, _ = mock_profile
+    reaper = ReservationReaper(profile, _config(reaper_interval_minutes=0))
+    reaper.start()
+    assert reaper._task is None
@@ -1,6 +1,6 @@
 import json
 import logging
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 import pytest
 from aiohttp import web
@@ -16,6 +16,7 @@ from traction_innkeeper.v1_0.schema_storage import routes as test_module
 from traction_innkeeper.v1_0.schema_storage.schema_storage_service import (
     SchemaStorageService,
 )
+from traction_innkeeper.v1_0.innkeeper.models import JobRecord
 from traction_innkeeper.v1_0.schema_storage.models import (
     SchemaStorageRecord,  # Although schema not directly used, good practice
 )
@@ -139,7 +140,7 @@ def mock_schema_storage_service(mock_profile: MagicMock):
 @pytest.fixture
 def mock_schema_storage_record():
     """Provides a mocked SchemaStorageRecord instance."""
-    record = MagicMock(spec=SchemaStorageRecord)
+    record = MagicMock(spec=SchemaStorageRecord, _id="1", updated_at="2024-01-01T00:00:00.000000Z")
     record.schema_id = TEST_SCHEMA_ID
     record.serialize = MagicMock(
         return_value={
@@ -165,9 +166,9 @@ async def test_schema_storage_list(
     profile = mock_context.profile
 
     # Mock service response
-    mock_rec_1 = MagicMock(spec=SchemaStorageRecord)
+    mock_rec_1 = MagicMock(spec=SchemaStorageRecord, _id="1", updated_at="2024-01-01T00:00:00.000000Z")
     mock_rec_1.serialize.return_value = {"schema_id": "schema-1"}
-    mock_rec_2 = MagicMock(spec=SchemaStorageRecord)
+    mock_rec_2 = MagicMock(spec=SchemaStorageRecord, _id="2", updated_at="2024-01-01T00:00:00.000000Z")
     mock_rec_2.serialize.return_value = {"schema_id": "schema-2"}
     mock_schema_storage_service.list_items.return_value = [mock_rec_1, mock_rec_2]
 
@@ -427,6 +428,66 @@ async def test_schema_storage_sync_created_success(
     mock_rec_synced.serialize.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_schema_storage_sync_created_stream(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_schema_storage_service: AsyncMock,
+):
+    """Test POST /schema-storage/sync-created?stream=true writes NDJSON progress."""
+    profile = mock_context.profile
+    mock_request.query["stream"] = "true"
+    mock_rec_synced = MagicMock(spec=SchemaStorageRecord)
+    mock_rec_synced.serialize.return_value = {"schema_id": "synced-schema-1"}
+    entry = {"schema_id": "synced-schema-1", "status": "added", "done": 1, "total": 1}
+
+    async def sync_created(profile, progress):
+        await progress(entry)
+        return [mock_rec_synced]
+
+    mock_schema_storage_service.sync_created.side_effect = sync_created
+    mock_response = MagicMock()
+    mock_response.prepare = AsyncMock()
+    mock_response.write = AsyncMock()
+    mock_response.write_eof = AsyncMock()
+
+    with patch.object(test_module.web, "StreamResponse", return_value=mock_response):
+        response = await test_module.schema_storage_sync_created(mock_request)
+
+    assert response is mock_response
+    mock_response.prepare.assert_awaited_once_with(mock_request)
+    mock_schema_storage_service.sync_created.assert_awaited_once_with(profile, progress=ANY)
+    lines = [json.loads(awaited.args[0]) for awaited in mock_response.write.await_args_list]
+    assert lines == [entry, {"results": [{"schema_id": "synced-schema-1"}]}]
+    mock_response.write_eof.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_schema_storage_sync_created_background(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_schema_storage_service: AsyncMock,
+):
+    """Test POST /schema-storage/sync-created?background=true returns a job for the wallet."""
+    profile = mock_context.profile
+    mock_request.query["background"] = "true"
+    job = JobRecord(job_id="j1", job_type="schema_sync")
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        mock_jobs.start = AsyncMock(return_value=job)
+        response = await test_module.schema_storage_sync_created(mock_request)
+
+    assert response.status == 202
+    assert json.loads(response.body)["job_id"] == "j1"
+    mock_jobs.start.assert_awaited_once_with(
+        "schema_sync", ANY, wallet_id=profile.settings.get("wallet.id"), interruptible=True
+    )
+    mock_schema_storage_service.sync_created.assert_not_called()
+
+    await mock_jobs.start.call_args.args[1](job)
+    mock_schema_storage_service.sync_created.assert_awaited_once_with(profile, progress=ANY)
+
+
 @pytest.mark.asyncio
 async def test_schema_storage_sync_created_empty(
     mock_request: MagicMock,
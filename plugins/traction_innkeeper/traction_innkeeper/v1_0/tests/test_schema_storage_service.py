@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from unittest.mock import MagicMock, AsyncMock, patch, call, ANY
 
@@ -9,6 +10,7 @@ from acapy_agent.core.event_bus import Event, EventBus
 from acapy_agent.storage.base import BaseStorage
 
 # Assuming models and service are importable like this
+from traction_innkeeper.v1_0.innkeeper.ledger_cache import LEDGER_CACHE
 from traction_innkeeper.v1_0.schema_storage.models import SchemaStorageRecord
 from traction_innkeeper.v1_0.schema_storage.schema_storage_service import (
     SchemaStorageService,
@@ -45,6 +47,13 @@ TEST_SCHEMA_DATA = {
 
 
 # --- Fixtures ---
+@pytest.fixture(autouse=True)
+def clear_ledger_cache():
+    LEDGER_CACHE.clear()
+    yield
+    LEDGER_CACHE.clear()
+
+
 @pytest.fixture
 def mock_profile():
     """Provides a mocked Profile with settings, session, and inject."""
@@ -357,6 +366,30 @@ async def test_add_item_new_success_with_multitenant(
     mock_schema_storage_record.save.assert_awaited_once_with(session, reason="New schema storage record")
 
 
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.IndyLedgerRequestsExecutor",
+    autospec=True,
+)
+async def test_fetch_schema_from_ledger_is_cached(
+    MockExecutorCls: MagicMock,
+    schema_storage_service: SchemaStorageService,
+    mock_profile: tuple,
+    mock_ledger: AsyncMock,
+):
+    """A schema resolved for one tenant is served from the shared cache for the next."""
+    profile, session = mock_profile
+    session.inject_or.return_value = MagicMock(spec=BaseMultitenantManager)
+    mock_executor_instance = MockExecutorCls.return_value
+    mock_executor_instance.get_ledger_for_identifier = AsyncMock(return_value=(TEST_LEDGER_ID, mock_ledger))
+
+    first = await schema_storage_service._fetch_schema_from_ledger(profile, TEST_SCHEMA_ID)
+    second = await schema_storage_service._fetch_schema_from_ledger(profile, TEST_SCHEMA_ID)
+
+    assert first == second == (TEST_SCHEMA_DATA, TEST_SCHEMA_DATA, TEST_LEDGER_ID)
+    mock_ledger.get_schema.assert_awaited_once_with(TEST_SCHEMA_ID)
+
+
 @pytest.mark.asyncio
 @patch(
     "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.read_item",
@@ -550,89 +583,180 @@ async def test_remove_item_delete_error(
 # --- sync_created tests ---
 
 
+def _sent_records(mock_profile, *schema_ids):
+    profile, session = mock_profile
+    mock_storage = MagicMock(spec=BaseStorage)
+    mock_storage.find_all_records = AsyncMock(
+        return_value=[MagicMock(spec=BaseRecord, value=schema_id) for schema_id in schema_ids]
+    )
+    session.inject.return_value = mock_storage
+    return mock_storage
+
+
 @pytest.mark.asyncio
 @patch(
-    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.add_item",
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService._add_new_item",
     new_callable=AsyncMock,
 )
 @patch(
     "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.list_items",
     new_callable=AsyncMock,
 )
-@pytest.mark.skip("TODO: AttributeError: 'coroutine' object has no attribute 'find_all_records'")
 async def test_sync_created_success(
     mock_list_items: AsyncMock,
-    mock_add_item: AsyncMock,
+    mock_add_new_item: AsyncMock,
     schema_storage_service: SchemaStorageService,
     mock_profile: tuple[MagicMock, AsyncMock],
     mock_schema_storage_record: AsyncMock,
 ):
-    """Test sync_created successfully adds found schemas."""
-    mock_storage = MagicMock(spec=BaseStorage)
+    """Test sync_created only fetches schemas that are not stored yet."""
     profile, session = mock_profile
-    profile.session = AsyncMock(return_value=session)
-
-    schema_id_1 = "schema-id-1"
-    schema_id_2 = "schema-id-2"
-    mock_record_1 = MagicMock(spec=BaseRecord, value=schema_id_1)
-    mock_record_2 = MagicMock(spec=BaseRecord, value=schema_id_2)
-    mock_storage.find_all_records.return_value = [mock_record_1, mock_record_2]
-    mock_list_items.return_value = [mock_schema_storage_record]  # Final list result
+    mock_storage = _sent_records(mock_profile, TEST_SCHEMA_ID, "schema-id-1", "schema-id-2")
+    # one batched existence check up front, then the final list
+    mock_list_items.side_effect = [[mock_schema_storage_record], [mock_schema_storage_record]]
 
-    session.inject.return_value = mock_storage
     result = await schema_storage_service.sync_created(profile)
 
     assert result == [mock_schema_storage_record]
-    # Check session usage
-    assert profile.session.await_count == 1  # Used for find_all_records
     session.inject.assert_called_once_with(BaseStorage)
     mock_storage.find_all_records.assert_awaited_once_with(
         type_filter=ANY,  # Check for SCHEMA_SENT_RECORD_TYPE
         tag_query={},
     )
-    # Check add_item calls
-    assert mock_add_item.await_count == 2
-    mock_add_item.assert_has_awaits(
+    # already stored schema skips the ledger
+    assert mock_add_new_item.await_count == 2
+    mock_add_new_item.assert_has_awaits(
         [
-            call(profile, schema_id_1),
-            call(profile, schema_id_2),
-        ]
+            call(profile, {"schema_id": "schema-id-1"}),
+            call(profile, {"schema_id": "schema-id-2"}),
+        ],
+        any_order=True,
     )
-    # Check final list call
-    mock_list_items.assert_awaited_once_with(profile)
+    assert mock_list_items.await_count == 2
 
 
 @pytest.mark.asyncio
 @patch(
-    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.add_item",
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService._add_new_item",
     new_callable=AsyncMock,
 )
 @patch(
     "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.list_items",
     new_callable=AsyncMock,
 )
-@pytest.mark.skip("TODO: 'coroutine' object has no attribute 'find_all_records'")
 async def test_sync_created_no_schemas_found(
     mock_list_items: AsyncMock,
-    mock_add_item: AsyncMock,
+    mock_add_new_item: AsyncMock,
     schema_storage_service: SchemaStorageService,
     mock_profile: tuple[MagicMock, AsyncMock],
 ):
     """Test sync_created when no schema_sent records are found."""
-    mock_storage = MagicMock(spec=BaseStorage)
     profile, session = mock_profile
-    profile.session = AsyncMock(return_value=session)
-    mock_storage.find_all_records.return_value = []  # No records found
+    mock_storage = _sent_records(mock_profile)
     mock_list_items.return_value = []  # Final list is empty
-    session.inject.return_value = mock_storage
 
     result = await schema_storage_service.sync_created(profile)
 
     assert result == []
     session.inject.assert_called_once_with(BaseStorage)
     mock_storage.find_all_records.assert_awaited_once()
-    mock_add_item.assert_not_awaited()  # add_item should not be called
-    mock_list_items.assert_awaited_once_with(profile)
+    mock_add_new_item.assert_not_awaited()  # add_item should not be called
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.list_items",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_bounded_concurrency(
+    mock_list_items: AsyncMock,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """Test ledger fetches run concurrently but never above max_concurrency."""
+    profile, _ = mock_profile
+    schema_ids = [f"schema-id-{idx}" for idx in range(10)]
+    _sent_records(mock_profile, *schema_ids)
+    mock_list_items.return_value = []
+    service = SchemaStorageService(max_concurrency=3)
+    running = 0
+    peak = 0
+
+    async def add_new_item(profile, data):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+
+    with patch.object(service, "_add_new_item", side_effect=add_new_item):
+        await service.sync_created(profile)
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService._add_new_item",
+    new_callable=AsyncMock,
+)
+@patch(
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.list_items",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_reports_progress(
+    mock_list_items: AsyncMock,
+    mock_add_new_item: AsyncMock,
+    schema_storage_service: SchemaStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+    mock_schema_storage_record: AsyncMock,
+):
+    """Test each schema is reported and errors do not stop the sync when streaming."""
+    profile, _ = mock_profile
+    _sent_records(mock_profile, TEST_SCHEMA_ID, "missing-schema")
+    mock_list_items.return_value = [mock_schema_storage_record]
+    mock_add_new_item.side_effect = StorageNotFoundError("Schema not found on ledger")
+    progress = AsyncMock()
+
+    await schema_storage_service.sync_created(profile, progress=progress)
+
+    entries = [awaited.args[0] for awaited in progress.await_args_list]
+    assert entries == [
+        {"schema_id": TEST_SCHEMA_ID, "status": "exists", "done": 1, "total": 2},
+        {
+            "schema_id": "missing-schema",
+            "status": "error",
+            "done": 2,
+            "total": 2,
+            "error": "Schema not found on ledger",
+        },
+    ]
+
+
+@pytest.mark.asyncio
+@patch(
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService._add_new_item",
+    new_callable=AsyncMock,
+)
+@patch(
+    "traction_innkeeper.v1_0.schema_storage.schema_storage_service.SchemaStorageService.list_items",
+    new_callable=AsyncMock,
+)
+async def test_sync_created_raises_without_progress(
+    mock_list_items: AsyncMock,
+    mock_add_new_item: AsyncMock,
+    schema_storage_service: SchemaStorageService,
+    mock_profile: tuple[MagicMock, AsyncMock],
+):
+    """Test a failed schema fails the (non streamed) sync after the others are stored."""
+    profile, _ = mock_profile
+    _sent_records(mock_profile, "missing-schema", "schema-id-1")
+    mock_list_items.return_value = []
+    mock_add_new_item.side_effect = [StorageNotFoundError("Schema not found on ledger"), None]
+
+    with pytest.raises(StorageNotFoundError):
+        await schema_storage_service.sync_created(profile)
+
+    assert mock_add_new_item.await_count == 2
 
 
 # --- Global Function Tests ---
@@ -0,0 +1,82 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from acapy_agent.version import __version__
+from aiohttp import web
+
+from traction_innkeeper.v1_0.innkeeper.server_config import (
+    ServerConfigView,
+    innkeeper_server_config,
+    tenant_server_config,
+)
+
+
+@pytest.fixture
+def settings():
+    return {
+        "wallet.key": "secret",
+        "wallet.name": "root",
+        "admin.admin_api_key": "secret",
+        "ledger.ledger_config_list": [{"id": "ledger", "genesis_transactions": "big blob"}],
+        "plugin_config": {"traction_innkeeper": {"innkeeper_wallet": {"wallet_key": "secret", "tenant_id": "inn"}}},
+    }
+
+
+def _request(if_none_match=None):
+    request = MagicMock(spec=web.Request)
+    request.headers = {"If-None-Match": if_none_match} if if_none_match else {}
+    return request
+
+
+def test_innkeeper_server_config(settings):
+    config = innkeeper_server_config(settings)
+    assert "wallet.key" not in config
+    assert "admin.admin_api_key" not in config
+    assert config["wallet.name"] == "root"
+    assert config["plugin_config"]["traction_innkeeper"]["innkeeper_wallet"] == {"tenant_id": "inn"}
+    assert config["version"] == __version__
+    # the live settings keep their secrets
+    assert settings["plugin_config"]["traction_innkeeper"]["innkeeper_wallet"]["wallet_key"] == "secret"
+
+
+def test_tenant_server_config(settings):
+    config = tenant_server_config(settings)
+    assert "wallet.name" not in config
+    assert "innkeeper_wallet" not in config["plugin_config"]["traction_innkeeper"]
+    assert config["ledger.ledger_config_list"] == [{"id": "ledger"}]
+    assert settings["ledger.ledger_config_list"][0]["genesis_transactions"] == "big blob"
+    assert "innkeeper_wallet" in settings["plugin_config"]["traction_innkeeper"]
+
+
+def test_view_rebuilds_only_when_settings_change(settings):
+    build = MagicMock(side_effect=innkeeper_server_config)
+    view = ServerConfigView(build)
+
+    body, etag = view.get(settings)
+    assert view.get(settings) == (body, etag)
+    assert build.call_count == 1
+
+    settings["wallet.name"] = "renamed"
+    body2, etag2 = view.get(settings)
+    assert build.call_count == 2
+    assert etag2 != etag
+    assert json.loads(body2)["config"]["wallet.name"] == "renamed"
+
+    # nested in-place edits are not noticed
+    settings["plugin_config"]["traction_innkeeper"]["innkeeper_wallet"]["tenant_id"] = "edited"
+    assert view.get(settings) == (body2, etag2)
+    assert build.call_count == 2
+
+
+def test_view_response_not_modified(settings):
+    view = ServerConfigView(innkeeper_server_config)
+
+    response = view.response(_request(), settings)
+    assert response.status == 200
+    etag = response.headers["ETag"]
+    assert json.loads(response.body)["config"]["wallet.name"] == "root"
+
+    response = view.response(_request(etag), settings)
+    assert response.status == 304
+    assert response.headers["ETag"] == etag
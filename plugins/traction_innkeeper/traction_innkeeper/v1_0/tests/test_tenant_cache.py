@@ -0,0 +1,90 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from acapy_agent.messaging.models.base_record import BaseRecord
+
+from traction_innkeeper.v1_0.innkeeper.models import TenantRecord
+from traction_innkeeper.v1_0.innkeeper.tenant_cache import TENANT_CACHE, TenantCache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    TENANT_CACHE.clear()
+    yield
+    TENANT_CACHE.clear()
+
+
+def test_get_put_counts_hits_and_misses():
+    cache = TenantCache(ttl_seconds=30, max_size=10)
+    assert cache.get("w1") is None
+    cache.put("w1", "t1", {"state": "active"})
+    assert cache.get("w1") == ("t1", {"state": "active"})
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_expired_entry_is_a_miss():
+    cache = TenantCache(ttl_seconds=30, max_size=10)
+    with patch("traction_innkeeper.v1_0.innkeeper.tenant_cache.time.monotonic", return_value=100):
+        cache.put("w1", "t1", {})
+    with patch("traction_innkeeper.v1_0.innkeeper.tenant_cache.time.monotonic", return_value=131):
+        assert cache.get("w1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction():
+    cache = TenantCache(ttl_seconds=30, max_size=2)
+    cache.put("w1", "t1", {})
+    cache.put("w2", "t2", {})
+    cache.get("w1")
+    cache.put("w3", "t3", {})
+    assert cache.get("w2") is None
+    assert cache.get("w1") is not None
+    assert cache.evictions == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = TenantCache(ttl_seconds=0, max_size=10)
+    cache.put("w1", "t1", {})
+    assert cache.get("w1") is None
+
+
+def test_stale_generation_is_not_cached():
+    cache = TenantCache()
+    generation = cache.generation
+    cache.invalidate("w1")
+    cache.put("w1", "t1", {}, generation)
+    assert cache.get("w1") is None
+
+
+def test_cached_record_is_a_copy():
+    rec = TenantRecord(tenant_id="t1", tenant_name="name", wallet_id="w1")
+    rec.add_to_cache()
+    cached = TenantRecord.from_cache("w1")
+    assert cached.tenant_id == "t1"
+    assert cached.state == TenantRecord.STATE_ACTIVE
+    cached.tenant_name = "changed"
+    assert TenantRecord.from_cache("w1").tenant_name == "name"
+
+
+@pytest.mark.parametrize("method", ["save", "delete_record"])
+async def test_record_writes_invalidate(method):
+    rec = TenantRecord(tenant_id="t1", tenant_name="name", wallet_id="w1")
+    rec.add_to_cache()
+    with patch.object(BaseRecord, method, AsyncMock()):
+        await getattr(rec, method)(AsyncMock())
+    assert TenantRecord.from_cache("w1") is None
+
+
+async def test_soft_delete_invalidates():
+    rec = TenantRecord(tenant_id="t1", tenant_name="name", wallet_id="w1")
+    rec.add_to_cache()
+    session = MagicMock()
+    storage = session.inject.return_value
+    storage.delete_all_records = AsyncMock()
+    with patch.object(BaseRecord, "save", AsyncMock()):
+        await rec.soft_delete(session)
+    storage.delete_all_records.assert_awaited_once_with("tenant_authentication_api", {"tenant_id": "t1"})
+    assert TenantRecord.from_cache("w1") is None
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from unittest.mock import MagicMock, patch
 
@@ -6,10 +7,13 @@ import pytest
 from acapy_agent.core.event_bus import EventBus
 from acapy_agent.core.plugin_registry import PluginRegistry
 from acapy_agent.core.protocol_registry import ProtocolRegistry
+from traction_innkeeper.v1_0 import tenant as tenant_module
 from traction_innkeeper.v1_0.tenant import (
     ContextFilter,
     setup_multitenant_logging,
     log_records_inject,
+    log_records_reset,
+    tenant_log_record_factory,
     setup,
 )
 
@@ -18,28 +22,67 @@ def test_context_filter():
     f = ContextFilter()
     r = logging.LogRecord("n", 0, "", 0, "", (), None)
     assert f.filter(r)
+    assert r.tenant_id is None
     r.tenant_id = "x"
     assert f.filter(r)
 
 
+def test_context_filter_uses_context():
+    f = ContextFilter()
+    token = log_records_inject("t")
+    try:
+        r = logging.LogRecord("n", 0, "", 0, "", (), None)
+        f.filter(r)
+    finally:
+        log_records_reset(token)
+    assert r.tenant_id == "t"
+
+
 def test_setup_multitenant_logging():
     h = MagicMock()
-    with patch("traction_innkeeper.v1_0.tenant.logging") as m:
+    with (
+        patch("traction_innkeeper.v1_0.tenant.logging") as m,
+        patch.object(tenant_module, "base_log_record_factory"),
+    ):
         m.getLogger.return_value.handlers = [h]
         setup_multitenant_logging()
     h.setFormatter.assert_called_once()
+    m.setLogRecordFactory.assert_called_once_with(tenant_log_record_factory)
 
 
-def test_log_records_inject():
+def test_setup_multitenant_logging_installs_factory_once():
     orig = logging.getLogRecordFactory()
-    log_records_inject("t")
-    assert logging.getLogRecordFactory()("n", 0, "", 0, "", (), None).tenant_id == "t"
-    logging.setLogRecordFactory(orig)
+    try:
+        with patch("traction_innkeeper.v1_0.tenant.logging.getLogger") as m:
+            m.return_value.handlers = []
+            setup_multitenant_logging()
+            setup_multitenant_logging()
+        assert logging.getLogRecordFactory() is tenant_log_record_factory
+        assert tenant_module.base_log_record_factory is orig
+    finally:
+        logging.setLogRecordFactory(orig)
+
+
+def test_log_records_inject():
+    token = log_records_inject("t")
+    assert tenant_log_record_factory("n", 0, "", 0, "", (), None).tenant_id == "t"
+    log_records_reset(token)
+    assert tenant_log_record_factory("n", 0, "", 0, "", (), None).tenant_id is None
+
+
+async def test_log_records_inject_is_task_local():
+    seen = {}
 
+    async def request(tenant_id):
+        token = log_records_inject(tenant_id)
+        try:
+            await asyncio.sleep(0)
+            seen[tenant_id] = tenant_log_record_factory("n", 0, "", 0, "", (), None).tenant_id
+        finally:
+            log_records_reset(token)
 
-def test_log_records_inject_error():
-    with patch("traction_innkeeper.v1_0.tenant.base_log_record_factory", side_effect=Exception):
-        log_records_inject("t")
+    await asyncio.gather(request("a"), request("b"))
+    assert seen == {"a": "a", "b": "b"}
 
 
 async def test_setup_success():
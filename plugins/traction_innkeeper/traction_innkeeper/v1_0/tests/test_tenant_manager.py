@@ -1,23 +1,33 @@
+import asyncio
 import logging
-from unittest.mock import MagicMock, AsyncMock, patch, call
+from unittest.mock import MagicMock, AsyncMock, patch
+
+import bcrypt
 import pytest
 
 # Assuming tenant_manager.py is in ../innkeeper relative to this test file
-from traction_innkeeper.v1_0.innkeeper.tenant_manager import TenantManager
+from traction_innkeeper.v1_0.innkeeper import hashing
+from traction_innkeeper.v1_0.innkeeper import tenant_manager as tenant_manager_module
+from traction_innkeeper.v1_0.innkeeper.tenant_manager import WALLET_NAME_WINDOW, TenantManager
 
 # Import classes that need mocking or inspection
 from traction_innkeeper.v1_0.innkeeper.models import (
+    JobRecord,
     TenantRecord,
     ReservationRecord,
     TenantAuthenticationApiRecord,
 )  # noqa F401 mocked
 from traction_innkeeper.v1_0.innkeeper.config import (
+    BulkProvisioningConfig,
+    EndorserLedgerConfig,
     TractionInnkeeperConfig,
     InnkeeperWalletConfig,
     ReservationConfig,
 )
 from acapy_agent.core.profile import Profile
+from acapy_agent.utils.testing import create_test_profile
 from acapy_agent.storage.error import (
+    StorageError,
     StorageNotFoundError,
 )  # noqa F401 used in tests
 from acapy_agent.wallet.models.wallet_record import WalletRecord
@@ -58,17 +68,10 @@ def mock_traction_config(mock_innkeeper_wallet_config, mock_reservation_config):
     config = MagicMock(spec=TractionInnkeeperConfig)
     config.innkeeper_wallet = mock_innkeeper_wallet_config
     config.reservation = mock_reservation_config
+    config.bulk_provisioning = BulkProvisioningConfig(max_concurrency=2, max_tenants=10)
     return config
 
 
-@pytest.fixture
-def mock_bcrypt(mocker):
-    """Mocks bcrypt functions."""
-    # Use mocker fixture provided by pytest-mock
-    mocked_bcrypt = mocker.patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.bcrypt", autospec=True)
-    return mocked_bcrypt
-
-
 @pytest.fixture
 def mock_tenant_rec():
     """Mocks bcrypt functions."""
@@ -268,6 +271,294 @@ async def test_create_wallet_success(
     assert result_token == mock_token
 
 
+@pytest.mark.asyncio
+@patch.object(TenantManager, "get_wallet_names_in_use", new_callable=AsyncMock)
+@patch.object(TenantManager, "get_token", new_callable=AsyncMock)
+@patch.object(TenantManager, "create_tenant", new_callable=AsyncMock)
+async def test_create_wallet_concurrent_names_do_not_collide(
+    mock_create_tenant: AsyncMock,
+    mock_get_token: AsyncMock,
+    mock_names_in_use: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_multitenant_mgr: MagicMock,
+):
+    """Concurrent check-ins for the same name get distinct wallet names."""
+    mock_names_in_use.return_value = {"test"}
+    created = asyncio.Event()
+
+    async def create_wallet(settings, key_management_mode):
+        # hold the first creation open until both names are allocated
+        if not created.is_set():
+            created.set()
+            await asyncio.sleep(0)
+        return MagicMock(spec=WalletRecord, wallet_id=settings["wallet.name"])
+
+    mock_multitenant_mgr.create_wallet = AsyncMock(side_effect=create_wallet)
+
+    results = await asyncio.gather(
+        tenant_manager.create_wallet("test", "key", None),
+        tenant_manager.create_wallet("test", "key", None),
+    )
+
+    names = [awaited.args[0]["wallet.name"] for awaited in mock_multitenant_mgr.create_wallet.await_args_list]
+    assert sorted(names) == ["test-1", "test-2"]
+    assert len(results) == 2
+    assert tenant_manager._pending_wallet_names == set()
+
+
+@pytest.mark.asyncio
+@patch.object(TenantManager, "create_wallet", new_callable=AsyncMock)
+async def test_provision_tenants(
+    mock_create_wallet: AsyncMock,
+    tenant_manager: TenantManager,
+):
+    """Every spec is reported; failures do not stop the others."""
+
+    async def create_wallet(wallet_name, wallet_key, tenant_email, extra_settings):
+        if wallet_name == "bad":
+            raise ValueError("boom")
+        tenant = MagicMock(spec=TenantRecord, tenant_id=f"t-{wallet_name}")
+        wallet = MagicMock(spec=WalletRecord, wallet_id=f"w-{wallet_name}")
+        return tenant, wallet, f"token-{wallet_name}"
+
+    mock_create_wallet.side_effect = create_wallet
+    progress = AsyncMock()
+    specs = [
+        {
+            "tenant_name": "one",
+            "contact_email": "one@example.com",
+            "connect_to_endorser": [{"endorser_alias": "endorser", "ledger_id": "ledger"}],
+            "create_public_did": ["ledger"],
+        },
+        {"tenant_name": "bad", "contact_email": "bad@example.com"},
+    ]
+
+    created = await tenant_manager.provision_tenants(specs, progress)
+
+    assert created == 1
+    results = sorted((awaited.args[0] for awaited in progress.await_args_list), key=lambda r: r["index"])
+    assert results[0]["status"] == "created"
+    assert results[0]["tenant_id"] == "t-one"
+    assert results[0]["wallet_id"] == "w-one"
+    assert results[0]["token"] == "token-one"
+    assert results[0]["wallet_key"]
+    assert results[1] == {"index": 1, "tenant_name": "bad", "status": "error", "error": "boom"}
+    first_call = next(a for a in mock_create_wallet.await_args_list if a.kwargs["wallet_name"] == "one")
+    assert first_call.kwargs["tenant_email"] == "one@example.com"
+    assert first_call.kwargs["extra_settings"] == {
+        "tenant.endorser_config": [EndorserLedgerConfig(endorser_alias="endorser", ledger_id="ledger")],
+        "tenant.public_did_config": ["ledger"],
+    }
+
+
+@pytest.mark.asyncio
+@patch.object(TenantManager, "create_wallet", new_callable=AsyncMock)
+async def test_provision_tenants_bounded_concurrency(
+    mock_create_wallet: AsyncMock,
+    tenant_manager: TenantManager,
+):
+    """No more than max_concurrency wallets are created at once."""
+    running = 0
+    peak = 0
+
+    async def create_wallet(**kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+        return MagicMock(tenant_id="t"), MagicMock(wallet_id="w"), "token"
+
+    mock_create_wallet.side_effect = create_wallet
+    specs = [{"tenant_name": f"tenant-{i}", "contact_email": "e"} for i in range(6)]
+
+    # a failing progress callback (client gone) does not stop provisioning
+    assert await tenant_manager.provision_tenants(specs, AsyncMock(side_effect=ConnectionResetError())) == 6
+    assert peak == 2
+
+
+@pytest.fixture
+def mock_transaction(mock_profile):
+    """Every profile.transaction() yields the same mocked transaction."""
+    profile, _ = mock_profile
+    txn = AsyncMock()
+    profile.transaction = MagicMock()
+    profile.transaction.return_value.__aenter__.return_value = txn
+    profile.transaction.return_value.__aexit__.return_value = None
+    return txn
+
+
+def _tenant_records(*tenant_ids, state=TenantRecord.STATE_ACTIVE):
+    """Return a retrieve_by_id side effect serving mocked tenant records by id."""
+    records = {
+        tenant_id: MagicMock(spec=TenantRecord, tenant_id=tenant_id, wallet_id=f"w-{tenant_id}", state=state)
+        for tenant_id in tenant_ids
+    }
+
+    async def retrieve_by_id(session, tenant_id, **kwargs):
+        if tenant_id not in records:
+            raise StorageNotFoundError()
+        return records[tenant_id]
+
+    return records, retrieve_by_id
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantRecord.retrieve_by_id")
+async def test_soft_delete_tenants_in_chunks(
+    mock_retrieve_by_id: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_profile,
+    mock_transaction: AsyncMock,
+):
+    """Tenants are soft deleted chunk_size per transaction; the innkeeper is skipped."""
+    profile, _ = mock_profile
+    tenant_manager._config.bulk_provisioning.chunk_size = 2
+    records, mock_retrieve_by_id.side_effect = _tenant_records("t1", "t2", "t3")
+    job = JobRecord(job_type="tenant_soft_delete", total=5)
+
+    await tenant_manager.soft_delete_tenants(["t1", "innkeeper_tenant_id", "t2", "missing", "t3"], job)
+
+    assert profile.transaction.call_count == 2
+    assert mock_transaction.commit.await_count == 2
+    for rec in records.values():
+        rec.soft_delete.assert_awaited_once_with(mock_transaction)
+    assert job.succeeded == 3
+    assert [error["id"] for error in job.errors] == ["innkeeper_tenant_id", "missing"]
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantRecord.retrieve_by_id")
+async def test_soft_delete_tenants_failed_chunk(
+    mock_retrieve_by_id: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_transaction: AsyncMock,
+):
+    """A storage error fails the tenants of its chunk and the next chunk still runs."""
+    tenant_manager._config.bulk_provisioning.chunk_size = 2
+    records, mock_retrieve_by_id.side_effect = _tenant_records("t1", "t2", "t3")
+    records["t2"].soft_delete.side_effect = StorageError("locked")
+    job = JobRecord(job_type="tenant_soft_delete", total=3)
+
+    await tenant_manager.soft_delete_tenants(["t1", "t2", "t3"], job)
+
+    assert job.succeeded == 1
+    assert job.errors == [{"id": "t1", "error": "locked"}, {"id": "t2", "error": "locked"}]
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantRecord.retrieve_by_id")
+async def test_soft_delete_tenants_stops_when_cancelled(
+    mock_retrieve_by_id: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_transaction: AsyncMock,
+):
+    """A cancelled job finishes its current chunk and starts no other."""
+    tenant_manager._config.bulk_provisioning.chunk_size = 2
+    records, mock_retrieve_by_id.side_effect = _tenant_records("t1", "t2", "t3")
+    job = JobRecord(job_type="tenant_soft_delete", total=3)
+
+    async def cancel(session):
+        job.cancel_requested = True
+
+    records["t1"].soft_delete.side_effect = cancel
+
+    await tenant_manager.soft_delete_tenants(["t1", "t2", "t3"], job)
+
+    records["t2"].soft_delete.assert_awaited_once()
+    records["t3"].soft_delete.assert_not_called()
+    assert job.succeeded == 2
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantRecord.retrieve_by_id")
+async def test_restore_tenants(
+    mock_retrieve_by_id: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_transaction: AsyncMock,
+):
+    """Only soft deleted tenants are restored."""
+    records, mock_retrieve_by_id.side_effect = _tenant_records("t1", "t2", state=TenantRecord.STATE_DELETED)
+    records["t2"].state = TenantRecord.STATE_ACTIVE
+    job = JobRecord(job_type="tenant_restore", total=2)
+
+    await tenant_manager.restore_tenants(["t1", "t2"], job)
+
+    records["t1"].restore_deleted.assert_awaited_once_with(mock_transaction)
+    records["t2"].restore_deleted.assert_not_called()
+    assert job.succeeded == 1
+    assert job.errors == [{"id": "t2", "error": "Tenant t2 is not deleted."}]
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantRecord.retrieve_by_id")
+async def test_hard_delete_tenants(
+    mock_retrieve_by_id: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_multitenant_mgr: AsyncMock,
+    mock_transaction: AsyncMock,
+):
+    """Wallets are removed with bounded concurrency; only removed tenants are deleted."""
+    records, mock_retrieve_by_id.side_effect = _tenant_records("t1", "t2", "t3", "t4")
+    running = 0
+    peak = 0
+
+    async def remove_wallet(wallet_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+        if wallet_id == "w-t3":
+            raise StorageNotFoundError("no wallet")
+
+    mock_multitenant_mgr.remove_wallet = AsyncMock(side_effect=remove_wallet)
+    job = JobRecord(job_type="tenant_hard_delete", total=4)
+
+    await tenant_manager.hard_delete_tenants(["t1", "t2", "t3", "t4"], job)
+
+    assert peak == 2
+    assert mock_multitenant_mgr.remove_wallet.await_count == 4
+    for tenant_id in ("t1", "t2", "t4"):
+        records[tenant_id].delete_record.assert_awaited_once_with(mock_transaction)
+    records["t3"].delete_record.assert_not_called()
+    mock_transaction.commit.assert_awaited_once()
+    assert job.succeeded == 3
+    assert job.errors == [{"id": "t3", "error": "no wallet"}]
+
+
+@pytest.mark.asyncio
+async def test_find_tenant_ids(tenant_manager: TenantManager, mock_profile):
+    """Tenant ids are read from storage without deserializing the records."""
+    _, session = mock_profile
+    storage = AsyncMock()
+    storage.find_all_records.return_value = [MagicMock(id="t1"), MagicMock(id="t2")]
+    session.inject = MagicMock(return_value=storage)
+
+    assert await tenant_manager.find_tenant_ids({"state": "active"}) == ["t1", "t2"]
+    storage.find_all_records.assert_awaited_once_with(TenantRecord.RECORD_TYPE, {"state": "active"})
+
+
+@pytest.mark.asyncio
+async def test_find_tenant_ids_name_prefix_askar(mock_traction_config):
+    """Test the name prefix against real Askar storage, where tenant_name is an encrypted tag."""
+    profile = await create_test_profile()
+    async with profile.session() as session:
+        tenants = {}
+        for name, state in (("test-a", "active"), ("Test-B", "deleted"), ("test-c", "deleted"), ("other", "deleted")):
+            tenant = TenantRecord(tenant_name=name, wallet_id=name, state=state)
+            await tenant.save(session)
+            tenants[name] = tenant.tenant_id
+    mgr = TenantManager(profile, mock_traction_config)
+
+    assert await mgr.find_tenant_ids({"tenant_name": {"$like": "test-%"}}) == []
+    found = await mgr.find_tenant_ids({}, name_prefix="TEST-")
+    assert sorted(found) == sorted([tenants["test-a"], tenants["Test-B"], tenants["test-c"]])
+    found = await mgr.find_tenant_ids({"state": "deleted"}, name_prefix="test-")
+    assert sorted(found) == sorted([tenants["Test-B"], tenants["test-c"]])
+    await profile.close()
+
+
 @pytest.mark.asyncio
 @patch(
     "traction_innkeeper.v1_0.innkeeper.tenant_manager.WalletRecord.retrieve_by_id",
@@ -404,7 +695,7 @@ async def test_get_token_failure(
     mock_multitenant_mgr.create_auth_token.assert_awaited_once_with(mock_wallet_record, wallet_key)
 
 
-# --- Tests for check_tables_for_wallet_name ---
+# --- Tests for get_wallet_names_in_use ---
 
 
 @pytest.mark.asyncio
@@ -412,239 +703,260 @@ async def test_get_token_failure(
     "traction_innkeeper.v1_0.innkeeper.tenant_manager.WalletRecord.query",
     new_callable=AsyncMock,
 )
-async def test_check_tables_for_wallet_name_exists(
+async def test_get_wallet_names_in_use_single_query(
     mock_wallet_query: AsyncMock,
     tenant_manager: TenantManager,
     mock_profile,
 ):
-    """Test check_tables_for_wallet_name when wallet exists."""
+    """Test the candidate names are fetched in one exact-match query."""
     profile, session = mock_profile
-    wallet_name = "existing-wallet"
-    mock_wallet_query.return_value = [MagicMock()]  # Return a list with one item
+    mock_wallet_query.return_value = [
+        MagicMock(spec=WalletRecord, wallet_name="test"),
+        MagicMock(spec=WalletRecord, wallet_name="test-1"),
+    ]
 
-    exists = await tenant_manager.check_tables_for_wallet_name(session, wallet_name)
+    names = await tenant_manager.get_wallet_names_in_use(session, ["test", "test-1", "test-2"])
 
-    assert exists is True
-    mock_wallet_query.assert_awaited_once_with(session, {"wallet_name": wallet_name})
-
-
-@pytest.mark.asyncio
-@patch(
-    "traction_innkeeper.v1_0.innkeeper.tenant_manager.WalletRecord.query",
-    new_callable=AsyncMock,
-)
-async def test_check_tables_for_wallet_name_not_exists(
-    mock_wallet_query: AsyncMock,
-    tenant_manager: TenantManager,
-    mock_profile,
-):
-    """Test check_tables_for_wallet_name when wallet does not exist."""
-    profile, session = mock_profile
-    wallet_name = "new-wallet"
-    mock_wallet_query.return_value = []  # Return an empty list
+    assert names == {"test", "test-1"}
+    mock_wallet_query.assert_awaited_once_with(
+        session,
+        {"$or": [{"wallet_name": "test"}, {"wallet_name": "test-1"}, {"wallet_name": "test-2"}]},
+    )
 
-    exists = await tenant_manager.check_tables_for_wallet_name(session, wallet_name)
 
-    assert exists is False
-    mock_wallet_query.assert_awaited_once_with(session, {"wallet_name": wallet_name})
+# --- Tests for get_unique_wallet_name ---
 
 
-# --- Tests for get_unique_wallet_name ---
+def _candidates(wallet_name: str) -> list:
+    return [wallet_name] + [f"{wallet_name}-{idx}" for idx in range(1, WALLET_NAME_WINDOW)]
 
 
 @pytest.mark.asyncio
-@patch.object(TenantManager, "check_tables_for_wallet_name", new_callable=AsyncMock)
+@patch.object(TenantManager, "get_wallet_names_in_use", new_callable=AsyncMock)
 async def test_get_unique_wallet_name_already_unique(
-    mock_check_tables: AsyncMock,
+    mock_names_in_use: AsyncMock,
     tenant_manager: TenantManager,
     mock_profile,
 ):
     """Test get_unique_wallet_name when the name is already unique."""
     profile, session = mock_profile
     wallet_name = "unique-wallet"
-    mock_check_tables.return_value = False  # Name is unique
+    mock_names_in_use.return_value = set()  # Name is unique
 
     unique_name = await tenant_manager.get_unique_wallet_name(wallet_name)
 
     assert unique_name == wallet_name
-    mock_check_tables.assert_awaited_once_with(session, wallet_name)
+    mock_names_in_use.assert_awaited_once_with(session, _candidates(wallet_name))
 
 
 @pytest.mark.asyncio
-@patch.object(TenantManager, "check_tables_for_wallet_name", new_callable=AsyncMock)
+@patch.object(TenantManager, "get_wallet_names_in_use", new_callable=AsyncMock)
 async def test_get_unique_wallet_name_needs_one_suffix(
-    mock_check_tables: AsyncMock,
+    mock_names_in_use: AsyncMock,
     tenant_manager: TenantManager,
     mock_profile,
 ):
     """Test get_unique_wallet_name when one suffix is needed."""
     profile, session = mock_profile
     wallet_name = "taken-wallet"
-    # Simulate: 'taken-wallet' exists, 'taken-wallet-1' does not
-    mock_check_tables.side_effect = [True, False]
+    mock_names_in_use.return_value = {wallet_name}
 
     unique_name = await tenant_manager.get_unique_wallet_name(wallet_name)
 
     assert unique_name == f"{wallet_name}-1"
-    assert mock_check_tables.await_count == 2
-    mock_check_tables.assert_has_awaits(
-        [
-            call(session, wallet_name),
-            call(session, f"{wallet_name}-1"),
-        ]
-    )
+    mock_names_in_use.assert_awaited_once_with(session, _candidates(wallet_name))
 
 
 @pytest.mark.asyncio
-@patch.object(TenantManager, "check_tables_for_wallet_name", new_callable=AsyncMock)
+@patch.object(TenantManager, "get_wallet_names_in_use", new_callable=AsyncMock)
 async def test_get_unique_wallet_name_needs_multiple_suffixes(
-    mock_check_tables: AsyncMock,
+    mock_names_in_use: AsyncMock,
     tenant_manager: TenantManager,
     mock_profile,
 ):
     """Test get_unique_wallet_name when multiple suffixes are needed."""
     profile, session = mock_profile
     wallet_name = "very-taken-wallet"
-    # Simulate: 'very-taken-wallet' exists, 'very-taken-wallet-1' exists, 'very-taken-wallet-1-2' does not
-    mock_check_tables.side_effect = [True, True, False]
+    # the first free suffix is used, gaps are filled
+    mock_names_in_use.return_value = {wallet_name, f"{wallet_name}-1", f"{wallet_name}-3"}
 
     unique_name = await tenant_manager.get_unique_wallet_name(wallet_name)
 
-    # Note: The loop logic adds '-1', then '-2', etc.
     assert unique_name == f"{wallet_name}-2"
-    assert mock_check_tables.await_count == 3
-    mock_check_tables.assert_has_awaits(
-        [
-            call(session, wallet_name),
-            call(session, f"{wallet_name}-1"),
-            call(session, f"{wallet_name}-2"),
-        ]
-    )
+    # a single storage query while a free name is in the first window
+    mock_names_in_use.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@patch.object(TenantManager, "get_wallet_names_in_use", new_callable=AsyncMock)
+async def test_get_unique_wallet_name_skips_pending(
+    mock_names_in_use: AsyncMock,
+    tenant_manager: TenantManager,
+):
+    """Test names allocated to wallets still being created are not reused."""
+    mock_names_in_use.return_value = {"test"}
+    tenant_manager._pending_wallet_names.add("test-1")
+
+    assert await tenant_manager.get_unique_wallet_name("test") == "test-2"
+
+
+@pytest.mark.asyncio
+async def test_get_unique_wallet_name_askar(mock_traction_config):
+    """Test against real Askar storage, where wallet_name is an encrypted tag."""
+    profile = await create_test_profile()
+    async with profile.session() as session:
+        for wallet_name in ("test", "test-1", "test-3", "other"):
+            await WalletRecord(settings={"wallet.name": wallet_name}, key_management_mode="managed").save(session)
+    mgr = TenantManager(profile, mock_traction_config)
+
+    assert await mgr.get_unique_wallet_name("test") == "test-2"
+    assert await mgr.get_unique_wallet_name("new") == "new"
+    # the next window is searched when the first one is all taken
+    with patch.object(tenant_manager_module, "WALLET_NAME_WINDOW", 2):
+        assert await mgr.get_unique_wallet_name("test") == "test-2"
+    await profile.close()
 
 
 # --- Tests for check_reservation_password ---
 
 
-def test_check_reservation_password_null_input(tenant_manager: TenantManager, mock_bcrypt):
+@pytest.fixture
+def mock_hashing_checkpw(mocker):
+    """Mocks the executor-backed bcrypt check."""
+    return mocker.patch(
+        "traction_innkeeper.v1_0.innkeeper.tenant_manager.hashing.checkpw",
+        new_callable=AsyncMock,
+    )
+
+
+async def test_check_reservation_password_null_input(tenant_manager: TenantManager, mock_hashing_checkpw):
     """Test check_reservation_password with null inputs."""
-    mock_reservation = MagicMock(spec=ReservationRecord)
-    assert tenant_manager.check_reservation_password(None, mock_reservation) is None
-    assert tenant_manager.check_reservation_password("pwd", None) is None
-    mock_bcrypt.hashpw.assert_not_called()
-    mock_bcrypt.checkpw.assert_not_called()
+    mock_reservation = MagicMock(spec=ReservationRecord, reservation_token_hash=None)
+    assert await tenant_manager.check_reservation_password(None, mock_reservation) is None
+    assert await tenant_manager.check_reservation_password("pwd", None) is None
+    assert await tenant_manager.check_reservation_password("pwd", mock_reservation) is None
+    mock_hashing_checkpw.assert_not_awaited()
 
 
-def test_check_reservation_password_correct(tenant_manager: TenantManager, mock_bcrypt):
+async def test_check_reservation_password_correct(tenant_manager: TenantManager, mock_hashing_checkpw):
     """Test check_reservation_password with correct password."""
     pwd = "correct_password"
-    salt = b"salt_value"
     hash_val = b"hashed_password_value"
     mock_reservation = MagicMock(
         spec=ReservationRecord,
-        reservation_token_salt=salt.decode(),
+        reservation_token_salt="salt_value",
         reservation_token_hash=hash_val.decode(),
     )
-    # Make hashpw return something deterministic based on input pwd and salt
-    mock_bcrypt.hashpw.return_value = hash_val
-    # Make checkpw return True (indicating match)
-    mock_bcrypt.checkpw.return_value = True
-
-    # Expected token is the *re-hashed* password using the salt
-    expected_token = hash_val.decode()
-    result_token = tenant_manager.check_reservation_password(pwd, mock_reservation)
-
-    assert result_token == expected_token
-    mock_bcrypt.hashpw.assert_called_once_with(pwd.encode("utf-8"), salt)
-    # checkpw is called twice in the function
-    assert mock_bcrypt.checkpw.call_count == 2
-    mock_bcrypt.checkpw.assert_has_calls(
-        [
-            call(pwd.encode("utf-8"), hash_val),  # Check against re-hashed
-            call(pwd.encode("utf-8"), hash_val),  # Check against stored hash
-        ]
-    )
+    mock_hashing_checkpw.return_value = True
+
+    result_token = await tenant_manager.check_reservation_password(pwd, mock_reservation)
 
+    # the stored hash is returned and only a single bcrypt check is made
+    assert result_token == hash_val.decode()
+    mock_hashing_checkpw.assert_awaited_once_with(pwd.encode("utf-8"), hash_val)
 
-def test_check_reservation_password_incorrect(tenant_manager: TenantManager, mock_bcrypt):
+
+async def test_check_reservation_password_incorrect(tenant_manager: TenantManager, mock_hashing_checkpw):
     """Test check_reservation_password with incorrect password."""
     pwd = "wrong_password"
-    salt = b"salt_value"
     correct_hash = b"correct_hashed_password"
-    wrong_hash = b"wrong_hashed_password"  # What hashpw returns for wrong pwd
     mock_reservation = MagicMock(
         spec=ReservationRecord,
-        reservation_token_salt=salt.decode(),
+        reservation_token_salt="salt_value",
         reservation_token_hash=correct_hash.decode(),
     )
-    mock_bcrypt.hashpw.return_value = wrong_hash
-    # Simulate checkpw failing on one or both checks
-    mock_bcrypt.checkpw.side_effect = [False, False]  # Fails both checks
+    mock_hashing_checkpw.return_value = False
 
-    result_token = tenant_manager.check_reservation_password(pwd, mock_reservation)
+    result_token = await tenant_manager.check_reservation_password(pwd, mock_reservation)
 
     assert result_token is None
-    mock_bcrypt.hashpw.assert_called_once_with(pwd.encode("utf-8"), salt)
-    assert mock_bcrypt.checkpw.call_count == 2
-    mock_bcrypt.checkpw.assert_has_calls(
-        [
-            call(pwd.encode("utf-8"), wrong_hash),  # Check against re-hashed (fails)
-            call(pwd.encode("utf-8"), correct_hash),  # Check against stored hash (fails)
-        ]
-    )
+    mock_hashing_checkpw.assert_awaited_once_with(pwd.encode("utf-8"), correct_hash)
 
 
-# --- Tests for check_api_key --- (Similar structure to password check)
+async def test_check_reservation_password_real_hash(tenant_manager: TenantManager):
+    """Round trip through the hashing executor with a real bcrypt hash."""
+    pwd = "real_password"
+    _salt, _hash = await hashing.hash_password(pwd.encode("utf-8"))
+    mock_reservation = MagicMock(spec=ReservationRecord, reservation_token_hash=_hash.decode("utf-8"))
+    assert await tenant_manager.check_reservation_password(pwd, mock_reservation) == _hash.decode("utf-8")
+    assert await tenant_manager.check_reservation_password("other", mock_reservation) is None
 
 
-def test_check_api_key_null_input(tenant_manager: TenantManager, mock_bcrypt):
-    """Test check_api_key with null inputs."""
-    mock_api_rec = MagicMock(spec=TenantAuthenticationApiRecord)
-    assert tenant_manager.check_api_key(None, mock_api_rec) is None
-    assert tenant_manager.check_api_key("key", None) is None
-    mock_bcrypt.hashpw.assert_not_called()
-    mock_bcrypt.checkpw.assert_not_called()
+# --- Tests for verify_api_key / find_api_key_records ---
 
 
-def test_check_api_key_correct(tenant_manager: TenantManager, mock_bcrypt):
-    """Test check_api_key with correct API key."""
-    api_key = "correct_api_key"
-    salt = b"api_salt_value"
-    hash_val = b"hashed_api_key_value"
-    mock_api_rec = MagicMock(
-        spec=TenantAuthenticationApiRecord,
-        api_key_token_salt=salt.decode(),
-        api_key_token_hash=hash_val.decode(),
-    )
-    mock_bcrypt.hashpw.return_value = hash_val
-    mock_bcrypt.checkpw.return_value = True
-
-    expected_token = hash_val.decode()
-    result_token = tenant_manager.check_api_key(api_key, mock_api_rec)
-
-    assert result_token == expected_token
-    mock_bcrypt.hashpw.assert_called_once_with(api_key.encode("utf-8"), salt)
-    assert mock_bcrypt.checkpw.call_count == 2
-
-
-def test_check_api_key_incorrect(tenant_manager: TenantManager, mock_bcrypt):
-    """Test check_api_key with incorrect API key."""
-    api_key = "wrong_api_key"
-    salt = b"api_salt_value"
-    correct_hash = b"correct_hashed_api_key"
-    wrong_hash = b"wrong_hashed_api_key"
-    mock_api_rec = MagicMock(
-        spec=TenantAuthenticationApiRecord,
-        api_key_token_salt=salt.decode(),
-        api_key_token_hash=correct_hash.decode(),
+def test_parse_api_key():
+    """Prefixed keys carry their record id, legacy keys do not."""
+    rec_id = "0c0bbd7bfa6a4b2c9d3e5f6a7b8c9d0e"
+    record_id, secret = TenantAuthenticationApiRecord.parse_api_key(f"{rec_id}.secret")
+    assert record_id == "0c0bbd7b-fa6a-4b2c-9d3e-5f6a7b8c9d0e"
+    assert secret == "secret"
+    assert TenantAuthenticationApiRecord.parse_api_key("legacykey") == (None, "legacykey")
+    assert TenantAuthenticationApiRecord.parse_api_key("not-a-uuid.secret") == (None, "secret")
+
+
+def test_format_api_key():
+    rec = TenantAuthenticationApiRecord(tenant_authentication_api_id="0c0bbd7b-fa6a-4b2c-9d3e-5f6a7b8c9d0e")
+    assert rec.format_api_key("secret") == "0c0bbd7bfa6a4b2c9d3e5f6a7b8c9d0e.secret"
+
+
+@pytest.mark.asyncio
+async def test_verify_api_key_single_check(tenant_manager: TenantManager):
+    """verify_api_key does one real bcrypt check of the secret part of the key."""
+    secret = "the-secret"
+    hashed = bcrypt.hashpw(secret.encode("utf-8"), bcrypt.gensalt(rounds=4))
+    rec = TenantAuthenticationApiRecord(
+        tenant_authentication_api_id="0c0bbd7b-fa6a-4b2c-9d3e-5f6a7b8c9d0e",
+        api_key_token_hash=hashed.decode("utf-8"),
     )
-    mock_bcrypt.hashpw.return_value = wrong_hash
-    mock_bcrypt.checkpw.side_effect = [False, False]
+    with patch(
+        "traction_innkeeper.v1_0.innkeeper.tenant_manager.hashing.checkpw",
+        wraps=hashing.checkpw,
+    ) as mock_checkpw:
+        assert await tenant_manager.verify_api_key(rec.format_api_key(secret), rec) is True
+        assert await tenant_manager.verify_api_key(secret, rec) is True
+        assert await tenant_manager.verify_api_key(rec.format_api_key("wrong"), rec) is False
+    assert mock_checkpw.await_count == 3
+    assert await tenant_manager.verify_api_key(None, rec) is False
+    assert await tenant_manager.verify_api_key(secret, None) is False
 
-    result_token = tenant_manager.check_api_key(api_key, mock_api_rec)
 
-    assert result_token is None
-    mock_bcrypt.hashpw.assert_called_once_with(api_key.encode("utf-8"), salt)
-    assert mock_bcrypt.checkpw.call_count == 2
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantAuthenticationApiRecord.query_by_tenant_id")
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantAuthenticationApiRecord.retrieve_by_auth_api_id")
+async def test_find_api_key_records_prefixed(
+    mock_retrieve: AsyncMock,
+    mock_query: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_profile,
+):
+    """A prefixed key only loads its own record, and only for the right tenant."""
+    _, session = mock_profile
+    rec = MagicMock(tenant_id="tenant-1")
+    mock_retrieve.return_value = rec
+    key = "0c0bbd7bfa6a4b2c9d3e5f6a7b8c9d0e.secret"
+
+    assert await tenant_manager.find_api_key_records("tenant-1", key) == [rec]
+    assert await tenant_manager.find_api_key_records("tenant-2", key) == []
+    mock_retrieve.assert_awaited_with(session, "0c0bbd7b-fa6a-4b2c-9d3e-5f6a7b8c9d0e")
+    mock_query.assert_not_awaited()
+
+    mock_retrieve.side_effect = StorageNotFoundError()
+    assert await tenant_manager.find_api_key_records("tenant-1", key) == []
+
+
+@pytest.mark.asyncio
+@patch("traction_innkeeper.v1_0.innkeeper.tenant_manager.TenantAuthenticationApiRecord.query_by_tenant_id")
+async def test_find_api_key_records_legacy(
+    mock_query: AsyncMock,
+    tenant_manager: TenantManager,
+    mock_profile,
+):
+    """Legacy keys fall back to all of the tenant's records."""
+    _, session = mock_profile
+    mock_query.return_value = ["a", "b"]
+    assert await tenant_manager.find_api_key_records("tenant-1", "legacykey") == ["a", "b"]
+    mock_query.assert_awaited_once_with(session, "tenant-1")
 
 
 # --- Tests for create_wallet Error Paths and Options ---
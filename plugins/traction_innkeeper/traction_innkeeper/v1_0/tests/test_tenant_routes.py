@@ -7,9 +7,12 @@ from aiohttp import web
 
 # Import the module containing the routes to be tested
 from traction_innkeeper.v1_0.tenant import routes as test_module
+from traction_innkeeper.v1_0.endorser.endorser_connection_service import ENDORSER_CONNECTION_CACHE
+from traction_innkeeper.v1_0.innkeeper import tenant_context
 
 # Import Schemas and Models used for mocking return types or validation
 from traction_innkeeper.v1_0.innkeeper.models import (
+    JobRecord,
     TenantRecord,
     TenantAuthenticationApiRecord,
 )
@@ -30,6 +33,11 @@ TEST_TENANT_ID = "test-tenant-id"
 TEST_API_KEY = "test-secret-key"
 
 
+def patch_tenant_record():
+    """Patch TenantRecord where the request's tenant context looks it up, with nothing cached."""
+    return patch.object(tenant_context, "TenantRecord", autospec=True, **{"from_cache.return_value": None})
+
+
 @pytest.fixture
 def mock_profile_inject():
     """Provides a mock injector function and tracks injectable mocks."""
@@ -94,12 +102,20 @@ def mock_request(mock_context: MagicMock):
     request.match_info = {}
     request.query = {}
 
+    # the tenant context setup_tenant_context puts on the request
+    items = {
+        "context": mock_context,
+        tenant_context.REQUEST_KEY: tenant_context.TenantRequestContext(mock_context),
+    }
+
     def getitem_side_effect(key):
-        if key == "context":
-            return mock_context
+        if key in items:
+            return items[key]
         return MagicMock()
 
     request.__getitem__.side_effect = getitem_side_effect
+    request.__setitem__.side_effect = items.__setitem__
+    request.get = items.get
     request.json = AsyncMock()
     request.headers = {"x-api-key": TEST_API_KEY}
     request._set_json_body = lambda data: setattr(request.json, "return_value", data)
@@ -130,14 +146,14 @@ def mock_multitenant_mgr(mock_profile: MagicMock):
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_tenant_self(
     MockTenantRecordCls: MagicMock,  # Patched Class
     mock_request: MagicMock,
 ):
     """Test GET /tenant endpoint."""
     # Setup mock TenantRecord instance and its query method
-    mock_tenant_rec = AsyncMock(spec=TenantRecord)
+    mock_tenant_rec = AsyncMock(spec=TenantRecord, _id=TEST_TENANT_ID, updated_at="2024-01-01T00:00:00.000000Z")
     mock_tenant_rec.serialize.return_value = {
         "tenant_id": TEST_TENANT_ID,
         "wallet_id": TEST_WALLET_ID,
@@ -156,6 +172,36 @@ async def test_tenant_self(
     }
 
 
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+@patch_tenant_record()
+async def test_tenant_self_not_modified(
+    MockTenantRecordCls: MagicMock,
+    mock_request: MagicMock,
+):
+    """Test GET /tenant returns 304 without serializing when the ETag matches."""
+    mock_tenant_rec = AsyncMock(spec=TenantRecord, _id=TEST_TENANT_ID, updated_at="2024-01-01T00:00:00.000000Z")
+    mock_tenant_rec.serialize.return_value = {"tenant_id": TEST_TENANT_ID}
+    MockTenantRecordCls.query_by_wallet_id = AsyncMock(return_value=mock_tenant_rec)
+
+    response = await test_module.tenant_self(mock_request)
+    etag = response.headers["ETag"]
+
+    mock_tenant_rec.serialize.reset_mock()
+    mock_request.headers["If-None-Match"] = etag
+    response = await test_module.tenant_self(mock_request)
+
+    assert response.status == 304
+    assert response.headers["ETag"] == etag
+    mock_tenant_rec.serialize.assert_not_called()
+
+    # a save moves updated_at, so the old ETag no longer matches
+    mock_tenant_rec.updated_at = "2024-01-02T00:00:00.000000Z"
+    response = await test_module.tenant_self(mock_request)
+    assert response.status == 200
+    assert response.headers["ETag"] != etag
+
+
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
 @patch(f"{test_module.__name__}.WalletRecord", autospec=True)
@@ -167,7 +213,7 @@ async def test_tenant_wallet_get(
 ):
     """Test GET /tenant/wallet endpoint."""
     # Setup mock WalletRecord
-    mock_wallet_rec = MagicMock(spec=WalletRecord)
+    mock_wallet_rec = MagicMock(spec=WalletRecord, _id=TEST_WALLET_ID, updated_at="2024-01-01T00:00:00.000000Z")
     MockWalletRecordCls.retrieve_by_id = AsyncMock(return_value=mock_wallet_rec)
     mock_format_wallet_record.return_value = {
         "wallet_id": TEST_WALLET_ID,
@@ -185,7 +231,7 @@ async def test_tenant_wallet_get(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_tenant_config_get(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
@@ -194,6 +240,8 @@ async def test_tenant_config_get(
     # Setup mock TenantRecord with attributes
     mock_tenant_rec = MagicMock(
         spec=TenantRecord,
+        _id=TEST_TENANT_ID,
+        updated_at="2024-01-01T00:00:00.000000Z",
         connected_to_endorsers=[{"endorser_alias": "test-endorser"}],
         created_public_did=[{"did": "test-did"}],
         auto_issuer=True,
@@ -219,7 +267,7 @@ async def test_tenant_config_get(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_tenant_config_ledger_id_set(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
@@ -234,6 +282,7 @@ async def test_tenant_config_ledger_id_set(
     mock_tenant_rec = AsyncMock(spec=TenantRecord)
     mock_tenant_rec.curr_ledger_id = "old-ledger-id"  # Initial value to be overwritten
     MockTenantRecordCls.query_by_wallet_id = AsyncMock(return_value=mock_tenant_rec)
+    ENDORSER_CONNECTION_CACHE.put(TEST_WALLET_ID, "endorser", "old-ledger-endorser-conn")
 
     response = await test_module.tenant_config_ledger_id_set(mock_request)
 
@@ -245,6 +294,8 @@ async def test_tenant_config_ledger_id_set(
     mock_tenant_rec.save.assert_awaited_once_with(ANY)
     assert response.status == 200
     assert json.loads(response.body) == {"ledger_id": new_ledger_id}
+    # the old ledger's endorser connection is looked up again
+    assert ENDORSER_CONNECTION_CACHE.lookup(TEST_WALLET_ID, "endorser") == (False, None)
 
 
 @pytest.mark.asyncio
@@ -306,7 +357,7 @@ async def test_tenant_wallet_update(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_tenant_email_update(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
@@ -336,7 +387,30 @@ async def test_tenant_email_update(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
+async def test_tenant_email_update_reads_from_storage(
+    MockTenantRecordCls: MagicMock,
+    mock_request: MagicMock,
+):
+    """Test an update is made to the stored record, never to the cached copy."""
+    mock_request._set_json_body({"contact_email": "new.email@example.com"})
+    cached_rec = AsyncMock(spec=TenantRecord, tenant_id=TEST_TENANT_ID)
+    stored_rec = AsyncMock(spec=TenantRecord, tenant_id=TEST_TENANT_ID)
+    MockTenantRecordCls.from_cache.return_value = cached_rec
+    MockTenantRecordCls.query_by_wallet_id = AsyncMock(return_value=stored_rec)
+
+    # the middleware checks the cached copy first
+    assert await tenant_context.tenant_request_context(mock_request).tenant() is cached_rec
+    await test_module.tenant_email_update(mock_request)
+
+    MockTenantRecordCls.query_by_wallet_id.assert_awaited_once_with(ANY, TEST_WALLET_ID)
+    stored_rec.save.assert_awaited_once_with(ANY, reason="updated email")
+    cached_rec.save.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+@patch_tenant_record()
 @patch(f"{test_module.__name__}.TenantAuthenticationApiRecord", autospec=True)
 @patch(f"{test_module.__name__}.create_api_key")
 async def test_tenant_api_key_create(
@@ -383,7 +457,7 @@ async def test_tenant_api_key_create(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 @patch(f"{test_module.__name__}.TenantAuthenticationApiRecord", autospec=True)
 async def test_tenant_api_key_get_record(
     MockTenantAuthApiRecordCls: MagicMock,
@@ -425,7 +499,7 @@ async def test_tenant_api_key_get_record(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 @patch(f"{test_module.__name__}.TenantAuthenticationApiRecord", autospec=True)
 async def test_tenant_api_key_get_record_not_found_wrong_tenant(
     MockTenantAuthApiRecordCls: MagicMock,
@@ -457,7 +531,7 @@ async def test_tenant_api_key_get_record_not_found_wrong_tenant(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 @patch(f"{test_module.__name__}.TenantAuthenticationApiRecord", autospec=True)
 async def test_tenant_api_key_list_records(
     MockTenantAuthApiRecordCls: MagicMock,
@@ -498,7 +572,7 @@ async def test_tenant_api_key_list_records(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 @patch(f"{test_module.__name__}.TenantAuthenticationApiRecord", autospec=True)
 async def test_tenant_api_key_delete_record(
     MockTenantAuthApiRecordCls: MagicMock,
@@ -539,13 +613,17 @@ async def test_tenant_api_key_delete_record(
 @pytest.mark.asyncio
 # Need both manager fixtures for injection setup
 @pytest.mark.usefixtures("mock_tenant_mgr", "mock_multitenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_tenant_delete_hard(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_session: AsyncMock,
     mock_multitenant_mgr: MagicMock,  # Used for assertions
 ):
     """Test DELETE /tenant/hard endpoint."""
+    mock_context.inject = mock_context.profile.inject
+    mock_session.__aexit__ = AsyncMock()
     # Mock TenantRecord query and delete
     mock_tenant_rec = AsyncMock(spec=TenantRecord, tenant_id=TEST_TENANT_ID, wallet_id=TEST_WALLET_ID)
     mock_tenant_rec.serialize.return_value = {
@@ -555,7 +633,11 @@ async def test_tenant_delete_hard(
     MockTenantRecordCls.query_by_wallet_id = AsyncMock(return_value=mock_tenant_rec)
 
     # Mock multitenant manager remove_wallet (on the instance)
-    mock_multitenant_mgr.remove_wallet = AsyncMock()
+    async def remove_wallet(wallet_id):
+        # the session of the lookup is closed before the wallet is removed
+        mock_session.__aexit__.assert_awaited_once()
+
+    mock_multitenant_mgr.remove_wallet = AsyncMock(side_effect=remove_wallet)
 
     response = await test_module.tenant_delete(mock_request)
 
@@ -573,7 +655,7 @@ async def test_tenant_delete_hard(
 
 @pytest.mark.asyncio
 @pytest.mark.usefixtures("mock_tenant_mgr")
-@patch(f"{test_module.__name__}.TenantRecord", autospec=True)
+@patch_tenant_record()
 async def test_tenant_delete_soft(
     MockTenantRecordCls: MagicMock,
     mock_request: MagicMock,
@@ -590,3 +672,73 @@ async def test_tenant_delete_soft(
     mock_tenant_rec.soft_delete.assert_awaited_once_with(ANY)
     assert response.status == 200
     assert json.loads(response.body) == {"success": f"Tenant {TEST_TENANT_ID} soft deleted."}
+
+
+@pytest.mark.asyncio
+async def test_tenant_jobs_are_scoped_to_the_wallet(mock_request: MagicMock):
+    """Test GET /tenant/jobs/{job_id} and cancel only look at the tenant's own jobs."""
+    job = JobRecord(job_id="j1", job_type="schema_sync", wallet_id=TEST_WALLET_ID)
+    mock_request._set_match_info("job_id", "j1")
+
+    with patch.object(test_module, "JOBS") as mock_jobs:
+        mock_jobs.get = AsyncMock(return_value=job)
+        mock_jobs.cancel = AsyncMock(return_value=job)
+        response = await test_module.tenant_job_get(mock_request)
+        assert json.loads(response.body)["job_id"] == "j1"
+        await test_module.tenant_job_cancel(mock_request)
+
+        mock_jobs.get.side_effect = StorageNotFoundError("Job j1 not found.")
+        with pytest.raises(web.HTTPNotFound):
+            await test_module.tenant_job_get(mock_request)
+
+    mock_jobs.get.assert_awaited_with("j1", TEST_WALLET_ID)
+    mock_jobs.cancel.assert_awaited_once_with("j1", TEST_WALLET_ID)
+
+
+@pytest.mark.asyncio
+async def test_setup_tenant_context_shares_tenant(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_tenant_mgr: AsyncMock,
+    mock_session: AsyncMock,
+):
+    """Test the middleware looks the tenant up once, closing its session before the handler runs."""
+    mock_context.inject = mock_context.profile.inject
+    mock_session.__aexit__ = AsyncMock()
+    mock_tenant_rec = AsyncMock(spec=TenantRecord, tenant_id=TEST_TENANT_ID, state=TenantRecord.STATE_ACTIVE)
+
+    async def handler(request):
+        # no session is held while the handler runs
+        mock_session.__aexit__.assert_awaited_once()
+        assert await tenant_context.tenant_request_context(request).tenant() is mock_tenant_rec
+        return web.json_response({})
+
+    with patch_tenant_record() as MockTenantRecordCls:
+        MockTenantRecordCls.query_by_wallet_id = AsyncMock(return_value=mock_tenant_rec)
+        response = await test_module.setup_tenant_context(mock_request, handler)
+
+    assert response.status == 200
+    MockTenantRecordCls.query_by_wallet_id.assert_awaited_once_with(mock_session, TEST_WALLET_ID)
+    mock_tenant_mgr.profile.session.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_tenant_mgr")
+async def test_setup_tenant_context_suspended(
+    mock_request: MagicMock,
+    mock_context: MagicMock,
+    mock_session: AsyncMock,
+):
+    """Test a suspended tenant is refused and the session is still closed."""
+    mock_context.inject = mock_context.profile.inject
+    mock_session.__aexit__ = AsyncMock()
+    mock_tenant_rec = AsyncMock(spec=TenantRecord, tenant_id=TEST_TENANT_ID, state=TenantRecord.STATE_DELETED)
+    handler = AsyncMock()
+
+    with patch_tenant_record() as MockTenantRecordCls:
+        MockTenantRecordCls.query_by_wallet_id = AsyncMock(return_value=mock_tenant_rec)
+        with pytest.raises(web.HTTPUnauthorized):
+            await test_module.setup_tenant_context(mock_request, handler)
+
+    handler.assert_not_called()
+    mock_session.__aexit__.assert_awaited_once()